@@ -37,7 +37,7 @@
 
 """
 Implements the standard 'collect' action.
-@sort: executeCollect
+@sort: executeCollect, planCollect
 @author: Kenneth J. Pronovici <pronovic@ieee.org>
 """
 
@@ -47,14 +47,31 @@ Implements the standard 'collect' action.
 ########################################################################
 
 # System modules
+import sys
 import os
+import re
+import glob
+import bz2
+import zlib
+import time
+import hashlib
 import logging
 import pickle
+import shutil
+import tarfile
+import tempfile
+import traceback
+import multiprocessing
 
 # Cedar Backup modules
 from CedarBackup2.filesystem import BackupFileList, FilesystemList
-from CedarBackup2.util import isStartOfWeek, changeOwnership, displayBytes, buildNormalizedPath
-from CedarBackup2.actions.constants import DIGEST_EXTENSION, COLLECT_INDICATOR
+from CedarBackup2.delta import generateSignature, generateDelta
+from CedarBackup2.chunk import writeChunkArchive
+from CedarBackup2.util import isStartOfWeek, changeOwnership, displayBytes, buildNormalizedPath, deriveDayOfWeek
+from CedarBackup2.util import openBackupFile, closeBackupFile, SECONDS_PER_MINUTE, MINUTES_PER_HOUR, HOURS_PER_DAY
+from CedarBackup2.actions.constants import DIGEST_EXTENSION, COLLECT_INDICATOR, COLLECT_STATISTICS, COLLECT_DEFERRED
+from CedarBackup2.actions.constants import COLLECT_SCHEDULE, SIGNATURE_EXTENSION, CHUNK_EXTENSION, STAGE_INDICATOR
+from CedarBackup2.actions.constants import FULL_EXTENSION, DIR_TIME_FORMAT
 from CedarBackup2.actions.util import writeIndicatorFile
 
 
@@ -64,6 +81,44 @@ from CedarBackup2.actions.util import writeIndicatorFile
 
 logger = logging.getLogger("CedarBackup2.log.actions.collect")
 
+ADAPTIVE_LEVELS = [ ("tar", None), ("targz", 1), ("targz", 6), ("targz", 9), ("tarbz2", 9), ]  # weakest to strongest
+ADAPTIVE_BUDGET = 60                 # default archive budget for a collect run in adaptive mode, in minutes
+ADAPTIVE_SAMPLE = 1024 * 1024        # total amount of data sampled to measure compressor throughput
+ADAPTIVE_CHUNK  = 64 * 1024          # amount of data sampled from each file
+
+DAYS_OF_WEEK = [ "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday", ]
+
+
+########################################################################
+# Worker process support
+########################################################################
+
+class _RecordHandler(logging.Handler):
+
+   """
+   Log handler used within collect worker processes.
+
+   Records are captured rather than being emitted, so they can be returned to
+   the parent process.  The message is formatted (and any exception
+   information is converted to text) up front, so the records can be pickled.
+   """
+
+   def __init__(self):
+      logging.Handler.__init__(self)
+      self.records = []
+
+   def emit(self, record):
+      record.msg = record.getMessage()
+      record.args = None
+      if record.exc_info:
+         record.exc_text = logging.Formatter().formatException(record.exc_info)
+         record.exc_info = None
+      self.records.append(record)
+
+_WORKER_HANDLER = _RecordHandler()  # Captures log records within a worker process
+_WORKER_CONFIG = None               # Config object within a worker process
+_ARCHIVE_DEADLINE = None            # Time by which adaptive archives should be written, during a collect run
+
 
 ########################################################################
 # Public functions
@@ -83,6 +138,18 @@ def executeCollect(configPath, options, config):
    has completed.  The stage process uses this indicator to decide whether a
    peer is ready to be staged.
 
+   @note: If a collect end time or duration is configured, any collect
+   directories which have not been started by the deadline are deferred.  The
+   deferred directories are saved in the working directory, and are collected
+   first on the next run (even if their collect mode would not otherwise call
+   for it).  When some directories were deferred, the collect indicator
+   contains the word C{partial} followed by the deferred paths, one per line.
+
+   @note: Unless the full schedule is C{fixed}, each collect directory gets its
+   own day of the week for its full backup (see L{_getFullDays}), rather than
+   every directory using the configured starting day.  This spreads the full
+   backups across the week.  Collect files always use the starting day.
+
    @param configPath: Path to configuration file on disk.
    @type configPath: String representing a path on disk.
 
@@ -96,30 +163,143 @@ def executeCollect(configPath, options, config):
    @raise TarError: If there is a problem creating a tar file
    """
    logger.debug("Executing the 'collect' action.")
+   _checkCollectConfig(config)
+   deadline = _getCollectDeadline(config, time.time())
+   deferred = _loadDeferred(config)
+   (items, resetFlags) = _getCollectItems(config, options.full, deferred, _getFullDays(config))
+   items.sort(key=lambda item: item[1] not in deferred)  # stable, so deferred items just move to the front
+   remaining = _executeJobs(config, items, deadline, deferred.keys())
+   _updateSchedule(config, items, resetFlags, remaining)
+   contents = ""
+   if remaining:
+      contents = "partial\n%s\n" % "\n".join(remaining)
+      logger.warn("Collect deadline reached; deferred %d directories to the next run.", len(remaining))
+   _writeDeferred(config, dict([ (path, resetFlags[path]) for path in remaining ]))
+   writeIndicatorFile(config.collect.targetDir, COLLECT_INDICATOR,
+                      config.options.backupUser, config.options.backupGroup, contents)
+   logger.info("Executed the 'collect' action successfully.")
+
+
+#########################
+# planCollect() function
+#########################
+
+# pylint: disable=W0613
+def planCollect(configPath, options, config):
+   """
+   Plans the collect backup action, without executing it.
+
+   The collect items and jobs are built exactly as they would be by
+   L{executeCollect}, but rather than being executed, each job just walks its
+   directory and looks at the size and modification time of each file (see
+   L{_planJob}).  Apart from a small sample used to estimate how well the data
+   will compress, no file is read, and nothing is written to the working
+   directory or the collect target directory.
+
+   The plan is written to the screen and to the log.  For each collect item,
+   it lists the number of files and the amount of data to archive, the
+   estimated size once compressed, and the estimated duration, based on the
+   throughput measured by previous runs (see L{_getThroughput}).  Then, the
+   free space in the collect target directory (and in the stage target
+   directory, if stage is configured) is compared against the total
+   estimated size.
+
+   @param configPath: Path to configuration file on disk.
+   @type configPath: String representing a path on disk.
+
+   @param options: Program command-line options.
+   @type options: Options object.
+
+   @param config: Program configuration.
+   @type config: Config object.
+
+   @raise ValueError: Under many generic error conditions
+   """
+   logger.debug("Planning the 'collect' action.")
+   _checkCollectConfig(config)
+   (items, unused) = _getCollectItems(config, options.full, _loadDeferred(config), _getFullDays(config, save=False))
+   throughput = _getThroughput(_loadStatistics(config))
+   plan = []
+   for (message, absolutePath, jobs) in items:
+      if not jobs:
+         plan.append((absolutePath, None))
+      else:
+         totals = [ 0, 0, 0, ]
+         for (jobPath, function, args) in jobs:
+            totals = [ x + y for (x, y) in zip(totals, _planJob(config, function, args)) ]
+         plan.append((absolutePath, tuple(totals)))
+   targets = [ config.collect.targetDir, ]
+   if config.stage is not None and config.stage.targetDir not in targets:
+      targets.append(config.stage.targetDir)
+   _writePlan(plan, throughput, targets)
+   logger.info("Planned the 'collect' action successfully.")
+
+
+########################################################################
+# Private utility functions
+########################################################################
+
+#################################
+# _checkCollectConfig() function
+#################################
+
+def _checkCollectConfig(config):
+   """
+   Checks that the collect configuration is filled in well enough to collect.
+   @param config: Config object.
+   @raise ValueError: If the configuration is not usable.
+   """
    if config.options is None or config.collect is None:
       raise ValueError("Collect configuration is not properly filled in.")
    if ((config.collect.collectFiles is None or len(config.collect.collectFiles) < 1) and
        (config.collect.collectDirs is None or len(config.collect.collectDirs) < 1)):
       raise ValueError("There must be at least one collect file or collect directory.")
-   fullBackup = options.full
+
+
+##############################
+# _getCollectItems() function
+##############################
+
+def _getCollectItems(config, fullBackup, deferred, fullDays):
+   """
+   Gets the collect items for all configured collect files and directories.
+
+   Each item is a tuple C{(message, absolutePath, jobs)}, as described in
+   L{_executeJobs}.  Items that should not be backed up today (per their
+   collect mode) have an empty list of jobs.  Directories that were deferred
+   by the previous run are always collected, using the reset digest flag that
+   was in effect when they were deferred.
+
+   @param config: Config object.
+   @param fullBackup: Full backup flag.
+   @param deferred: Deferred collect directories, as from L{_loadDeferred}.
+   @param fullDays: Full backup day for each collect directory, as from L{_getFullDays}.
+
+   @return: Tuple C{(items, resetFlags)}, where C{resetFlags} maps each collect directory to its reset digest flag.
+   """
    logger.debug("Full backup flag is [%s]", fullBackup)
    todayIsStart = isStartOfWeek(config.options.startingDay)
    resetDigest = fullBackup or todayIsStart
    logger.debug("Reset digest flag is [%s]", resetDigest)
-   if config.collect.collectFiles is not None:
+   resetFlags = {}
+   items = []
+   if config.collect.collectFiles is not None and _getGroupFiles(config):
+      items.extend(_getFileGroupItems(config, fullBackup, todayIsStart, resetDigest))
+   elif config.collect.collectFiles is not None:
       for collectFile in config.collect.collectFiles:
          logger.debug("Working with collect file [%s]", collectFile.absolutePath)
          collectMode = _getCollectMode(config, collectFile)
          archiveMode = _getArchiveMode(config, collectFile)
          digestPath = _getDigestPath(config, collectFile.absolutePath)
          tarfilePath = _getTarfilePath(config, collectFile.absolutePath, archiveMode)
-         if fullBackup or (collectMode in ['daily', 'incr', ]) or (collectMode == 'weekly' and todayIsStart):
+         jobs = []
+         if fullBackup or (collectMode in ['daily', 'incr', 'diff', ]) or (collectMode == 'weekly' and todayIsStart):
             logger.debug("File meets criteria to be backed up today.")
-            _collectFile(config, collectFile.absolutePath, tarfilePath,
-                         collectMode, archiveMode, resetDigest, digestPath)
+            jobs.append((collectFile.absolutePath, _collectFile,
+                         (collectFile.absolutePath, tarfilePath, collectMode, archiveMode, resetDigest, digestPath)))
          else:
             logger.debug("File will not be backed up, per collect mode.")
-         logger.info("Completed collecting file [%s]", collectFile.absolutePath)
+         items.append(("Completed collecting file [%s]", collectFile.absolutePath, jobs))
    if config.collect.collectDirs is not None:
       for collectDir in config.collect.collectDirs:
          logger.debug("Working with collect directory [%s]", collectDir.absolutePath)
@@ -129,23 +309,39 @@ def executeCollect(configPath, options, config):
          linkDepth = _getLinkDepth(collectDir)
          dereference = _getDereference(collectDir)
          recursionLevel = _getRecursionLevel(collectDir)
+         volumeSize = _getVolumeSize(collectDir)
+         skipCompressed = _getSkipCompressed(collectDir)
+         fileFilters = _getFileFilters(collectDir)
+         syntheticFull = _getSyntheticFull(collectDir) and not fullBackup
+         deltaThreshold = _getDeltaThreshold(collectDir)
+         dedupFiles = _getDedupFiles(collectDir)
          (excludePaths, excludePatterns) = _getExclusions(config, collectDir)
-         if fullBackup or (collectMode in ['daily', 'incr', ]) or (collectMode == 'weekly' and todayIsStart):
+         dirIsStart = todayIsStart
+         if collectDir.absolutePath in fullDays:
+            dirIsStart = isStartOfWeek(fullDays[collectDir.absolutePath])
+         dirResetDigest = fullBackup or dirIsStart
+         resetFlags[collectDir.absolutePath] = dirResetDigest or deferred.get(collectDir.absolutePath, False)
+         jobs = []
+         if collectDir.absolutePath in deferred:
+            logger.debug("Directory was deferred by the previous run.")
+            jobs.extend(_getDirectoryJobs(collectDir.absolutePath,
+                                          collectMode, archiveMode, ignoreFile, linkDepth, dereference,
+                                          resetFlags[collectDir.absolutePath],
+                                          excludePaths, excludePatterns, recursionLevel,
+                                          volumeSize, skipCompressed, fileFilters, syntheticFull, deltaThreshold,
+                                          dedupFiles))
+         elif fullBackup or (collectMode in ['daily', 'incr', 'diff', ]) or (collectMode == 'weekly' and dirIsStart):
             logger.debug("Directory meets criteria to be backed up today.")
-            _collectDirectory(config, collectDir.absolutePath,
-                              collectMode, archiveMode, ignoreFile, linkDepth, dereference,
-                              resetDigest, excludePaths, excludePatterns, recursionLevel)
+            jobs.extend(_getDirectoryJobs(collectDir.absolutePath,
+                                          collectMode, archiveMode, ignoreFile, linkDepth, dereference,
+                                          dirResetDigest, excludePaths, excludePatterns, recursionLevel,
+                                          volumeSize, skipCompressed, fileFilters, syntheticFull, deltaThreshold,
+                                          dedupFiles))
          else:
             logger.debug("Directory will not be backed up, per collect mode.")
-         logger.info("Completed collecting directory [%s]", collectDir.absolutePath)
-   writeIndicatorFile(config.collect.targetDir, COLLECT_INDICATOR,
-                      config.options.backupUser, config.options.backupGroup)
-   logger.info("Executed the 'collect' action successfully.")
-
+         items.append(("Completed collecting directory [%s]", collectDir.absolutePath, jobs))
+   return (items, resetFlags)
 
-########################################################################
-# Private utility functions
-########################################################################
 
 ##########################
 # _collectFile() function
@@ -171,10 +367,86 @@ def _collectFile(config, absolutePath, tarfilePath, collectMode, archiveMode, re
    @param archiveMode: Archive mode to use.
    @param resetDigest: Reset digest flag.
    @param digestPath: Path to digest file on disk, if needed.
+   @return: Number of bytes backed up, as from L{_executeBackup}.
    """
    backupList = BackupFileList()
    backupList.addFile(absolutePath)
-   _executeBackup(config, backupList, absolutePath, tarfilePath, collectMode, archiveMode, resetDigest, digestPath)
+   return _executeBackup(config, backupList, absolutePath, tarfilePath, collectMode, archiveMode, resetDigest, digestPath)
+
+
+###############################
+# _collectFileGroup() function
+###############################
+
+def _collectFileGroup(config, groupPath, absolutePaths, tarfilePath, collectMode, archiveMode, resetDigest, digestPath):
+   """
+   Collects a group of configured collect files.
+
+   This works just like L{_collectFile}, except that all of the files in the
+   group are collected into a single tarfile, with a single digest.  The group
+   path is not a real path on disk; it's used to name the tarfile and digest
+   and to identify the group in log messages (see L{_getFileGroupPath}).
+
+   @param config: Config object.
+   @param groupPath: Path identifying the group of files.
+   @param absolutePaths: List of absolute paths of files to collect.
+   @param tarfilePath: Path to tarfile that should be created.
+   @param collectMode: Collect mode to use.
+   @param archiveMode: Archive mode to use.
+   @param resetDigest: Reset digest flag.
+   @param digestPath: Path to digest file on disk, if needed.
+   @return: Number of bytes backed up, as from L{_executeBackup}.
+   """
+   backupList = BackupFileList()
+   for absolutePath in absolutePaths:
+      backupList.addFile(absolutePath)
+   return _executeBackup(config, backupList, groupPath, tarfilePath, collectMode, archiveMode, resetDigest, digestPath)
+
+
+################################
+# _getFileGroupItems() function
+################################
+
+def _getFileGroupItems(config, fullBackup, todayIsStart, resetDigest):
+   """
+   Gets the collect items for configured collect files, grouped together.
+
+   When collect files are grouped, every collect file that meets the criteria
+   to be backed up today is put into a group with the other files that share
+   its collect mode and archive mode.  Each group is a single collect item
+   with a single job, which collects all of the files in the group into one
+   tarfile using one digest (see L{_collectFileGroup}).  This avoids the
+   overhead of writing, staging and storing a separate tarfile and digest for
+   each file when many individual files are configured.
+
+   @param config: Config object.
+   @param fullBackup: Full backup flag.
+   @param todayIsStart: Whether today is the start of the week.
+   @param resetDigest: Reset digest flag.
+
+   @return: List of collect items, as described in L{_executeJobs}.
+   """
+   groups = {}
+   for collectFile in config.collect.collectFiles:
+      logger.debug("Working with collect file [%s]", collectFile.absolutePath)
+      collectMode = _getCollectMode(config, collectFile)
+      archiveMode = _getArchiveMode(config, collectFile)
+      if fullBackup or (collectMode in ['daily', 'incr', 'diff', ]) or (collectMode == 'weekly' and todayIsStart):
+         logger.debug("File meets criteria to be backed up today.")
+         groups.setdefault((collectMode, archiveMode), []).append(collectFile.absolutePath)
+      else:
+         logger.debug("File will not be backed up, per collect mode.")
+   items = []
+   for (collectMode, archiveMode) in sorted(groups.keys()):
+      groupPath = _getFileGroupPath(collectMode, archiveMode)
+      digestPath = _getDigestPath(config, groupPath)
+      tarfilePath = _getTarfilePath(config, groupPath, archiveMode)
+      absolutePaths = groups[(collectMode, archiveMode)]
+      logger.debug("File group [%s] contains %d files.", groupPath, len(absolutePaths))
+      jobs = [ (groupPath, _collectFileGroup,
+                (groupPath, absolutePaths, tarfilePath, collectMode, archiveMode, resetDigest, digestPath)), ]
+      items.append(("Completed collecting file group [%s]", groupPath, jobs))
+   return items
 
 
 ###############################
@@ -183,7 +455,8 @@ def _collectFile(config, absolutePath, tarfilePath, collectMode, archiveMode, re
 
 def _collectDirectory(config, absolutePath, collectMode, archiveMode,
                       ignoreFile, linkDepth, dereference, resetDigest,
-                      excludePaths, excludePatterns, recursionLevel):
+                      excludePaths, excludePatterns, volumeSize=None, skipCompressed=False, fileFilters=None,
+                      syntheticFull=False, deltaThreshold=None, dedupFiles=False):
    """
    Collects a configured collect directory.
 
@@ -195,6 +468,11 @@ def _collectDirectory(config, absolutePath, collectMode, archiveMode,
 
    The caller must decide what the collect and archive modes are, since they
    can be on both the collect configuration and the collect directory itself.
+   Recursion is handled by L{_getDirectoryJobs}, so this function always
+   collects the directory itself, as if the recursion level were zero.
+
+   Files that are left out because of the size and age filters are
+   summarized in the log (see L{_logFilteredFiles}).
 
    @param config: Config object.
    @param absolutePath: Absolute path of directory to collect.
@@ -206,21 +484,119 @@ def _collectDirectory(config, absolutePath, collectMode, archiveMode,
    @param resetDigest: Reset digest flag.
    @param excludePaths: List of absolute paths to exclude.
    @param excludePatterns: List of patterns to exclude.
-   @param recursionLevel: Recursion level (zero for no recursion)
+   @param volumeSize: Volume size to use, in bytes, or C{None} for a single tarfile.
+   @param skipCompressed: Skip compressed flag to use.
+   @param fileFilters: File filters to use, as from L{_getFileFilters}.
+   @param syntheticFull: Synthetic full flag to use.
+   @param deltaThreshold: Delta threshold to use, in bytes, or C{None} to never archive deltas.
+   @param dedupFiles: Dedup files flag to use.
+   @return: Number of bytes backed up, as from L{_executeBackup}.
    """
-   if recursionLevel == 0:
-      # Collect the actual directory because we're at recursion level 0
-      logger.info("Collecting directory [%s]", absolutePath)
-      tarfilePath = _getTarfilePath(config, absolutePath, archiveMode)
-      digestPath = _getDigestPath(config, absolutePath)
+   logger.info("Collecting directory [%s]", absolutePath)
+   tarfilePath = _getTarfilePath(config, absolutePath, archiveMode)
+   digestPath = _getDigestPath(config, absolutePath)
+   backupList = _buildDirectoryList(absolutePath, ignoreFile, linkDepth, dereference,
+                                    excludePaths, excludePatterns, fileFilters)
+   _logFilteredFiles(backupList, absolutePath)
+   return _executeBackup(config, backupList, absolutePath, tarfilePath, collectMode, archiveMode, resetDigest, digestPath,
+                         volumeSize, skipCompressed, syntheticFull, deltaThreshold, dedupFiles)
 
-      backupList = BackupFileList()
-      backupList.ignoreFile = ignoreFile
-      backupList.excludePaths = excludePaths
-      backupList.excludePatterns = excludePatterns
-      backupList.addDirContents(absolutePath, linkDepth=linkDepth, dereference=dereference)
 
-      _executeBackup(config, backupList, absolutePath, tarfilePath, collectMode, archiveMode, resetDigest, digestPath)
+#################################
+# _buildDirectoryList() function
+#################################
+
+def _buildDirectoryList(absolutePath, ignoreFile, linkDepth, dereference, excludePaths, excludePatterns, fileFilters):
+   """
+   Builds the backup list for a collect directory, as if the recursion level were zero.
+   @param absolutePath: Absolute path of directory to collect.
+   @param ignoreFile: Ignore file to use.
+   @param linkDepth: Link depth value to use.
+   @param dereference: Dereference flag to use.
+   @param excludePaths: List of absolute paths to exclude.
+   @param excludePatterns: List of patterns to exclude.
+   @param fileFilters: File filters to use, as from L{_getFileFilters}, or C{None}.
+   @return: Backup list containing the contents of the directory.
+   """
+   backupList = BackupFileList()
+   backupList.ignoreFile = ignoreFile
+   backupList.excludePaths = excludePaths
+   backupList.excludePatterns = excludePatterns
+   if fileFilters is not None:
+      (backupList.maxFileSize, backupList.minFileAge, backupList.maxFileAge) = fileFilters
+   backupList.addDirContents(absolutePath, linkDepth=linkDepth, dereference=dereference)
+   return backupList
+
+
+###############################
+# _logFilteredFiles() function
+###############################
+
+def _logFilteredFiles(backupList, absolutePath):
+   """
+   Summarizes the files left out of a backup list by its size and age filters.
+   @param backupList: Backup list that has been filled in.
+   @param absolutePath: Absolute path of directory being collected.
+   """
+   if backupList.filteredFiles:
+      counts = { "size": 0, "new": 0, "old": 0, }
+      total = 0.0
+      for (path, size, reason) in backupList.filteredFiles:
+         counts[reason] += 1
+         total += size
+      logger.info("Skipped %d files in [%s] (%s): %d too large, %d too new, %d too old.",
+                  len(backupList.filteredFiles), absolutePath, displayBytes(total),
+                  counts["size"], counts["new"], counts["old"])
+      for (path, size, reason) in sorted(backupList.filteredFiles, key=lambda item: item[1], reverse=True)[:10]:
+         logger.info("Skipped file [%s] (%s, %s).", path, displayBytes(size), reason)
+
+
+###############################
+# _getDirectoryJobs() function
+###############################
+
+def _getDirectoryJobs(absolutePath, collectMode, archiveMode,
+                      ignoreFile, linkDepth, dereference, resetDigest,
+                      excludePaths, excludePatterns, recursionLevel, volumeSize=None, skipCompressed=False,
+                      fileFilters=None, syntheticFull=False, deltaThreshold=None, dedupFiles=False):
+   """
+   Gets the list of independent collect jobs for a configured collect directory.
+
+   If the recursion level is zero, there is a single job, which collects the
+   directory itself.  Otherwise, each of the immediate subdirectories is
+   broken down recursively, and then one final job collects everything that
+   hasn't previously been backed up.  Each job gets its own copy of the
+   exclusions in effect at the point where it was generated, so the jobs can
+   be executed in any order (or concurrently) and still produce exactly the
+   same tarfiles.
+
+   Each job is a tuple C{(absolutePath, function, args)}.  The function must be
+   called as C{function(config, *args)}.
+
+   @param absolutePath: Absolute path of directory to collect.
+   @param collectMode: Collect mode to use.
+   @param archiveMode: Archive mode to use.
+   @param ignoreFile: Ignore file to use.
+   @param linkDepth: Link depth value to use.
+   @param dereference: Dereference flag to use.
+   @param resetDigest: Reset digest flag.
+   @param excludePaths: List of absolute paths to exclude.
+   @param excludePatterns: List of patterns to exclude.
+   @param recursionLevel: Recursion level (zero for no recursion)
+   @param volumeSize: Volume size to use, in bytes, or C{None} for a single tarfile.
+   @param skipCompressed: Skip compressed flag to use.
+   @param fileFilters: File filters to use, as from L{_getFileFilters}.
+   @param syntheticFull: Synthetic full flag to use.
+   @param deltaThreshold: Delta threshold to use, in bytes, or C{None} to never archive deltas.
+   @param dedupFiles: Dedup files flag to use.
+
+   @return: List of jobs, in the order they would be executed sequentially.
+   """
+   if recursionLevel == 0:
+      return [ (absolutePath, _collectDirectory,
+                (absolutePath, collectMode, archiveMode, ignoreFile, linkDepth, dereference,
+                 resetDigest, excludePaths[:], excludePatterns[:], volumeSize, skipCompressed, fileFilters,
+                 syntheticFull, deltaThreshold, dedupFiles)), ]
    else:
       # Find all of the immediate subdirectories
       subdirs = FilesystemList()
@@ -231,23 +607,220 @@ def _collectDirectory(config, absolutePath, collectMode, archiveMode,
       subdirs.addDirContents(path=absolutePath, recursive=False, addSelf=False)
 
       # Back up the subdirectories separately
+      jobs = []
       for subdir in subdirs:
-         _collectDirectory(config, subdir, collectMode, archiveMode,
-                           ignoreFile, linkDepth, dereference, resetDigest,
-                           excludePaths, excludePatterns, recursionLevel-1)
+         jobs.extend(_getDirectoryJobs(subdir, collectMode, archiveMode,
+                                       ignoreFile, linkDepth, dereference, resetDigest,
+                                       excludePaths, excludePatterns, recursionLevel-1,
+                                       volumeSize, skipCompressed, fileFilters, syntheticFull, deltaThreshold,
+                                       dedupFiles))
          excludePaths.append(subdir) # this directory is already backed up, so exclude it
 
       # Back up everything that hasn't previously been backed up
-      _collectDirectory(config, absolutePath, collectMode, archiveMode,
-                        ignoreFile, linkDepth, dereference, resetDigest,
-                        excludePaths, excludePatterns, 0)
+      jobs.extend(_getDirectoryJobs(absolutePath, collectMode, archiveMode,
+                                    ignoreFile, linkDepth, dereference, resetDigest,
+                                    excludePaths, excludePatterns, 0, volumeSize, skipCompressed, fileFilters,
+                                    syntheticFull, deltaThreshold, dedupFiles))
+      return jobs
+
+
+##########################
+# _executeJobs() function
+##########################
+
+def _executeJobs(config, items, deadline=None, priority=None):
+   """
+   Executes the collect jobs for all configured collect items.
+
+   Each item is a tuple C{(message, absolutePath, jobs)}, as built by
+   L{executeCollect}.  The completion message is logged (with the absolute
+   path as its argument) once all of the item's jobs have completed.
+
+   If a deadline is passed in, collect directory jobs which have not been
+   started by the deadline are skipped rather than executed.  A job which is
+   already in progress when the deadline passes is allowed to finish.  Any
+   item with a skipped job is deferred, and is returned to the caller.
+
+   If the configured worker count is greater than one, the jobs are executed
+   concurrently in a pool of worker processes.  Jobs are submitted to the pool
+   longest-job-first, based on how long each job took during the previous run
+   (jobs we have no history for are assumed to be long).  Each worker
+   captures the log messages generated by its jobs, and the messages are
+   re-emitted here in configuration order once the job completes.  Since every
+   job writes its own tarfile and digest, the result on disk is identical to
+   what a sequential run would have produced.  If a job fails, the traceback
+   from the worker process is logged before its exception is raised here,
+   since re-raising the exception loses the worker's stack.
+
+   Job durations and the number of bytes each job backed up are saved in the
+   working directory for use on the next run.
+
+   The archive budget used in adaptive archive mode covers the whole run, so
+   it is turned into a deadline here, which is shared with the worker
+   processes (see L{_chooseCompression}).
+
+   Jobs for the items listed in C{priority} (i.e. items deferred by the
+   previous run) are submitted to the pool ahead of all others.
+
+   @param config: Config object.
+   @param items: List of collect items to execute.
+   @param deadline: Time after which no new collect directory jobs are started, in seconds since the epoch.
+   @param priority: List of absolute paths of items whose jobs should be started first.
+
+   @return: List of absolute paths of the items that were deferred.
+
+   @raise ValueError: Under many generic error conditions
+   @raise TarError: If there is a problem creating a tar file
+   """
+   global _ARCHIVE_DEADLINE # pylint: disable=W0603
+   statistics = _loadStatistics(config)
+   workerCount = _getWorkerCount(config)
+   _ARCHIVE_DEADLINE = time.time() + (_getArchiveBudget(config) * SECONDS_PER_MINUTE)
+   if priority is None:
+      priority = []
+   jobs = []
+   for (message, absolutePath, itemJobs) in items:
+      for job in itemJobs:
+         jobs.append((absolutePath in priority, job))
+   pool = None
+   results = None
+   deferred = []
+   try:
+      if workerCount > 1 and len(jobs) > 1:
+         workerCount = min(workerCount, len(jobs))
+         logger.info("Collecting %d jobs using %d worker processes.", len(jobs), workerCount)
+         order = sorted(range(len(jobs)), reverse=True,
+                        key=lambda index: (jobs[index][0], _getPreviousDuration(statistics, jobs[index][1][0])))
+         pool = multiprocessing.Pool(processes=workerCount, initializer=_initializeWorker, initargs=(config, _ARCHIVE_DEADLINE))
+         results = [ None, ] * len(jobs)
+         for index in order:
+            (unused, function, args) = jobs[index][1]
+            results[index] = pool.apply_async(_executeWorkerJob, (function, args, _getJobDeadline(function, deadline)))
+         pool.close()
+      index = 0
+      for (message, absolutePath, itemJobs) in items:
+         skipped = False
+         for (jobPath, function, args) in itemJobs:
+            if results is None:
+               jobDeadline = _getJobDeadline(function, deadline)
+               if jobDeadline is not None and time.time() >= jobDeadline:
+                  skipped = True
+               else:
+                  start = time.time()
+                  size = function(config, *args)
+                  statistics[jobPath] = { "duration": time.time() - start, "bytes": size, }
+            else:
+               (duration, records, error, skip, size, trace) = results[index].get()
+               for record in records:
+                  logging.getLogger(record.name).handle(record)
+               if error is not None:
+                  logger.error("Collect job for [%s] failed in a worker process:\n%s", jobPath, trace.rstrip())
+                  raise error
+               if skip:
+                  skipped = True
+               else:
+                  statistics[jobPath] = { "duration": duration, "bytes": size, }
+            index += 1
+         if skipped:
+            logger.info("Deferred [%s] to the next run, since the collect deadline has passed.", absolutePath)
+            deferred.append(absolutePath)
+         else:
+            logger.info(message, absolutePath)
+   finally:
+      if pool is not None:
+         pool.terminate()
+         pool.join()
+      _ARCHIVE_DEADLINE = None
+      _writeStatistics(config, statistics)
+   return deferred
+
+
+#############################
+# _getJobDeadline() function
+#############################
+
+def _getJobDeadline(function, deadline):
+   """
+   Gets the deadline that applies to a single collect job.
+   Only collect directory jobs can be deferred, so other jobs have no deadline.
+   @param function: Collect function the job calls.
+   @param deadline: Collect deadline, in seconds since the epoch, or C{None}.
+   @return: Deadline for the job, or C{None} if the job must always be executed.
+   """
+   if function is _collectDirectory:
+      return deadline
+   return None
+
+
+################################
+# _initializeWorker() function
+################################
+
+def _initializeWorker(config, archiveDeadline=None):
+   """
+   Initializes a collect worker process.
+
+   The configuration is saved for use by L{_executeWorkerJob}.  (The config
+   object is inherited when the worker process is forked, so it never needs
+   to be pickled.)  The handlers on the Cedar Backup loggers are replaced with
+   a handler that just captures log records, so the parent process can emit
+   them in a deterministic order.
+
+   @param config: Config object.
+   @param archiveDeadline: Time by which adaptive archives should be written, in seconds since the epoch.
+   """
+   global _WORKER_CONFIG, _ARCHIVE_DEADLINE # pylint: disable=W0603
+   _WORKER_CONFIG = config
+   _ARCHIVE_DEADLINE = archiveDeadline
+   for name in [ "CedarBackup2.log", "CedarBackup2.output", ]:
+      logging.getLogger(name).handlers = [ _WORKER_HANDLER, ]
+
+
+################################
+# _executeWorkerJob() function
+################################
+
+def _executeWorkerJob(function, args, deadline=None):
+   """
+   Executes a single collect job within a worker process.
+
+   Exceptions are not raised, but are instead returned to the caller along
+   with the captured log records, so the log output generated prior to the
+   failure is not lost.  The traceback is formatted here and returned as
+   well, because it can't be recovered from the exception once it has been
+   passed back to the parent process.
+
+   If the deadline has already passed when the job is picked up, the job is
+   skipped rather than executed.
+
+   @param function: Collect function to call.
+   @param args: Arguments to the collect function, except for config.
+   @param deadline: Time after which the job is skipped, in seconds since the epoch, or C{None}.
+
+   @return: Tuple C{(duration, records, error, skipped, size, trace)}, where error and trace are C{None} on success.
+   """
+   _WORKER_HANDLER.records = []
+   error = None
+   trace = None
+   size = None
+   start = time.time()
+   if deadline is not None and start >= deadline:
+      return (0.0, [], None, True, None, None)
+   try:
+      size = function(_WORKER_CONFIG, *args)
+   except Exception, e:
+      error = e
+      trace = traceback.format_exc()
+   duration = time.time() - start
+   return (duration, _WORKER_HANDLER.records, error, False, size, trace)
 
 
 ############################
 # _executeBackup() function
 ############################
 
-def _executeBackup(config, backupList, absolutePath, tarfilePath, collectMode, archiveMode, resetDigest, digestPath):
+def _executeBackup(config, backupList, absolutePath, tarfilePath, collectMode, archiveMode, resetDigest, digestPath,
+                   volumeSize=None, skipCompressed=False, syntheticFull=False, deltaThreshold=None, dedupFiles=False):
    """
    Execute the backup process for the indicated backup list.
 
@@ -261,6 +834,50 @@ def _executeBackup(config, backupList, absolutePath, tarfilePath, collectMode, a
    that is being backed up.  This might little wasteful in terms of the number
    of files that we keep around, but it's consistent and easy to understand.
 
+   In incremental mode, we try to read each file only once.  Only the files
+   that appear in the old digest need to be hashed up front, to decide whether
+   they have changed.  Every other file (which, when the digest is reset, is
+   every file) is new, so it is hashed while it's being written into the
+   tarfile.  The new digest is then made up of the old digest values for the
+   unchanged files plus the digests captured while archiving.  A file that
+   can't be archived is left out of the new digest, so it will be picked up
+   again next time.
+
+   Differential mode works the same way, except that the digest is only
+   written when it is reset (or when there is no digest on disk yet).  Every
+   other day is compared against the digest from the last full backup, so a
+   restore never needs more than the full backup and the latest differential.
+   The same goes for the record of stored chunks in C{chunk} archive mode
+   (see L{_writeChunkArchive}).
+
+   If the synthetic full flag is set for an incremental directory, then
+   instead of resetting the digest, the full backup is built by
+   L{_executeSyntheticBackup}.  Either way, the date of each full backup of an
+   incremental directory is saved (see L{_writeFullDate}), so later synthetic
+   full backups know which staged archives belong to the current cycle.
+
+   If a delta threshold is set, changed files larger than the threshold are
+   archived as block deltas rather than in full, as long as they have a block
+   signature from an earlier run (see L{_executeDeltas}).  This never happens
+   when the digest is reset.  The signatures are saved alongside the digest,
+   whenever the digest is written (see L{_writeSignatures}).  In incremental
+   mode, each delta applies to the file as of the previous run.  In
+   differential mode, each delta applies to the file as of the last full
+   backup.
+
+   If a volume size is set, the tarfile is split into independently valid
+   volumes as it is written (see L{BackupFileList.generateTarfile}), and every
+   volume is given the configured ownership.
+
+   If the skip compressed flag is set and the archive mode is compressed, files
+   that won't compress any further are written into a separate uncompressed
+   tarfile alongside the normal one (see L{_writeTarfiles}).
+
+   If the dedup files flag is set, files with exactly the same contents as
+   another file in the same tarfile are stored as hard links to it (see
+   L{BackupFileList.generateTarfile}).  Synthetic full backups are built
+   without this.
+
    @param config: Config object.
    @param backupList: List to execute backup for
    @param absolutePath: Absolute path of directory or file to collect.
@@ -269,16 +886,31 @@ def _executeBackup(config, backupList, absolutePath, tarfilePath, collectMode, a
    @param archiveMode: Archive mode to use.
    @param resetDigest: Reset digest flag.
    @param digestPath: Path to digest file on disk, if needed.
+   @param volumeSize: Volume size to use, in bytes, or C{None} for a single tarfile.
+   @param skipCompressed: Skip compressed flag to use.
+   @param syntheticFull: Synthetic full flag to use.
+   @param deltaThreshold: Delta threshold to use, in bytes, or C{None} to never archive deltas.
+   @param dedupFiles: Dedup files flag to use.
+
+   @return: Number of bytes backed up, i.e. the total size of the files that were archived.
    """
-   if collectMode != 'incr':
+   if _getPhysicalOrder(config):
+      backupList.sortPhysical()
+   if syntheticFull and resetDigest and collectMode == 'incr':
+      if volumeSize is None and not skipCompressed and archiveMode not in [ 'adaptive', 'chunk', ]:
+         return _executeSyntheticBackup(config, backupList, absolutePath, tarfilePath, archiveMode, digestPath,
+                                        deltaThreshold)
+      logger.warn("Synthetic full backup of [%s] is not possible with volumes, skipped compression, adaptive or chunk mode.",
+                  absolutePath)
+   if collectMode not in ['incr', 'diff', ]:
       logger.debug("Collect mode is [%s]; no digest will be used.", collectMode)
       if len(backupList) == 1 and backupList[0] == absolutePath:  # special case for individual file
          logger.info("Backing up file [%s] (%s).", absolutePath, displayBytes(backupList.totalSize()))
       else:
          logger.info("Backing up %d files in [%s] (%s).", len(backupList), absolutePath, displayBytes(backupList.totalSize()))
-      if len(backupList) > 0:
-         backupList.generateTarfile(tarfilePath, archiveMode, True)
-         changeOwnership(tarfilePath, config.options.backupUser, config.options.backupGroup)
+      _writeTarfiles(config, backupList, absolutePath, tarfilePath, archiveMode, False, volumeSize, skipCompressed,
+                     resetDigest, dedupFiles)
+      return backupList.totalSize()
    else:
       if resetDigest:
          logger.debug("Based on resetDigest flag, digest will be cleared.")
@@ -286,96 +918,1205 @@ def _executeBackup(config, backupList, absolutePath, tarfilePath, collectMode, a
       else:
          logger.debug("Based on resetDigest flag, digest will loaded from disk.")
          oldDigest = _loadDigest(digestPath)
-      (removed, newDigest) = backupList.removeUnchanged(oldDigest, captureDigest=True)
+      updateDigest = collectMode == 'incr' or resetDigest or not os.path.isfile(digestPath)
+      logger.debug("Update digest flag is [%s]", updateDigest)
+      candidates = set(backupList)
+      removed = backupList.removeUnchanged(oldDigest)
       logger.debug("Removed %d unchanged files based on digest values.", removed)
+      newDigest = {}
+      for entry in candidates.difference(backupList):
+         newDigest[entry] = oldDigest[entry]
+      if deltaThreshold is not None:
+         signaturePath = _getSignaturePath(config, absolutePath)
+         signatures = _loadSignatures(signaturePath)
+         if not resetDigest:
+            newDigest.update(_executeDeltas(config, backupList, absolutePath, deltaThreshold, signatures))
       if len(backupList) == 1 and backupList[0] == absolutePath:  # special case for individual file
          logger.info("Backing up file [%s] (%s).", absolutePath, displayBytes(backupList.totalSize()))
       else:
          logger.info("Backing up %d files in [%s] (%s).", len(backupList), absolutePath, displayBytes(backupList.totalSize()))
-      if len(backupList) > 0:
-         backupList.generateTarfile(tarfilePath, archiveMode, True)
-         changeOwnership(tarfilePath, config.options.backupUser, config.options.backupGroup)
-      _writeDigest(config, newDigest, digestPath)
-
+      newDigest.update(_writeTarfiles(config, backupList, absolutePath, tarfilePath, archiveMode,
+                                      updateDigest, volumeSize, skipCompressed, resetDigest, dedupFiles,
+                                      updateDigest))
+      if updateDigest:
+         _writeDigest(config, newDigest, digestPath)
+         if deltaThreshold is not None:
+            _writeSignatures(config, signatures, newDigest, deltaThreshold, signaturePath)
+      if resetDigest and collectMode == 'incr':
+         _writeFullDate(config, absolutePath)
+      return backupList.totalSize()
+
+
+#####################################
+# _executeSyntheticBackup() function
+#####################################
+
+def _executeSyntheticBackup(config, backupList, absolutePath, tarfilePath, archiveMode, digestPath, deltaThreshold=None):
+   """
+   Execute a synthetic full backup for the indicated backup list.
+
+   A synthetic full backup contains every file in the list, just like a normal
+   full backup, but the contents of unchanged files are copied out of the
+   archives already in the staging area rather than being read from disk again
+   (see L{BackupFileList.generateSyntheticTarfile}).
+
+   The existing digest is used to decide which files are unchanged, exactly
+   like on any other day in incremental mode.  Since the digest is updated
+   every day, the newest staged archive containing an unchanged file holds its
+   current contents.  Each copied file is checked against its digest value
+   on the way, and a copy that doesn't match is not used.  Changed and new
+   files, plus any unchanged files that can't be found in the staged archives
+   or whose copy doesn't match, are read from disk.  The digest is then
+   rewritten to cover the whole list, as for a normal full backup.  Only the
+   staged archives written since the last full backup are used (see
+   L{_getSyntheticArchives}).
+
+   If a delta threshold is set, files larger than the threshold are always
+   read from disk, because the newest staged copy of such a file may be
+   followed by deltas rather than by a full copy.  The block signatures are
+   updated along with the digest.
 
-#########################
-# _loadDigest() function
-#########################
+   @param config: Config object.
+   @param backupList: List to execute backup for
+   @param absolutePath: Absolute path of directory or file to collect.
+   @param tarfilePath: Path to tarfile that should be created.
+   @param archiveMode: Archive mode to use.
+   @param digestPath: Path to digest file on disk.
+   @param deltaThreshold: Delta threshold to use, in bytes, or C{None} if deltas are never archived.
 
-def _loadDigest(digestPath):
+   @return: Number of bytes backed up, i.e. the total size of the files in the list.
    """
-   Loads the indicated digest path from disk into a dictionary.
+   oldDigest = _loadDigest(digestPath)
+   fullList = BackupFileList()
+   fullList.extend(backupList)
+   candidates = set(backupList)
+   removed = backupList.removeUnchanged(oldDigest)
+   logger.debug("Found %d unchanged files based on digest values.", removed)
+   unchanged = {}
+   for entry in candidates.difference(backupList):
+      if deltaThreshold is None or not _isDeltaCandidate(entry, deltaThreshold):
+         unchanged[entry] = oldDigest[entry]
+   archives = _getSyntheticArchives(config, absolutePath)
+   logger.info("Backing up %d files in [%s] (%s) as a synthetic full backup from %d staged archives.",
+               len(fullList), absolutePath, displayBytes(fullList.totalSize()), len(archives))
+   newDigest = {}
+   if len(fullList) > 0:
+      newDigest = fullList.generateSyntheticTarfile(tarfilePath, archives, unchanged, archiveMode, True, captureDigest=True)
+      changeOwnership(tarfilePath, config.options.backupUser, config.options.backupGroup)
+   _writeDigest(config, newDigest, digestPath)
+   if deltaThreshold is not None:
+      signaturePath = _getSignaturePath(config, absolutePath)
+      _writeSignatures(config, _loadSignatures(signaturePath), newDigest, deltaThreshold, signaturePath)
+   _writeFullDate(config, absolutePath)
+   return fullList.totalSize()
 
-   If we can't load the digest successfully (either because it doesn't exist or
-   for some other reason), then an empty dictionary will be returned - but the
-   condition will be logged.
 
-   @param digestPath: Path to the digest file on disk.
+############################
+# _executeDeltas() function
+############################
 
-   @return: Dictionary representing contents of digest path.
+def _executeDeltas(config, backupList, absolutePath, deltaThreshold, signatures):
    """
-   if not os.path.isfile(digestPath):
-      digest = {}
-      logger.debug("Digest [%s] does not exist on disk.", digestPath)
-   else:
-      try:
-         digest = pickle.load(open(digestPath, "r"))
-         logger.debug("Loaded digest [%s] from disk: %d entries.", digestPath, len(digest))
-      except:
-         digest = {}
-         logger.error("Failed loading digest [%s] from disk.", digestPath)
-   return digest
+   Archives the large changed files in a backup list as block deltas.
 
+   Every file in the list that is larger than the delta threshold and has a
+   block signature from an earlier run is written as a delta against that
+   signature (see L{CedarBackup2.delta.generateDelta}).  The deltas are
+   written into a separate uncompressed tarfile, at the path returned by
+   L{_getDeltaTarfilePath}, each named after its file with a C{.cbdelta}
+   extension.  These files are removed from the backup list, so they aren't
+   archived in full as well, and their signatures are replaced in place.
 
-##########################
-# _writeDigest() function
-##########################
+   A file whose delta can't be written is left in the list, so it is archived
+   in full instead.
 
-def _writeDigest(config, digest, digestPath):
+   @param config: Config object.
+   @param backupList: List of changed files, which is modified in place.
+   @param absolutePath: Absolute path of directory being collected.
+   @param deltaThreshold: Delta threshold to use, in bytes.
+   @param signatures: Dictionary of block signatures, which is modified in place.
+
+   @return: Digest map of the files archived as deltas.
    """
-   Writes the digest dictionary to the indicated digest path on disk.
+   digest = {}
+   candidates = [ entry for entry in backupList if entry in signatures and _isDeltaCandidate(entry, deltaThreshold) ]
+   if not candidates:
+      return digest
+   deltas = []
+   tempdir = tempfile.mkdtemp(dir=config.options.workingDir)
+   try:
+      for entry in candidates:
+         deltaPath = os.path.join(tempdir, "%d.cbdelta" % len(deltas))
+         try:
+            (signature, changed) = generateDelta(entry, signatures[entry], deltaPath)
+         except (IOError, OSError), e:
+            logger.warn("Unable to write delta for [%s]; it will be archived in full: %s", entry, e)
+            continue
+         logger.debug("Wrote delta for [%s]: %d changed blocks.", entry, changed)
+         signatures[entry] = signature
+         digest[entry] = signature[2]
+         deltas.append((entry, deltaPath))
+      if deltas:
+         deltaTarfilePath = _getDeltaTarfilePath(config, absolutePath)
+         tar = tarfile.open(deltaTarfilePath, "w", format=tarfile.GNU_FORMAT)
+         try:
+            for (entry, deltaPath) in deltas:
+               tar.add(deltaPath, arcname="%s.cbdelta" % entry)
+         finally:
+            tar.close()
+         changeOwnership(deltaTarfilePath, config.options.backupUser, config.options.backupGroup)
+         logger.info("Backing up %d large files in [%s] as deltas (%s).",
+                     len(deltas), absolutePath, displayBytes(os.path.getsize(deltaTarfilePath)))
+   finally:
+      shutil.rmtree(tempdir, True)
+   for (entry, deltaPath) in deltas:
+      backupList.remove(entry)
+   return digest
 
-   If we can't write the digest successfully for any reason, we'll log the
-   condition but won't throw an exception.
 
-   @param config: Config object.
-   @param digest: Digest dictionary to write to disk.
-   @param digestPath: Path to the digest file on disk.
+###############################
+# _isDeltaCandidate() function
+###############################
+
+def _isDeltaCandidate(entry, deltaThreshold):
+   """
+   Indicates whether an entry is a regular file larger than the delta threshold.
+   @param entry: Path of the entry on disk.
+   @param deltaThreshold: Delta threshold to use, in bytes.
+   @return: Boolean true if the entry could be archived as a delta.
    """
    try:
-      pickle.dump(digest, open(digestPath, "w"))
-      changeOwnership(digestPath, config.options.backupUser, config.options.backupGroup)
-      logger.debug("Wrote new digest [%s] to disk: %d entries.", digestPath, len(digest))
-   except:
-      logger.error("Failed to write digest [%s] to disk.", digestPath)
+      return os.path.isfile(entry) and not os.path.islink(entry) and os.path.getsize(entry) > deltaThreshold
+   except OSError:
+      return False
 
 
-########################################################################
-# Private attribute "getter" functions
-########################################################################
-
 ############################
-# getCollectMode() function
+# _writeTarfiles() function
 ############################
 
-def _getCollectMode(config, item):
-   """
-   Gets the collect mode that should be used for a collect directory or file.
-   If possible, use the one on the file or directory, otherwise take from collect section.
-   @param config: Config object.
-   @param item: C{CollectFile} or C{CollectDir} object
-   @return: Collect mode to use.
+def _writeTarfiles(config, backupList, absolutePath, tarfilePath, archiveMode, captureDigest, volumeSize, skipCompressed,
+                   resetChunks=False, dedupFiles=False, saveChunks=True):
    """
-   if item.collectMode is None:
-      collectMode = config.collect.collectMode
-   else:
-      collectMode = item.collectMode
-   logger.debug("Collect mode is [%s]", collectMode)
-   return collectMode
+   Writes the tarfile (or tarfiles) for a backup list.
 
+   Normally, the whole list is written into the indicated tarfile, split into
+   volumes if a volume size is set.  Every file that is written is given the
+   configured ownership.  Nothing is written for an empty list.
 
-#############################
-# _getArchiveMode() function
+   If the skip compressed flag is set and the archive mode is C{targz},
+   C{tarbz2} or C{adaptive}, files that won't compress any further are first
+   split out of the list (see L{BackupFileList.splitIncompressible}).  Those
+   files are written into a separate uncompressed tarfile, at the path
+   returned by L{_getStoredTarfilePath}, so no time is wasted trying to
+   compress them.  The rest of the list is written into the normal tarfile.
+
+   In C{adaptive} archive mode, the compression for the normal tarfile is
+   picked by L{_chooseCompression} once the final list is known, and the
+   choice is recorded in the tarfile name (see L{_getAdaptiveTarfilePath}).
+
+   In C{chunk} archive mode, a chunk archive is written instead of a tarfile
+   (see L{_writeChunkArchive}), and the volume size, skip compressed flag and
+   dedup files flag don't apply.  Identical chunks are only stored once
+   anyway.
+
+   @param config: Config object.
+   @param backupList: List to write tarfiles for.
+   @param absolutePath: Absolute path of directory or file to collect.
+   @param tarfilePath: Path to tarfile that should be created.
+   @param archiveMode: Archive mode to use.
+   @param captureDigest: Indicates whether digests should be captured while archiving.
+   @param volumeSize: Volume size to use, in bytes, or C{None} for a single tarfile.
+   @param skipCompressed: Skip compressed flag to use.
+   @param resetChunks: Indicates whether chunks stored by earlier runs should be forgotten, in C{chunk} mode.
+   @param dedupFiles: Dedup files flag to use.
+   @param saveChunks: Indicates whether the record of stored chunks should be saved, in C{chunk} mode.
+
+   @return: Digest map of the files written if C{captureDigest} is set, otherwise an empty dictionary.
+   """
+   if archiveMode == 'chunk':
+      return _writeChunkArchive(config, backupList, absolutePath, tarfilePath, captureDigest, resetChunks, saveChunks)
+   archives = []
+   if skipCompressed and archiveMode in [ 'targz', 'tarbz2', 'adaptive', ]:
+      storedList = backupList.splitIncompressible()
+      logger.debug("Found %d files in [%s] that will not be compressed.", len(storedList), absolutePath)
+      archives.append((storedList, _getStoredTarfilePath(config, absolutePath), 'tar', None))
+   if archiveMode == 'adaptive':
+      if len(backupList) > 0:
+         (mode, level) = _chooseCompression(config, backupList, absolutePath)
+         archives.insert(0, (backupList, _getAdaptiveTarfilePath(tarfilePath, mode, level), mode, level))
+   else:
+      archives.insert(0, (backupList, tarfilePath, archiveMode, None))
+   digest = {}
+   for (fileList, path, mode, level) in archives:
+      if len(fileList) > 0:
+         result = fileList.generateTarfile(path, mode, True, prefetch=_getPrefetchDepth(config),
+                                           captureDigest=captureDigest, volumeSize=volumeSize,
+                                           compressLevel=level, dedup=dedupFiles)
+         if volumeSize is None:
+            (volumes, captured) = ([ path, ], result)
+         elif captureDigest:
+            (volumes, captured) = result
+         else:
+            (volumes, captured) = (result, None)
+         if captureDigest:
+            digest.update(captured)
+         for volume in volumes:
+            changeOwnership(volume, config.options.backupUser, config.options.backupGroup)
+   return digest
+
+
+################################
+# _writeChunkArchive() function
+################################
+
+def _writeChunkArchive(config, backupList, absolutePath, manifestPath, captureDigest, resetChunks, saveChunks=True):
+   """
+   Writes a chunk archive for a backup list, in place of a tarfile.
+
+   The manifest is written to the path that would otherwise have been used
+   for the tarfile, and the pack alongside it (see L{_getChunkPackPath}).  The
+   chunks stored by earlier runs for the same path are recorded in the working
+   directory (see L{_getChunkIndexPath}), and only chunks that aren't in that
+   record are written into the pack (see L{CedarBackup2.chunk.writeChunkArchive}).
+
+   The record is forgotten whenever the digest is reset, so the full backup
+   at the start of each week stores every chunk it needs.  That way, nothing
+   written during the week depends on chunks from an earlier week, which
+   might be on media that has since been rotated out.
+
+   The record is only saved if C{saveChunks} is set.  In differential mode,
+   it's only saved along with the digest, i.e. by the full backup.  Each
+   differential run then stores every chunk that the full backup didn't,
+   so a restore never needs a pack from an earlier differential run, which
+   is exactly what differential mode promises.
+
+   If the pack from an earlier run is still in the collect directory and
+   hasn't been staged yet (according to the stage indicator), the new chunks
+   are appended to it, since it holds chunks that the record says are stored.
+
+   @param config: Config object.
+   @param backupList: List to write a chunk archive for.
+   @param absolutePath: Absolute path of directory or file to collect.
+   @param manifestPath: Path to the manifest that should be created.
+   @param captureDigest: Indicates whether digests should be captured while archiving.
+   @param resetChunks: Indicates whether chunks stored by earlier runs should be forgotten.
+   @param saveChunks: Indicates whether the record of stored chunks should be saved for later runs.
+
+   @return: Digest map of the files written if C{captureDigest} is set, otherwise an empty dictionary.
+   """
+   if len(backupList) == 0:
+      return {}
+   indexPath = _getChunkIndexPath(config, absolutePath)
+   packPath = _getChunkPackPath(config, absolutePath)
+   if resetChunks:
+      logger.debug("Based on resetDigest flag, known chunks will be cleared.")
+      known = set()
+   else:
+      known = _loadChunkIndex(indexPath)
+   stageIndicator = os.path.join(config.collect.targetDir, STAGE_INDICATOR)
+   append = os.path.isfile(packPath) and not (os.path.isfile(stageIndicator) and
+                                              os.path.getmtime(stageIndicator) >= os.path.getmtime(packPath))
+   if append:
+      logger.info("Pack [%s] has not been staged yet; new chunks will be appended to it.", packPath)
+   before = len(known)
+   captured = writeChunkArchive(backupList, manifestPath, packPath, known, True, captureDigest, append)
+   logger.info("Stored %d new chunks for [%s].", len(known) - before, absolutePath)
+   for path in [ manifestPath, packPath, ]:
+      if os.path.isfile(path):
+         changeOwnership(path, config.options.backupUser, config.options.backupGroup)
+   if saveChunks:
+      _writeChunkIndex(config, known, indexPath)
+   else:
+      logger.debug("Record of known chunks [%s] will not be updated.", indexPath)
+   if captured is None:
+      return {}
+   return captured
+
+
+################################
+# _chooseCompression() function
+################################
+
+def _chooseCompression(config, backupList, absolutePath):
+   """
+   Chooses the compression to use for a backup list in adaptive archive mode.
+
+   The throughput of each candidate in L{ADAPTIVE_LEVELS} is measured by
+   compressing a sample of the files that are about to be archived (see
+   L{_sampleBackupList}).  The time it took to read the sample is added to
+   each measurement, since the files have to be read as well as compressed.
+   Together with the total size of the list, this gives an estimate of how
+   long each candidate would take.  We pick the strongest candidate whose
+   estimate fits within the time left in the archive budget, falling back on
+   an uncompressed tarfile if none of them fit.
+
+   The configured archive budget covers the whole collect run.  During a run,
+   the time left is counted down to the deadline set by L{_executeJobs}, so
+   archives written late in the run get less time than those written early.
+   Otherwise (for instance, when planning), the whole budget is available.
+
+   @param config: Config object.
+   @param backupList: List that is about to be archived.
+   @param absolutePath: Absolute path of directory or file to collect.
+
+   @return: Tuple C{(archiveMode, compressLevel)}, where the level is C{None} for C{tar}.
+   """
+   if _ARCHIVE_DEADLINE is None:
+      budget = _getArchiveBudget(config) * SECONDS_PER_MINUTE
+   else:
+      budget = max(0, _ARCHIVE_DEADLINE - time.time())
+   size = backupList.totalSize()
+   started = time.time()
+   sample = _sampleBackupList(backupList)
+   readTime = time.time() - started
+   (mode, level) = ADAPTIVE_LEVELS[0]
+   estimate = 0
+   for (candidateMode, candidateLevel) in reversed(ADAPTIVE_LEVELS[1:]):
+      started = time.time()
+      if candidateMode == "targz":
+         zlib.compress(sample, candidateLevel)
+      else:
+         bz2.compress(sample, candidateLevel)
+      elapsed = readTime + time.time() - started
+      if len(sample) == 0 or elapsed <= 0:
+         candidateEstimate = 0
+      else:
+         candidateEstimate = size * elapsed / len(sample)
+      logger.debug("Estimated %.1f seconds for [%s] level %d.", candidateEstimate, candidateMode, candidateLevel)
+      if candidateEstimate <= budget:
+         (mode, level, estimate) = (candidateMode, candidateLevel, candidateEstimate)
+         break
+   if level is None:
+      chosen = mode
+   else:
+      chosen = "%s level %d" % (mode, level)
+   logger.info("Adaptive archive mode chose [%s] for [%s] (%s, estimated %d of %d seconds left).",
+               chosen, absolutePath, displayBytes(size), estimate, budget)
+   return (mode, level)
+
+
+###############################
+# _sampleBackupList() function
+###############################
+
+def _sampleBackupList(backupList):
+   """
+   Reads a sample of the data in a backup list, to measure compressor throughput.
+
+   Up to L{ADAPTIVE_CHUNK} bytes are read from the start of files spread
+   evenly through the list, until L{ADAPTIVE_SAMPLE} bytes have been read.
+   Links and files that can't be read are skipped.
+
+   @param backupList: List to sample.
+   @return: Sampled data, as a string.
+   """
+   sample = []
+   length = 0
+   step = max(1, len(backupList) // (ADAPTIVE_SAMPLE // ADAPTIVE_CHUNK))
+   for entry in backupList[::step]:
+      if length >= ADAPTIVE_SAMPLE:
+         break
+      if os.path.isfile(entry) and not os.path.islink(entry):
+         try:
+            fileobj = openBackupFile(entry)
+            try:
+               data = fileobj.read(min(ADAPTIVE_CHUNK, ADAPTIVE_SAMPLE - length))
+            finally:
+               closeBackupFile(fileobj)
+         except (IOError, OSError):
+            continue
+         sample.append(data)
+         length += len(data)
+   return "".join(sample)
+
+
+######################
+# _planJob() function
+######################
+
+def _planJob(config, function, args):
+   """
+   Plans a single collect job, without executing it.
+
+   The backup list is built just as the collect function would build it, and
+   then the files which the job would skip are removed without reading them
+   (see L{_removeUnmodified}).  The compressed size is estimated by
+   compressing a sample of the remaining files (see L{_estimateCompression}).
+
+   Since no file is read in full, files that would be archived as block
+   deltas or stored as links to identical files are counted at their full
+   size, so the estimates are an upper bound for directories that use those
+   options.
+
+   @param config: Config object.
+   @param function: Collect function the job calls.
+   @param args: Arguments to the collect function, except for config.
+
+   @return: Tuple C{(files, size, compressed)}, the number of files, the bytes to archive and the estimated compressed bytes.
+   """
+   backupList = BackupFileList()
+   if function is _collectDirectory:
+      (absolutePath, collectMode, archiveMode, ignoreFile, linkDepth, dereference, resetDigest, excludePaths,
+       excludePatterns, unused, unused, fileFilters, unused, unused, unused) = args
+      backupList = _buildDirectoryList(absolutePath, ignoreFile, linkDepth, dereference,
+                                       excludePaths, excludePatterns, fileFilters)
+      digestPath = _getDigestPath(config, absolutePath)
+   elif function is _collectFileGroup:
+      (absolutePath, absolutePaths, unused, collectMode, archiveMode, resetDigest, digestPath) = args
+      for path in absolutePaths:
+         backupList.addFile(path)
+   else:
+      (absolutePath, unused, collectMode, archiveMode, resetDigest, digestPath) = args
+      backupList.addFile(absolutePath)
+   if collectMode in ['incr', 'diff', ] and not resetDigest:
+      removed = _removeUnmodified(backupList, digestPath)
+      logger.debug("Planned to skip %d unmodified files in [%s].", removed, absolutePath)
+   size = backupList.totalSize()
+   compressed = int(size * _estimateCompression(_sampleBackupList(backupList), archiveMode))
+   logger.debug("Planned %d files in [%s] (%s).", len(backupList), absolutePath, displayBytes(size))
+   return (len(backupList), size, compressed)
+
+
+###############################
+# _removeUnmodified() function
+###############################
+
+def _removeUnmodified(backupList, digestPath):
+   """
+   Removes files that have not been modified since a digest was written.
+
+   This is the stat-only equivalent of L{BackupFileList.removeUnchanged}.  A
+   file is kept if it does not appear in the digest, or if its modification
+   time is later than the modification time of the digest file itself.  A
+   file whose contents changed without its modification time changing would
+   be archived by a real collect run, but is not counted here.
+
+   @param backupList: Backup list to remove files from.
+   @param digestPath: Path to digest file on disk.
+
+   @return: Number of files removed from the list.
+   """
+   oldDigest = _loadDigest(digestPath)
+   if not oldDigest:
+      return 0
+   since = os.stat(digestPath).st_mtime
+   removed = 0
+   for entry in backupList[:]:
+      try:
+         if entry in oldDigest and os.lstat(entry).st_mtime <= since:
+            backupList.remove(entry)
+            removed += 1
+      except OSError:
+         pass
+   return removed
+
+
+##################################
+# _estimateCompression() function
+##################################
+
+def _estimateCompression(sample, archiveMode):
+   """
+   Estimates how well data will compress in a given archive mode.
+
+   The sample is compressed the way the archive mode compresses its data.
+   Uncompressed tarfiles are assumed not to compress at all.  The C{adaptive}
+   mode picks its compression at collect time, so it's estimated using the
+   middle level of gzip, which is also what the C{chunk} mode uses.
+
+   @param sample: Sampled data, as from L{_sampleBackupList}.
+   @param archiveMode: Archive mode to use.
+
+   @return: Estimated ratio of compressed size to original size, between 0.0 and 1.0.
+   """
+   if not sample or archiveMode == "tar":
+      return 1.0
+   elif archiveMode == "targz":
+      compressed = zlib.compress(sample, 9)
+   elif archiveMode == "tarbz2":
+      compressed = bz2.compress(sample, 9)
+   else:
+      compressed = zlib.compress(sample, 6)
+   return min(1.0, float(len(compressed)) / len(sample))
+
+
+########################
+# _writePlan() function
+########################
+
+def _writePlan(plan, throughput, targets, fd=sys.stdout):
+   """
+   Writes a collect plan to the screen and to the log.
+
+   Each entry in the plan is a tuple C{(absolutePath, totals)}, where the
+   totals are a tuple C{(files, size, compressed)} as from L{_planJob}, or
+   C{None} if the item will not be collected today.  For each target
+   directory, the free space is compared against the total estimated
+   compressed size.
+
+   @param plan: List of planned collect items.
+   @param throughput: Measured throughput in bytes per second, or C{None} if unknown.
+   @param targets: List of target directories to check for free space.
+   @param fd: File descriptor used to print information.
+
+   @note: The C{fd} is used rather than C{print} to facilitate unit testing.
+   """
+   lines = []
+   total = [ 0, 0, 0, ]
+   for (absolutePath, totals) in plan:
+      if totals is None:
+         lines.append("[%s]: not collected today" % absolutePath)
+      else:
+         lines.append("[%s]: %s" % (absolutePath, _describePlan(totals, throughput)))
+         total = [ x + y for (x, y) in zip(total, totals) ]
+   lines.append("Total: %s" % _describePlan(total, throughput))
+   for targetDir in targets:
+      free = _getFreeSpace(targetDir)
+      if free is None:
+         lines.append("Target [%s]: free space unknown" % targetDir)
+      elif free >= total[2]:
+         lines.append("Target [%s]: %s free, enough space" % (targetDir, displayBytes(free)))
+      else:
+         lines.append("Target [%s]: %s free, NOT enough space" % (targetDir, displayBytes(free)))
+   for line in lines:
+      logger.info("Collect plan: %s", line)
+      fd.write("%s\n" % line)
+
+
+###########################
+# _describePlan() function
+###########################
+
+def _describePlan(totals, throughput):
+   """
+   Describes the planned totals for a collect item, for L{_writePlan}.
+   @param totals: Tuple C{(files, size, compressed)}, as from L{_planJob}.
+   @param throughput: Measured throughput in bytes per second, or C{None} if unknown.
+   @return: Description of the totals, as a string.
+   """
+   (files, size, compressed) = totals
+   if throughput is None:
+      duration = "unknown duration"
+   else:
+      duration = "about %d seconds" % (size / throughput)
+   return "%d files, %s to archive, about %s compressed, %s" % (files, displayBytes(size), displayBytes(compressed), duration)
+
+
+###########################
+# _getFreeSpace() function
+###########################
+
+def _getFreeSpace(path):
+   """
+   Gets the free space available to unprivileged users in a directory.
+   @param path: Path of the directory.
+   @return: Free space in bytes, or C{None} if it can't be determined.
+   """
+   try:
+      stats = os.statvfs(path)
+   except (OSError, AttributeError):
+      return None
+   return stats.f_bavail * stats.f_frsize
+
+
+#########################
+# _loadDigest() function
+#########################
+
+def _loadDigest(digestPath):
+   """
+   Loads the indicated digest path from disk into a dictionary.
+
+   If we can't load the digest successfully (either because it doesn't exist or
+   for some other reason), then an empty dictionary will be returned - but the
+   condition will be logged.
+
+   @param digestPath: Path to the digest file on disk.
+
+   @return: Dictionary representing contents of digest path.
+   """
+   if not os.path.isfile(digestPath):
+      digest = {}
+      logger.debug("Digest [%s] does not exist on disk.", digestPath)
+   else:
+      try:
+         digest = pickle.load(open(digestPath, "r"))
+         logger.debug("Loaded digest [%s] from disk: %d entries.", digestPath, len(digest))
+      except:
+         digest = {}
+         logger.error("Failed loading digest [%s] from disk.", digestPath)
+   return digest
+
+
+##########################
+# _writeDigest() function
+##########################
+
+def _writeDigest(config, digest, digestPath):
+   """
+   Writes the digest dictionary to the indicated digest path on disk.
+
+   If we can't write the digest successfully for any reason, we'll log the
+   condition but won't throw an exception.
+
+   @param config: Config object.
+   @param digest: Digest dictionary to write to disk.
+   @param digestPath: Path to the digest file on disk.
+   """
+   try:
+      pickle.dump(digest, open(digestPath, "w"))
+      changeOwnership(digestPath, config.options.backupUser, config.options.backupGroup)
+      logger.debug("Wrote new digest [%s] to disk: %d entries.", digestPath, len(digest))
+   except:
+      logger.error("Failed to write digest [%s] to disk.", digestPath)
+
+
+#############################
+# _loadSignatures() function
+#############################
+
+def _loadSignatures(signaturePath):
+   """
+   Loads the block signatures for a collect directory from disk.
+
+   The signatures are a dictionary mapping the path of each file larger than
+   the delta threshold to its signature, as from
+   L{CedarBackup2.delta.generateSignature}.  If we can't load the signatures
+   successfully, then an empty dictionary will be returned - but the condition
+   will be logged.
+
+   @param signaturePath: Path to the signature file on disk.
+
+   @return: Dictionary of block signatures.
+   """
+   if not os.path.isfile(signaturePath):
+      signatures = {}
+      logger.debug("Signatures [%s] do not exist on disk.", signaturePath)
+   else:
+      try:
+         signatures = pickle.load(open(signaturePath, "rb"))
+         logger.debug("Loaded signatures [%s] from disk: %d entries.", signaturePath, len(signatures))
+      except:
+         signatures = {}
+         logger.error("Failed loading signatures [%s] from disk.", signaturePath)
+   return signatures
+
+
+##############################
+# _writeSignatures() function
+##############################
+
+def _writeSignatures(config, signatures, digest, deltaThreshold, signaturePath):
+   """
+   Brings the block signatures up to date with a new digest and writes them to disk.
+
+   A signature is kept for every file in the digest that is larger than the
+   delta threshold.  If a file has no signature yet, or its signature doesn't
+   match its digest (because the file was archived in full), the file is read
+   once more to generate one.  A signature that doesn't match the digest even
+   then (because the file changed after it was archived) is dropped, so the
+   file will be archived in full next time.  Signatures for files that are no
+   longer in the digest are dropped as well.
+
+   If we can't write the signatures successfully for any reason, we'll log the
+   condition but won't throw an exception.
+
+   @param config: Config object.
+   @param signatures: Dictionary of block signatures from the previous run.
+   @param digest: Digest dictionary that was just written to disk.
+   @param deltaThreshold: Delta threshold to use, in bytes.
+   @param signaturePath: Path to the signature file on disk.
+   """
+   updated = {}
+   for entry in digest:
+      if _isDeltaCandidate(entry, deltaThreshold):
+         signature = signatures.get(entry)
+         if signature is None or signature[2] != digest[entry]:
+            try:
+               signature = generateSignature(entry)
+            except (IOError, OSError):
+               logger.error("Failed to generate signature for [%s].", entry)
+               continue
+         if signature[2] == digest[entry]:
+            updated[entry] = signature
+   try:
+      pickle.dump(updated, open(signaturePath, "wb"), pickle.HIGHEST_PROTOCOL)
+      changeOwnership(signaturePath, config.options.backupUser, config.options.backupGroup)
+      logger.debug("Wrote signatures [%s] to disk: %d entries.", signaturePath, len(updated))
+   except:
+      logger.error("Failed to write signatures [%s] to disk.", signaturePath)
+
+
+#############################
+# _loadChunkIndex() function
+#############################
+
+def _loadChunkIndex(indexPath):
+   """
+   Loads the record of chunks stored by earlier runs from disk.
+
+   The record is a set of binary chunk digests.  If we can't load it
+   successfully, then an empty set will be returned (so every chunk is
+   stored again) - but the condition will be logged.
+
+   @param indexPath: Path to the chunk record on disk.
+
+   @return: Set of binary chunk digests.
+   """
+   if not os.path.isfile(indexPath):
+      known = set()
+      logger.debug("Chunk record [%s] does not exist on disk.", indexPath)
+   else:
+      try:
+         known = pickle.load(open(indexPath, "rb"))
+         logger.debug("Loaded chunk record [%s] from disk: %d entries.", indexPath, len(known))
+      except:
+         known = set()
+         logger.error("Failed loading chunk record [%s] from disk.", indexPath)
+   return known
+
+
+##############################
+# _writeChunkIndex() function
+##############################
+
+def _writeChunkIndex(config, known, indexPath):
+   """
+   Writes the record of stored chunks to disk, for use by the next run.
+
+   If we can't write the record successfully for any reason, we'll log the
+   condition but won't throw an exception.
+
+   @param config: Config object.
+   @param known: Set of binary chunk digests.
+   @param indexPath: Path to the chunk record on disk.
+   """
+   try:
+      pickle.dump(known, open(indexPath, "wb"), pickle.HIGHEST_PROTOCOL)
+      changeOwnership(indexPath, config.options.backupUser, config.options.backupGroup)
+      logger.debug("Wrote chunk record [%s] to disk: %d entries.", indexPath, len(known))
+   except:
+      logger.error("Failed to write chunk record [%s] to disk.", indexPath)
+
+
+##########################
+# _getFullDays() function
+##########################
+
+def _getFullDays(config, save=True):
+   """
+   Gets the day of the week on which each collect directory gets its full backup.
+
+   With the C{fixed} full schedule, every directory uses the configured
+   starting day, and an empty dictionary is returned.  Otherwise, each
+   directory is assigned its own day:
+
+      - C{hash}: the day is derived from a hash of the directory's path
+      - C{size}: the day is the one with the least expected volume so far
+
+   Assignments are saved in the working directory, so a directory keeps its
+   day from one run to the next.  Only directories which have not been seen
+   before are assigned a day (largest first, in C{size} mode).  In C{size}
+   mode, a new directory is measured when that happens; in C{hash} mode, its
+   size is not needed to pick a day, so it starts out as zero.  Either way,
+   the size is kept up to date by L{_updateSchedule} whenever the directory
+   gets a full backup, so a directory is walked at most once just to measure
+   it.  The expected full backup volume for each day is logged, starting from
+   the starting day.
+
+   @param config: Config object.
+   @param save: Whether to save new assignments in the working directory.
+   @return: Dictionary mapping collect directory path to English day name.
+   """
+   fullSchedule = _getFullSchedule(config)
+   if fullSchedule == "fixed" or config.collect.collectDirs is None:
+      return {}
+   previous = _loadSchedule(config)
+   schedule = {}
+   unassigned = []
+   for collectDir in config.collect.collectDirs:
+      if collectDir.absolutePath in previous:
+         schedule[collectDir.absolutePath] = previous[collectDir.absolutePath]
+      elif fullSchedule == "hash":
+         unassigned.append((0, collectDir.absolutePath))
+      else:
+         unassigned.append((_measureDirectory(config, collectDir), collectDir.absolutePath))
+   start = deriveDayOfWeek(config.options.startingDay)
+   days = [ DAYS_OF_WEEK[(start + offset) % len(DAYS_OF_WEEK)] for offset in range(len(DAYS_OF_WEEK)) ]
+   volumes = dict([ (day, 0) for day in days ])
+   for (day, size) in schedule.values():
+      volumes[day] += size
+   for (size, absolutePath) in sorted(unassigned, reverse=True):
+      if fullSchedule == "hash":
+         day = DAYS_OF_WEEK[int(hashlib.md5(absolutePath).hexdigest(), 16) % len(DAYS_OF_WEEK)]
+      else:
+         day = min(days, key=lambda day: volumes[day])
+      logger.debug("Assigned full backup day [%s] to [%s] (%s).", day, absolutePath, displayBytes(size))
+      schedule[absolutePath] = (day, size)
+      volumes[day] += size
+   if save:
+      _writeSchedule(config, schedule)
+   for day in days:
+      count = len([ path for path in schedule if schedule[path][0] == day ])
+      logger.info("Expected full backup volume on %s: %s in %d directories.", day, displayBytes(volumes[day]), count)
+   return dict([ (path, schedule[path][0]) for path in schedule ])
+
+
+#############################
+# _updateSchedule() function
+#############################
+
+def _updateSchedule(config, items, resetFlags, deferred):
+   """
+   Updates the saved size of each collect directory that got a full backup.
+
+   A full backup archives every file in a directory, so the number of bytes
+   its jobs backed up (as saved by L{_executeJobs}) is the directory's current
+   size.  Using it means that the schedule follows the directories as they
+   grow or shrink, without ever walking them again.  Directories which were
+   deferred, or which didn't get a full backup, keep their previous size.
+
+   @param config: Config object.
+   @param items: List of collect items that were executed.
+   @param resetFlags: Reset digest flag for each collect directory, as from L{_getCollectItems}.
+   @param deferred: List of absolute paths of the items that were deferred.
+   """
+   if _getFullSchedule(config) == "fixed":
+      return
+   schedule = _loadSchedule(config)
+   statistics = _loadStatistics(config)
+   updated = 0
+   for (message, absolutePath, jobs) in items:
+      if jobs and absolutePath in schedule and resetFlags.get(absolutePath, False) and absolutePath not in deferred:
+         size = sum([ statistics.get(jobPath, {}).get("bytes") or 0 for (jobPath, function, args) in jobs ])
+         logger.debug("Full backup size of [%s] is now %s.", absolutePath, displayBytes(size))
+         schedule[absolutePath] = (schedule[absolutePath][0], size)
+         updated += 1
+   if updated > 0:
+      _writeSchedule(config, schedule)
+
+
+###############################
+# _measureDirectory() function
+###############################
+
+def _measureDirectory(config, collectDir):
+   """
+   Measures the amount of data a full backup of a collect directory would contain.
+   @param config: Config object.
+   @param collectDir: Collect directory object.
+   @return: Total size of the files in the directory, in bytes.
+   """
+   (excludePaths, excludePatterns) = _getExclusions(config, collectDir)
+   backupList = BackupFileList()
+   backupList.ignoreFile = _getIgnoreFile(config, collectDir)
+   backupList.excludePaths = excludePaths
+   backupList.excludePatterns = excludePatterns
+   (backupList.maxFileSize, backupList.minFileAge, backupList.maxFileAge) = _getFileFilters(collectDir)
+   backupList.addDirContents(collectDir.absolutePath, linkDepth=_getLinkDepth(collectDir),
+                             dereference=_getDereference(collectDir))
+   return backupList.totalSize()
+
+
+###################################
+# _getSyntheticArchives() function
+###################################
+
+def _getSyntheticArchives(config, absolutePath):
+   """
+   Gets the staged archives that a synthetic full backup can copy files from.
+
+   Archives are looked for in the daily staging directories written since the
+   last full backup of the collect directory (see L{_loadFullDate}), under
+   the local peer whose collect directory is this collect action's target
+   directory.  Older archives belong to an earlier backup cycle, so they are
+   never used.  Any tarfile written for the collect directory is included:
+   the normal tarfile, plus any volumes, stored tarfile or adaptive tarfile.
+   If there is no such local peer, or the date of the last full backup is not
+   known, there are no archives.
+
+   @param config: Config object.
+   @param absolutePath: Absolute path of the directory being collected.
+   @return: List of paths to archives, newest first.
+   """
+   if config.stage is None or config.stage.localPeers is None:
+      logger.debug("No local peers are configured; no staged archives can be used.")
+      return []
+   peers = [ peer for peer in config.stage.localPeers
+             if os.path.normpath(peer.collectDir) == os.path.normpath(config.collect.targetDir) ]
+   if len(peers) == 0:
+      logger.debug("No local peer collects from [%s]; no staged archives can be used.", config.collect.targetDir)
+      return []
+   fullDate = _loadFullDate(config, absolutePath)
+   if fullDate is None:
+      logger.debug("Date of the last full backup of [%s] is not known; no staged archives can be used.", absolutePath)
+      return []
+   normalized = buildNormalizedPath(absolutePath)
+   pattern = re.compile(r"^%s(\.stored|\.(gz|bz)[1-9])?(\.vol[0-9]{3})?\.tar(\.gz|\.bz2)?$" % re.escape(normalized))
+   archives = []
+   for dailyDir in sorted(glob.glob(os.path.join(config.stage.targetDir, "*", "*", "*")), reverse=True):
+      if os.path.relpath(dailyDir, config.stage.targetDir) < fullDate:
+         break
+      peerDir = os.path.join(dailyDir, peers[0].name)
+      if os.path.isdir(peerDir):
+         for name in sorted(os.listdir(peerDir)):
+            if pattern.search(name):
+               archives.append(os.path.join(peerDir, name))
+   logger.debug("Found %d staged archives for [%s] since [%s].", len(archives), absolutePath, fullDate)
+   return archives
+
+
+###########################
+# _loadFullDate() function
+###########################
+
+def _loadFullDate(config, absolutePath):
+   """
+   Loads the date of the last full backup of a collect directory from disk.
+
+   The date is in the format of the daily staging directories, i.e.
+   C{YYYY/MM/DD}.  If the date can't be loaded successfully, then C{None} will
+   be returned - but the condition will be logged.
+
+   @param config: Config object.
+   @param absolutePath: Absolute path of the collect directory.
+
+   @return: Date of the last full backup, or C{None} if it is not known.
+   """
+   fullDatePath = _getFullDatePath(config, absolutePath)
+   if not os.path.isfile(fullDatePath):
+      logger.debug("Full backup date [%s] does not exist on disk.", fullDatePath)
+      return None
+   try:
+      fullDate = open(fullDatePath, "r").read().strip()
+      time.strptime(fullDate, DIR_TIME_FORMAT)
+      logger.debug("Loaded full backup date [%s] from disk: %s", fullDatePath, fullDate)
+      return fullDate
+   except:
+      logger.error("Failed loading full backup date [%s] from disk.", fullDatePath)
+      return None
+
+
+############################
+# _writeFullDate() function
+############################
+
+def _writeFullDate(config, absolutePath):
+   """
+   Writes today's date to disk as the date of the last full backup of a collect directory.
+
+   If we can't write the date successfully for any reason, we'll log the
+   condition but won't throw an exception.
+
+   @param config: Config object.
+   @param absolutePath: Absolute path of the collect directory.
+   """
+   fullDatePath = _getFullDatePath(config, absolutePath)
+   try:
+      open(fullDatePath, "w").write("%s\n" % time.strftime(DIR_TIME_FORMAT))
+      changeOwnership(fullDatePath, config.options.backupUser, config.options.backupGroup)
+      logger.debug("Wrote full backup date [%s] to disk.", fullDatePath)
+   except:
+      logger.error("Failed to write full backup date [%s] to disk.", fullDatePath)
+
+
+#############################
+# _loadStatistics() function
+#############################
+
+def _loadStatistics(config):
+   """
+   Loads the collect statistics from the previous run from disk.
+
+   The statistics are a dictionary mapping the absolute path of each collect
+   job to a dictionary of values about that job, i.e. C{{"duration": 12.3,
+   "bytes": 4567}}.  Statistics written by older versions have no byte count.
+   If we can't load the statistics successfully, then an empty dictionary will
+   be returned - but the condition will be logged.
+
+   @param config: Config object.
+
+   @return: Dictionary of collect statistics.
+   """
+   statisticsPath = os.path.join(config.options.workingDir, COLLECT_STATISTICS)
+   if not os.path.isfile(statisticsPath):
+      statistics = {}
+      logger.debug("Collect statistics [%s] do not exist on disk.", statisticsPath)
+   else:
+      try:
+         statistics = pickle.load(open(statisticsPath, "r"))
+         logger.debug("Loaded collect statistics [%s] from disk: %d entries.", statisticsPath, len(statistics))
+      except:
+         statistics = {}
+         logger.error("Failed loading collect statistics [%s] from disk.", statisticsPath)
+   return statistics
+
+
+##############################
+# _writeStatistics() function
+##############################
+
+def _writeStatistics(config, statistics):
+   """
+   Writes the collect statistics to disk, for use by the next run.
+
+   If we can't write the statistics successfully for any reason, we'll log the
+   condition but won't throw an exception.
+
+   @param config: Config object.
+   @param statistics: Dictionary of collect statistics.
+   """
+   statisticsPath = os.path.join(config.options.workingDir, COLLECT_STATISTICS)
+   try:
+      pickle.dump(statistics, open(statisticsPath, "w"))
+      changeOwnership(statisticsPath, config.options.backupUser, config.options.backupGroup)
+      logger.debug("Wrote collect statistics [%s] to disk: %d entries.", statisticsPath, len(statistics))
+   except:
+      logger.error("Failed to write collect statistics [%s] to disk.", statisticsPath)
+
+
+###########################
+# _loadDeferred() function
+###########################
+
+def _loadDeferred(config):
+   """
+   Loads the collect directories deferred by the previous run from disk.
+
+   The deferred directories are a dictionary mapping the absolute path of each
+   collect directory to the reset digest flag that was in effect when it was
+   deferred.  If we can't load the deferred directories successfully, then an
+   empty dictionary will be returned - but the condition will be logged.
+
+   @param config: Config object.
+
+   @return: Dictionary of deferred collect directories.
+   """
+   deferredPath = os.path.join(config.options.workingDir, COLLECT_DEFERRED)
+   if not os.path.isfile(deferredPath):
+      deferred = {}
+      logger.debug("Deferred collect directories [%s] do not exist on disk.", deferredPath)
+   else:
+      try:
+         deferred = pickle.load(open(deferredPath, "r"))
+         logger.debug("Loaded deferred collect directories [%s] from disk: %d entries.", deferredPath, len(deferred))
+      except:
+         deferred = {}
+         logger.error("Failed loading deferred collect directories [%s] from disk.", deferredPath)
+   return deferred
+
+
+############################
+# _writeDeferred() function
+############################
+
+def _writeDeferred(config, deferred):
+   """
+   Writes the deferred collect directories to disk, for use by the next run.
+
+   If nothing was deferred, any existing file is removed instead.  If we can't
+   write the deferred directories successfully for any reason, we'll log the
+   condition but won't throw an exception.
+
+   @param config: Config object.
+   @param deferred: Dictionary of deferred collect directories.
+   """
+   deferredPath = os.path.join(config.options.workingDir, COLLECT_DEFERRED)
+   try:
+      if not deferred:
+         if os.path.exists(deferredPath):
+            os.remove(deferredPath)
+            logger.debug("Removed deferred collect directories [%s] from disk.", deferredPath)
+      else:
+         pickle.dump(deferred, open(deferredPath, "w"))
+         changeOwnership(deferredPath, config.options.backupUser, config.options.backupGroup)
+         logger.debug("Wrote deferred collect directories [%s] to disk: %d entries.", deferredPath, len(deferred))
+   except:
+      logger.error("Failed to write deferred collect directories [%s] to disk.", deferredPath)
+
+
+###########################
+# _loadSchedule() function
+###########################
+
+def _loadSchedule(config):
+   """
+   Loads the full backup schedule from the previous run from disk.
+
+   The schedule is a dictionary mapping the absolute path of each collect
+   directory to a tuple C{(day, size)}, where the day is an English day name
+   and the size is the measured size of the directory in bytes.  If we can't
+   load the schedule successfully, then an empty dictionary will be returned -
+   but the condition will be logged.
+
+   @param config: Config object.
+
+   @return: Dictionary representing the full backup schedule.
+   """
+   schedulePath = os.path.join(config.options.workingDir, COLLECT_SCHEDULE)
+   if not os.path.isfile(schedulePath):
+      schedule = {}
+      logger.debug("Full backup schedule [%s] does not exist on disk.", schedulePath)
+   else:
+      try:
+         schedule = pickle.load(open(schedulePath, "r"))
+         logger.debug("Loaded full backup schedule [%s] from disk: %d entries.", schedulePath, len(schedule))
+      except:
+         schedule = {}
+         logger.error("Failed loading full backup schedule [%s] from disk.", schedulePath)
+   return schedule
+
+
+############################
+# _writeSchedule() function
+############################
+
+def _writeSchedule(config, schedule):
+   """
+   Writes the full backup schedule to disk, for use by the next run.
+
+   If we can't write the schedule successfully for any reason, we'll log the
+   condition but won't throw an exception.
+
+   @param config: Config object.
+   @param schedule: Dictionary representing the full backup schedule.
+   """
+   schedulePath = os.path.join(config.options.workingDir, COLLECT_SCHEDULE)
+   try:
+      pickle.dump(schedule, open(schedulePath, "w"))
+      changeOwnership(schedulePath, config.options.backupUser, config.options.backupGroup)
+      logger.debug("Wrote full backup schedule [%s] to disk: %d entries.", schedulePath, len(schedule))
+   except:
+      logger.error("Failed to write full backup schedule [%s] to disk.", schedulePath)
+
+
+########################################################################
+# Private attribute "getter" functions
+########################################################################
+
+############################
+# getCollectMode() function
+############################
+
+def _getCollectMode(config, item):
+   """
+   Gets the collect mode that should be used for a collect directory or file.
+   If possible, use the one on the file or directory, otherwise take from collect section.
+   @param config: Config object.
+   @param item: C{CollectFile} or C{CollectDir} object
+   @return: Collect mode to use.
+   """
+   if item.collectMode is None:
+      collectMode = config.collect.collectMode
+   else:
+      collectMode = item.collectMode
+   logger.debug("Collect mode is [%s]", collectMode)
+   return collectMode
+
+
+#############################
+# _getArchiveMode() function
 #############################
 
 def _getArchiveMode(config, item):
@@ -471,6 +2212,315 @@ def _getRecursionLevel(item):
    return recursionLevel
 
 
+############################
+# _getVolumeSize() function
+############################
+
+def _getVolumeSize(item):
+   """
+   Gets the volume size that should be used for a collect directory.
+   If possible, use the one on the directory, otherwise set a value of C{None}.
+   @param item: C{CollectDir} object
+   @return: Volume size to use, in bytes, or C{None} for a single tarfile.
+   """
+   if item.volumeSize is None or item.volumeSize.bytes <= 0:
+      volumeSize = None
+   else:
+      volumeSize = item.volumeSize.bytes
+   logger.debug("Volume size is [%s]", volumeSize)
+   return volumeSize
+
+
+############################
+# _getGroupFiles() function
+############################
+
+def _getGroupFiles(config):
+   """
+   Gets the group files flag that should be used for collect files.
+   If possible, use the one on the collect section, otherwise set a value of False.
+   @param config: Config object.
+   @return: Group files flag to use.
+   """
+   if config.collect.groupFiles is None:
+      groupFiles = False
+   else:
+      groupFiles = config.collect.groupFiles
+   logger.debug("Group files flag is [%s]", groupFiles)
+   return groupFiles
+
+
+###############################
+# _getArchiveBudget() function
+###############################
+
+def _getArchiveBudget(config):
+   """
+   Gets the archive budget that should be used for a collect run in adaptive archive mode.
+   If possible, use the one on the collect section, otherwise use L{ADAPTIVE_BUDGET}.
+   @param config: Config object.
+   @return: Archive budget to use, in minutes.
+   """
+   if config.collect.archiveBudget is None:
+      archiveBudget = ADAPTIVE_BUDGET
+   else:
+      archiveBudget = config.collect.archiveBudget
+   logger.debug("Archive budget is [%d] minutes", archiveBudget)
+   return archiveBudget
+
+
+################################
+# _getSkipCompressed() function
+################################
+
+def _getSkipCompressed(item):
+   """
+   Gets the skip compressed flag that should be used for a collect directory.
+   If possible, use the one on the directory, otherwise set a value of False.
+   @param item: C{CollectDir} object
+   @return: Skip compressed flag to use.
+   """
+   if item.skipCompressed is None:
+      skipCompressed = False
+   else:
+      skipCompressed = item.skipCompressed
+   logger.debug("Skip compressed flag is [%s]", skipCompressed)
+   return skipCompressed
+
+
+#############################
+# _getFileFilters() function
+#############################
+
+def _getFileFilters(item):
+   """
+   Gets the size and age filters that should be used for a collect directory.
+   The filters are converted into the units used by L{BackupFileList}.
+   @param item: C{CollectDir} object
+   @return: Tuple C{(maxFileSize, minFileAge, maxFileAge)} in bytes, days and days; each may be C{None}.
+   """
+   maxFileSize = None
+   minFileAge = None
+   maxFileAge = None
+   if item.maxFileSize is not None:
+      maxFileSize = item.maxFileSize.bytes
+   if item.minFileAge is not None:
+      minFileAge = item.minFileAge / (MINUTES_PER_HOUR * HOURS_PER_DAY)
+   if item.maxFileAge is not None:
+      maxFileAge = item.maxFileAge
+   logger.debug("File filters are [%s, %s, %s]", maxFileSize, minFileAge, maxFileAge)
+   return (maxFileSize, minFileAge, maxFileAge)
+
+
+##############################
+# _getFullSchedule() function
+##############################
+
+def _getFullSchedule(config):
+   """
+   Gets the full schedule that should be used to assign full backup days.
+   If possible, use the one on the collect section, otherwise set a value of C{fixed}.
+   @param config: Config object.
+   @return: Full schedule to use.
+   """
+   if config.collect.fullSchedule is None:
+      fullSchedule = "fixed"
+   else:
+      fullSchedule = config.collect.fullSchedule
+   logger.debug("Full schedule is [%s]", fullSchedule)
+   return fullSchedule
+
+
+###############################
+# _getSyntheticFull() function
+###############################
+
+def _getSyntheticFull(item):
+   """
+   Gets the synthetic full flag that should be used for a collect directory.
+   If possible, use the one on the directory, otherwise set a value of False.
+   @param item: C{CollectDir} object
+   @return: Synthetic full flag to use.
+   """
+   if item.syntheticFull is None:
+      syntheticFull = False
+   else:
+      syntheticFull = item.syntheticFull
+   logger.debug("Synthetic full flag is [%s]", syntheticFull)
+   return syntheticFull
+
+
+################################
+# _getDeltaThreshold() function
+################################
+
+def _getDeltaThreshold(item):
+   """
+   Gets the delta threshold that should be used for a collect directory.
+   If possible, use the one on the directory, otherwise set a value of C{None}.
+   @param item: C{CollectDir} object
+   @return: Delta threshold to use, in bytes, or C{None} to never archive deltas.
+   """
+   if item.deltaThreshold is None:
+      deltaThreshold = None
+   else:
+      deltaThreshold = item.deltaThreshold.bytes
+   logger.debug("Delta threshold is [%s]", deltaThreshold)
+   return deltaThreshold
+
+
+############################
+# _getDedupFiles() function
+############################
+
+def _getDedupFiles(item):
+   """
+   Gets the dedup files flag that should be used for a collect directory.
+   If possible, use the one on the directory, otherwise set a value of C{False}.
+   @param item: C{CollectDir} object
+   @return: Dedup files flag to use.
+   """
+   if item.dedupFiles is None:
+      dedupFiles = False
+   else:
+      dedupFiles = item.dedupFiles
+   logger.debug("Dedup files flag is [%s]", dedupFiles)
+   return dedupFiles
+
+
+#############################
+# _getWorkerCount() function
+#############################
+
+def _getWorkerCount(config):
+   """
+   Gets the number of worker processes that should be used to collect items.
+   If possible, use the one on the collect section, otherwise set a value of 1 (one).
+   @param config: Config object.
+   @return: Worker count to use.
+   """
+   if config.collect.workerCount is None:
+      workerCount = 1
+   else:
+      workerCount = config.collect.workerCount
+   logger.debug("Worker count is [%d]", workerCount)
+   return workerCount
+
+
+###############################
+# _getPrefetchDepth() function
+###############################
+
+def _getPrefetchDepth(config):
+   """
+   Gets the number of files that should be read ahead while archiving.
+   If possible, use the one on the collect section, otherwise set a value of 0 (zero).
+   @param config: Config object.
+   @return: Prefetch depth to use.
+   """
+   if config.collect.prefetchDepth is None:
+      prefetchDepth = 0
+   else:
+      prefetchDepth = config.collect.prefetchDepth
+   logger.debug("Prefetch depth is [%d]", prefetchDepth)
+   return prefetchDepth
+
+
+###############################
+# _getPhysicalOrder() function
+###############################
+
+def _getPhysicalOrder(config):
+   """
+   Gets the physical order flag that should be used when collecting.
+   If possible, use the one on the collect section, otherwise set a value of False.
+   @param config: Config object.
+   @return: Physical order flag to use.
+   """
+   if config.collect.physicalOrder is None:
+      physicalOrder = False
+   else:
+      physicalOrder = config.collect.physicalOrder
+   logger.debug("Physical order flag is [%s]", physicalOrder)
+   return physicalOrder
+
+
+#################################
+# _getCollectDeadline() function
+#################################
+
+def _getCollectDeadline(config, start):
+   """
+   Gets the time after which the collect action should not start any new work.
+
+   The collect end time is a time of day, which is taken to mean the first
+   occurrence of that time after the action started.  The collect duration is
+   counted from when the action started.  If both are configured, the earlier
+   of the two wins.
+
+   @param config: Config object.
+   @param start: Time the collect action started, in seconds since the epoch.
+   @return: Deadline in seconds since the epoch, or C{None} if there is no deadline.
+   """
+   deadline = None
+   if config.options.collectEndTime is not None:
+      (hour, minute) = [ int(field) for field in config.options.collectEndTime.split(":") ]
+      current = time.localtime(start)
+      day = 0
+      while deadline is None or deadline <= start:
+         deadline = time.mktime((current.tm_year, current.tm_mon, current.tm_mday + day, hour, minute, 0, 0, 0, -1))
+         day += 1
+   if config.options.collectDuration is not None:
+      limit = start + (config.options.collectDuration * SECONDS_PER_MINUTE)
+      if deadline is None or limit < deadline:
+         deadline = limit
+   logger.debug("Collect deadline is [%s]", deadline)
+   return deadline
+
+
+##################################
+# _getPreviousDuration() function
+##################################
+
+def _getPreviousDuration(statistics, absolutePath):
+   """
+   Gets the duration of a collect job during the previous run.
+   If there's no history for the job, it's assumed to be infinitely long.
+   @param statistics: Collect statistics from the previous run.
+   @param absolutePath: Absolute path of the collect job.
+   @return: Duration of the job in seconds.
+   """
+   try:
+      return statistics[absolutePath]["duration"]
+   except (KeyError, TypeError):
+      return float("inf")
+
+
+############################
+# _getThroughput() function
+############################
+
+def _getThroughput(statistics):
+   """
+   Gets the collect throughput measured during the previous run.
+   Only jobs with a recorded byte count are considered.
+   @param statistics: Collect statistics from the previous run.
+   @return: Throughput in bytes per second, or C{None} if there's no usable history.
+   """
+   size = 0
+   duration = 0.0
+   for values in statistics.values():
+      try:
+         if values["bytes"] is not None:
+            size += values["bytes"]
+            duration += values["duration"]
+      except (KeyError, TypeError):
+         pass
+   if size <= 0 or duration <= 0:
+      return None
+   return size / duration
+
+
 ############################
 # _getDigestPath() function
 ############################
@@ -496,13 +2546,17 @@ def _getDigestPath(config, absolutePath):
 def _getTarfilePath(config, absolutePath, archiveMode):
    """
    Gets the tarfile path (including correct extension) associated with a collect directory.
+   In adaptive archive mode, this is the uncompressed path that L{_getAdaptiveTarfilePath} starts from.
+   In chunk archive mode, this is the path of the manifest.
    @param config: Config object.
    @param absolutePath: Absolute path to generate tarfile for
    @param archiveMode: Archive mode to use for this tarfile.
    @return: Absolute path to the tarfile associated with the collect directory.
    """
-   if archiveMode == 'tar':
+   if archiveMode in [ 'tar', 'adaptive', ]:
       extension = "tar"
+   elif archiveMode == 'chunk':
+      extension = "manifest"
    elif archiveMode == 'targz':
       extension = "tar.gz"
    elif archiveMode == 'tarbz2':
@@ -514,6 +2568,157 @@ def _getTarfilePath(config, absolutePath, archiveMode):
    return tarfilePath
 
 
+#####################################
+# _getAdaptiveTarfilePath() function
+#####################################
+
+def _getAdaptiveTarfilePath(tarfilePath, archiveMode, compressLevel):
+   """
+   Gets the tarfile path for the compression chosen in adaptive archive mode.
+   The chosen level is recorded in the name, i.e. C{home.tar} becomes C{home.gz6.tar.gz}.
+   @param tarfilePath: Tarfile path, as returned by L{_getTarfilePath} in adaptive mode.
+   @param archiveMode: Archive mode chosen by L{_chooseCompression}.
+   @param compressLevel: Compression level chosen by L{_chooseCompression}.
+   @return: Absolute path to the tarfile to create.
+   """
+   base = tarfilePath[:-len(".tar")]
+   if archiveMode == 'tar':
+      adaptivePath = tarfilePath
+   elif archiveMode == 'targz':
+      adaptivePath = "%s.gz%d.tar.gz" % (base, compressLevel)
+   elif archiveMode == 'tarbz2':
+      adaptivePath = "%s.bz%d.tar.bz2" % (base, compressLevel)
+   logger.debug("Adaptive tarfile path is [%s]", adaptivePath)
+   return adaptivePath
+
+
+###############################
+# _getFileGroupPath() function
+###############################
+
+def _getFileGroupPath(collectMode, archiveMode):
+   """
+   Gets the path used to identify a group of collect files.
+   This isn't a real path on disk.  It's normalized like any other collect path
+   to name the group's tarfile and digest, i.e. C{collect-files-incr-targz.tar.gz}.
+   @param collectMode: Collect mode of the files in the group.
+   @param archiveMode: Archive mode of the files in the group.
+   @return: Path identifying the group.
+   """
+   return "/collect-files-%s-%s" % (collectMode, archiveMode)
+
+
+###############################
+# _getSignaturePath() function
+###############################
+
+def _getSignaturePath(config, absolutePath):
+   """
+   Gets the block signature path associated with a collect directory.
+   @param config: Config object.
+   @param absolutePath: Absolute path to generate signatures for
+   @return: Absolute path to the signatures associated with the collect directory.
+   """
+   normalized = buildNormalizedPath(absolutePath)
+   filename = "%s.%s" % (normalized, SIGNATURE_EXTENSION)
+   signaturePath = os.path.join(config.options.workingDir, filename)
+   logger.debug("Signature path is [%s]", signaturePath)
+   return signaturePath
+
+
+##############################
+# _getFullDatePath() function
+##############################
+
+def _getFullDatePath(config, absolutePath):
+   """
+   Gets the path of the file holding the date of the last full backup of a collect directory.
+   @param config: Config object.
+   @param absolutePath: Absolute path of the collect directory
+   @return: Absolute path to the full backup date associated with the collect directory.
+   """
+   normalized = buildNormalizedPath(absolutePath)
+   filename = "%s.%s" % (normalized, FULL_EXTENSION)
+   fullDatePath = os.path.join(config.options.workingDir, filename)
+   logger.debug("Full backup date path is [%s]", fullDatePath)
+   return fullDatePath
+
+
+###################################
+# _getStoredTarfilePath() function
+###################################
+
+def _getStoredTarfilePath(config, absolutePath):
+   """
+   Gets the path of the uncompressed tarfile used for incompressible files.
+   This sits alongside the normal tarfile, with a C{.stored.tar} extension.
+   @param config: Config object.
+   @param absolutePath: Absolute path to generate tarfile for
+   @return: Absolute path to the uncompressed tarfile associated with the collect directory.
+   """
+   normalized = buildNormalizedPath(absolutePath)
+   filename = "%s.stored.tar" % normalized
+   storedPath = os.path.join(config.collect.targetDir, filename)
+   logger.debug("Stored tarfile path is [%s]", storedPath)
+   return storedPath
+
+
+###############################
+# _getChunkPackPath() function
+###############################
+
+def _getChunkPackPath(config, absolutePath):
+   """
+   Gets the path of the pack used for new chunks in chunk archive mode.
+   This sits alongside the manifest, with a C{.chunks} extension.
+   @param config: Config object.
+   @param absolutePath: Absolute path to generate pack for
+   @return: Absolute path to the pack associated with the collect directory.
+   """
+   normalized = buildNormalizedPath(absolutePath)
+   filename = "%s.chunks" % normalized
+   packPath = os.path.join(config.collect.targetDir, filename)
+   logger.debug("Chunk pack path is [%s]", packPath)
+   return packPath
+
+
+################################
+# _getChunkIndexPath() function
+################################
+
+def _getChunkIndexPath(config, absolutePath):
+   """
+   Gets the path of the record of stored chunks associated with a collect directory.
+   @param config: Config object.
+   @param absolutePath: Absolute path to generate record for
+   @return: Absolute path to the chunk record associated with the collect directory.
+   """
+   normalized = buildNormalizedPath(absolutePath)
+   filename = "%s.%s" % (normalized, CHUNK_EXTENSION)
+   indexPath = os.path.join(config.options.workingDir, filename)
+   logger.debug("Chunk record path is [%s]", indexPath)
+   return indexPath
+
+
+##################################
+# _getDeltaTarfilePath() function
+##################################
+
+def _getDeltaTarfilePath(config, absolutePath):
+   """
+   Gets the path of the tarfile used for block deltas.
+   This sits alongside the normal tarfile, with a C{.delta.tar} extension.
+   @param config: Config object.
+   @param absolutePath: Absolute path to generate tarfile for
+   @return: Absolute path to the delta tarfile associated with the collect directory.
+   """
+   normalized = buildNormalizedPath(absolutePath)
+   filename = "%s.delta.tar" % normalized
+   deltaPath = os.path.join(config.collect.targetDir, filename)
+   logger.debug("Delta tarfile path is [%s]", deltaPath)
+   return deltaPath
+
+
 ############################
 # _getExclusions() function
 ############################
@@ -32,6 +32,12 @@ Provides common constants used by standard actions.
 
 DIR_TIME_FORMAT      = "%Y/%m/%d"
 DIGEST_EXTENSION     = "sha"
+SIGNATURE_EXTENSION  = "sig"
+FULL_EXTENSION       = "full"
+CHUNK_EXTENSION      = "known"
+COLLECT_STATISTICS   = "cback.collect.stats"
+COLLECT_DEFERRED     = "cback.collect.deferred"
+COLLECT_SCHEDULE     = "cback.collect.schedule"
 
 INDICATOR_PATTERN    = [ r"cback\..*", ]
 COLLECT_INDICATOR    = "cback.collect"
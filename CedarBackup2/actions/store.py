@@ -55,8 +55,8 @@ import datetime
 import tempfile
 
 # Cedar Backup modules
-from CedarBackup2.filesystem import compareContents
-from CedarBackup2.util import isStartOfWeek
+from CedarBackup2.filesystem import BackupFileList, compareContents
+from CedarBackup2.util import isStartOfWeek, deriveDayOfWeek
 from CedarBackup2.util import mount, unmount, displayBytes
 from CedarBackup2.actions.util import createWriter, checkMediaState, buildMediaLabel, writeIndicatorFile
 from CedarBackup2.actions.constants import DIR_TIME_FORMAT, STAGE_INDICATOR, STORE_INDICATOR
@@ -68,6 +68,8 @@ from CedarBackup2.actions.constants import DIR_TIME_FORMAT, STAGE_INDICATOR, STO
 
 logger = logging.getLogger("CedarBackup2.log.actions.store")
 
+PLANNED_HISTORY = 8  # weeks of staging directories used to plan media
+
 
 ########################################################################
 # Public functions
@@ -181,6 +183,9 @@ def writeImageBlankSafe(config, rebuildMedia, todayIsStart, blankBehavior, stagi
       the disc will be blanked if it looks like the weekly backup will not
       fit onto the media.
 
+      If blanking behavior is specified and the blank mode is "planned",
+      then the disc will be blanked according to the media plan below.
+
       Otherwise, the disc will not be blanked
 
    How do we decide whether the weekly backup will fit onto the media?  That is
@@ -191,6 +196,16 @@ def writeImageBlankSafe(config, rebuildMedia, todayIsStart, blankBehavior, stagi
    The blanking factor will vary from setup to setup, and will probably
    require some experimentation to get it right.
 
+   The "planned" blank mode looks at history instead.  The rest of the week is
+   forecast from the daily staging directories written in the last few weeks
+   (see L{_getVolumeForecast}), and the forecast is multiplied by the blanking
+   factor, so a factor of 1.0 assumes that no day will be larger than the
+   largest one seen recently.  Then, the disc is blanked if today's data does
+   not fit, or if today's data fits but the rest of the week will not, and the
+   rest of the week (including today) would fit onto an empty disc.  This way,
+   the disc is blanked at most once per week if possible, and no earlier than
+   it needs to be.
+
    @param config: Config object.
    @param rebuildMedia: Indicates whether media should be rebuilt
    @param todayIsStart: Indicates whether today is the starting day of the week
@@ -207,11 +222,14 @@ def writeImageBlankSafe(config, rebuildMedia, todayIsStart, blankBehavior, stagi
       logger.debug("Adding stage directory [%s].", stageDir)
       dateSuffix = stagingDirs[stageDir]
       writer.addImageEntry(stageDir, dateSuffix)
-   newDisc = _getNewDisc(writer, rebuildMedia, todayIsStart, blankBehavior)
+   forecast = None
+   if not rebuildMedia and blankBehavior is not None and blankBehavior.blankMode == "planned":
+      forecast = _getVolumeForecast(config, writer)
+   newDisc = _getNewDisc(writer, rebuildMedia, todayIsStart, blankBehavior, forecast)
    writer.setImageNewDisc(newDisc)
    writer.writeImage()
 
-def _getNewDisc(writer, rebuildMedia, todayIsStart, blankBehavior):
+def _getNewDisc(writer, rebuildMedia, todayIsStart, blankBehavior, forecast=None):
    """
    Gets a value for the newDisc flag based on blanking factor rules.
 
@@ -221,6 +239,7 @@ def _getNewDisc(writer, rebuildMedia, todayIsStart, blankBehavior):
    @param rebuildMedia: Indicates whether media should be rebuilt
    @param todayIsStart: Indicates whether today is the starting day of the week
    @param blankBehavior: Blank behavior from configuration, or C{None} to use default behavior
+   @param forecast: Forecast size of the rest of the week in bytes, for the "planned" blank mode
 
    @return: newDisc flag to be set on writer.
    """
@@ -237,7 +256,10 @@ def _getNewDisc(writer, rebuildMedia, todayIsStart, blankBehavior):
       else:
          # note: validation says we can assume that behavior is fully filled in if it exists at all
          logger.debug("Optimized media blanking behavior is in effect based on configuration.")
-         if blankBehavior.blankMode == "daily" or (blankBehavior.blankMode == "weekly" and todayIsStart):
+         if blankBehavior.blankMode == "planned":
+            logger.debug("New disc flag will be set based on the media plan.")
+            newDisc = _getPlannedNewDisc(writer, float(blankBehavior.blankFactor), forecast or 0)
+         elif blankBehavior.blankMode == "daily" or (blankBehavior.blankMode == "weekly" and todayIsStart):
             logger.debug("New disc flag will be set based on blank factor calculation.")
             blankFactor = float(blankBehavior.blankFactor)
             logger.debug("Configured blanking factor: %.2f", blankFactor)
@@ -254,6 +276,39 @@ def _getNewDisc(writer, rebuildMedia, todayIsStart, blankBehavior):
    logger.debug("New disc flag [%s].", newDisc)
    return newDisc
 
+def _getPlannedNewDisc(writer, blankFactor, forecast):
+   """
+   Gets a value for the newDisc flag based on the media plan.
+
+   The media plan is described above by L{writeImageBlankSafe}.  The
+   prediction and the space actually used on the disc are logged, so the
+   blanking factor can be checked against real backups over time.
+
+   @param writer: Previously configured image writer containing image entries
+   @param blankFactor: Blanking factor applied to the forecast
+   @param forecast: Forecast size of the rest of the week, in bytes
+
+   @return: newDisc flag to be set on writer.
+   """
+   capacity = writer.retrieveCapacity()
+   available = capacity.bytesAvailable
+   required = writer.getEstimatedImageSize()
+   planned = forecast * blankFactor
+   logger.info("Media plan: disc has %s used and %s available.", displayBytes(capacity.bytesUsed), displayBytes(available))
+   logger.info("Media plan: today needs %s, rest of week is predicted to need %s.", displayBytes(required), displayBytes(planned))
+   if required > available:
+      logger.info("Media plan: today's data does not fit; starting a new disc.")
+      return True
+   if required + planned <= available:
+      logger.info("Media plan: the rest of the week is predicted to fit; appending to the current disc.")
+      return False
+   entireDisc = writer.retrieveCapacity(entireDisc=True).bytesAvailable
+   if required + planned <= entireDisc:
+      logger.info("Media plan: the rest of the week is predicted to fit on a new disc; starting one now.")
+      return True
+   logger.info("Media plan: the rest of the week is predicted to need more than one disc; filling the current disc first.")
+   return False
+
 
 #################################
 # writeStoreIndicator() function
@@ -322,6 +377,97 @@ def consistencyCheck(config, stagingDirs):
 # Private utility functions
 ########################################################################
 
+################################
+# _getVolumeForecast() function
+################################
+
+def _getVolumeForecast(config, writer):
+   """
+   Forecasts how much data the store action will write for the rest of the week.
+
+   Each daily staging directory written to disc in the last L{PLANNED_HISTORY}
+   weeks is sized, and the largest size seen for each day of the week is used
+   as the forecast for that day.  Days with no history are forecast using the
+   largest size seen for any day.  If there is no history at all, each day is
+   assumed to be as large as today's image.
+
+   The actual size of the directories stored so far this week is logged along
+   with what would have been forecast for them at the start of the week.
+
+   @param config: Config object.
+   @param writer: Previously configured image writer containing image entries
+
+   @return: Forecast size of the days after today until the start of the next week, in bytes.
+   """
+   today = datetime.date.today()
+   weekStart = today - datetime.timedelta(days=(today.weekday() - deriveDayOfWeek(config.options.startingDay)) % 7)
+   history = _getStagingHistory(config.stage.targetDir, today - datetime.timedelta(weeks=PLANNED_HISTORY), today)
+   stored = [ date for date in history if date >= weekStart ]
+   if stored:
+      actual = sum([ history[date] for date in stored ])
+      expected = _forecastDays(history, weekStart, [ date.weekday() for date in stored ])
+      if expected is None:
+         logger.info("Media plan: stored %s so far this week; no forecast was available.", displayBytes(actual))
+      else:
+         logger.info("Media plan: stored %s so far this week, against a forecast of %s.", displayBytes(actual), displayBytes(expected))
+   days = 6 - (today - weekStart).days
+   weekdays = [ (today + datetime.timedelta(days=day)).weekday() for day in range(1, days + 1) ]
+   forecast = _forecastDays(history, today, weekdays)
+   if forecast is None:
+      logger.info("Media plan: no staging history found; assuming each remaining day matches today.")
+      forecast = days * writer.getEstimatedImageSize()
+   logger.debug("Forecast for the remaining %d day(s) of the week: %s", days, displayBytes(forecast))
+   return forecast
+
+
+###########################
+# _forecastDays() function
+###########################
+
+def _forecastDays(history, before, weekdays):
+   """
+   Forecasts the total size of staging directories for a set of days.
+   @param history: Dictionary mapping date to size in bytes, as from L{_getStagingHistory}.
+   @param before: Only history for dates before this date is used.
+   @param weekdays: List of days of the week to forecast, as from C{datetime.date.weekday}.
+   @return: Forecast size in bytes, or C{None} if there is no usable history.
+   """
+   maxima = {}
+   for date in history:
+      if date < before:
+         maxima[date.weekday()] = max(history[date], maxima.get(date.weekday(), 0))
+   if not maxima:
+      return None
+   largest = max(maxima.values())
+   return sum([ maxima.get(weekday, largest) for weekday in weekdays ])
+
+
+################################
+# _getStagingHistory() function
+################################
+
+def _getStagingHistory(stagingDir, start, end):
+   """
+   Sizes the daily staging directories that have been written to disc.
+   Only directories that contain a store indicator are included.
+   @param stagingDir: Configured staging directory (config.targetDir)
+   @param start: First date to look at.
+   @param end: Date after the last date to look at.
+   @return: Dictionary mapping date to the size of its staging directory, in bytes.
+   """
+   history = {}
+   date = start
+   while date < end:
+      dailyDir = os.path.join(stagingDir, date.strftime(DIR_TIME_FORMAT))
+      if os.path.isdir(dailyDir) and os.path.exists(os.path.join(dailyDir, STORE_INDICATOR)):
+         fileList = BackupFileList()
+         fileList.addDirContents(dailyDir)
+         history[date] = fileList.totalSize()
+      date += datetime.timedelta(days=1)
+   logger.debug("Found %d stored daily staging directories since %s.", len(history), start)
+   return history
+
+
 #########################
 # _findCorrectDailyDir()
 #########################
@@ -164,19 +164,21 @@ def createWriter(config):
 # writeIndicatorFile() function
 ################################
 
-def writeIndicatorFile(targetDir, indicatorFile, backupUser, backupGroup):
+def writeIndicatorFile(targetDir, indicatorFile, backupUser, backupGroup, contents=""):
    """
    Writes an indicator file into a target directory.
+   Indicator files are normally empty, since only their existence matters.
    @param targetDir: Target directory in which to write indicator
    @param indicatorFile: Name of the indicator file
    @param backupUser: User that indicator file should be owned by
    @param backupGroup: Group that indicator file should be owned by
+   @param contents: Contents to write into the indicator file
    @raise IOException: If there is a problem writing the indicator file
    """
    filename = os.path.join(targetDir, indicatorFile)
    logger.debug("Writing indicator file [%s].", filename)
    try:
-      open(filename, "w").write("")
+      open(filename, "w").write(contents)
       changeOwnership(filename, backupUser, backupGroup)
    except Exception, e:
       logger.error("Error writing [%s]: %s", filename, e)
@@ -0,0 +1,523 @@
+# -*- coding: iso-8859-1 -*-
+# vim: set ft=python ts=3 sw=3 expandtab:
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#
+#              C E D A R
+#          S O L U T I O N S       "Software done right."
+#           S O F T W A R E
+#
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#
+# Copyright (c) 2004-2005,2010 Kenneth J. Pronovici.
+# All rights reserved.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License,
+# Version 2, as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# Copies of the GNU General Public License are available from
+# the Free Software Foundation website, http://www.gnu.org/.
+#
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#
+# Author   : Kenneth J. Pronovici <pronovic@ieee.org>
+# Language : Python 2 (>= 2.7)
+# Project  : Cedar Backup, release 2
+# Purpose  : Provides content-defined chunk archives
+#
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+########
+# Notes
+########
+
+"""
+Provides content-defined chunk archives, an alternative to tarfiles.
+
+A chunk archive is made up of two files.  The I{manifest} describes each
+entry that would have been put into a tarfile (name, type, ownership,
+permissions and so on), and lists the chunks that make up the contents of each
+regular file.  The I{pack} holds the chunks themselves.  Each chunk is named
+by the SHA digest of its contents, and only chunks which are not already
+known (from earlier archives, or from earlier in the same archive) are written
+into the pack.  Identical data is only stored once, no matter how many files
+or how many days it turns up in.  A normal tarfile can be rebuilt from a
+manifest and the packs holding its chunks (see L{materializeTarfile}).
+
+Files are split into chunks at boundaries that depend on their contents, so
+inserting or removing data in a file only changes the chunks around the edit,
+and the rest of the file still matches the chunks already stored.  The usual
+way to find these boundaries is with a rolling hash evaluated at every byte
+offset, but that is far too slow in pure Python.  Instead, a boundary is
+placed after any four bytes that match L{CHUNK_BOUNDARY}, a regular
+expression made of four character classes with 16 bytes each.  This is still
+a function of a small window of the contents, just like a rolling hash, but
+the search runs at the speed of the regular expression engine.  Chunks are
+never smaller than L{CHUNK_MIN_SIZE} or larger than L{CHUNK_MAX_SIZE}, so data
+with no boundaries in it (i.e. long runs of zeros) is just split into
+fixed-size chunks.
+
+The pack starts with L{PACK_MAGIC}, followed by one record per chunk.  Each
+record is a header in L{PACK_RECORD} format (the binary SHA digest of the
+chunk, a flag indicating whether the data is compressed with C{zlib}, and the
+length of the data) followed by the data itself.  Chunks are only stored
+compressed if that makes them smaller.
+
+The manifest is a JSON document, with the magic string L{MANIFEST_MAGIC} and a
+list of entries.  Each entry holds the C{tarfile} header fields for the entry
+plus a list of chunk digests.  Since paths are byte strings that are not
+necessarily valid UTF-8, strings are encoded as Latin-1 in the manifest, which
+round-trips any byte string exactly.
+
+@sort: writeChunkArchive, materializeTarfile, splitChunks, CHUNK_MIN_SIZE,
+       CHUNK_MAX_SIZE, CHUNK_BOUNDARY, PACK_MAGIC, PACK_RECORD, MANIFEST_MAGIC
+
+@var CHUNK_MIN_SIZE: Minimum chunk size, in bytes.
+@var CHUNK_MAX_SIZE: Maximum chunk size, in bytes.
+@var CHUNK_BOUNDARY: Regular expression that marks a chunk boundary.
+@var PACK_MAGIC: Magic string at the start of every pack.
+@var PACK_RECORD: C{struct} format of the header of each record in a pack.
+@var MANIFEST_MAGIC: Magic string identifying a manifest.
+
+@author: Kenneth J. Pronovici <pronovic@ieee.org>
+"""
+
+########################################################################
+# Imported modules
+########################################################################
+
+# System modules
+import os
+import re
+import zlib
+import json
+import struct
+import hashlib
+import logging
+import tarfile
+from cStringIO import StringIO
+
+# Cedar Backup modules
+from CedarBackup2.util import openBackupFile, closeBackupFile, displayBytes, encodePath
+
+
+########################################################################
+# Module-wide constants and variables
+########################################################################
+
+logger = logging.getLogger("CedarBackup2.log.chunk")
+
+CHUNK_MIN_SIZE = 64 * 1024
+CHUNK_MAX_SIZE = 512 * 1024
+CHUNK_BOUNDARY = re.compile("".join([ "[%s]" % "".join([ "\\x%02x" % b for b in range(256) if (b * 7 + i * 5) % 16 == 0 ])
+                                      for i in range(4) ]))
+PACK_MAGIC     = "CBCHUNK1"
+PACK_RECORD    = ">20sBI"   # digest, compressed flag, length
+MANIFEST_MAGIC = "CBMANIFEST1"
+MANIFEST_FIELDS = [ "name", "mode", "uid", "gid", "size", "mtime", "type", "linkname", "uname", "gname", ]
+
+
+#######################################################################
+# Public functions
+#######################################################################
+
+#########################
+# splitChunks() function
+#########################
+
+def splitChunks(fileobj):
+   """
+   Splits the contents of a file into content-defined chunks.
+
+   Each chunk ends just after the first match of L{CHUNK_BOUNDARY} that
+   starts at least L{CHUNK_MIN_SIZE} bytes into the chunk, or after
+   L{CHUNK_MAX_SIZE} bytes if there is no such match.  The last chunk may be
+   smaller than the minimum.
+
+   @param fileobj: File-like object to read from.
+   @return: Generator yielding the chunks, as strings.
+   """
+   buf = ""
+   offset = 0
+   eof = False
+   while True:
+      if not eof and len(buf) - offset < CHUNK_MAX_SIZE:
+         data = fileobj.read(CHUNK_MAX_SIZE)
+         if not data:
+            eof = True
+         buf = buf[offset:] + data
+         offset = 0
+         continue
+      if offset >= len(buf):
+         return
+      match = CHUNK_BOUNDARY.search(buf, offset + CHUNK_MIN_SIZE, offset + CHUNK_MAX_SIZE)
+      if match is None:
+         end = offset + CHUNK_MAX_SIZE
+      else:
+         end = match.end()
+      yield buf[offset:end]
+      offset = end
+
+
+###############################
+# writeChunkArchive() function
+###############################
+
+def writeChunkArchive(entries, manifestPath, packPath, known, ignore=False, captureDigest=False, append=False):
+   """
+   Writes a chunk archive containing the indicated entries.
+
+   Each entry is described in the manifest exactly as it would have been
+   described in a tarfile created by L{BackupFileList.generateTarfile}, except
+   that hard links are stored as regular files (which costs nothing, since
+   their chunks are already known).  The contents of each regular file are
+   split into chunks with L{splitChunks}, and every chunk that is not in
+   C{known} is written into the pack and added to C{known}.  The caller is responsible for saving C{known} (and for making
+   sure the chunks in it really are available somewhere) for later archives.
+   If no new chunks are written, no pack is left on disk.
+
+   If you pass in C{append=True} and the pack already exists, the new chunks
+   are appended to it rather than replacing it.  This is how the caller keeps
+   chunks that were written into a pack which hasn't been copied anywhere
+   yet, since C{known} says they're already stored.
+
+   By default, the whole method call fails if there are problems adding any of
+   the entries, resulting in an exception.  If you pass in C{ignore=True},
+   then entries that can't be read are logged and left out.  Any chunks
+   already written for such an entry stay in the pack, which does no harm.
+
+   If you pass in C{captureDigest=True}, then each regular file is hashed as
+   it is chunked, and a digest map (in exactly the form returned by
+   L{BackupFileList.generateDigestMap}) is returned for the files that were
+   actually archived.
+
+   We'll always attempt to remove the manifest and pack from disk (or, when
+   appending, to put the pack back the way it was) if an exception will be
+   thrown.
+
+   @param entries: List of paths to archive.
+   @param manifestPath: Path of the manifest to create on disk.
+   @param packPath: Path of the pack to create on disk.
+   @param known: Set of binary chunk digests already stored, which is modified in place.
+   @param ignore: Indicates whether to ignore errors reading individual entries.
+   @param captureDigest: Indicates that digest information should be captured.
+   @param append: Indicates that new chunks should be appended to an existing pack.
+
+   @return: Digest map if C{captureDigest} is C{True}, or C{None} otherwise.
+
+   @raise ValueError: If list is empty
+   @raise IOError: If there is a problem writing the manifest or pack.
+   @raise OSError: If there is a problem reading an entry and C{ignore} is C{False}.
+   """
+   manifestPath = encodePath(manifestPath)
+   packPath = encodePath(packPath)
+   if len(entries) == 0: raise ValueError("Empty list cannot be used to generate chunk archive.")
+   captured = None
+   if captureDigest:
+      captured = {}
+   scratch = tarfile.open(fileobj=StringIO(), mode="w", format=tarfile.GNU_FORMAT)
+   (total, stored, storedBytes) = (0, 0, 0)
+   appending = append and os.path.isfile(packPath)
+   if appending:
+      original = os.path.getsize(packPath)
+   try:
+      manifest = []
+      if appending:
+         pack = open(packPath, "ab")
+      else:
+         pack = open(packPath, "wb")
+         pack.write(PACK_MAGIC)
+      try:
+         for entry in entries:
+            try:
+               tarinfo = scratch.gettarinfo(entry, entry)
+               if tarinfo is None:
+                  logger.info("Unable to add file [%s], which has an unsupported type; going on anyway.", entry)
+                  continue
+               if tarinfo.islnk():
+                  (tarinfo.type, tarinfo.linkname) = (tarfile.REGTYPE, "")  # identical chunks cost nothing
+               chunks = []
+               if tarinfo.isreg():
+                  s = hashlib.sha1()
+                  tarinfo.size = 0
+                  fileobj = openBackupFile(entry)
+                  try:
+                     for chunk in splitChunks(fileobj):
+                        s.update(chunk)
+                        digest = hashlib.sha1(chunk).digest()
+                        if digest not in known:
+                           storedBytes += _writePackRecord(pack, digest, chunk)
+                           known.add(digest)
+                           stored += 1
+                        chunks.append(digest.encode("hex"))
+                        tarinfo.size += len(chunk)
+                  finally:
+                     closeBackupFile(fileobj)
+                  total += len(chunks)
+                  if captured is not None:
+                     captured[entry] = s.hexdigest()
+               item = dict([ (field, getattr(tarinfo, field)) for field in MANIFEST_FIELDS ])
+               item["chunks"] = chunks
+               manifest.append(item)
+            except (IOError, OSError), e:
+               if not ignore:
+                  raise e
+               logger.info("Unable to add file [%s]; going on anyway.", entry)
+      finally:
+         pack.close()
+         scratch.close()
+      output = open(manifestPath, "w")
+      try:
+         json.dump({ "magic": MANIFEST_MAGIC, "entries": manifest, }, output, encoding="latin-1")
+      finally:
+         output.close()
+   except:
+      if os.path.exists(manifestPath):
+         try: os.remove(manifestPath)
+         except: pass
+      if appending:
+         try: open(packPath, "r+b").truncate(original)
+         except: pass
+      elif os.path.exists(packPath):
+         try: os.remove(packPath)
+         except: pass
+      raise
+   if stored == 0 and not appending:
+      os.remove(packPath)
+   logger.debug("Stored %d of %d chunks (%s) for [%s].", stored, total, displayBytes(storedBytes), manifestPath)
+   return captured
+
+
+################################
+# materializeTarfile() function
+################################
+
+def materializeTarfile(manifestPath, searchDirs, tarfilePath, mode='tar'):
+   """
+   Rebuilds a normal tarfile from a chunk archive.
+
+   The packs holding the chunks are found by searching the indicated
+   directories recursively for files with a C{.chunks} extension.  Usually,
+   this would be the staging directory, or a disc (or set of discs) that the
+   staging directory was written to.  Every chunk is checked against its
+   digest as it is read.  The resulting tarfile has the same members, in the
+   same order, as the tarfile that L{BackupFileList.generateTarfile} would
+   have created.
+
+   We'll always attempt to remove the tarfile from disk if an exception will
+   be thrown.
+
+   @param manifestPath: Path of the manifest on disk.
+   @param searchDirs: List of directories to search for packs.
+   @param tarfilePath: Path of tar file to create on disk.
+   @param mode: Tar creation mode, one of C{'tar'}, C{'targz'} or C{'tarbz2'}.
+
+   @raise ValueError: If the manifest is invalid, the mode is invalid or a chunk is missing or corrupt.
+   @raise IOError: If there is a problem reading or writing a file.
+   """
+   manifest = _readManifest(manifestPath)
+   needed = set()
+   for item in manifest:
+      needed.update([ digest.decode("hex") for digest in item["chunks"] ])
+   locations = _findChunks(searchDirs, needed)
+   missing = needed.difference(locations)
+   if missing:
+      raise ValueError("Unable to find %d chunks needed by [%s]." % (len(missing), manifestPath))
+   if mode == 'tar': tarmode = "w:"
+   elif mode == 'targz': tarmode = "w:gz"
+   elif mode == 'tarbz2': tarmode = "w:bz2"
+   else: raise ValueError("Mode [%s] is not valid." % mode)
+   packs = {}
+   try:
+      tar = tarfile.open(tarfilePath, tarmode, format=tarfile.GNU_FORMAT)
+      try:
+         for item in manifest:
+            tarinfo = tarfile.TarInfo()
+            for field in MANIFEST_FIELDS:
+               setattr(tarinfo, field, item[field])
+            if tarinfo.isreg():
+               tar.addfile(tarinfo, _ChunkReader(item["chunks"], locations, packs))
+            else:
+               tar.addfile(tarinfo)
+      finally:
+         tar.close()
+   except:
+      if os.path.exists(tarfilePath):
+         try: os.remove(tarfilePath)
+         except: pass
+      raise
+   finally:
+      for pack in packs.values():
+         pack.close()
+   logger.info("Materialized [%s] from [%s]: %d entries.", tarfilePath, manifestPath, len(manifest))
+
+
+########################################################################
+# Private utility functions and classes
+########################################################################
+
+##############################
+# _writePackRecord() function
+##############################
+
+def _writePackRecord(pack, digest, chunk):
+   """
+   Writes a single chunk into a pack, compressing it if that helps.
+   @param pack: Pack file object, open for writing.
+   @param digest: Binary SHA digest of the chunk.
+   @param chunk: Contents of the chunk.
+   @return: Number of bytes of chunk data written.
+   """
+   data = zlib.compress(chunk, 6)
+   if len(data) < len(chunk):
+      pack.write(struct.pack(PACK_RECORD, digest, 1, len(data)))
+   else:
+      data = chunk
+      pack.write(struct.pack(PACK_RECORD, digest, 0, len(data)))
+   pack.write(data)
+   return len(data)
+
+
+###########################
+# _readManifest() function
+###########################
+
+def _readManifest(manifestPath):
+   """
+   Reads a manifest from disk.
+   Strings are converted back to the original byte strings.
+   @param manifestPath: Path of the manifest on disk.
+   @return: List of manifest entries, as dictionaries.
+   @raise ValueError: If the file is not a valid manifest.
+   """
+   try:
+      document = json.load(open(manifestPath, "r"), encoding="latin-1")
+   except ValueError:
+      raise ValueError("File [%s] is not a valid manifest." % manifestPath)
+   if not isinstance(document, dict) or document.get("magic") != MANIFEST_MAGIC:
+      raise ValueError("File [%s] is not a valid manifest." % manifestPath)
+   entries = []
+   for item in document["entries"]:
+      entry = {}
+      for (key, value) in item.items():
+         if isinstance(value, unicode):
+            value = value.encode("latin-1")
+         entry[str(key)] = value
+      entries.append(entry)
+   return entries
+
+
+#########################
+# _findChunks() function
+#########################
+
+def _findChunks(searchDirs, needed):
+   """
+   Finds the location of the needed chunks within the packs in a set of directories.
+   Packs that can't be read are skipped.  If a chunk is in more than one pack, the first one found is used.
+   @param searchDirs: List of directories to search recursively.
+   @param needed: Set of binary chunk digests to find.
+   @return: Dictionary mapping digest to C{(packPath, offset, compressed, length)}.
+   """
+   locations = {}
+   recordSize = struct.calcsize(PACK_RECORD)
+   for searchDir in searchDirs:
+      for (root, dirs, files) in os.walk(searchDir):
+         dirs.sort()
+         for name in sorted(files):
+            if not name.endswith(".chunks"):
+               continue
+            packPath = os.path.join(root, name)
+            try:
+               pack = open(packPath, "rb")
+               try:
+                  if pack.read(len(PACK_MAGIC)) != PACK_MAGIC:
+                     logger.warn("File [%s] is not a valid pack; skipping it.", packPath)
+                     continue
+                  while True:
+                     header = pack.read(recordSize)
+                     if len(header) < recordSize:
+                        break
+                     (digest, compressed, length) = struct.unpack(PACK_RECORD, header)
+                     if digest in needed and digest not in locations:
+                        locations[digest] = (packPath, pack.tell(), compressed, length)
+                     pack.seek(length, 1)
+               finally:
+                  pack.close()
+            except IOError, e:
+               logger.warn("Unable to read pack [%s]: %s", packPath, e)
+   logger.debug("Found %d of %d needed chunks.", len(locations), len(needed))
+   return locations
+
+
+########################
+# _ChunkReader class
+########################
+
+class _ChunkReader(object):
+
+   """
+   File-like object that reads the contents of a file back out of its chunks.
+   Each chunk is checked against its digest as it is read.
+   """
+
+   def __init__(self, chunks, locations, packs):
+      """
+      Constructor for the C{_ChunkReader} class.
+      @param chunks: List of hex chunk digests, in order.
+      @param locations: Dictionary of chunk locations, as from L{_findChunks}.
+      @param packs: Dictionary of open packs by path, shared between readers.
+      """
+      self.chunks = chunks
+      self.locations = locations
+      self.packs = packs
+      self.index = 0
+      self.buffer = ""
+      self.offset = 0
+
+   def read(self, size=-1):
+      """
+      Reads up to C{size} bytes, or everything that's left if C{size} is negative.
+      @raise ValueError: If a chunk is corrupt.
+      """
+      pieces = []
+      while size != 0:
+         if self.offset >= len(self.buffer):
+            if self.index >= len(self.chunks):
+               break
+            self.buffer = self._readChunk(self.chunks[self.index])
+            self.index += 1
+            self.offset = 0
+         if size < 0:
+            piece = self.buffer[self.offset:]
+         else:
+            piece = self.buffer[self.offset:self.offset + size]
+            size -= len(piece)
+         self.offset += len(piece)
+         pieces.append(piece)
+      return "".join(pieces)
+
+   def _readChunk(self, hexdigest):
+      """
+      Reads a single chunk out of its pack.
+      @raise ValueError: If the chunk is corrupt.
+      """
+      digest = hexdigest.decode("hex")
+      (packPath, offset, compressed, length) = self.locations[digest]
+      if packPath not in self.packs:
+         self.packs[packPath] = open(packPath, "rb")
+      pack = self.packs[packPath]
+      pack.seek(offset)
+      data = pack.read(length)
+      try:
+         if compressed:
+            data = zlib.decompress(data)
+      except zlib.error:
+         raise ValueError("Chunk [%s] in pack [%s] is corrupt." % (hexdigest, packPath))
+      if hashlib.sha1(data).digest() != digest:
+         raise ValueError("Chunk [%s] in pack [%s] is corrupt." % (hexdigest, packPath))
+      return data
@@ -90,9 +90,10 @@ from CedarBackup2.customize import customizeOverrides
 from CedarBackup2.util import DirectedGraph, PathResolverSingleton
 from CedarBackup2.util import sortDict, splitCommandLine, executeCommand, getFunctionReference
 from CedarBackup2.util import getUidGid, encodePath, Diagnostics
+from CedarBackup2.util import setIoMode, IO_MODE_NORMAL
 from CedarBackup2.config import Config
 from CedarBackup2.peer import RemotePeer
-from CedarBackup2.actions.collect import executeCollect
+from CedarBackup2.actions.collect import executeCollect, planCollect
 from CedarBackup2.actions.stage import executeStage
 from CedarBackup2.actions.store import executeStore
 from CedarBackup2.actions.purge import executePurge
@@ -130,9 +131,9 @@ VALID_ACTIONS      = [ "collect", "stage", "store", "purge", "rebuild", "validat
 COMBINE_ACTIONS    = [ "collect", "stage", "store", "purge", ]
 NONCOMBINE_ACTIONS = [ "rebuild", "validate", "initialize", "all", ]
 
-SHORT_SWITCHES     = "hVbqc:fMNl:o:m:OdsDu"
+SHORT_SWITCHES     = "hVbqc:fPMNl:o:m:OdsDu"
 LONG_SWITCHES      = [ 'help', 'version', 'verbose', 'quiet',
-                       'config=', 'full', 'managed', 'managed-only',
+                       'config=', 'full', 'plan', 'managed', 'managed-only',
                        'logfile=', 'owner=', 'mode=',
                        'output', 'debug', 'stack', 'diagnostics',
                        'unsupported', ]
@@ -253,6 +254,7 @@ def cli():
       config = Config(xmlPath=configPath)
       customizeOverrides(config)
       setupPathResolver(config)
+      setupIoMode(config)
       actionSet = _ActionSet(options.actions, config.extensions, config.options,
                              config.peers, executeManaged, executeLocal)
    except Exception, e:
@@ -845,12 +847,19 @@ class _ActionSet(object):
       values.  We also pass in the config path so that extension modules can
       re-parse configuration if they want to, to add in extra information.
 
+      If the plan flag is set in the options, nothing is executed.  Instead,
+      the collect action is planned (see L{planCollect}) and no hooks are run.
+
       @param configPath: Path to configuration file on disk.
       @param options: Command-line options to be passed to action functions.
       @param config: Parsed configuration to be passed to action functions.
 
       @raise Exception: If there is a problem executing the actions.
       """
+      if options.plan:
+         logger.debug("Planning the collect action rather than executing it.")
+         planCollect(configPath, options, config)
+         return
       logger.debug("Executing local actions.")
       for actionItem in self.actionSet:
          actionItem.executeAction(configPath, options, config)
@@ -933,6 +942,7 @@ def _usage(fd=sys.stderr):
    fd.write("   -q, --quiet        Run quietly (display no output to the screen)\n")
    fd.write("   -c, --config       Path to config file (default: %s)\n" % DEFAULT_CONFIG)
    fd.write("   -f, --full         Perform a full backup, regardless of configuration\n")
+   fd.write("   -P, --plan         Report what the collect action would do, without doing it\n")
    fd.write("   -M, --managed      Include managed clients when executing actions\n")
    fd.write("   -N, --managed-only Include ONLY managed clients when executing actions\n")
    fd.write("   -l, --logfile      Path to logfile (default: %s)\n" % DEFAULT_LOGFILE)
@@ -1222,6 +1232,27 @@ def setupPathResolver(config):
    singleton.fill(mapping)
 
 
+##########################
+# setupIoMode() function
+##########################
+
+def setupIoMode(config):
+   """
+   Set up the global I/O mode based on configuration.
+
+   The I/O mode controls how files are read when they are hashed, archived or
+   copied (see L{util.setIoMode}).  If the options configuration doesn't
+   specify a mode, the normal mode is used.
+
+   @param config: Configuration
+   @type config: L{Config} object
+   """
+   if config.options is not None and config.options.ioMode is not None:
+      setIoMode(config.options.ioMode)
+   else:
+      setIoMode(IO_MODE_NORMAL)
+
+
 #########################################################################
 # Options class definition
 ########################################################################
@@ -1330,6 +1361,7 @@ class Options(object):
       self._quiet = False
       self._config = None
       self._full = False
+      self._plan = False
       self._managed = False
       self._managedOnly = False
       self._logfile = None
@@ -1412,6 +1444,11 @@ class Options(object):
             return -1
          else:
             return 1
+      if self.plan != other.plan:
+         if self.plan < other.plan:
+            return -1
+         else:
+            return 1
       if self.managed != other.managed:
          if self.managed < other.managed:
             return -1
@@ -1569,6 +1606,22 @@ class Options(object):
       """
       return self._full
 
+   def _setPlan(self, value):
+      """
+      Property target used to set the plan flag.
+      No validations, but we normalize the value to C{True} or C{False}.
+      """
+      if value:
+         self._plan = True
+      else:
+         self._plan = False
+
+   def _getPlan(self):
+      """
+      Property target used to get the plan flag.
+      """
+      return self._plan
+
    def _setManaged(self, value):
       """
       Property target used to set the managed flag.
@@ -1776,6 +1829,7 @@ class Options(object):
    quiet = property(_getQuiet, _setQuiet, None, "Command-line quiet (C{-q,--quiet}) flag.")
    config = property(_getConfig, _setConfig, None, "Command-line configuration file (C{-c,--config}) parameter.")
    full = property(_getFull, _setFull, None, "Command-line full-backup (C{-f,--full}) flag.")
+   plan = property(_getPlan, _setPlan, None, "Command-line plan (C{-P,--plan}) flag.")
    managed = property(_getManaged, _setManaged, None, "Command-line managed (C{-M,--managed}) flag.")
    managedOnly = property(_getManagedOnly, _setManagedOnly, None, "Command-line managed-only (C{-N,--managed-only}) flag.")
    logfile = property(_getLogfile, _setLogfile, None, "Command-line logfile (C{-l,--logfile}) parameter.")
@@ -1798,9 +1852,10 @@ class Options(object):
       Validates command-line options represented by the object.
 
       Unless C{--help} or C{--version} are supplied, at least one action must
-      be specified.  Other validations (as for allowed values for particular
-      options) will be taken care of at assignment time by the properties
-      functionality.
+      be specified.  The C{--plan} option may only be used with the C{collect}
+      action, and not with managed clients.  Other validations (as for allowed
+      values for particular options) will be taken care of at assignment time
+      by the properties functionality.
 
       @note: The command line format is specified by the L{_usage} function.
       Call L{_usage} to see a usage statement for the cback script.
@@ -1812,6 +1867,11 @@ class Options(object):
             raise ValueError("At least one action must be specified.")
       if self.managed and self.managedOnly:
          raise ValueError("The --managed and --managed-only options may not be combined.")
+      if self.plan and not self.help and not self.version and not self.diagnostics:
+         if self.actions != [ "collect", ]:
+            raise ValueError("The --plan option may only be used with the collect action.")
+         if self.managed or self.managedOnly:
+            raise ValueError("The --plan option may not be combined with managed clients.")
 
    def buildArgumentList(self, validate=True):
       """
@@ -1856,6 +1916,8 @@ class Options(object):
          argumentList.append(self.config)
       if self.full:
          argumentList.append("--full")
+      if self.plan:
+         argumentList.append("--plan")
       if self.managed:
          argumentList.append("--managed")
       if self.managedOnly:
@@ -1926,6 +1988,8 @@ class Options(object):
          argumentString += "--config \"%s\" " % self.config
       if self.full:
          argumentString += "--full "
+      if self.plan:
+         argumentString += "--plan "
       if self.managed:
          argumentString += "--managed "
       if self.managedOnly:
@@ -1990,6 +2054,8 @@ class Options(object):
          self.config = switches["--config"]
       if switches.has_key("-f") or switches.has_key("--full"):
          self.full = True
+      if switches.has_key("-P") or switches.has_key("--plan"):
+         self.plan = True
       if switches.has_key("-M") or switches.has_key("--managed"):
          self.managed = True
       if switches.has_key("-N") or switches.has_key("--managed-only"):
@@ -218,7 +218,7 @@ Validation
        DEFAULT_DEVICE_TYPE, DEFAULT_MEDIA_TYPE,
        VALID_DEVICE_TYPES, VALID_MEDIA_TYPES,
        VALID_COLLECT_MODES, VALID_ARCHIVE_MODES,
-       VALID_ORDER_MODES
+       VALID_ORDER_MODES, VALID_IO_MODES, VALID_FULL_SCHEDULES
 
 @var DEFAULT_DEVICE_TYPE: The default device type.
 @var DEFAULT_MEDIA_TYPE: The default media type.
@@ -228,6 +228,8 @@ Validation
 @var VALID_COMPRESS_MODES: List of valid compress modes.
 @var VALID_ARCHIVE_MODES: List of valid archive modes.
 @var VALID_ORDER_MODES: List of valid extension order modes.
+@var VALID_IO_MODES: List of valid I/O modes.
+@var VALID_FULL_SCHEDULES: List of valid full backup schedules.
 
 @author: Kenneth J. Pronovici <pronovic@ieee.org>
 """
@@ -265,17 +267,20 @@ VALID_DEVICE_TYPES    = [ "cdwriter", "dvdwriter", ]
 VALID_CD_MEDIA_TYPES  = [ "cdr-74", "cdrw-74", "cdr-80", "cdrw-80", ]
 VALID_DVD_MEDIA_TYPES = [ "dvd+r", "dvd+rw", ]
 VALID_MEDIA_TYPES     = VALID_CD_MEDIA_TYPES + VALID_DVD_MEDIA_TYPES
-VALID_COLLECT_MODES   = [ "daily", "weekly", "incr", ]
-VALID_ARCHIVE_MODES   = [ "tar", "targz", "tarbz2", ]
+VALID_COLLECT_MODES   = [ "daily", "weekly", "incr", "diff", ]
+VALID_ARCHIVE_MODES   = [ "tar", "targz", "tarbz2", "adaptive", "chunk", ]
 VALID_COMPRESS_MODES  = [ "none", "gzip", "bzip2", ]
 VALID_ORDER_MODES     = [ "index", "dependency", ]
-VALID_BLANK_MODES     = [ "daily", "weekly", ]
+VALID_BLANK_MODES     = [ "daily", "weekly", "planned", ]
 VALID_BYTE_UNITS      = [ UNIT_BYTES, UNIT_KBYTES, UNIT_MBYTES, UNIT_GBYTES, ]
 VALID_FAILURE_MODES   = [ "none", "all", "daily", "weekly", ]
+VALID_IO_MODES        = [ "normal", "backup", ]
+VALID_FULL_SCHEDULES  = [ "fixed", "hash", "size", ]
 
 REWRITABLE_MEDIA_TYPES = [ "cdrw-74", "cdrw-80", "dvd+rw", ]
 
 ACTION_NAME_REGEX     = r"^[a-z0-9]*$"
+TIME_OF_DAY_REGEX     = r"^([01][0-9]|2[0-3]):[0-5][0-9]$"
 
 
 ########################################################################
@@ -1301,6 +1306,10 @@ class CollectDir(object):
       - The collect mode must be one of the values in L{VALID_COLLECT_MODES}.
       - The archive mode must be one of the values in L{VALID_ARCHIVE_MODES}.
       - The ignore file must be a non-empty string.
+      - The volume size must be a C{ByteQuantity} object.
+      - The maximum file size must be a C{ByteQuantity} object.
+      - The minimum file age must be an integer >= 0.
+      - The maximum file age must be an integer >= 0.
 
    For the C{absoluteExcludePaths} list, validation is accomplished through the
    L{util.AbsolutePathList} list implementation that overrides common list
@@ -1310,12 +1319,16 @@ class CollectDir(object):
 
    @sort: __init__, __repr__, __str__, __cmp__, absolutePath, collectMode,
           archiveMode, ignoreFile, linkDepth, dereference, absoluteExcludePaths,
-          relativeExcludePaths, excludePatterns
+          relativeExcludePaths, excludePatterns, volumeSize, skipCompressed,
+          maxFileSize, minFileAge, maxFileAge, syntheticFull, deltaThreshold,
+          dedupFiles
    """
 
    def __init__(self, absolutePath=None, collectMode=None, archiveMode=None, ignoreFile=None,
                 absoluteExcludePaths=None, relativeExcludePaths=None, excludePatterns=None,
-                linkDepth=None, dereference=False, recursionLevel=None):
+                linkDepth=None, dereference=False, recursionLevel=None, volumeSize=None,
+                skipCompressed=False, maxFileSize=None, minFileAge=None, maxFileAge=None,
+                syntheticFull=False, deltaThreshold=None, dedupFiles=False):
       """
       Constructor for the C{CollectDir} class.
 
@@ -1328,6 +1341,14 @@ class CollectDir(object):
       @param absoluteExcludePaths: List of absolute paths to exclude.
       @param relativeExcludePaths: List of relative paths to exclude.
       @param excludePatterns: List of regular expression patterns to exclude.
+      @param volumeSize: Size at which to start a new tarfile volume.
+      @param skipCompressed: Whether to keep already-compressed files out of the compressed tarfile.
+      @param maxFileSize: Size above which files are not collected.
+      @param minFileAge: Age in minutes below which files are not collected.
+      @param maxFileAge: Age in days above which files are not collected.
+      @param syntheticFull: Whether to build full backups from earlier staged archives.
+      @param deltaThreshold: Size above which changed files are archived as block deltas.
+      @param dedupFiles: Whether to store files with identical contents only once.
 
       @raise ValueError: If one of the values is invalid.
       """
@@ -1341,6 +1362,14 @@ class CollectDir(object):
       self._absoluteExcludePaths = None
       self._relativeExcludePaths = None
       self._excludePatterns = None
+      self._volumeSize = None
+      self._skipCompressed = None
+      self._maxFileSize = None
+      self._minFileAge = None
+      self._maxFileAge = None
+      self._syntheticFull = None
+      self._deltaThreshold = None
+      self._dedupFiles = None
       self.absolutePath = absolutePath
       self.collectMode = collectMode
       self.archiveMode = archiveMode
@@ -1351,18 +1380,26 @@ class CollectDir(object):
       self.absoluteExcludePaths = absoluteExcludePaths
       self.relativeExcludePaths = relativeExcludePaths
       self.excludePatterns = excludePatterns
+      self.volumeSize = volumeSize
+      self.skipCompressed = skipCompressed
+      self.maxFileSize = maxFileSize
+      self.minFileAge = minFileAge
+      self.maxFileAge = maxFileAge
+      self.syntheticFull = syntheticFull
+      self.deltaThreshold = deltaThreshold
+      self.dedupFiles = dedupFiles
 
    def __repr__(self):
       """
       Official string representation for class instance.
       """
-      return "CollectDir(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)" % (self.absolutePath, self.collectMode,
-                                                                     self.archiveMode, self.ignoreFile,
-                                                                     self.absoluteExcludePaths,
-                                                                     self.relativeExcludePaths,
-                                                                     self.excludePatterns,
-                                                                     self.linkDepth, self.dereference,
-                                                                     self.recursionLevel)
+      return "CollectDir(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)" % (
+          self.absolutePath, self.collectMode, self.archiveMode,
+          self.ignoreFile, self.absoluteExcludePaths, self.relativeExcludePaths,
+          self.excludePatterns, self.linkDepth, self.dereference,
+          self.recursionLevel, self.volumeSize, self.skipCompressed,
+          self.maxFileSize, self.minFileAge, self.maxFileAge,
+          self.syntheticFull, self.deltaThreshold, self.dedupFiles)
 
    def __str__(self):
       """
@@ -1429,6 +1466,46 @@ class CollectDir(object):
             return -1
          else:
             return 1
+      if self.volumeSize != other.volumeSize:
+         if self.volumeSize < other.volumeSize:
+            return -1
+         else:
+            return 1
+      if self.skipCompressed != other.skipCompressed:
+         if self.skipCompressed < other.skipCompressed:
+            return -1
+         else:
+            return 1
+      if self.maxFileSize != other.maxFileSize:
+         if self.maxFileSize < other.maxFileSize:
+            return -1
+         else:
+            return 1
+      if self.minFileAge != other.minFileAge:
+         if self.minFileAge < other.minFileAge:
+            return -1
+         else:
+            return 1
+      if self.maxFileAge != other.maxFileAge:
+         if self.maxFileAge < other.maxFileAge:
+            return -1
+         else:
+            return 1
+      if self.syntheticFull != other.syntheticFull:
+         if self.syntheticFull < other.syntheticFull:
+            return -1
+         else:
+            return 1
+      if self.deltaThreshold != other.deltaThreshold:
+         if self.deltaThreshold < other.deltaThreshold:
+            return -1
+         else:
+            return 1
+      if self.dedupFiles != other.dedupFiles:
+         if self.dedupFiles < other.dedupFiles:
+            return -1
+         else:
+            return 1
       return 0
 
    def _setAbsolutePath(self, value):
@@ -1628,6 +1705,157 @@ class CollectDir(object):
       """
       return self._excludePatterns
 
+   def _setVolumeSize(self, value):
+      """
+      Property target used to set the volume size.
+      If not C{None}, the value must be a C{ByteQuantity} object.
+      @raise ValueError: If the value is not a C{ByteQuantity}
+      """
+      if value is None:
+         self._volumeSize = None
+      else:
+         if not isinstance(value, ByteQuantity):
+            raise ValueError("Value must be a C{ByteQuantity} object.")
+         self._volumeSize = value
+
+   def _getVolumeSize(self):
+      """
+      Property target used to get the volume size.
+      """
+      return self._volumeSize
+
+   def _setSkipCompressed(self, value):
+      """
+      Property target used to set the skip compressed flag.
+      No validations, but we normalize the value to C{True} or C{False}.
+      """
+      if value:
+         self._skipCompressed = True
+      else:
+         self._skipCompressed = False
+
+   def _getSkipCompressed(self):
+      """
+      Property target used to get the skip compressed flag.
+      """
+      return self._skipCompressed
+
+   def _setMaxFileSize(self, value):
+      """
+      Property target used to set the maximum file size.
+      If not C{None}, the value must be a C{ByteQuantity} object.
+      @raise ValueError: If the value is not a C{ByteQuantity}
+      """
+      if value is None:
+         self._maxFileSize = None
+      else:
+         if not isinstance(value, ByteQuantity):
+            raise ValueError("Value must be a C{ByteQuantity} object.")
+         self._maxFileSize = value
+
+   def _getMaxFileSize(self):
+      """
+      Property target used to get the maximum file size.
+      """
+      return self._maxFileSize
+
+   def _setMinFileAge(self, value):
+      """
+      Property target used to set the minimum file age.
+      The value must be an integer >= 0.
+      @raise ValueError: If the value is not valid.
+      """
+      if value is None:
+         self._minFileAge = None
+      else:
+         try:
+            value = int(value)
+         except TypeError:
+            raise ValueError("Minimum file age value must be an integer >= 0.")
+         if value < 0:
+            raise ValueError("Minimum file age value must be an integer >= 0.")
+         self._minFileAge = value
+
+   def _getMinFileAge(self):
+      """
+      Property target used to get the minimum file age.
+      """
+      return self._minFileAge
+
+   def _setMaxFileAge(self, value):
+      """
+      Property target used to set the maximum file age.
+      The value must be an integer >= 0.
+      @raise ValueError: If the value is not valid.
+      """
+      if value is None:
+         self._maxFileAge = None
+      else:
+         try:
+            value = int(value)
+         except TypeError:
+            raise ValueError("Maximum file age value must be an integer >= 0.")
+         if value < 0:
+            raise ValueError("Maximum file age value must be an integer >= 0.")
+         self._maxFileAge = value
+
+   def _getMaxFileAge(self):
+      """
+      Property target used to get the maximum file age.
+      """
+      return self._maxFileAge
+
+   def _setSyntheticFull(self, value):
+      """
+      Property target used to set the synthetic full flag.
+      No validations, but we normalize the value to C{True} or C{False}.
+      """
+      if value:
+         self._syntheticFull = True
+      else:
+         self._syntheticFull = False
+
+   def _getSyntheticFull(self):
+      """
+      Property target used to get the synthetic full flag.
+      """
+      return self._syntheticFull
+
+   def _setDeltaThreshold(self, value):
+      """
+      Property target used to set the delta threshold.
+      If not C{None}, the value must be a C{ByteQuantity} object.
+      @raise ValueError: If the value is not a C{ByteQuantity}
+      """
+      if value is None:
+         self._deltaThreshold = None
+      else:
+         if not isinstance(value, ByteQuantity):
+            raise ValueError("Value must be a C{ByteQuantity} object.")
+         self._deltaThreshold = value
+
+   def _getDeltaThreshold(self):
+      """
+      Property target used to get the delta threshold.
+      """
+      return self._deltaThreshold
+
+   def _setDedupFiles(self, value):
+      """
+      Property target used to set the dedup files flag.
+      No validations, but we normalize the value to C{True} or C{False}.
+      """
+      if value:
+         self._dedupFiles = True
+      else:
+         self._dedupFiles = False
+
+   def _getDedupFiles(self):
+      """
+      Property target used to get the dedup files flag.
+      """
+      return self._dedupFiles
+
    absolutePath = property(_getAbsolutePath, _setAbsolutePath, None, doc="Absolute path of the directory to collect.")
    collectMode = property(_getCollectMode, _setCollectMode, None, doc="Overridden collect mode for this directory.")
    archiveMode = property(_getArchiveMode, _setArchiveMode, None, doc="Overridden archive mode for this directory.")
@@ -1638,6 +1866,16 @@ class CollectDir(object):
    absoluteExcludePaths = property(_getAbsoluteExcludePaths, _setAbsoluteExcludePaths, None, "List of absolute paths to exclude.")
    relativeExcludePaths = property(_getRelativeExcludePaths, _setRelativeExcludePaths, None, "List of relative paths to exclude.")
    excludePatterns = property(_getExcludePatterns, _setExcludePatterns, None, "List of regular expression patterns to exclude.")
+   volumeSize = property(_getVolumeSize, _setVolumeSize, None, "Size at which to start a new tarfile volume, as a ByteQuantity.")
+   skipCompressed = property(_getSkipCompressed, _setSkipCompressed, None,
+                             "Whether to keep already-compressed files out of the compressed tarfile.")
+   maxFileSize = property(_getMaxFileSize, _setMaxFileSize, None, "Size above which files are not collected, as a ByteQuantity.")
+   minFileAge = property(_getMinFileAge, _setMinFileAge, None, "Age in minutes below which files are not collected.")
+   maxFileAge = property(_getMaxFileAge, _setMaxFileAge, None, "Age in days above which files are not collected.")
+   syntheticFull = property(_getSyntheticFull, _setSyntheticFull, None, "Whether to build full backups from earlier staged archives.")
+   deltaThreshold = property(_getDeltaThreshold, _setDeltaThreshold, None,
+                             "Size above which changed files are archived as block deltas, as a ByteQuantity.")
+   dedupFiles = property(_getDedupFiles, _setDedupFiles, None, "Whether to store files with identical contents only once.")
 
 
 ########################################################################
@@ -2443,15 +2681,20 @@ class OptionsConfig(object):
       - The hooks list must be a list of C{ActionHook} objects.
       - The cback command must be a non-empty string.
       - Any managed action name must be a non-empty string matching C{ACTION_NAME_REGEX}
+      - The I/O mode must be one of the values in L{VALID_IO_MODES}.
+      - The collect end time must be a time of day like C{"06:30"}, matching C{TIME_OF_DAY_REGEX}.
+      - The collect duration must be an integer >= 1.
 
    @sort: __init__, __repr__, __str__, __cmp__, startingDay, workingDir,
-         backupUser, backupGroup, rcpCommand, rshCommand, overrides
+         backupUser, backupGroup, rcpCommand, rshCommand, overrides, ioMode,
+         collectEndTime, collectDuration
    """
 
    def __init__(self, startingDay=None, workingDir=None, backupUser=None,
                 backupGroup=None, rcpCommand=None, overrides=None,
                 hooks=None, rshCommand=None, cbackCommand=None,
-                managedActions=None):
+                managedActions=None, ioMode=None, collectEndTime=None,
+                collectDuration=None):
       """
       Constructor for the C{OptionsConfig} class.
 
@@ -2465,6 +2708,9 @@ class OptionsConfig(object):
       @param overrides: List of configured command path overrides, if any.
       @param hooks: List of configured pre- and post-action hooks.
       @param managedActions: Default set of actions that are managed on remote peers.
+      @param ioMode: I/O mode to use when reading files for backup.
+      @param collectEndTime: Time of day by which the collect action should finish.
+      @param collectDuration: Maximum duration of the collect action, in minutes.
 
       @raise ValueError: If one of the values is invalid.
       """
@@ -2478,6 +2724,9 @@ class OptionsConfig(object):
       self._overrides = None
       self._hooks = None
       self._managedActions = None
+      self._ioMode = None
+      self._collectEndTime = None
+      self._collectDuration = None
       self.startingDay = startingDay
       self.workingDir = workingDir
       self.backupUser = backupUser
@@ -2488,16 +2737,21 @@ class OptionsConfig(object):
       self.overrides = overrides
       self.hooks = hooks
       self.managedActions = managedActions
+      self.ioMode = ioMode
+      self.collectEndTime = collectEndTime
+      self.collectDuration = collectDuration
 
    def __repr__(self):
       """
       Official string representation for class instance.
       """
-      return "OptionsConfig(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)" % (self.startingDay, self.workingDir,
-                                                                        self.backupUser, self.backupGroup,
-                                                                        self.rcpCommand, self.overrides,
-                                                                        self.hooks, self.rshCommand,
-                                                                        self.cbackCommand, self.managedActions)
+      return "OptionsConfig(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)" % (self.startingDay, self.workingDir,
+                                                                                    self.backupUser, self.backupGroup,
+                                                                                    self.rcpCommand, self.overrides,
+                                                                                    self.hooks, self.rshCommand,
+                                                                                    self.cbackCommand, self.managedActions,
+                                                                                    self.ioMode, self.collectEndTime,
+                                                                                    self.collectDuration)
 
    def __str__(self):
       """
@@ -2563,6 +2817,21 @@ class OptionsConfig(object):
             return -1
          else:
             return 1
+      if self.ioMode != other.ioMode:
+         if self.ioMode < other.ioMode:
+            return -1
+         else:
+            return 1
+      if self.collectEndTime != other.collectEndTime:
+         if self.collectEndTime < other.collectEndTime:
+            return -1
+         else:
+            return 1
+      if self.collectDuration != other.collectDuration:
+         if self.collectDuration < other.collectDuration:
+            return -1
+         else:
+            return 1
       return 0
 
    def addOverride(self, command, absolutePath):
@@ -2792,6 +3061,63 @@ class OptionsConfig(object):
       """
       return self._managedActions
 
+   def _setIoMode(self, value):
+      """
+      Property target used to set the I/O mode.
+      If not C{None}, the mode must be one of the values in L{VALID_IO_MODES}.
+      @raise ValueError: If the value is not valid.
+      """
+      if value is not None:
+         if value not in VALID_IO_MODES:
+            raise ValueError("I/O mode must be one of %s." % VALID_IO_MODES)
+      self._ioMode = value
+
+   def _getIoMode(self):
+      """
+      Property target used to get the I/O mode.
+      """
+      return self._ioMode
+
+   def _setCollectEndTime(self, value):
+      """
+      Property target used to set the collect end time.
+      If not C{None}, the value must be a 24-hour time of day like C{"06:30"}.
+      @raise ValueError: If the value is not valid.
+      """
+      if value is not None:
+         if not re.compile(TIME_OF_DAY_REGEX).search(value):
+            raise ValueError("Collect end time must be a time of day in HH:MM form.")
+      self._collectEndTime = value
+
+   def _getCollectEndTime(self):
+      """
+      Property target used to get the collect end time.
+      """
+      return self._collectEndTime
+
+   def _setCollectDuration(self, value):
+      """
+      Property target used to set the collect duration.
+      The value must be an integer >= 1.
+      @raise ValueError: If the value is not valid.
+      """
+      if value is None:
+         self._collectDuration = None
+      else:
+         try:
+            value = int(value)
+         except TypeError:
+            raise ValueError("Collect duration value must be an integer >= 1.")
+         if value < 1:
+            raise ValueError("Collect duration value must be an integer >= 1.")
+         self._collectDuration = value
+
+   def _getCollectDuration(self):
+      """
+      Property target used to get the collect duration.
+      """
+      return self._collectDuration
+
    startingDay = property(_getStartingDay, _setStartingDay, None, "Day that starts the week.")
    workingDir = property(_getWorkingDir, _setWorkingDir, None, "Working (temporary) directory to use for backups.")
    backupUser = property(_getBackupUser, _setBackupUser, None, "Effective user that backups should run as.")
@@ -2802,6 +3128,9 @@ class OptionsConfig(object):
    overrides = property(_getOverrides, _setOverrides, None, "List of configured command path overrides, if any.")
    hooks = property(_getHooks, _setHooks, None, "List of configured pre- and post-action hooks.")
    managedActions = property(_getManagedActions, _setManagedActions, None, "Default set of actions that are managed on remote peers.")
+   ioMode = property(_getIoMode, _setIoMode, None, "I/O mode to use when reading files for backup.")
+   collectEndTime = property(_getCollectEndTime, _setCollectEndTime, None, "Time of day by which the collect action should finish.")
+   collectDuration = property(_getCollectDuration, _setCollectDuration, None, "Maximum duration of the collect action, in minutes.")
 
 
 ########################################################################
@@ -2953,6 +3282,10 @@ class CollectConfig(object):
       - Each of the paths in C{absoluteExcludePaths} must be an absolute path
       - The collect file list must be a list of C{CollectFile} objects.
       - The collect directory list must be a list of C{CollectDir} objects.
+      - The worker count must be an integer >= 1.
+      - The prefetch depth must be an integer >= 0.
+      - The archive budget must be an integer >= 1.
+      - The full schedule must be one of the values in L{VALID_FULL_SCHEDULES}.
 
    For the C{absoluteExcludePaths} list, validation is accomplished through the
    L{util.AbsolutePathList} list implementation that overrides common list
@@ -2967,12 +3300,14 @@ class CollectConfig(object):
 
    @sort: __init__, __repr__, __str__, __cmp__, targetDir,
           collectMode, archiveMode, ignoreFile, absoluteExcludePaths,
-          excludePatterns, collectFiles, collectDirs
+          excludePatterns, collectFiles, collectDirs, workerCount,
+          prefetchDepth, physicalOrder, archiveBudget, groupFiles, fullSchedule
    """
 
    def __init__(self, targetDir=None, collectMode=None, archiveMode=None, ignoreFile=None,
                 absoluteExcludePaths=None, excludePatterns=None, collectFiles=None,
-                collectDirs=None):
+                collectDirs=None, workerCount=None, prefetchDepth=None, physicalOrder=False,
+                archiveBudget=None, groupFiles=False, fullSchedule=None):
       """
       Constructor for the C{CollectConfig} class.
 
@@ -2984,6 +3319,12 @@ class CollectConfig(object):
       @param excludePatterns: List of regular expression patterns to exclude.
       @param collectFiles: List of collect files.
       @param collectDirs: List of collect directories.
+      @param workerCount: Number of worker processes used to collect items.
+      @param prefetchDepth: Number of files to read ahead while archiving.
+      @param physicalOrder: Whether to read files in the order they are laid out on disk.
+      @param archiveBudget: Time budget, in minutes, for writing all of the tarfiles in a collect run in adaptive archive mode.
+      @param groupFiles: Whether to collect files into one tarfile per collect mode and archive mode.
+      @param fullSchedule: How collect directories are assigned a day of the week for their full backup.
 
       @raise ValueError: If one of the values is invalid.
       """
@@ -2995,6 +3336,12 @@ class CollectConfig(object):
       self._excludePatterns = None
       self._collectFiles = None
       self._collectDirs = None
+      self._workerCount = None
+      self._prefetchDepth = None
+      self._physicalOrder = None
+      self._archiveBudget = None
+      self._groupFiles = None
+      self._fullSchedule = None
       self.targetDir = targetDir
       self.collectMode = collectMode
       self.archiveMode = archiveMode
@@ -3003,14 +3350,23 @@ class CollectConfig(object):
       self.excludePatterns = excludePatterns
       self.collectFiles = collectFiles
       self.collectDirs = collectDirs
+      self.workerCount = workerCount
+      self.prefetchDepth = prefetchDepth
+      self.physicalOrder = physicalOrder
+      self.archiveBudget = archiveBudget
+      self.groupFiles = groupFiles
+      self.fullSchedule = fullSchedule
 
    def __repr__(self):
       """
       Official string representation for class instance.
       """
-      return "CollectConfig(%s, %s, %s, %s, %s, %s, %s, %s)" % (self.targetDir, self.collectMode, self.archiveMode,
-                                                                self.ignoreFile, self.absoluteExcludePaths,
-                                                                self.excludePatterns, self.collectFiles, self.collectDirs)
+      return "CollectConfig(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)" % (
+          self.targetDir, self.collectMode, self.archiveMode,
+          self.ignoreFile, self.absoluteExcludePaths, self.excludePatterns,
+          self.collectFiles, self.collectDirs, self.workerCount,
+          self.prefetchDepth, self.physicalOrder, self.archiveBudget,
+          self.groupFiles, self.fullSchedule)
 
    def __str__(self):
       """
@@ -3067,6 +3423,36 @@ class CollectConfig(object):
             return -1
          else:
             return 1
+      if self.workerCount != other.workerCount:
+         if self.workerCount < other.workerCount:
+            return -1
+         else:
+            return 1
+      if self.prefetchDepth != other.prefetchDepth:
+         if self.prefetchDepth < other.prefetchDepth:
+            return -1
+         else:
+            return 1
+      if self.physicalOrder != other.physicalOrder:
+         if self.physicalOrder < other.physicalOrder:
+            return -1
+         else:
+            return 1
+      if self.archiveBudget != other.archiveBudget:
+         if self.archiveBudget < other.archiveBudget:
+            return -1
+         else:
+            return 1
+      if self.groupFiles != other.groupFiles:
+         if self.groupFiles < other.groupFiles:
+            return -1
+         else:
+            return 1
+      if self.fullSchedule != other.fullSchedule:
+         if self.fullSchedule < other.fullSchedule:
+            return -1
+         else:
+            return 1
       return 0
 
    def _setTargetDir(self, value):
@@ -3231,6 +3617,124 @@ class CollectConfig(object):
       """
       return self._collectDirs
 
+   def _setWorkerCount(self, value):
+      """
+      Property target used to set the worker count.
+      The value must be an integer >= 1.
+      @raise ValueError: If the value is not valid.
+      """
+      if value is None:
+         self._workerCount = None
+      else:
+         try:
+            value = int(value)
+         except TypeError:
+            raise ValueError("Worker count value must be an integer >= 1.")
+         if value < 1:
+            raise ValueError("Worker count value must be an integer >= 1.")
+         self._workerCount = value
+
+   def _getWorkerCount(self):
+      """
+      Property target used to get the worker count.
+      """
+      return self._workerCount
+
+   def _setPrefetchDepth(self, value):
+      """
+      Property target used to set the prefetch depth.
+      The value must be an integer >= 0.
+      @raise ValueError: If the value is not valid.
+      """
+      if value is None:
+         self._prefetchDepth = None
+      else:
+         try:
+            value = int(value)
+         except TypeError:
+            raise ValueError("Prefetch depth value must be an integer >= 0.")
+         if value < 0:
+            raise ValueError("Prefetch depth value must be an integer >= 0.")
+         self._prefetchDepth = value
+
+   def _getPrefetchDepth(self):
+      """
+      Property target used to get the prefetch depth.
+      """
+      return self._prefetchDepth
+
+   def _setPhysicalOrder(self, value):
+      """
+      Property target used to set the physical order flag.
+      No validations, but we normalize the value to C{True} or C{False}.
+      """
+      if value:
+         self._physicalOrder = True
+      else:
+         self._physicalOrder = False
+
+   def _getPhysicalOrder(self):
+      """
+      Property target used to get the physical order flag.
+      """
+      return self._physicalOrder
+
+   def _setArchiveBudget(self, value):
+      """
+      Property target used to set the archive budget.
+      The value must be an integer >= 1.
+      @raise ValueError: If the value is not valid.
+      """
+      if value is None:
+         self._archiveBudget = None
+      else:
+         try:
+            value = int(value)
+         except TypeError:
+            raise ValueError("Archive budget value must be an integer >= 1.")
+         if value < 1:
+            raise ValueError("Archive budget value must be an integer >= 1.")
+         self._archiveBudget = value
+
+   def _getArchiveBudget(self):
+      """
+      Property target used to get the archive budget.
+      """
+      return self._archiveBudget
+
+   def _setGroupFiles(self, value):
+      """
+      Property target used to set the group files flag.
+      No validations, but we normalize the value to C{True} or C{False}.
+      """
+      if value:
+         self._groupFiles = True
+      else:
+         self._groupFiles = False
+
+   def _getGroupFiles(self):
+      """
+      Property target used to get the group files flag.
+      """
+      return self._groupFiles
+
+   def _setFullSchedule(self, value):
+      """
+      Property target used to set the full schedule.
+      If not C{None}, the schedule must be one of L{VALID_FULL_SCHEDULES}.
+      @raise ValueError: If the value is not valid.
+      """
+      if value is not None:
+         if value not in VALID_FULL_SCHEDULES:
+            raise ValueError("Full schedule must be one of %s." % VALID_FULL_SCHEDULES)
+      self._fullSchedule = value
+
+   def _getFullSchedule(self):
+      """
+      Property target used to get the full schedule.
+      """
+      return self._fullSchedule
+
    targetDir = property(_getTargetDir, _setTargetDir, None, "Directory to collect files into.")
    collectMode = property(_getCollectMode, _setCollectMode, None, "Default collect mode.")
    archiveMode = property(_getArchiveMode, _setArchiveMode, None, "Default archive mode for collect files.")
@@ -3239,6 +3743,15 @@ class CollectConfig(object):
    excludePatterns = property(_getExcludePatterns, _setExcludePatterns, None, "List of regular expressions patterns to exclude.")
    collectFiles = property(_getCollectFiles, _setCollectFiles, None, "List of collect files.")
    collectDirs = property(_getCollectDirs, _setCollectDirs, None, "List of collect directories.")
+   workerCount = property(_getWorkerCount, _setWorkerCount, None, "Number of worker processes used to collect items.")
+   prefetchDepth = property(_getPrefetchDepth, _setPrefetchDepth, None, "Number of files to read ahead while archiving.")
+   physicalOrder = property(_getPhysicalOrder, _setPhysicalOrder, None, "Whether to read files in the order they are laid out on disk.")
+   archiveBudget = property(_getArchiveBudget, _setArchiveBudget, None,
+                            "Time budget, in minutes, for writing all of the tarfiles in a collect run in adaptive archive mode.")
+   groupFiles = property(_getGroupFiles, _setGroupFiles, None,
+                         "Whether to collect files into one tarfile per collect mode and archive mode.")
+   fullSchedule = property(_getFullSchedule, _setFullSchedule, None,
+                           "How collect directories are assigned a day of the week for their full backup.")
 
 
 ########################################################################
@@ -4446,14 +4959,17 @@ class Config(object):
 
       We read the following fields::
 
-         startingDay    //cb_config/options/starting_day
-         workingDir     //cb_config/options/working_dir
-         backupUser     //cb_config/options/backup_user
-         backupGroup    //cb_config/options/backup_group
-         rcpCommand     //cb_config/options/rcp_command
-         rshCommand     //cb_config/options/rsh_command
-         cbackCommand   //cb_config/options/cback_command
-         managedActions //cb_config/options/managed_actions
+         startingDay     //cb_config/options/starting_day
+         workingDir      //cb_config/options/working_dir
+         backupUser      //cb_config/options/backup_user
+         backupGroup     //cb_config/options/backup_group
+         rcpCommand      //cb_config/options/rcp_command
+         rshCommand      //cb_config/options/rsh_command
+         cbackCommand    //cb_config/options/cback_command
+         managedActions  //cb_config/options/managed_actions
+         ioMode          //cb_config/options/io_mode
+         collectEndTime  //cb_config/options/collect_end_time
+         collectDuration //cb_config/options/collect_duration
 
       The list of managed actions is a comma-separated list of action names.
 
@@ -4486,6 +5002,9 @@ class Config(object):
          options.hooks = Config._parseHooks(sectionNode)
          managedActions = readString(sectionNode, "managed_actions")
          options.managedActions = parseCommaSeparatedString(managedActions)
+         options.ioMode = readString(sectionNode, "io_mode")
+         options.collectEndTime = readString(sectionNode, "collect_end_time")
+         options.collectDuration = readInteger(sectionNode, "collect_duration")
       return options
 
    @staticmethod
@@ -4524,6 +5043,12 @@ class Config(object):
          collectMode          //cb_config/collect/collect_mode
          archiveMode          //cb_config/collect/archive_mode
          ignoreFile           //cb_config/collect/ignore_file
+         workerCount          //cb_config/collect/worker_count
+         prefetchDepth        //cb_config/collect/prefetch_depth
+         physicalOrder        //cb_config/collect/physical_order
+         archiveBudget        //cb_config/collect/archive_budget
+         groupFiles           //cb_config/collect/group_files
+         fullSchedule         //cb_config/collect/full_schedule
 
       We also read groups of the following items, one list element per
       item::
@@ -4550,6 +5075,12 @@ class Config(object):
          collect.collectMode = readString(sectionNode, "collect_mode")
          collect.archiveMode = readString(sectionNode, "archive_mode")
          collect.ignoreFile = readString(sectionNode, "ignore_file")
+         collect.workerCount = readInteger(sectionNode, "worker_count")
+         collect.prefetchDepth = readInteger(sectionNode, "prefetch_depth")
+         collect.physicalOrder = readBoolean(sectionNode, "physical_order")
+         collect.archiveBudget = readInteger(sectionNode, "archive_budget")
+         collect.groupFiles = readBoolean(sectionNode, "group_files")
+         collect.fullSchedule = readString(sectionNode, "full_schedule")
          (collect.absoluteExcludePaths, unused, collect.excludePatterns) = Config._parseExclusions(sectionNode)
          collect.collectFiles = Config._parseCollectFiles(sectionNode)
          collect.collectDirs = Config._parseCollectDirs(sectionNode)
@@ -4826,6 +5357,14 @@ class Config(object):
          linkDepth               link_depth
          dereference             dereference
          recursionLevel          recursion_level
+         volumeSize              volume_size
+         skipCompressed          skip_compressed
+         maxFileSize             max_file_size
+         minFileAge              min_file_age
+         maxFileAge              max_file_age
+         syntheticFull           synthetic_full
+         deltaThreshold          delta_threshold
+         dedupFiles              dedup_files
 
       The collect mode is a special case.  Just a C{mode} tag is accepted for
       backwards compatibility, but we prefer C{collect_mode} for consistency
@@ -4859,6 +5398,14 @@ class Config(object):
             cdir.linkDepth = readInteger(entry, "link_depth")
             cdir.dereference = readBoolean(entry, "dereference")
             cdir.recursionLevel = readInteger(entry, "recursion_level")
+            cdir.volumeSize = readByteQuantity(entry, "volume_size")
+            cdir.skipCompressed = readBoolean(entry, "skip_compressed")
+            cdir.maxFileSize = readByteQuantity(entry, "max_file_size")
+            cdir.minFileAge = readInteger(entry, "min_file_age")
+            cdir.maxFileAge = readInteger(entry, "max_file_age")
+            cdir.syntheticFull = readBoolean(entry, "synthetic_full")
+            cdir.deltaThreshold = readByteQuantity(entry, "delta_threshold")
+            cdir.dedupFiles = readBoolean(entry, "dedup_files")
             (cdir.absoluteExcludePaths, cdir.relativeExcludePaths, cdir.excludePatterns) = Config._parseExclusions(entry)
             lst.append(cdir)
       if lst == []:
@@ -5101,14 +5648,17 @@ class Config(object):
 
       We add the following fields to the document::
 
-         startingDay    //cb_config/options/starting_day
-         workingDir     //cb_config/options/working_dir
-         backupUser     //cb_config/options/backup_user
-         backupGroup    //cb_config/options/backup_group
-         rcpCommand     //cb_config/options/rcp_command
-         rshCommand     //cb_config/options/rsh_command
-         cbackCommand   //cb_config/options/cback_command
-         managedActions //cb_config/options/managed_actions
+         startingDay     //cb_config/options/starting_day
+         workingDir      //cb_config/options/working_dir
+         backupUser      //cb_config/options/backup_user
+         backupGroup     //cb_config/options/backup_group
+         rcpCommand      //cb_config/options/rcp_command
+         rshCommand      //cb_config/options/rsh_command
+         cbackCommand    //cb_config/options/cback_command
+         managedActions  //cb_config/options/managed_actions
+         ioMode          //cb_config/options/io_mode
+         collectEndTime  //cb_config/options/collect_end_time
+         collectDuration //cb_config/options/collect_duration
 
       We also add groups of the following items, one list element per
       item::
@@ -5137,6 +5687,9 @@ class Config(object):
          addStringNode(xmlDom, sectionNode, "cback_command", optionsConfig.cbackCommand)
          managedActions = Config._buildCommaSeparatedString(optionsConfig.managedActions)
          addStringNode(xmlDom, sectionNode, "managed_actions", managedActions)
+         addStringNode(xmlDom, sectionNode, "io_mode", optionsConfig.ioMode)
+         addStringNode(xmlDom, sectionNode, "collect_end_time", optionsConfig.collectEndTime)
+         addIntegerNode(xmlDom, sectionNode, "collect_duration", optionsConfig.collectDuration)
          if optionsConfig.overrides is not None:
             for override in optionsConfig.overrides:
                Config._addOverride(xmlDom, sectionNode, override)
@@ -5184,6 +5737,12 @@ class Config(object):
          collectMode          //cb_config/collect/collect_mode
          archiveMode          //cb_config/collect/archive_mode
          ignoreFile           //cb_config/collect/ignore_file
+         workerCount          //cb_config/collect/worker_count
+         prefetchDepth        //cb_config/collect/prefetch_depth
+         physicalOrder        //cb_config/collect/physical_order
+         archiveBudget        //cb_config/collect/archive_budget
+         groupFiles           //cb_config/collect/group_files
+         fullSchedule         //cb_config/collect/full_schedule
 
       We also add groups of the following items, one list element per
       item::
@@ -5208,6 +5767,12 @@ class Config(object):
          addStringNode(xmlDom, sectionNode, "collect_mode", collectConfig.collectMode)
          addStringNode(xmlDom, sectionNode, "archive_mode", collectConfig.archiveMode)
          addStringNode(xmlDom, sectionNode, "ignore_file", collectConfig.ignoreFile)
+         addIntegerNode(xmlDom, sectionNode, "worker_count", collectConfig.workerCount)
+         addIntegerNode(xmlDom, sectionNode, "prefetch_depth", collectConfig.prefetchDepth)
+         addBooleanNode(xmlDom, sectionNode, "physical_order", collectConfig.physicalOrder)
+         addIntegerNode(xmlDom, sectionNode, "archive_budget", collectConfig.archiveBudget)
+         addBooleanNode(xmlDom, sectionNode, "group_files", collectConfig.groupFiles)
+         addStringNode(xmlDom, sectionNode, "full_schedule", collectConfig.fullSchedule)
          if ((collectConfig.absoluteExcludePaths is not None and collectConfig.absoluteExcludePaths != []) or
              (collectConfig.excludePatterns is not None and collectConfig.excludePatterns != [])):
             excludeNode = addContainerNode(xmlDom, sectionNode, "exclude")
@@ -5464,6 +6029,14 @@ class Config(object):
          linkDepth               dir/link_depth
          dereference             dir/dereference
          recursionLevel          dir/recursion_level
+         volumeSize              dir/volume_size
+         skipCompressed          dir/skip_compressed
+         maxFileSize             dir/max_file_size
+         minFileAge              dir/min_file_age
+         maxFileAge              dir/max_file_age
+         syntheticFull           dir/synthetic_full
+         deltaThreshold          dir/delta_threshold
+         dedupFiles              dir/dedup_files
 
       Note that an original XML document might have listed the collect mode
       using the C{mode} tag, since we accept both C{collect_mode} and C{mode}.
@@ -5494,6 +6067,14 @@ class Config(object):
          addIntegerNode(xmlDom, sectionNode, "link_depth", collectDir.linkDepth)
          addBooleanNode(xmlDom, sectionNode, "dereference", collectDir.dereference)
          addIntegerNode(xmlDom, sectionNode, "recursion_level", collectDir.recursionLevel)
+         addByteQuantityNode(xmlDom, sectionNode, "volume_size", collectDir.volumeSize)
+         addBooleanNode(xmlDom, sectionNode, "skip_compressed", collectDir.skipCompressed)
+         addByteQuantityNode(xmlDom, sectionNode, "max_file_size", collectDir.maxFileSize)
+         addIntegerNode(xmlDom, sectionNode, "min_file_age", collectDir.minFileAge)
+         addIntegerNode(xmlDom, sectionNode, "max_file_age", collectDir.maxFileAge)
+         addBooleanNode(xmlDom, sectionNode, "synthetic_full", collectDir.syntheticFull)
+         addByteQuantityNode(xmlDom, sectionNode, "delta_threshold", collectDir.deltaThreshold)
+         addBooleanNode(xmlDom, sectionNode, "dedup_files", collectDir.dedupFiles)
          if ((collectDir.absoluteExcludePaths is not None and collectDir.absoluteExcludePaths != []) or
              (collectDir.relativeExcludePaths is not None and collectDir.relativeExcludePaths != []) or
              (collectDir.excludePatterns is not None and collectDir.excludePatterns != [])):
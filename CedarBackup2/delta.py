@@ -0,0 +1,313 @@
+# -*- coding: iso-8859-1 -*-
+# vim: set ft=python ts=3 sw=3 expandtab:
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#
+#              C E D A R
+#          S O L U T I O N S       "Software done right."
+#           S O F T W A R E
+#
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#
+# Copyright (c) 2004-2005,2010 Kenneth J. Pronovici.
+# All rights reserved.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License,
+# Version 2, as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# Copies of the GNU General Public License are available from
+# the Free Software Foundation website, http://www.gnu.org/.
+#
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#
+# Author   : Kenneth J. Pronovici <pronovic@ieee.org>
+# Language : Python 2 (>= 2.7)
+# Project  : Cedar Backup, release 2
+# Purpose  : Provides block-level delta functionality for large files
+#
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+########
+# Notes
+########
+
+"""
+Provides block-level deltas for large files that change a little at a time.
+
+Files like virtual machine disk images, mail stores and databases are often
+very large, but only a small part of them changes from one day to the next.
+Rather than archiving the whole file again every time its digest changes, we
+can archive just the blocks that changed since the last time we looked.
+
+The file is split into fixed-size blocks, and a I{signature} is kept for it.
+The signature is a tuple C{(blockSize, size, digest, blocks)}, where C{size}
+is the size of the file in bytes, C{digest} is the SHA digest of the whole
+file (the same value used for the collect digest) and C{blocks} is a list of
+MD5 digests, one per block.  Given the old signature, a I{delta} for the new
+contents of the file can be written by reading the file once and keeping only
+the blocks whose digest no longer matches.
+
+Unlike rsync, we don't search for blocks at arbitrary offsets using a rolling
+checksum.  The kinds of files this is meant for are updated in place, one
+page at a time, so blocks hardly ever move.  A search at every byte offset
+would also be far too slow in pure Python for files that are many gigabytes
+in size.  If data is inserted in the middle of a file, everything after the
+insertion point simply ends up in the delta.
+
+A delta file starts with a small manifest (see L{DELTA_HEADER}), which records
+the block size, the size and digest of the file that the delta applies to, and
+the size and digest of the file that it produces.  This is followed by one
+record per changed block, made up of the block index and the block data.
+The digests let L{restoreFile} check that a chain of deltas is applied to the
+right base file in the right order, and that the result is correct.
+
+@sort: generateSignature, generateDelta, restoreFile, DELTA_BLOCK_SIZE, DELTA_MAGIC, DELTA_HEADER
+
+@var DELTA_BLOCK_SIZE: Default block size used for signatures, in bytes.
+@var DELTA_MAGIC: Magic string at the start of every delta file.
+@var DELTA_HEADER: C{struct} format of the manifest at the start of every delta file.
+
+@author: Kenneth J. Pronovici <pronovic@ieee.org>
+"""
+
+########################################################################
+# Imported modules
+########################################################################
+
+# System modules
+import os
+import struct
+import hashlib
+import logging
+
+# Cedar Backup modules
+from CedarBackup2.util import openBackupFile, closeBackupFile
+
+
+########################################################################
+# Module-wide constants and variables
+########################################################################
+
+logger = logging.getLogger("CedarBackup2.log.delta")
+
+DELTA_BLOCK_SIZE = 128 * 1024
+DELTA_MAGIC      = "CBDELTA1"
+DELTA_HEADER     = ">8sQQ40sQ40s"   # magic, block size, base size, base digest, new size, new digest
+DELTA_INDEX      = ">Q"
+
+
+#######################################################################
+# Public functions
+#######################################################################
+
+###############################
+# generateSignature() function
+###############################
+
+def generateSignature(path, blockSize=DELTA_BLOCK_SIZE):
+   """
+   Generates the block signature for a file on disk.
+
+   @param path: Path of the file to generate a signature for.
+   @param blockSize: Block size to use, in bytes.
+
+   @return: Signature tuple C{(blockSize, size, digest, blocks)}, as described above.
+   @raise OSError: If the file cannot be opened.
+   @raise IOError: If the file cannot be read.
+   """
+   s = hashlib.sha1()
+   blocks = []
+   size = 0
+   f = openBackupFile(path)
+   try:
+      while True:
+         block = f.read(blockSize)
+         if not block:
+            break
+         s.update(block)
+         blocks.append(hashlib.md5(block).digest())
+         size += len(block)
+   finally:
+      closeBackupFile(f)
+   logger.debug("Generated signature for [%s]: %d blocks.", path, len(blocks))
+   return (blockSize, size, s.hexdigest(), blocks)
+
+
+###########################
+# generateDelta() function
+###########################
+
+def generateDelta(path, signature, deltaPath):
+   """
+   Writes a delta for the current contents of a file on disk.
+
+   The file is read once.  Each block is compared against the old signature,
+   and only the blocks that differ (including any blocks past the old end of
+   the file) are written into the delta.  The signature of the current
+   contents is built along the way and returned, so it can be used for the
+   next delta.
+
+   @param path: Path of the file to generate a delta for.
+   @param signature: Signature of the contents the delta should apply to, as from L{generateSignature}.
+   @param deltaPath: Path of the delta file to write.
+
+   @return: Tuple C{(signature, changed)}, the signature of the current contents and the number of changed blocks.
+   @raise OSError: If the file cannot be opened.
+   @raise IOError: If the file cannot be read or the delta cannot be written.
+   """
+   (blockSize, baseSize, baseDigest, baseBlocks) = signature
+   s = hashlib.sha1()
+   blocks = []
+   size = 0
+   changed = 0
+   f = openBackupFile(path)
+   try:
+      delta = open(deltaPath, "wb")
+      try:
+         delta.write(struct.pack(DELTA_HEADER, DELTA_MAGIC, blockSize, baseSize, baseDigest, 0, "0" * 40))
+         while True:
+            block = f.read(blockSize)
+            if not block:
+               break
+            s.update(block)
+            blockDigest = hashlib.md5(block).digest()
+            index = len(blocks)
+            if index >= len(baseBlocks) or baseBlocks[index] != blockDigest:
+               delta.write(struct.pack(DELTA_INDEX, index))
+               delta.write(block)
+               changed += 1
+            blocks.append(blockDigest)
+            size += len(block)
+         delta.seek(0)
+         delta.write(struct.pack(DELTA_HEADER, DELTA_MAGIC, blockSize, baseSize, baseDigest, size, s.hexdigest()))
+      finally:
+         delta.close()
+   finally:
+      closeBackupFile(f)
+   logger.debug("Generated delta for [%s]: %d of %d blocks changed.", path, changed, len(blocks))
+   return ((blockSize, size, s.hexdigest(), blocks), changed)
+
+
+#########################
+# restoreFile() function
+#########################
+
+def restoreFile(basePath, deltaPaths, targetPath):
+   """
+   Restores a file from a base copy and a chain of deltas.
+
+   The base copy is the file as it was archived in the last full backup.  For
+   incremental backups, the deltas must be all of the deltas written since
+   then, in order.  For differential backups, only the latest delta is needed.
+
+   The manifests of the deltas are checked before anything is written, to make
+   sure that each delta applies to the output of the one before it.  The base
+   copy is checked while it's being copied to the target path, and the result
+   is checked once all of the deltas have been applied.  The target path must
+   not be the same as the base path.
+
+   @param basePath: Path of the base copy of the file.
+   @param deltaPaths: List of delta files to apply, oldest first.
+   @param targetPath: Path of the file to restore.
+
+   @raise ValueError: If a delta is invalid or doesn't apply, or the restored file is not correct.
+   @raise IOError: If a file cannot be read or written.
+   """
+   if os.path.abspath(basePath) == os.path.abspath(targetPath):
+      raise ValueError("Target path must not be the same as the base path.")
+   headers = [ _readHeader(deltaPath) for deltaPath in deltaPaths ]
+   for i in range(1, len(headers)):
+      if headers[i][3] != headers[i-1][5]:
+         raise ValueError("Delta [%s] does not apply to the output of [%s]." % (deltaPaths[i], deltaPaths[i-1]))
+   baseDigest = _copyFile(basePath, targetPath)
+   if headers and headers[0][3] != baseDigest:
+      raise ValueError("Delta [%s] does not apply to base file [%s]." % (deltaPaths[0], basePath))
+   target = open(targetPath, "r+b")
+   try:
+      for (deltaPath, header) in zip(deltaPaths, headers):
+         (blockSize, newSize) = (header[1], header[4])
+         delta = open(deltaPath, "rb")
+         try:
+            delta.seek(struct.calcsize(DELTA_HEADER))
+            target.truncate(newSize)
+            while True:
+               record = delta.read(struct.calcsize(DELTA_INDEX))
+               if not record:
+                  break
+               index = struct.unpack(DELTA_INDEX, record)[0]
+               length = min(blockSize, newSize - (index * blockSize))
+               block = delta.read(max(length, 0))
+               if length <= 0 or len(block) != length:
+                  raise ValueError("Delta [%s] is truncated or corrupt." % deltaPath)
+               target.seek(index * blockSize)
+               target.write(block)
+         finally:
+            delta.close()
+         logger.debug("Applied delta [%s] to [%s].", deltaPath, targetPath)
+   finally:
+      target.close()
+   if headers and _copyFile(targetPath, None) != headers[-1][5]:
+      raise ValueError("Restored file [%s] does not match the digest of the last delta." % targetPath)
+
+
+########################################################################
+# Private utility functions
+########################################################################
+
+#########################
+# _readHeader() function
+#########################
+
+def _readHeader(deltaPath):
+   """
+   Reads the manifest at the start of a delta file.
+   @param deltaPath: Path of the delta file.
+   @return: Tuple C{(magic, blockSize, baseSize, baseDigest, newSize, newDigest)}.
+   @raise ValueError: If the file is not a valid delta file.
+   """
+   delta = open(deltaPath, "rb")
+   try:
+      data = delta.read(struct.calcsize(DELTA_HEADER))
+   finally:
+      delta.close()
+   if len(data) != struct.calcsize(DELTA_HEADER) or not data.startswith(DELTA_MAGIC):
+      raise ValueError("File [%s] is not a valid delta file." % deltaPath)
+   return struct.unpack(DELTA_HEADER, data)
+
+
+#######################
+# _copyFile() function
+#######################
+
+def _copyFile(sourcePath, targetPath):
+   """
+   Copies a file, returning the SHA digest of its contents.
+   If the target path is C{None}, the file is only read to generate the digest.
+   @param sourcePath: Path of the file to copy.
+   @param targetPath: Path of the copy, or C{None}.
+   @return: SHA digest of the contents of the source file.
+   """
+   s = hashlib.sha1()
+   source = open(sourcePath, "rb")
+   try:
+      target = None
+      if targetPath is not None:
+         target = open(targetPath, "wb")
+      try:
+         while True:
+            data = source.read(DELTA_BLOCK_SIZE)
+            if not data:
+               break
+            s.update(data)
+            if target is not None:
+               target.write(data)
+      finally:
+         if target is not None:
+            target.close()
+   finally:
+      source.close()
+   return s.hexdigest()
@@ -65,9 +65,9 @@ What is this extension?
    This is a Cedar Backup extension used to back up mbox email files via the Cedar
    Backup command line.  Individual mbox files or directories containing mbox
    files can be backed up using the same collect modes allowed for filesystems in
-   the standard Cedar Backup collect action: weekly, daily, incremental.  It
-   implements the "smart" incremental backup process discussed above, using
-   functionality provided by the C{grepmail} utility.
+   the standard Cedar Backup collect action: weekly, daily, incremental,
+   differential.  It implements the "smart" incremental backup process discussed
+   above, using functionality provided by the C{grepmail} utility.
 
    This extension requires a new configuration section <mbox> and is intended to
    be run either immediately before or immediately after the standard collect
@@ -1063,13 +1063,13 @@ def executeAction(configPath, options, config):
          collectMode = _getCollectMode(local, mboxFile)
          compressMode = _getCompressMode(local, mboxFile)
          lastRevision = _loadLastRevision(config, mboxFile, fullBackup, collectMode)
-         if fullBackup or (collectMode in ['daily', 'incr', ]) or (collectMode == 'weekly' and todayIsStart):
+         if fullBackup or (collectMode in ['daily', 'incr', 'diff', ]) or (collectMode == 'weekly' and todayIsStart):
             logger.debug("Mbox file meets criteria to be backed up today.")
             _backupMboxFile(config, mboxFile.absolutePath, fullBackup,
                             collectMode, compressMode, lastRevision, newRevision)
          else:
             logger.debug("Mbox file will not be backed up, per collect mode.")
-         if collectMode == 'incr':
+         if collectMode == 'incr' or (collectMode == 'diff' and lastRevision is None):
             _writeNewRevision(config, mboxFile, newRevision)
    if local.mbox.mboxDirs is not None:
       for mboxDir in local.mbox.mboxDirs:
@@ -1078,7 +1078,7 @@ def executeAction(configPath, options, config):
          compressMode = _getCompressMode(local, mboxDir)
          lastRevision = _loadLastRevision(config, mboxDir, fullBackup, collectMode)
          (excludePaths, excludePatterns) = _getExclusions(mboxDir)
-         if fullBackup or (collectMode in ['daily', 'incr', ]) or (collectMode == 'weekly' and todayIsStart):
+         if fullBackup or (collectMode in ['daily', 'incr', 'diff', ]) or (collectMode == 'weekly' and todayIsStart):
             logger.debug("Mbox directory meets criteria to be backed up today.")
             _backupMboxDir(config, mboxDir.absolutePath,
                            fullBackup, collectMode, compressMode,
@@ -1086,7 +1086,7 @@ def executeAction(configPath, options, config):
                            excludePaths, excludePatterns)
          else:
             logger.debug("Mbox directory will not be backed up, per collect mode.")
-         if collectMode == 'incr':
+         if collectMode == 'incr' or (collectMode == 'diff' and lastRevision is None):
             _writeNewRevision(config, mboxDir, newRevision)
    logger.info("Executed the mbox extended action successfully.")
 
@@ -1334,7 +1334,7 @@ def _backupMboxFile(config, absolutePath,
    """
    backupPath = _getBackupPath(config, absolutePath, compressMode, newRevision, targetDir=targetDir)
    outputFile = _getOutputFile(backupPath, compressMode)
-   if fullBackup or collectMode != "incr" or lastRevision is None:
+   if fullBackup or collectMode not in ["incr", "diff", ] or lastRevision is None:
       args = [ "-a", "-u", absolutePath, ]  # remove duplicates but fetch entire mailbox
    else:
       revisionDate = lastRevision.strftime("%Y-%m-%dT%H:%M:%S")  # ISO-8601 format; grepmail calls Date::Parse::str2time()
@@ -41,7 +41,7 @@ Provides an extension to back up Subversion repositories.
 This is a Cedar Backup extension used to back up Subversion repositories via
 the Cedar Backup command line.  Each Subversion repository can be backed using
 the same collect modes allowed for filesystems in the standard Cedar Backup
-collect action: weekly, daily, incremental.
+collect action: weekly, daily, incremental, differential.
 
 This extension requires a new configuration section <subversion> and is
 intended to be run either immediately before or immediately after the standard
@@ -1226,11 +1226,11 @@ def _backupRepository(config, local, todayIsStart, fullBackup, repository):
    collectMode = _getCollectMode(local, repository)
    compressMode = _getCompressMode(local, repository)
    revisionPath = _getRevisionPath(config, repository)
-   if not (fullBackup or (collectMode in ['daily', 'incr', ]) or (collectMode == 'weekly' and todayIsStart)):
+   if not (fullBackup or (collectMode in ['daily', 'incr', 'diff', ]) or (collectMode == 'weekly' and todayIsStart)):
       logger.debug("Repository will not be backed up, per collect mode.")
       return
    logger.debug("Repository meets criteria to be backed up today.")
-   if collectMode != "incr" or fullBackup:
+   if collectMode not in ["incr", "diff", ] or fullBackup:
       startRevision = 0
       endRevision = getYoungestRevision(repository.repositoryPath)
       logger.debug("Using full backup, revision: (%d, %d).", startRevision, endRevision)
@@ -1254,7 +1254,7 @@ def _backupRepository(config, local, todayIsStart, fullBackup, repository):
    if not os.path.exists(backupPath):
       raise IOError("Dump file [%s] does not seem to exist after backup completed." % backupPath)
    changeOwnership(backupPath, config.options.backupUser, config.options.backupGroup)
-   if collectMode == "incr":
+   if collectMode == "incr" or (collectMode == "diff" and startRevision == 0):
       _writeLastRevision(config, revisionPath, endRevision)
    logger.info("Completed backing up Subversion repository [%s].", repository.repositoryPath)
 
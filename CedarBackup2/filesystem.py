@@ -49,14 +49,36 @@ Provides filesystem-related objects.
 # System modules
 import os
 import re
+import sys
 import math
+import array
+import stat
+import time
+import zlib
+import shutil
 import logging
 import tarfile
+import tempfile
+import struct
+import threading
+import multiprocessing
+import Queue
+from cStringIO import StringIO
+
+try:
+   import fcntl
+   _FIEMAP_AVAILABLE = True
+except ImportError:
+   _FIEMAP_AVAILABLE = False
 
 # Cedar Backup modules
-from CedarBackup2.knapsack import firstFit, bestFit, worstFit, alternateFit
+from CedarBackup2.knapsack import firstFit, bestFit, worstFit, alternateFit, optimalFit
+from CedarBackup2.knapsack import firstFitDecreasing, bestFitDecreasing
 from CedarBackup2.util import AbsolutePathList, UnorderedList, RegexList
-from CedarBackup2.util import removeKeys, displayBytes, calculateFileAge, encodePath, dereferenceLink
+from CedarBackup2.util import removeKeys, displayBytes, calculateFileAge, encodePath, dereferenceLink, SECONDS_PER_DAY
+from CedarBackup2.util import adviseFileAccess, POSIX_FADV_WILLNEED
+from CedarBackup2.util import getIoMode, openBackupFile, closeBackupFile, IO_MODE_BACKUP
+from CedarBackup2.util import ISO_SECTOR_SIZE
 
 
 ########################################################################
@@ -65,6 +87,36 @@ from CedarBackup2.util import removeKeys, displayBytes, calculateFileAge, encode
 
 logger = logging.getLogger("CedarBackup2.log.filesystem")
 
+PREFETCH_THREADS   = 4                  # maximum number of prefetch reader threads
+PREFETCH_SLURP     = 256 * 1024         # files up to this size are read whole by the prefetcher
+PREFETCH_READAHEAD = 8 * 1024 * 1024    # readahead hint given for the start of larger files
+
+FS_IOC_FIEMAP      = 0xC020660B         # Linux ioctl used to map a file's extents
+FIEMAP_HEADER      = "=QQIIII"          # struct fiemap, without the trailing extent array
+FIEMAP_EXTENT      = "=QQQQQIIII"       # struct fiemap_extent
+
+DEDUP_PREFIX       = 64 * 1024          # amount of each file compared before reading it in full to check for duplicates
+
+ENTROPY_SAMPLE     = 64 * 1024          # amount of each file sampled to check whether it compresses
+ENTROPY_MINIMUM    = 4 * 1024           # files smaller than this are never sampled
+ENTROPY_RATIO      = 0.95               # sample must compress below this ratio to be considered compressible
+
+INCOMPRESSIBLE_EXTENSIONS = [ ".7z", ".aac", ".avi", ".bz2", ".cab", ".deb", ".docx", ".flac", ".gif", ".gz",
+                              ".heic", ".jar", ".jpeg", ".jpg", ".lz", ".lz4", ".lzma", ".m4a", ".m4v", ".mkv",
+                              ".mov", ".mp3", ".mp4", ".odp", ".ods", ".odt", ".ogg", ".png", ".pptx", ".rar",
+                              ".rpm", ".tbz2", ".tgz", ".txz", ".webm", ".webp", ".xlsx", ".xz", ".z", ".zip",
+                              ".zst", ]
+
+ISO_IMAGE_OVERHEAD = 256 * 2048         # fixed cost of an image: system area, descriptors, path tables and padding
+ISO_RECORD_SIZE    = 33 + 14 + 80       # directory record, with the longest ISO level 1 name and the Rock Ridge fields
+ISO_RECORD_LIMIT   = 254                # longest record; the rest of a long Rock Ridge name goes in a continuation area
+ISO_PATH_SIZE      = 16                 # path table entry, with the longest ISO level 1 directory name
+ISO_LINK_SIZE      = 16                 # Rock Ridge symlink field, not counting the link target
+
+DIRECTORY_LOCALITY = 1.0                # default largest directory group for directory_fit, as a fraction of capacity
+
+_SPAN_WORKER = None                     # Table of sizes and span settings within a span worker process
+
 
 ########################################################################
 # FilesystemList class definition
@@ -761,8 +813,14 @@ class BackupFileList(FilesystemList): # pylint: disable=R0904
    total size of the files in the list and a way to export the list into tar
    form.
 
-   @sort: __init__, addDir, totalSize, generateSizeMap, generateDigestMap,
-          generateFitted, generateTarfile, removeUnchanged
+   A backup list can also filter the files it adds by size and age, so that
+   unexpectedly large files, files that are still being written, or files
+   that haven't changed in ages can be kept out of a backup.  Filtered files
+   are remembered, so that callers can summarize them.
+
+   @sort: __init__, addFile, addDir, totalSize, generateSizeMap, generateDigestMap,
+          generateFitted, generateTarfile, removeUnchanged, sortPhysical,
+          maxFileSize, minFileAge, maxFileAge, filteredFiles
    """
 
    ##############
@@ -772,12 +830,139 @@ class BackupFileList(FilesystemList): # pylint: disable=R0904
    def __init__(self):
       """Initializes a list with no configured exclusions."""
       FilesystemList.__init__(self)
+      self._maxFileSize = None
+      self._minFileAge = None
+      self._maxFileAge = None
+      self._filteredFiles = []
+
+
+   #############
+   # Properties
+   #############
+
+   def _setMaxFileSize(self, value):
+      """
+      Property target used to set the maximum file size.
+      The value must be C{None} or a number of bytes >= 0.
+      @raise ValueError: If the value is not valid.
+      """
+      self._maxFileSize = BackupFileList._validateFilter(value, "Maximum file size")
+
+   def _getMaxFileSize(self):
+      """
+      Property target used to get the maximum file size.
+      """
+      return self._maxFileSize
+
+   def _setMinFileAge(self, value):
+      """
+      Property target used to set the minimum file age.
+      The value must be C{None} or a number of days >= 0.
+      @raise ValueError: If the value is not valid.
+      """
+      self._minFileAge = BackupFileList._validateFilter(value, "Minimum file age")
+
+   def _getMinFileAge(self):
+      """
+      Property target used to get the minimum file age.
+      """
+      return self._minFileAge
+
+   def _setMaxFileAge(self, value):
+      """
+      Property target used to set the maximum file age.
+      The value must be C{None} or a number of days >= 0.
+      @raise ValueError: If the value is not valid.
+      """
+      self._maxFileAge = BackupFileList._validateFilter(value, "Maximum file age")
+
+   def _getMaxFileAge(self):
+      """
+      Property target used to get the maximum file age.
+      """
+      return self._maxFileAge
+
+   def _getFilteredFiles(self):
+      """
+      Property target used to get the list of filtered files.
+      """
+      return self._filteredFiles
+
+   @staticmethod
+   def _validateFilter(value, name):
+      """
+      Validates a size or age filter value.
+      @param value: Value to validate.
+      @param name: Name of the filter, for use in error messages.
+      @return: Value as a float, or C{None}.
+      @raise ValueError: If the value is not C{None} or a number >= 0.
+      """
+      if value is None:
+         return None
+      try:
+         value = float(value)
+      except (TypeError, ValueError):
+         raise ValueError("%s must be a number >= 0." % name)
+      if value < 0:
+         raise ValueError("%s must be a number >= 0." % name)
+      return value
+
+   maxFileSize = property(_getMaxFileSize, _setMaxFileSize, None, "Size in bytes above which files are filtered, or C{None}.")
+   minFileAge = property(_getMinFileAge, _setMinFileAge, None,
+                         "Age in days (by modification time) below which files are filtered, or C{None}.")
+   maxFileAge = property(_getMaxFileAge, _setMaxFileAge, None,
+                         "Age in days (by modification time) above which files are filtered, or C{None}.")
+   filteredFiles = property(_getFilteredFiles, None, None, "List of C{(path, size, reason)} tuples for files filtered by size or age.")
 
 
    ################################
    # Overridden superclass methods
    ################################
 
+   def addFile(self, path):
+      """
+      Adds a file to the list.
+
+      This method is implemented in terms of the superclass method, with one
+      additional step.  Once the superclass has added a regular file (not a
+      soft link), the file is checked against the size and age filters, using
+      a single C{stat} call.  A file that is larger than C{maxFileSize}, was
+      modified less than C{minFileAge} days ago, or was last modified more
+      than C{maxFileAge} days ago is taken back out of the list and recorded
+      in C{filteredFiles}, with a reason of C{"size"}, C{"new"} or C{"old"}.
+      All of the superclass's existing validations and restrictions apply.
+
+      @param path: File path to be added to the list
+      @type path: String representing a path on disk
+
+      @return: Number of items added to the list.
+
+      @raise ValueError: If path is not a file or does not exist.
+      @raise ValueError: If the path could not be encoded properly.
+      """
+      added = FilesystemList.addFile(self, path)
+      if added and (self.maxFileSize is not None or self.minFileAge is not None or self.maxFileAge is not None):
+         path = self[-1]
+         if not os.path.islink(path):
+            try:
+               fileStats = os.stat(path)
+            except OSError:
+               return added
+            reason = None
+            ageInDays = (time.time() - fileStats.st_mtime) / SECONDS_PER_DAY
+            if self.maxFileSize is not None and fileStats.st_size > self.maxFileSize:
+               reason = "size"
+            elif self.minFileAge is not None and ageInDays < self.minFileAge:
+               reason = "new"
+            elif self.maxFileAge is not None and ageInDays > self.maxFileAge:
+               reason = "old"
+            if reason is not None:
+               logger.debug("Path [%s] is filtered based on file %s filter.", path, reason)
+               self.pop()
+               self._filteredFiles.append((path, fileStats.st_size, reason))
+               return 0
+      return added
+
    def addDir(self, path):
       """
       Adds a directory to the list.
@@ -840,6 +1025,60 @@ class BackupFileList(FilesystemList): # pylint: disable=R0904
             table[entry] = float(os.stat(entry).st_size)
       return table
 
+   def sortPhysical(self, extents=True):
+      """
+      Sorts the list into the order in which files are laid out on disk.
+
+      Files are normally listed in walk order, which is essentially random with
+      respect to where the data lives on disk.  When every file in the list is
+      going to be read (i.e. to hash it or to put it into an archive), reading
+      in physical order cuts down on seeks, which matters a great deal on
+      spinning disks.
+
+      Files are sorted by device, and then by the physical offset of the
+      file's first extent, as reported by the Linux C{FIEMAP} ioctl.  Where
+      extent information isn't available (other platforms, some filesystems,
+      or if C{extents=False}), files are sorted by inode number instead, which
+      on most filesystems correlates well with on-disk location.  Soft links
+      and entries that no longer exist on disk are moved to the end of the
+      list, in their original order.
+
+      Getting extent information requires opening each file, but no data is
+      read.
+
+      @param extents: Indicates whether to use extent information when available.
+      @type extents: Boolean
+      """
+      keys = {}
+      for entry in self:
+         keys[entry] = BackupFileList._getPhysicalKey(entry, extents)
+      self.sort(key=lambda entry: keys[entry])
+
+   @staticmethod
+   def _getPhysicalKey(path, extents):
+      """
+      Gets the key used to sort a file into physical order.
+
+      The key is C{(0, st_dev, 0, offset)} when the physical offset of the
+      first extent is known, or C{(0, st_dev, 1, st_ino)} otherwise.  Soft
+      links and missing files get C{(1, )}, which sorts after everything else.
+
+      @param path: Path of the file.
+      @param extents: Indicates whether to use extent information when available.
+      @return: Sort key for the file.
+      """
+      try:
+         stats = os.lstat(path)
+      except OSError:
+         return (1, )
+      if not stat.S_ISREG(stats.st_mode):
+         return (1, )
+      if extents:
+         offset = _getFirstExtentOffset(path)
+         if offset is not None:
+            return (0, stats.st_dev, 0, offset)
+      return (0, stats.st_dev, 1, stats.st_ino)
+
    def generateDigestMap(self, stripPrefix=None):
       """
       Generates a mapping from file to file digest.
@@ -917,18 +1156,20 @@ class BackupFileList(FilesystemList): # pylint: disable=R0904
       except ImportError:
          import sha
          s = sha.new()
-      f = open(path, mode="rb")  # in case platform cares about binary reads
-      readBytes = 4096  # see notes above
-      while readBytes > 0:
-         readString = f.read(readBytes)
-         s.update(readString)
-         readBytes = len(readString)
-      f.close()
+      f = openBackupFile(path)  # binary read, honoring the configured I/O mode
+      try:
+         readBytes = 4096  # see notes above
+         while readBytes > 0:
+            readString = f.read(readBytes)
+            s.update(readString)
+            readBytes = len(readString)
+      finally:
+         closeBackupFile(f)
       digest = s.hexdigest()
       logger.debug("Generated digest [%s] for file [%s].", digest, path)
       return digest
 
-   def generateFitted(self, capacity, algorithm="worst_fit"):
+   def generateFitted(self, capacity, algorithm="worst_fit", budget=None, isoCost=False):
       """
       Generates a list of items that fit in the indicated capacity.
 
@@ -940,22 +1181,34 @@ class BackupFileList(FilesystemList): # pylint: disable=R0904
 
       The fitting is done using the functions in the knapsack module.  By
       default, the first fit algorithm is used, but you can also choose
-      from best fit, worst fit and alternate fit.
+      from best fit, worst fit, alternate fit and optimal fit.
+
+      If C{isoCost} is C{True}, then the items are fitted by their estimated
+      cost in an ISO image rather than by their size, as described for
+      L{generateSpan}.
 
       @param capacity: Maximum capacity among the files in the new list
       @type capacity: Integer, in bytes
 
       @param algorithm: Knapsack (fit) algorithm to use
-      @type algorithm: One of "first_fit", "best_fit", "worst_fit", "alternate_fit"
+      @type algorithm: One of "first_fit", "best_fit", "worst_fit", "alternate_fit", "optimal_fit"
+
+      @param budget: Time budget for the optimal fit algorithm, in seconds, or C{None} for the default
+      @type budget: Float
+
+      @param isoCost: Whether to fit the estimated ISO image cost of each item
+      @type isoCost: Boolean
 
       @return: Copy of list with total size no larger than indicated capacity
       @raise ValueError: If the algorithm is invalid.
       """
-      table = self._getKnapsackTable()
-      function = BackupFileList._getKnapsackFunction(algorithm)
+      table = self._getKnapsackTable(isoCost=isoCost)
+      function = BackupFileList._getKnapsackFunction(algorithm, budget)
+      if isoCost:
+         capacity = max(capacity - ISO_IMAGE_OVERHEAD, 0)
       return function(table, capacity)[0]
 
-   def generateSpan(self, capacity, algorithm="worst_fit"):
+   def generateSpan(self, capacity, algorithm="worst_fit", budget=None, isoCost=False, locality=None):
       """
       Splits the list of items into sub-lists that fit in a given capacity.
 
@@ -965,7 +1218,35 @@ class BackupFileList(FilesystemList): # pylint: disable=R0904
 
       The fitting is done using the functions in the knapsack module.  By
       default, the first fit algorithm is used, but you can also choose
-      from best fit, worst fit and alternate fit.
+      from best fit, worst fit, alternate fit and optimal fit.  These fill one span item
+      at a time, sorting the remaining files again for each one.  The first
+      fit decreasing and best fit decreasing algorithms instead pack all of
+      the span items in a single pass, which is much faster for large lists.
+
+      All of those algorithms look only at sizes, so the files from a single
+      directory usually end up scattered across many span items.  The
+      directory fit algorithm keeps directories together instead.  Every
+      directory subtree no larger than C{locality} times the capacity is
+      treated as a single group, and only larger subtrees are split (into the
+      files directly within them, which are also grouped if they're small
+      enough, and their subdirectories).  The groups are then packed using
+      best fit decreasing.  A C{locality} of C{1.0} keeps together everything
+      that can fit on one span item, while smaller values give smaller groups
+      that pack more tightly, and C{0.0} is the same as best fit decreasing.
+      Use L{getSpanLocality} to see how scattered the result is.
+
+      By default, each file counts for its size on disk.  That underestimates
+      the space needed on an ISO image, where every file takes a whole number
+      of 2048-byte sectors and needs a directory record, and every directory
+      takes at least one sector of its own.  If C{isoCost} is C{True}, each
+      file is instead counted for its size rounded up to a whole sector, plus
+      its Rock Ridge directory record, plus a share of the cost of each
+      directory above it (split evenly among the files below that directory).
+      The fixed overhead of an image, L{ISO_IMAGE_OVERHEAD}, is set aside from
+      the capacity of every span item, and is included in its size.  The only
+      cost that isn't fully counted is for directories whose files end up
+      split across several span items, which is a few kilobytes per split
+      directory, so only a very small cushion is needed.
 
       @note: If any of your items are larger than the capacity, then it won't
       be possible to find a solution.  In this case, a value error will be
@@ -975,52 +1256,172 @@ class BackupFileList(FilesystemList): # pylint: disable=R0904
       @type capacity: Integer, in bytes
 
       @param algorithm: Knapsack (fit) algorithm to use
-      @type algorithm: One of "first_fit", "best_fit", "worst_fit", "alternate_fit"
+      @type algorithm: One of "first_fit", "best_fit", "worst_fit", "alternate_fit", "optimal_fit",
+         "first_fit_decreasing", "best_fit_decreasing" or "directory_fit"
+
+      @param budget: Time budget per span item for the optimal fit algorithm, in seconds, or C{None} for the default
+      @type budget: Float
+
+      @param isoCost: Whether to fit the estimated ISO image cost of each item
+      @type isoCost: Boolean
+
+      @param locality: Largest directory group for the directory fit algorithm, as a fraction of capacity, or C{None} for the default
+      @type locality: Float from 0.0 to 1.0
 
       @return: List of L{SpanItem} objects.
 
-      @raise ValueError: If the algorithm is invalid.
+      @raise ValueError: If the algorithm or locality is invalid.
+      @raise ValueError: If it's not possible to fit some items
+      """
+      overhead = BackupFileList._getSpanOverhead(capacity, isoCost)
+      if BackupFileList._getPackingFunction(algorithm, locality=locality) is None:
+         BackupFileList._getKnapsackFunction(algorithm, budget)  # validates the algorithm before any files are examined
+      (paths, sizes) = self._getSpanSizes(capacity - overhead, isoCost)
+      return BackupFileList._generateSpanItems(paths, sizes, capacity, algorithm, budget, overhead, locality)
+
+   def generateSpans(self, capacity, algorithms, budget=None, isoCost=False, locality=None):
+      """
+      Splits the list of items into sub-lists using several algorithms at once.
+
+      This works just like L{generateSpan}, except that each algorithm is run
+      in its own worker process, so that trying all of them takes about as
+      long as the slowest one rather than the sum of all of them.  The size
+      (or ISO cost) of each file is worked out once, before the workers are
+      started, and every worker shares that same table.
+
+      @param capacity: Maximum capacity among the files in each new list
+      @type capacity: Integer, in bytes
+
+      @param algorithms: Knapsack (fit) algorithms to use, as for L{generateSpan}
+      @type algorithms: List of algorithm names
+
+      @param budget: Time budget per span item for the optimal fit algorithm, in seconds, or C{None} for the default
+      @type budget: Float
+
+      @param isoCost: Whether to fit the estimated ISO image cost of each item
+      @type isoCost: Boolean
+
+      @param locality: Largest directory group for the directory fit algorithm, as for L{generateSpan}
+      @type locality: Float from 0.0 to 1.0
+
+      @return: Dictionary mapping each algorithm to a list of L{SpanItem} objects.
+
+      @raise ValueError: If one of the algorithms or the locality is invalid.
       @raise ValueError: If it's not possible to fit some items
       """
+      overhead = BackupFileList._getSpanOverhead(capacity, isoCost)
+      for algorithm in algorithms:
+         if BackupFileList._getPackingFunction(algorithm, locality=locality) is None:
+            BackupFileList._getKnapsackFunction(algorithm, budget)
+      if not algorithms:
+         return { }
+      (paths, sizes) = self._getSpanSizes(capacity - overhead, isoCost)
+      logger.debug("Evaluating %d span algorithms using %d worker processes.", len(algorithms), len(algorithms))
+      pool = multiprocessing.Pool(processes=len(algorithms), initializer=_initializeSpanWorker,
+                                  initargs=(paths, sizes, capacity, budget, overhead, locality))
+      try:
+         results = pool.map(_executeSpanWorker, algorithms)
+      finally:
+         pool.terminate()
+         pool.join()
+      return dict(zip(algorithms, results))
+
+   @staticmethod
+   def _getSpanOverhead(capacity, isoCost):
+      """
+      Gets the fixed overhead to set aside from the capacity of every span item.
+      @return: Fixed overhead in bytes, which is zero unless C{isoCost} is C{True}.
+      @raise ValueError: If the capacity doesn't leave room for the overhead.
+      """
+      if not isoCost:
+         return 0
+      if capacity <= ISO_IMAGE_OVERHEAD:
+         raise ValueError("Capacity %s does not leave room for the ISO image overhead." % displayBytes(capacity))
+      return ISO_IMAGE_OVERHEAD
+
+   @staticmethod
+   def _generateSpanItems(paths, sizes, capacity, algorithm, budget=None, overhead=0, locality=None):
+      """
+      Splits a table of paths and sizes into span items, using a fit algorithm.
+      @param paths: List of file paths.
+      @param sizes: List of file sizes, in the same order as the paths.
+      @param capacity: Capacity of each span item, including the fixed overhead.
+      @param algorithm: Knapsack (fit) algorithm to use.
+      @param budget: Time budget per span item for the optimal fit algorithm, or C{None} for the default.
+      @param overhead: Fixed overhead of each span item.
+      @param locality: Largest directory group for the directory fit algorithm, or C{None} for the default.
+      @return: List of L{SpanItem} objects.
+      @raise ValueError: If the algorithm is invalid.
+      """
       spanItems = []
-      function = BackupFileList._getKnapsackFunction(algorithm)
-      table = self._getKnapsackTable(capacity)
+      packing = BackupFileList._getPackingFunction(algorithm, paths, locality)
+      if packing is not None:
+         for (indexes, used) in packing(sizes, capacity - overhead):
+            utilization = (float(used + overhead)/float(capacity))*100.0
+            spanItems.append(SpanItem([ paths[index] for index in indexes ], used + overhead, capacity, utilization))
+         return spanItems
+      function = BackupFileList._getKnapsackFunction(algorithm, budget)
+      table = { }
+      for index in xrange(len(paths)):
+         table[paths[index]] = (paths[index], sizes[index])
       iteration = 0
       while len(table) > 0:
          iteration += 1
-         fit = function(table, capacity)
+         fit = function(table, capacity - overhead)
          if len(fit[0]) == 0:
             # Should never happen due to validations in _convertToKnapsackForm(), but let's be safe
             raise ValueError("After iteration %d, unable to add any new items." % iteration)
          removeKeys(table, fit[0])
-         utilization = (float(fit[1])/float(capacity))*100.0
-         item = SpanItem(fit[0], fit[1], capacity, utilization)
+         utilization = (float(fit[1] + overhead)/float(capacity))*100.0
+         item = SpanItem(fit[0], fit[1] + overhead, capacity, utilization)
          spanItems.append(item)
       return spanItems
 
-   def _getKnapsackTable(self, capacity=None):
+   def _getKnapsackTable(self, capacity=None, isoCost=False):
       """
       Converts the list into the form needed by the knapsack algorithms.
       @return: Dictionary mapping file name to tuple of (file path, file size).
       """
+      (paths, sizes) = self._getSpanSizes(capacity, isoCost)
       table = { }
+      for index in xrange(len(paths)):
+         table[paths[index]] = (paths[index], sizes[index])
+      return table
+
+   def _getSpanSizes(self, capacity=None, isoCost=False):
+      """
+      Converts the list into the form needed by the bin packing algorithms.
+      Links are counted as zero-sized, and entries which no longer exist are left out.
+      If C{isoCost} is C{True}, the sizes are replaced with the estimated cost of each entry in an ISO image.
+      @return: Tuple C{(paths, sizes)}, a list of file paths and an C{array.array} of file sizes.
+      @raise ValueError: If a capacity is passed in and a file is larger than the capacity.
+      """
+      paths = []
+      sizes = array.array("d")
       for entry in self:
          if os.path.islink(entry):
-            table[entry] = (entry, 0.0)
+            size = 0.0
          elif os.path.isfile(entry):
             size = float(os.stat(entry).st_size)
-            if capacity is not None:
-               if size > capacity:
-                  raise ValueError("File [%s] cannot fit in capacity %s." % (entry, displayBytes(capacity)))
-            table[entry] = (entry, size)
-      return table
+         else:
+            continue
+         paths.append(entry)
+         sizes.append(size)
+      if isoCost:
+         sizes = _getIsoCosts(paths, sizes)
+      if capacity is not None:
+         for index in xrange(len(paths)):
+            if sizes[index] > capacity:
+               raise ValueError("File [%s] cannot fit in capacity %s." % (paths[index], displayBytes(capacity)))
+      return (paths, sizes)
 
    @staticmethod
-   def _getKnapsackFunction(algorithm):
+   def _getKnapsackFunction(algorithm, budget=None):
       """
       Returns a reference to the function associated with an algorithm name.
-      Algorithm name must be one of "first_fit", "best_fit", "worst_fit", "alternate_fit"
+      Algorithm name must be one of "first_fit", "best_fit", "worst_fit", "alternate_fit", "optimal_fit"
       @param algorithm: Name of the algorithm
+      @param budget: Time budget for the optimal fit algorithm, in seconds, or C{None} for the default
       @return: Reference to knapsack function
       @raise ValueError: If the algorithm name is unknown.
       """
@@ -1032,16 +1433,46 @@ class BackupFileList(FilesystemList): # pylint: disable=R0904
          return worstFit
       elif algorithm == "alternate_fit":
          return alternateFit
+      elif algorithm == "optimal_fit":
+         if budget is None:
+            return optimalFit
+         return lambda items, capacity: optimalFit(items, capacity, budget)
       else:
          raise ValueError("Algorithm [%s] is invalid." % algorithm)
 
-   def generateTarfile(self, path, mode='tar', ignore=False, flat=False):
+   @staticmethod
+   def _getPackingFunction(algorithm, paths=None, locality=None):
+      """
+      Returns a reference to the bin packing function associated with an algorithm name.
+      Only "first_fit_decreasing", "best_fit_decreasing" and "directory_fit" have a bin packing function.
+      @param algorithm: Name of the algorithm
+      @param paths: List of file paths, needed by the directory fit algorithm
+      @param locality: Largest directory group for the directory fit algorithm, or C{None} for the default
+      @return: Reference to bin packing function, or C{None} if the algorithm is a knapsack algorithm.
+      @raise ValueError: If the locality is invalid.
+      """
+      if algorithm == "first_fit_decreasing":
+         return firstFitDecreasing
+      elif algorithm == "best_fit_decreasing":
+         return bestFitDecreasing
+      elif algorithm == "directory_fit":
+         if locality is None:
+            locality = DIRECTORY_LOCALITY
+         if locality < 0.0 or locality > 1.0:
+            raise ValueError("Locality must be between 0.0 and 1.0.")
+         return lambda sizes, capacity: _packDirectories(paths, sizes, capacity, locality)
+      return None
+
+   def generateTarfile(self, path, mode='tar', ignore=False, flat=False, prefetch=0, captureDigest=False, volumeSize=None,
+                       compressLevel=None, dedup=False):
       """
       Creates a tar file containing the files in the list.
 
       By default, this method will create uncompressed tar files.  If you pass
       in mode C{'targz'}, then it will create gzipped tar files, and if you
-      pass in mode C{'tarbz2'}, then it will create bzipped tar files.
+      pass in mode C{'tarbz2'}, then it will create bzipped tar files.  For
+      the compressed modes, you can pass in a C{compressLevel} from 1 (fastest)
+      to 9 (best compression).  By default, the best compression is used.
 
       The tar file will be created as a GNU tar archive, which enables extended
       file name lengths, etc.  Since GNU tar is so prevalent, I've decided that
@@ -1064,6 +1495,49 @@ class BackupFileList(FilesystemList): # pylint: disable=R0904
       ignore errors encountered when adding individual files to the archive
       (but not errors opening and closing the archive itself).
 
+      If you pass in a non-zero C{prefetch} value, then upcoming members are
+      opened and read on background threads (see L{_MemberPrefetcher}) while
+      earlier members are being written and compressed, so file I/O overlaps
+      with archiving.  The value is the maximum number of members that may be
+      read ahead.  Small files are read whole, and larger files are opened and
+      given a readahead hint.  The resulting archive is the same either way.
+
+      If you pass in C{captureDigest=True}, then each regular file is hashed
+      as it is streamed into the archive, and a digest map (in exactly the
+      form returned by L{generateDigestMap}) is returned for the files that
+      were actually archived.  This gives the caller a digest without having
+      to read every file a second time.  The digest reflects the contents that
+      were written into the archive.  Files that could not be added (when
+      C{ignore=True}) are left out of the map.
+
+      If you pass in a C{volumeSize} (in bytes), then the archive is split into
+      volumes.  Each volume is a complete, independently valid tar file (in the
+      same mode), so any one of them can be extracted on its own.  Once the
+      current volume has reached the volume size, the next file starts a new
+      volume.  Files are never split across volumes, so a volume can be larger
+      than the volume size by up to one file (plus whatever the compressor has
+      buffered, which for C{'tarbz2'} can be up to about 900 kB of input).  The
+      first volume is written to C{path}, and later volumes are named as
+      described in L{getVolumePath}.
+
+      If you pass in C{dedup=True}, then regular files with exactly the same
+      contents as an earlier member are stored as hard links to that member,
+      so their contents are only stored once.  Only files whose size matches
+      some other file in the list are checked at all.  For those, the first
+      L{DEDUP_PREFIX} bytes are hashed through the same file object that is
+      then used to write the member, and the file is only read in full before
+      writing if that matches an earlier member of the same size.  So, files
+      that turn out not to be duplicates are never read twice from disk.  A
+      hard link never points into an earlier volume, so each volume is still
+      independently valid.  The number of bytes saved is logged.
+
+      The return value varies depending on C{captureDigest} and C{volumeSize},
+      in the same spirit as L{removeUnchanged}.  If C{volumeSize} is C{None},
+      then we return the digest map if C{captureDigest} is C{True}, or C{None}
+      otherwise.  If C{volumeSize} is set, then we return the list of volumes
+      that were written, or a tuple C{(volumes, digest map)} if
+      C{captureDigest} is C{True}.
+
       We'll always attempt to remove the tarfile from disk if an exception will
       be thrown.
 
@@ -1091,6 +1565,23 @@ class BackupFileList(FilesystemList): # pylint: disable=R0904
       @param flat: Creates "flat" archive by putting all items in root
       @type flat: Boolean
 
+      @param prefetch: Maximum number of members to read ahead, or zero for none
+      @type prefetch: Integer >= 0
+
+      @param captureDigest: Indicates that digest information should be captured.
+      @type captureDigest: Boolean
+
+      @param volumeSize: Size at which to start a new volume, or C{None} for a single archive
+      @type volumeSize: Number of bytes, as an integer or float
+
+      @param compressLevel: Compression level for C{'targz'} or C{'tarbz2'}, or C{None} for the default
+      @type compressLevel: Integer from 1 to 9
+
+      @param dedup: Indicates that files with identical contents should only be stored once.
+      @type dedup: Boolean
+
+      @return: Results as discussed above (format varies based on arguments)
+
       @raise ValueError: If mode is not valid
       @raise ValueError: If list is empty
       @raise ValueError: If the path could not be encoded properly.
@@ -1099,46 +1590,454 @@ class BackupFileList(FilesystemList): # pylint: disable=R0904
       # pylint: disable=E1101
       path = encodePath(path)
       if len(self) == 0: raise ValueError("Empty list cannot be used to generate tarfile.")
-      if mode == 'tar': tarmode = "w:"
-      elif mode == 'targz': tarmode = "w:gz"
-      elif mode == 'tarbz2': tarmode = "w:bz2"
-      else: raise ValueError("Mode [%s] is not valid." % mode)
+      (tarmode, compressLevel) = BackupFileList._getTarmode(mode, compressLevel)
+      volumes = [ path, ]
       try:
-         tar = tarfile.open(path, tarmode)
+         tar = BackupFileList._openTarfile(path, tarmode, compressLevel)
+         captured = None
+         if captureDigest:
+            captured = {}
+         candidates = {}
+         if dedup:
+            candidates = self._getSizeCollisions()
+            logger.debug("Found %d files in [%s] that might be duplicates.", len(candidates), path)
+         (seen, linked, saved) = ({}, 0, 0)
+         prefetcher = None
+         if prefetch > 0:
+            prefetcher = _MemberPrefetcher(self, prefetch)
          try:
-            tar.format = tarfile.GNU_FORMAT
-         except AttributeError:
-            tar.posix = False
-         for entry in self:
-            try:
+            for entry in self:
+               member = None
+               if prefetcher is not None:
+                  member = prefetcher.next()
+               if volumeSize is not None and len(tar.members) > 0 and BackupFileList._getTarfileSize(tar) >= volumeSize:
+                  tar.close()
+                  volumes.append(getVolumePath(path, len(volumes) + 1))
+                  logger.debug("Starting tarfile volume [%s].", volumes[-1])
+                  tar = BackupFileList._openTarfile(volumes[-1], tarmode, compressLevel)
+                  seen = {}
+               arcname = entry
                if flat:
-                  tar.add(entry, arcname=os.path.basename(entry), recursive=False)
-               else:
-                  tar.add(entry, recursive=False)
-            except tarfile.TarError, e:
-               if not ignore:
-                  raise e
-               logger.info("Unable to add file [%s]; going on anyway.", entry)
-            except OSError, e:
-               if not ignore:
-                  raise tarfile.TarError(e)
-               logger.info("Unable to add file [%s]; going on anyway.", entry)
+                  arcname = os.path.basename(entry)
+               try:
+                  if entry in candidates and os.path.abspath(entry) != tar.name:
+                     if BackupFileList._addDedupMember(tar, entry, arcname, member, candidates[entry], seen, captured):
+                        linked += 1
+                        saved += candidates[entry]
+                  else:
+                     BackupFileList._addTarMember(tar, entry, arcname, member, captured)
+               except tarfile.TarError, e:
+                  if not ignore:
+                     raise e
+                  logger.info("Unable to add file [%s]; going on anyway.", entry)
+               except OSError, e:
+                  if not ignore:
+                     raise tarfile.TarError(e)
+                  logger.info("Unable to add file [%s]; going on anyway.", entry)
+         finally:
+            if prefetcher is not None:
+               prefetcher.close()
          tar.close()
+         if linked > 0:
+            logger.info("Stored %d duplicate files in [%s] as hard links, saving %s.", linked, path, displayBytes(saved))
+         if volumeSize is None:
+            return captured
+         elif captureDigest:
+            return (volumes, captured)
+         else:
+            return volumes
       except tarfile.ReadError, e:
          try: tar.close()
          except: pass
-         if os.path.exists(path):
-            try: os.remove(path)
-            except: pass
+         for volume in volumes:
+            if os.path.exists(volume):
+               try: os.remove(volume)
+               except: pass
          raise tarfile.ReadError("Unable to open [%s]; maybe directory doesn't exist?" % path)
       except tarfile.TarError, e:
          try: tar.close()
          except: pass
-         if os.path.exists(path):
-            try: os.remove(path)
-            except: pass
+         for volume in volumes:
+            if os.path.exists(volume):
+               try: os.remove(volume)
+               except: pass
          raise e
 
+   def generateSyntheticTarfile(self, path, archives, unchanged, mode='tar', ignore=False, captureDigest=False,
+                                compressLevel=None):
+      """
+      Creates a tar file containing the files in the list, reusing existing archives.
+
+      This works like L{generateTarfile}, except that the contents of unchanged
+      files are copied out of earlier archives rather than being read from
+      disk again.  This makes it possible to build a full backup from a
+      previous full backup plus the incremental backups taken since then.
+
+      The archives are searched in the order they are passed in, so the newest
+      archive should come first.  Each regular file in C{unchanged} is taken
+      from the first archive containing a regular file member with the name
+      L{generateTarfile} would have given it.  No more archives are opened once
+      every unchanged file has been found, and an archive that can't be read is
+      skipped.  Everything else in the list (including unchanged files that
+      weren't found) is read from disk.
+
+      Each copied member is hashed as it is read out of its archive, and the
+      digest is compared with the one passed in for the file.  The member is
+      spooled to a temporary file (in memory, for members no larger than
+      L{PREFETCH_SLURP}) until the digest is known, since nothing can be taken
+      back out of the new archive once it's been written.  A member whose
+      digest doesn't match is not used, and the file is read from disk
+      instead.  This way, a stale or damaged copy never ends up in the new
+      archive.
+
+      The copied members come first in the new archive, in the order they were
+      found, so each source archive is read sequentially just once.  The
+      remaining entries follow in list order.
+
+      The C{ignore}, C{captureDigest} and C{compressLevel} arguments work as in
+      L{generateTarfile}.  The captured digest map includes the files copied
+      from the archives, whose digests were checked along the way, as well as
+      the files read from disk.  Flat archives and volumes are not supported.
+
+      We'll always attempt to remove the tarfile from disk if an exception will
+      be thrown.
+
+      @param path: Path of tar file to create on disk
+      @type path: String representing a path on disk
+
+      @param archives: Paths of existing archives to copy members from, newest first
+      @type archives: List of paths on disk
+
+      @param unchanged: Digest of each entry whose contents can be copied from the archives
+      @type unchanged: Dictionary mapping path to digest
+
+      @param mode: Tar creation mode
+      @type mode: One of either C{'tar'}, C{'targz'} or C{'tarbz2'}
+
+      @param ignore: Indicates whether to ignore certain errors.
+      @type ignore: Boolean
+
+      @param captureDigest: Indicates that digest information should be captured.
+      @type captureDigest: Boolean
+
+      @param compressLevel: Compression level for C{'targz'} or C{'tarbz2'}, or C{None} for the default
+      @type compressLevel: Integer from 1 to 9
+
+      @return: Digest map of the files in the archive if C{captureDigest} is C{True}, otherwise C{None}.
+
+      @raise ValueError: If mode is not valid
+      @raise ValueError: If list is empty
+      @raise ValueError: If the path could not be encoded properly.
+      @raise TarError: If there is a problem creating the tar file
+      """
+      # pylint: disable=E1101
+      path = encodePath(path)
+      if len(self) == 0: raise ValueError("Empty list cannot be used to generate tarfile.")
+      (tarmode, compressLevel) = BackupFileList._getTarmode(mode, compressLevel)
+      wanted = {}
+      for entry in self:
+         if entry in unchanged:
+            wanted[BackupFileList._getArcname(entry)] = entry
+      entries = dict(wanted)
+      sources = []
+      try:
+         for archive in archives:
+            if len(wanted) == 0:
+               break
+            try:
+               source = tarfile.open(archive, "r:*")
+               members = []
+               for member in source.getmembers():
+                  if member.isreg() and member.name in wanted:
+                     members.append(member)
+                     del wanted[member.name]
+               sources.append((source, members))
+               logger.debug("Found %d unchanged files in archive [%s].", len(members), archive)
+            except (tarfile.TarError, IOError, OSError):
+               logger.warn("Unable to read archive [%s]; skipping it.", archive)
+         try:
+            tar = BackupFileList._openTarfile(path, tarmode, compressLevel)
+            captured = None
+            if captureDigest:
+               captured = {}
+            copied = set()
+            for (source, members) in sources:
+               for member in members:
+                  entry = entries[member.name]
+                  if BackupFileList._copyTarMember(tar, source, member, unchanged[entry]):
+                     copied.add(member.name)
+                     if captureDigest:
+                        captured[entry] = unchanged[entry]
+                  else:
+                     logger.info("Archived copy of [%s] does not match its digest; reading it from disk.", entry)
+            for entry in self:
+               if BackupFileList._getArcname(entry) not in copied:
+                  try:
+                     BackupFileList._addTarMember(tar, entry, entry, None, captured)
+                  except tarfile.TarError, e:
+                     if not ignore:
+                        raise e
+                     logger.info("Unable to add file [%s]; going on anyway.", entry)
+                  except OSError, e:
+                     if not ignore:
+                        raise tarfile.TarError(e)
+                     logger.info("Unable to add file [%s]; going on anyway.", entry)
+            tar.close()
+            logger.debug("Copied %d files from earlier archives into [%s].", len(copied), path)
+            return captured
+         except tarfile.ReadError, e:
+            try: tar.close()
+            except: pass
+            if os.path.exists(path):
+               try: os.remove(path)
+               except: pass
+            raise tarfile.ReadError("Unable to open [%s]; maybe directory doesn't exist?" % path)
+         except tarfile.TarError, e:
+            try: tar.close()
+            except: pass
+            if os.path.exists(path):
+               try: os.remove(path)
+               except: pass
+            raise e
+      finally:
+         for (source, members) in sources:
+            source.close()
+
+   @staticmethod
+   def _copyTarMember(tar, source, member, digest):
+      """
+      Copies a regular file member from one archive to another, if its digest matches.
+
+      The member's contents are hashed while they are read into a temporary
+      file, and are only added to the target archive once the digest is known
+      to match.  The temporary file is kept in memory for members no larger
+      than L{PREFETCH_SLURP}.
+
+      @param tar: Tarfile object to add to
+      @param source: Tarfile object to copy the member from
+      @param member: C{TarInfo} of the member within C{source}
+      @param digest: Expected digest of the member's contents
+      @return: C{True} if the member was copied, C{False} if its digest did not match.
+      """
+      spool = tempfile.SpooledTemporaryFile(max_size=PREFETCH_SLURP)
+      try:
+         reader = _DigestReader(source.extractfile(member))
+         shutil.copyfileobj(reader, spool, PREFETCH_SLURP)
+         if reader.hexdigest() != digest:
+            return False
+         spool.seek(0)
+         tar.addfile(member, spool)
+         return True
+      finally:
+         spool.close()
+
+   @staticmethod
+   def _getTarmode(mode, compressLevel):
+      """
+      Gets the C{tarfile} mode and compression level for a tar creation mode.
+      @param mode: Tar creation mode, one of C{'tar'}, C{'targz'} or C{'tarbz2'}
+      @param compressLevel: Compression level from 1 to 9, or C{None} for the default
+      @return: Tuple C{(tarmode, compressLevel)}, where the level is C{None} unless it applies.
+      @raise ValueError: If mode or compression level is not valid
+      """
+      if mode == 'tar': tarmode = "w:"
+      elif mode == 'targz': tarmode = "w:gz"
+      elif mode == 'tarbz2': tarmode = "w:bz2"
+      else: raise ValueError("Mode [%s] is not valid." % mode)
+      if mode == 'tar' or compressLevel is None:
+         compressLevel = None
+      elif compressLevel < 1 or compressLevel > 9:
+         raise ValueError("Compression level [%s] is not valid." % compressLevel)
+      return (tarmode, compressLevel)
+
+   @staticmethod
+   def _getArcname(entry):
+      """
+      Gets the name that C{tarfile} gives an entry added to a (non-flat) archive.
+      @param entry: Path of the entry on disk
+      @return: Name of the member within the archive.
+      """
+      return entry.replace(os.sep, "/").lstrip("/")
+
+   @staticmethod
+   def _openTarfile(path, tarmode, compressLevel=None):
+      """
+      Opens a tar file for writing, as a GNU tar archive.
+      @param path: Path of tar file to create on disk
+      @param tarmode: Mode to pass to C{tarfile.open()}, i.e. C{"w:gz"}
+      @param compressLevel: Compression level for a compressed mode, or C{None} for the default
+      @return: Open C{TarFile} object.
+      """
+      if compressLevel is None:
+         tar = tarfile.open(path, tarmode)
+      else:
+         tar = tarfile.open(path, tarmode, compresslevel=compressLevel)
+      try:
+         tar.format = tarfile.GNU_FORMAT
+      except AttributeError:
+         tar.posix = False
+      return tar
+
+   @staticmethod
+   def _getTarfileSize(tar):
+      """
+      Gets the number of bytes written so far to a tar file that is open for writing.
+
+      For an uncompressed archive, this is exact.  For a gzipped archive, it's
+      the amount of compressed data written so far, and for a bzipped archive
+      (where C{tarfile} hides the underlying file) it's whatever has reached
+      the disk.  Either way, data still buffered by the compressor isn't
+      counted.
+
+      @param tar: C{TarFile} object open for writing.
+      @return: Size in bytes.
+      """
+      if isinstance(tar.fileobj, file):
+         return tar.fileobj.tell()
+      fileobj = getattr(tar.fileobj, "fileobj", None)
+      if isinstance(fileobj, file):
+         return fileobj.tell()
+      return os.path.getsize(tar.name)
+
+   @staticmethod
+   def _addTarMember(tar, entry, arcname, member, digestMap=None):
+      """
+      Adds a single entry to a tar archive, non-recursively.
+
+      If there's no prefetched member, this is just C{tar.add()}.  Otherwise,
+      the member's contents are used rather than opening the file again.  For
+      a file whose contents were read whole, the size stored in the archive is
+      the size of the data that was actually read.  The archive itself is
+      always passed to C{tar.add()}, which skips it, and any member that was
+      prefetched for it is closed.
+
+      In backup I/O mode (see L{util.setIoMode}), regular files that weren't
+      prefetched are opened with L{util.openBackupFile} rather than letting
+      C{tar.add()} open them, so the page cache and access times are left alone.
+      The same happens if a digest map is passed in, since the file's contents
+      are hashed as they are written into the archive.  Once the member has
+      been added, its digest is stored in the map.
+
+      @param tar: Tarfile object to add to
+      @param entry: Path of the entry on disk
+      @param arcname: Name of the entry within the archive
+      @param member: Prefetched member tuple C{(fileobj, size)}, or C{None}
+      """
+      if member is None and (digestMap is not None or getIoMode() == IO_MODE_BACKUP):
+         if os.path.isfile(entry) and not os.path.islink(entry) and os.path.abspath(entry) != tar.name:
+            member = (openBackupFile(entry), None)
+      if member is None or os.path.abspath(entry) == tar.name:
+         if member is not None:
+            closeBackupFile(member[0])
+         tar.add(entry, arcname=arcname, recursive=False)
+      else:
+         (fileobj, size) = member
+         try:
+            reader = fileobj
+            if digestMap is not None:
+               reader = _DigestReader(fileobj)
+            tarinfo = tar.gettarinfo(entry, arcname)
+            if tarinfo.isreg():
+               if size is not None:
+                  tarinfo.size = size
+               tar.addfile(tarinfo, reader)
+            else:
+               tar.addfile(tarinfo)  # for instance, a hard link to an earlier member
+               if digestMap is not None:
+                  while reader.read(PREFETCH_SLURP):
+                     pass
+            if digestMap is not None:
+               digestMap[entry] = reader.hexdigest()
+         finally:
+            closeBackupFile(fileobj)
+
+   @staticmethod
+   def _addDedupMember(tar, entry, arcname, member, size, seen, digestMap=None):
+      """
+      Adds a single regular file to a tar archive, or a hard link if it's a duplicate.
+
+      The first L{DEDUP_PREFIX} bytes of the file are hashed, and the file is
+      looked up in C{seen} using its size and that digest.  If there's a
+      match, the rest of the file is hashed as well, and if an earlier member
+      has the same digest, a hard link to that member is added instead of the
+      file's contents.  Otherwise, the file is rewound and added normally
+      using L{_addTarMember}, and it's recorded in C{seen} for later files.
+      The same file object is used throughout, so the file is opened once and
+      the data that was already hashed is normally still in the page cache.
+
+      If the file can't be opened, it's just passed along to L{_addTarMember},
+      so errors are reported in the usual way.
+
+      @param tar: Tarfile object to add to
+      @param entry: Path of the entry on disk
+      @param arcname: Name of the entry within the archive
+      @param member: Prefetched member tuple C{(fileobj, size)}, or C{None}
+      @param size: Size of the entry on disk
+      @param seen: Dictionary mapping C{(size, prefix digest)} to a list of C{(digest, arcname)} for earlier members
+      @param digestMap: Digest map to store the entry's digest in, or C{None}
+      @return: C{True} if a hard link was added, C{False} otherwise.
+      """
+      if member is None:
+         try:
+            member = (openBackupFile(entry), None)
+         except (IOError, OSError):
+            BackupFileList._addTarMember(tar, entry, arcname, None, digestMap)
+            return False
+      target = BackupFileList._getArcname(arcname)
+      (digest, linkname) = (None, None)
+      try:
+         reader = _DigestReader(member[0])
+         reader.read(DEDUP_PREFIX)
+         key = (size, reader.hexdigest())
+         if key in seen:
+            while reader.read(PREFETCH_SLURP):
+               pass
+            digest = reader.hexdigest()
+            for (earlier, name) in seen[key]:
+               if earlier == digest and name != target:
+                  linkname = name
+                  break
+         if linkname is None:
+            member[0].seek(0)
+      except:
+         closeBackupFile(member[0])
+         raise
+      if linkname is not None:
+         closeBackupFile(member[0])
+         tarinfo = tar.gettarinfo(entry, arcname)
+         (tarinfo.type, tarinfo.linkname, tarinfo.size) = (tarfile.LNKTYPE, linkname, 0)
+         tar.addfile(tarinfo)
+         if digestMap is not None:
+            digestMap[entry] = digest
+         return True
+      captured = digestMap
+      if captured is None:
+         captured = {}
+      BackupFileList._addTarMember(tar, entry, arcname, member, captured)
+      seen.setdefault(key, []).append((captured[entry], target))
+      return False
+
+   def _getSizeCollisions(self):
+      """
+      Gets the regular files in the list whose size matches some other file in the list.
+      Empty files and entries that can't be found are left out.
+      @return: Dictionary mapping each such entry to its size.
+      """
+      sizes = {}
+      for entry in self:
+         try:
+            info = os.lstat(entry)
+         except OSError:
+            continue
+         if stat.S_ISREG(info.st_mode) and info.st_size > 0:
+            sizes.setdefault(info.st_size, set()).add(entry)
+      collisions = {}
+      for (size, entries) in sizes.items():
+         if len(entries) > 1:
+            for entry in entries:
+               collisions[entry] = size
+      return collisions
+
    def removeUnchanged(self, digestMap, captureDigest=False):
       """
       Removes unchanged entries from the list.
@@ -1164,6 +2063,10 @@ class BackupFileList(FilesystemList): # pylint: disable=R0904
       digest value for files we actually need to check, and we'll ignore any
       entry in the list which isn't a file that currently exists on disk.
 
+      The remaining entries stay in their original order (so, for instance,
+      the order established by L{sortPhysical} is kept), but any duplicate
+      entries are removed.
+
       The return value varies depending on C{captureDigest}, as well.  To
       preserve backwards compatibility, if C{captureDigest} is C{False}, then
       we'll just return a single value representing the number of entries
@@ -1204,24 +2107,280 @@ class BackupFileList(FilesystemList): # pylint: disable=R0904
                      removed += 1
                      del table[entry]
                      logger.debug("Discarded unchanged file [%s].", entry)
-         self[:] = table.keys()
+         self[:] = [ entry for entry in _uniqueEntries(self) if entry in table ]
          return (removed, captured)
       else:
          removed = 0
          table = {}
          for entry in self:
             table[entry] = None
-         for entry in digestMap.keys():
-            if table.has_key(entry):
+         for entry in _uniqueEntries(self):
+            if digestMap.has_key(entry):
                if os.path.isfile(entry) and not os.path.islink(entry):
                   digest = BackupFileList._generateDigest(entry)
                   if digest == digestMap[entry]:
                      removed += 1
                      del table[entry]
                      logger.debug("Discarded unchanged file [%s].", entry)
-         self[:] = table.keys()
+         self[:] = [ entry for entry in _uniqueEntries(self) if entry in table ]
          return removed
 
+   def splitIncompressible(self, extensions=None, sample=True):
+      """
+      Splits files that won't compress any further out of the list.
+
+      Files that are already compressed (images, video, audio, archives, etc.)
+      cost a lot of CPU time in a compressed tarfile, and save no space.  This
+      method finds those files, removes them from the current list, and returns
+      them as a separate list, so the caller can archive them without
+      compression.
+
+      A file is considered incompressible if its name ends in one of the
+      indicated extensions (compared without regard to case).  If C{sample} is
+      C{True}, any other file of at least C{ENTROPY_MINIMUM} bytes is also
+      checked by compressing its first C{ENTROPY_SAMPLE} bytes with a fast
+      compression level.  If the sample doesn't shrink below C{ENTROPY_RATIO} of
+      its original size, the file is considered incompressible.
+
+      Only regular files are ever moved to the returned list.  Directories,
+      soft links and anything that can't be read stay in the current list, in
+      their original order.
+
+      @param extensions: List of extensions to treat as incompressible, or C{None} for C{INCOMPRESSIBLE_EXTENSIONS}.
+      @type extensions: List of strings, like C{[ ".jpg", ".gz", ]}
+
+      @param sample: Indicates whether file contents should be sampled.
+      @type sample: Boolean
+
+      @return: C{BackupFileList} containing the incompressible files.
+      """
+      if extensions is None:
+         extensions = INCOMPRESSIBLE_EXTENSIONS
+      extensions = tuple([ extension.lower() for extension in extensions ])
+      incompressible = BackupFileList()
+      remaining = []
+      for entry in self:
+         if os.path.isfile(entry) and not os.path.islink(entry) and \
+            BackupFileList._isIncompressible(entry, extensions, sample):
+            logger.debug("File [%s] will not be compressed.", entry)
+            incompressible.append(entry)
+         else:
+            remaining.append(entry)
+      self[:] = remaining
+      return incompressible
+
+   @staticmethod
+   def _isIncompressible(path, extensions, sample):
+      """
+      Indicates whether a file is incompressible, per L{splitIncompressible}.
+      @param path: Path of the file to check.
+      @param extensions: Tuple of lowercase extensions to treat as incompressible.
+      @param sample: Indicates whether file contents should be sampled.
+      @return: Boolean indicating whether the file is incompressible.
+      """
+      if path.lower().endswith(extensions):
+         return True
+      if not sample:
+         return False
+      try:
+         if os.stat(path).st_size < ENTROPY_MINIMUM:
+            return False
+         fileobj = openBackupFile(path)
+         try:
+            data = fileobj.read(ENTROPY_SAMPLE)
+         finally:
+            closeBackupFile(fileobj)
+      except (IOError, OSError):
+         return False
+      return len(zlib.compress(data, 1)) >= len(data) * ENTROPY_RATIO
+
+
+########################################################################
+# _DigestReader class definition
+########################################################################
+
+class _DigestReader(object):
+
+   """
+   File-like wrapper that computes an SHA digest of the data read through it.
+
+   This is used by L{BackupFileList.generateTarfile} to hash files while they
+   are being written into an archive.  Only the C{read} method is provided,
+   since that's all C{tarfile} needs.  The digest is the same one generated by
+   L{BackupFileList._generateDigest}, as long as the whole file is read.
+   """
+
+   def __init__(self, fileobj):
+      """
+      Constructor for the C{_DigestReader} class.
+      @param fileobj: File-like object to read from.
+      """
+      # pylint: disable=C0103,E1101
+      try:
+         import hashlib
+         self._digest = hashlib.sha1()
+      except ImportError:
+         import sha
+         self._digest = sha.new()
+      self._fileobj = fileobj
+
+   def read(self, size=-1):
+      """
+      Reads data from the wrapped object, adding it to the digest.
+      @param size: Maximum number of bytes to read.
+      @return: Data that was read.
+      """
+      data = self._fileobj.read(size)
+      self._digest.update(data)
+      return data
+
+   def hexdigest(self):
+      """
+      Returns the ASCII-safe digest of the data read so far.
+      """
+      return self._digest.hexdigest()
+
+
+########################################################################
+# _MemberPrefetcher class definition
+########################################################################
+
+class _MemberPrefetcher(object):
+
+   """
+   Reads upcoming tar members on background threads.
+
+   This is used by L{BackupFileList.generateTarfile} to overlap file I/O with
+   archiving and compression.  The entries are divided round-robin among a
+   small number of reader threads, each of which fills its own bounded queue.
+   The caller retrieves members in the original list order using L{next}.
+
+   Each member is a tuple C{(fileobj, size)}.  Files no larger than
+   L{PREFETCH_SLURP} are read whole, and C{size} is the length of the data
+   that was read.  Larger files are just opened and given a readahead hint,
+   and C{size} is C{None}.  If an entry is not a regular file, or can't be
+   opened, the member is C{None} and the caller must deal with the entry on
+   its own (i.e. using C{tar.add()}), so errors are reported normally.  Any
+   other exception raised while reading an entry is passed back to the caller,
+   and is raised again by L{next} when that entry's member is retrieved, so a
+   reader thread can never die and leave the caller waiting forever.
+
+   The caller must always call L{close}, which stops the threads and closes
+   any files that were opened but never retrieved.
+   """
+
+   def __init__(self, entries, depth):
+      """
+      Constructor for the C{_MemberPrefetcher} class.
+      @param entries: List of entries that will be retrieved, in order.
+      @param depth: Maximum number of members to read ahead.
+      """
+      self._stopped = False
+      self._index = 0
+      count = max(1, min(depth, PREFETCH_THREADS))
+      self._queues = []
+      self._threads = []
+      for i in range(0, count):
+         queue = Queue.Queue(max(1, depth // count))
+         thread = threading.Thread(target=self._read, args=(entries[i::count], queue))
+         thread.setDaemon(True)
+         self._queues.append(queue)
+         self._threads.append(thread)
+      for thread in self._threads:
+         thread.start()
+
+   def next(self):
+      """
+      Returns the next member, in list order.
+      @return: Member tuple C{(fileobj, size)}, or C{None}.
+      """
+      queue = self._queues[self._index % len(self._queues)]
+      self._index += 1
+      member = queue.get()
+      if isinstance(member, _PrefetchError):
+         raise member.excInfo[0], member.excInfo[1], member.excInfo[2]
+      return member
+
+   def close(self):
+      """
+      Stops the reader threads and closes any unretrieved members.
+      """
+      self._stopped = True
+      for thread in self._threads:
+         thread.join()
+      for queue in self._queues:
+         while not queue.empty():
+            _MemberPrefetcher._discard(queue.get())
+
+   def _read(self, entries, queue):
+      """
+      Reads members for a set of entries and puts them on a queue.
+      @param entries: Entries to read, in order.
+      @param queue: Queue to put members on.
+      """
+      for entry in entries:
+         if self._stopped:
+            return
+         try:
+            member = _MemberPrefetcher._open(entry)
+         except:
+            member = _PrefetchError(sys.exc_info())
+         while True:
+            try:
+               queue.put(member, True, 0.1)
+               break
+            except Queue.Full:
+               if self._stopped:
+                  _MemberPrefetcher._discard(member)
+                  return
+
+   @staticmethod
+   def _discard(member):
+      """
+      Closes a member that will never be retrieved.
+      @param member: Member tuple C{(fileobj, size)}, C{None} or an error marker.
+      """
+      if member is not None and not isinstance(member, _PrefetchError):
+         closeBackupFile(member[0])
+
+   @staticmethod
+   def _open(entry):
+      """
+      Opens a single member.
+      @param entry: Path of the entry on disk.
+      @return: Member tuple C{(fileobj, size)}, or C{None}.
+      """
+      try:
+         if not stat.S_ISREG(os.lstat(entry).st_mode):
+            return None
+         fileobj = openBackupFile(entry)
+      except (IOError, OSError):
+         return None
+      try:
+         if os.fstat(fileobj.fileno()).st_size > PREFETCH_SLURP:
+            adviseFileAccess(fileobj.fileno(), POSIX_FADV_WILLNEED, 0, PREFETCH_READAHEAD)
+            return (fileobj, None)
+         data = fileobj.read()
+      except (IOError, OSError):
+         closeBackupFile(fileobj)
+         return None
+      closeBackupFile(fileobj)
+      return (StringIO(data), len(data))
+
+
+class _PrefetchError(object):
+
+   """
+   Marker put on a L{_MemberPrefetcher} queue in place of a member that could not be read.
+   """
+
+   def __init__(self, excInfo):
+      """
+      Constructor for the C{_PrefetchError} class.
+      @param excInfo: Exception information, as from C{sys.exc_info()}.
+      """
+      self.excInfo = excInfo
+
 
 ########################################################################
 # PurgeItemList class definition
@@ -1511,3 +2670,288 @@ def compareDigestMaps(digest1, digest2, verbose=False):
          if digest1[key] != digest2[key]:
             raise ValueError("File contents for [%s] vary between directories." % key)
 
+def getVolumePath(path, volume):
+   """
+   Gets the path of a volume of a tar file written with a volume size.
+
+   The first volume is the tar file path itself.  Later volumes get a C{.volNNN}
+   tag just before the tar extension, so for instance volume 2 of
+   C{/collect/home.tar.gz} is C{/collect/home.vol002.tar.gz}.  Since every
+   volume is written into the same directory and keeps the normal extension,
+   nothing else needs to know about volumes: each one is staged, stored and
+   extracted like any other tar file.
+
+   @param path: Path of the tar file (the first volume).
+   @param volume: Volume number, starting from 1.
+
+   @return: Path of the indicated volume.
+   """
+   if volume == 1:
+      return path
+   for extension in [ ".tar.gz", ".tar.bz2", ".tar", ]:
+      if path.endswith(extension):
+         return "%s.vol%03d%s" % (path[:-len(extension)], volume, extension)
+   return "%s.vol%03d" % (path, volume)
+
+
+#############################
+# getSpanLocality() function
+#############################
+
+def getSpanLocality(spanItems, root, depth=1):
+   """
+   Counts how many span items would be needed to restore each directory.
+
+   The directories counted are the ones C{depth} levels below C{root}, so with
+   the default depth of 1, these are the top-level directories in C{root}.
+   Files that are less than C{depth} levels below C{root} are counted under
+   the directory they're in, and files that aren't within C{root} at all are
+   ignored.
+
+   @param spanItems: List of L{SpanItem} objects, as from L{BackupFileList.generateSpan}.
+   @param root: Directory the counted directories are relative to.
+   @param depth: How many levels below C{root} the counted directories are.
+
+   @return: Dictionary mapping directory path to the number of span items holding files from it.
+   """
+   root = normalizeDir(root)
+   prefix = root if root.endswith(os.sep) else root + os.sep
+   items = { }
+   for (index, spanItem) in enumerate(spanItems):
+      for path in spanItem.fileList:
+         if not path.startswith(prefix):
+            continue
+         components = path[len(prefix):].split(os.sep)[:-1][:depth]
+         directory = os.path.join(root, *components)
+         items.setdefault(directory, set()).add(index)
+   return dict([ (directory, len(indexes)) for (directory, indexes) in items.items() ])
+
+
+########################################################################
+# Private functions
+########################################################################
+
+############################
+# _uniqueEntries() function
+############################
+
+def _uniqueEntries(entries):
+   """
+   Yields each distinct entry in a list, in order of first appearance.
+   @param entries: List of entries.
+   """
+   seen = set()
+   for entry in entries:
+      if entry not in seen:
+         seen.add(entry)
+         yield entry
+
+
+###################################
+# _initializeSpanWorker() function
+###################################
+
+def _initializeSpanWorker(paths, sizes, capacity, budget, overhead, locality):
+   """
+   Initializes a span worker process for L{BackupFileList.generateSpans}.
+
+   The table of paths and sizes is saved for use by L{_executeSpanWorker}.
+   (It's inherited when the worker process is forked, so it never needs to be
+   pickled.)
+
+   @param paths: List of file paths.
+   @param sizes: List of file sizes, in the same order as the paths.
+   @param capacity: Capacity of each span item, including the fixed overhead.
+   @param budget: Time budget per span item for the optimal fit algorithm, or C{None} for the default.
+   @param overhead: Fixed overhead of each span item.
+   @param locality: Largest directory group for the directory fit algorithm, or C{None} for the default.
+   """
+   global _SPAN_WORKER # pylint: disable=W0603
+   _SPAN_WORKER = (paths, sizes, capacity, budget, overhead, locality)
+
+
+################################
+# _executeSpanWorker() function
+################################
+
+def _executeSpanWorker(algorithm):
+   """
+   Splits the table saved by L{_initializeSpanWorker} using a fit algorithm.
+   @param algorithm: Knapsack (fit) algorithm to use.
+   @return: List of L{SpanItem} objects.
+   """
+   (paths, sizes, capacity, budget, overhead, locality) = _SPAN_WORKER
+   return BackupFileList._generateSpanItems(paths, sizes, capacity, algorithm, budget, overhead, locality) # pylint: disable=W0212
+
+
+##############################
+# _packDirectories() function
+##############################
+
+def _packDirectories(paths, sizes, capacity, locality):
+   """
+   Implements the directory fit bin packing algorithm.
+
+   The directory tree is walked from the top down.  Each subtree whose total
+   size is no larger than C{locality * capacity} becomes a single group, and
+   the walk doesn't go any further into it.  For a larger subtree, the files
+   directly within its top directory become one group if they're small enough
+   together, or a group each otherwise, and the walk continues into its
+   subdirectories.  The groups are then packed with L{bestFitDecreasing}.
+
+   The arguments and return value are the same as for L{firstFitDecreasing},
+   except for the list of paths, which is in the same order as the sizes.
+
+   @param paths: List of file paths
+   @param sizes: Size of each file
+   @param capacity: Capacity of each container
+   @param locality: Largest group, as a fraction of capacity
+
+   @return: List of containers as described in L{firstFitDecreasing}
+   @raise ValueError: If a file does not fit in the capacity.
+   """
+   limit = locality * capacity
+   files = { }
+   totals = { }
+   children = { }
+   roots = set()
+   for index in xrange(len(paths)):
+      directory = os.path.dirname(paths[index])
+      files.setdefault(directory, []).append(index)
+      while True:
+         totals[directory] = totals.get(directory, 0) + sizes[index]
+         parent = os.path.dirname(directory)
+         if parent == directory:
+            roots.add(directory)
+            break
+         children.setdefault(parent, set()).add(directory)
+         directory = parent
+   groups = []
+   pending = sorted(roots, reverse=True)
+   while pending:
+      directory = pending.pop()
+      if totals[directory] <= limit:
+         group = []
+         subtree = [ directory, ]
+         while subtree:
+            current = subtree.pop()
+            group.extend(files.get(current, []))
+            subtree.extend(children.get(current, []))
+         groups.append(group)
+      else:
+         direct = files.get(directory, [])
+         if sum([ sizes[index] for index in direct ]) <= limit:
+            groups.append(direct)
+         else:
+            groups.extend([ [ index, ] for index in direct ])
+         pending.extend(sorted(children.get(directory, []), reverse=True))
+   groups = [ group for group in groups if group ]
+   bins = []
+   for (indexes, used) in bestFitDecreasing([ sum([ sizes[index] for index in group ]) for group in groups ], capacity):
+      bins.append((sorted([ index for group in indexes for index in groups[group] ]), used))
+   return bins
+
+
+##########################
+# _getIsoCosts() function
+##########################
+
+def _getIsoCosts(paths, sizes):
+   """
+   Gets the estimated cost of each entry in a list when written to an ISO image.
+
+   The cost of an entry is its size rounded up to a whole number of sectors,
+   plus the cost of its directory record (see L{_getIsoRecordCost}), plus a
+   share of the cost of each directory above it.  A directory costs one sector
+   for its own extent (which holds its C{.} and C{..} records, and any records
+   left over at the end of a sector), its record in its parent and its entries
+   in the two path tables.  That cost is split evenly among all of the entries
+   below the directory.  Links cost only their directory record, which holds
+   the target of the link.
+
+   @param paths: List of entry paths.
+   @param sizes: List of entry sizes, in bytes.
+   @return: C{array.array} of entry costs, in bytes.
+   """
+   counts = { }
+   for path in paths:
+      parent = os.path.dirname(path)
+      while True:
+         counts[parent] = counts.get(parent, 0) + 1
+         if os.path.dirname(parent) == parent:
+            break
+         parent = os.path.dirname(parent)
+   shares = { }
+   def share(directory):
+      """Returns the cost each entry below a directory pays for it and the directories above it."""
+      if directory not in shares:
+         cost = ISO_SECTOR_SIZE + _getIsoRecordCost(len(os.path.basename(directory))) + (2 * ISO_PATH_SIZE)
+         shares[directory] = cost / counts[directory]
+         if os.path.dirname(directory) != directory:
+            shares[directory] += share(os.path.dirname(directory))
+      return shares[directory]
+   costs = array.array("d")
+   for index in xrange(len(paths)):
+      length = len(os.path.basename(paths[index]))
+      if os.path.islink(paths[index]):
+         length += len(os.readlink(paths[index])) + ISO_LINK_SIZE
+      sectors = math.ceil(sizes[index] / ISO_SECTOR_SIZE)
+      costs.append((sectors * ISO_SECTOR_SIZE) + _getIsoRecordCost(length) + share(os.path.dirname(paths[index])))
+   return costs
+
+
+###############################
+# _getIsoRecordCost() function
+###############################
+
+def _getIsoRecordCost(length):
+   """
+   Gets the amortized cost of a directory record in an ISO image.
+
+   Records are padded to an even length and may not cross a sector boundary,
+   so the cost is the space taken by each record in a directory full of
+   records of the same length.  Records can't be longer than
+   L{ISO_RECORD_LIMIT}, and the rest of a long Rock Ridge name is written to a
+   continuation area, which is counted byte for byte.
+
+   @param length: Length of the name, plus any other variable-length Rock Ridge fields.
+   @return: Cost of the record, in bytes.
+   """
+   length = ISO_RECORD_SIZE + length
+   length += length % 2
+   record = min(length, ISO_RECORD_LIMIT)
+   return (ISO_SECTOR_SIZE / (ISO_SECTOR_SIZE // record)) + (length - record)
+
+
+###################################
+# _getFirstExtentOffset() function
+###################################
+
+def _getFirstExtentOffset(path):
+   """
+   Gets the physical offset of the first extent of a file on disk.
+
+   This uses the Linux C{FIEMAP} ioctl, asking for a single extent.  If the
+   ioctl isn't available, isn't supported by the filesystem, or the file has
+   no extents (i.e. it's empty), then C{None} is returned.
+
+   @param path: Path of the file.
+   @return: Physical offset in bytes, or C{None} if it can't be determined.
+   """
+   if not _FIEMAP_AVAILABLE:
+      return None
+   try:
+      fd = os.open(path, os.O_RDONLY)
+      try:
+         request = struct.pack(FIEMAP_HEADER, 0, 0xFFFFFFFFFFFFFFFF, 0, 0, 1, 0)
+         request += "\0" * struct.calcsize(FIEMAP_EXTENT)
+         result = fcntl.ioctl(fd, FS_IOC_FIEMAP, request)
+      finally:
+         os.close(fd)
+   except (IOError, OSError):
+      return None
+   header = struct.calcsize(FIEMAP_HEADER)
+   mapped = struct.unpack(FIEMAP_HEADER, result[:header])[3]
+   if mapped < 1:
+      return None
+   return struct.unpack(FIEMAP_EXTENT, result[header:])[1]
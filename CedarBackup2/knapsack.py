@@ -58,11 +58,50 @@ number of collect-directory tarfiles onto a disc), worst-fit is probably the
 best choice if the goal is to include as many of the collect directories as
 possible.
 
-@sort: firstFit, bestFit, worstFit, alternateFit
+The algorithms above fill one container at a time.  To spread a large set of
+items across many containers, they have to be called once per container, and
+each call sorts all of the remaining items again.  The first-fit-decreasing
+and best-fit-decreasing algorithms instead pack every item into as many
+containers as are needed, in a single pass over a list sorted once.  They
+take a plain sequence of sizes (such as an C{array.array}) rather than a
+dictionary, and they identify items by their index in that sequence.
+
+The optimal-fit algorithm is different again.  It fills a single container,
+like the first four, but rather than making one greedy pass, it searches for
+the combination of items that comes closest to filling the container exactly,
+within a time budget.
+
+@sort: firstFit, bestFit, worstFit, alternateFit, optimalFit, firstFitDecreasing, bestFitDecreasing,
+       OPTIMAL_BUDGET, OPTIMAL_SECTOR
+
+@var OPTIMAL_BUDGET: Default time budget for L{optimalFit}, in seconds.
+@var OPTIMAL_SECTOR: Default sector size for L{optimalFit}, i.e. an ISO image sector.
 
 @author: Kenneth J. Pronovici <pronovic@ieee.org>
 """
 
+########################################################################
+# Imported modules
+########################################################################
+
+# System modules
+import math
+import time
+import bisect
+
+
+########################################################################
+# Module-wide constants and variables
+########################################################################
+
+OPTIMAL_BUDGET     = 10.0                # default time budget for optimalFit, in seconds
+OPTIMAL_SECTOR     = 2048                # default sector size for optimalFit, in bytes
+OPTIMAL_RESOLUTION = 4096                # minimum number of sectors in the capacity, for small capacities
+OPTIMAL_ITEMS      = 128                 # maximum number of items searched exactly
+OPTIMAL_MEMORY     = 32 * 1024 * 1024    # maximum memory used by the exact search, in bytes
+RESIDUAL_LOAD      = 256                 # typical number of containers in each block of a _ResidualList
+
+
 #######################################################################
 # Public functions
 #######################################################################
@@ -352,3 +391,407 @@ def alternateFit(items, capacity):
    # Return results
    return (included.keys(), used)
 
+
+########################
+# optimalFit() function
+########################
+
+def optimalFit(items, capacity, budget=OPTIMAL_BUDGET, sectorSize=OPTIMAL_SECTOR):
+
+   """
+   Implements the optimal-fit knapsack algorithm.
+
+   The greedy algorithms above often leave a few percent of the capacity
+   unused, because once a large item has been placed, nothing is ever taken
+   back out.  This algorithm searches for the subset of items whose total
+   size comes closest to the capacity (the subset-sum problem), within a
+   time budget.
+
+   Sizes are first converted into sectors, rounding up, and the capacity is
+   converted into sectors, rounding down, so the result always fits.  For
+   small capacities, the sector size is reduced so that the capacity is at
+   least L{OPTIMAL_RESOLUTION} sectors.  The largest items (as many as
+   memory allows, up to L{OPTIMAL_ITEMS}) are searched exactly, using dynamic
+   programming over the set of reachable totals, kept as bits in a long
+   integer.  Then, starting from the largest reachable total, the remaining
+   capacity is filled greedily with the rest of the items, largest first.
+   The search stops as soon as the container is exactly full, when no
+   smaller total could do any better, or when the time budget runs out.  The
+   best solution found so far is returned, and since the empty subset of the
+   largest items is always tried, the result is never worse than a plain
+   greedy pass over the sorted list.
+
+   The "size" values in the items and capacity arguments must be comparable,
+   but they are unitless from the perspective of this function.  Zero-sized
+   items and capacity are considered degenerate cases.  If capacity is zero,
+   no items fit, period, even if the items list contains zero-sized items.
+
+   The dictionary is indexed by its key, and then includes its key.  This
+   seems kind of strange on first glance.  It works this way to facilitate
+   easy sorting of the list on key if needed.
+
+   The function does not modify the list of items.
+
+   The function returns a list of chosen items and the unitless amount of
+   capacity used by the items.
+
+   @param items: Items to operate on
+   @type items: dictionary, keyed on item, of C{(item, size)} tuples, item as string and size as integer
+
+   @param capacity: Capacity of container to fit to
+   @type capacity: integer
+
+   @param budget: Time budget for the search, in seconds
+   @type budget: float
+
+   @param sectorSize: Size of one sector, in the same units as the sizes
+   @type sectorSize: integer
+
+   @returns: Tuple C{(items, used)} as described above
+   """
+
+   if capacity <= 0 or len(items) == 0:
+      return ([], 0)
+   deadline = time.time() + budget
+
+   # Convert sizes to sectors, largest first, leaving out items that can never fit
+   quantum = max(1, min(sectorSize, int(capacity) // OPTIMAL_RESOLUTION))
+   limit = int(capacity // quantum)
+   keys = sorted(items.keys(), key=lambda key: items[key][1], reverse=True)
+   weights = [ int(math.ceil(items[key][1] / float(quantum))) for key in keys ]
+   first = 0
+   while first < len(keys) and weights[first] > limit:
+      first += 1
+   last = len(keys)
+   while last > first and weights[last - 1] == 0:
+      last -= 1
+   zeros = keys[last:]    # zero-sized items always fit, so they're left out of the search
+   keys = keys[first:last]
+   weights = weights[first:last]
+
+   # Find every reachable total for the largest items
+   count = min(len(keys), OPTIMAL_ITEMS, max(1, (OPTIMAL_MEMORY * 8) // (limit + 1)))
+   mask = (1 << (limit + 1)) - 1
+   reachable = 1
+   prefix = []       # reachable totals before each item is added
+   for index in xrange(count):
+      if time.time() > deadline:
+         break
+      prefix.append(reachable)
+      reachable = (reachable | (reachable << weights[index])) & mask
+   large = len(prefix)
+   remainder = sum(weights[large:])
+
+   # Fill each reachable total (largest first) with the remaining items
+   best = (-1, 0, [])   # the empty total is always reachable, so this is always replaced
+   while reachable:
+      total = reachable.bit_length() - 1
+      reachable ^= 1 << total
+      if best[0] >= min(limit, total + remainder):
+         break
+      (filled, chosen) = _fillGreedy(weights, large, limit - total)
+      if total + filled > best[0]:
+         best = (total + filled, total, chosen)
+      if best[0] == limit or time.time() > deadline:
+         break
+
+   # Work out which of the largest items make up the chosen total
+   (unused, total, chosen) = best
+   for index in xrange(large - 1, -1, -1):
+      if not (prefix[index] >> total) & 1:
+         chosen.append(index)
+         total -= weights[index]
+
+   # Return results
+   included = [ keys[index] for index in chosen ] + zeros
+   used = 0
+   for key in included:
+      used += items[key][1]
+   return (included, used)
+
+
+################################
+# firstFitDecreasing() function
+################################
+
+def firstFitDecreasing(sizes, capacity):
+
+   """
+   Implements the first-fit-decreasing bin packing algorithm.
+
+   Items are considered from largest to smallest.  Each item goes into the
+   first (i.e. the oldest) container that still has room for it, and a new
+   container is started if none of them do.  The remaining capacity of the
+   containers is kept in a tree (see L{_ResidualTree}), so finding the right
+   container takes logarithmic time, and the whole packing takes
+   O(n log n) time for n items.  This algorithm never uses more than about
+   11/9 as many containers as the best possible packing.
+
+   The "size" values and the capacity must be comparable, but they are
+   unitless from the perspective of this function.  Zero-sized items are
+   packed along with everything else.  Every item must fit in the capacity
+   on its own.
+
+   The function returns a list of containers, in the order they were started.
+   Each container is a tuple C{(indexes, used)}, where C{indexes} is the list
+   of the indexes (into C{sizes}) of the items in the container, and C{used}
+   is the unitless amount of capacity used by those items.
+
+   @param sizes: Size of each item
+   @type sizes: Sequence of numbers, i.e. a list or an C{array.array}
+
+   @param capacity: Capacity of each container
+   @type capacity: integer
+
+   @returns: List of containers as described above
+   @raise ValueError: If an item does not fit in the capacity.
+   """
+
+   tree = _ResidualTree(capacity)
+   bins = []
+   for index in _sortDecreasing(sizes, capacity):
+      size = sizes[index]
+      binIndex = tree.find(size)
+      if binIndex == len(bins):
+         bins.append(([], 0))
+      (indexes, used) = bins[binIndex]
+      indexes.append(index)
+      bins[binIndex] = (indexes, used + size)
+      tree.update(binIndex, capacity - (used + size))
+   return bins
+
+
+###############################
+# bestFitDecreasing() function
+###############################
+
+def bestFitDecreasing(sizes, capacity):
+
+   """
+   Implements the best-fit-decreasing bin packing algorithm.
+
+   Items are considered from largest to smallest.  Each item goes into the
+   container with the least remaining capacity that still has room for it,
+   and a new container is started if none of them do.  The remaining
+   capacity of the containers is kept in sorted order in a list of blocks
+   (see L{_ResidualList}), so finding and updating the right container takes
+   logarithmic time plus a bounded amount of copying.  For n items packed
+   into m containers, the whole packing takes O(n log n) time, plus
+   O(n m / L^2) for maintaining the index of blocks of size L (see
+   L{RESIDUAL_LOAD}), which only matters once there are hundreds of thousands
+   of containers.  The packing usually needs the same number of containers
+   as first-fit-decreasing, but tends to fill the early containers more
+   completely, leaving the slack in the last one.
+
+   The arguments and return value are the same as for L{firstFitDecreasing}.
+
+   @param sizes: Size of each item
+   @type sizes: Sequence of numbers, i.e. a list or an C{array.array}
+
+   @param capacity: Capacity of each container
+   @type capacity: integer
+
+   @returns: List of containers as described in L{firstFitDecreasing}
+   @raise ValueError: If an item does not fit in the capacity.
+   """
+
+   residuals = _ResidualList()
+   bins = []
+   for index in _sortDecreasing(sizes, capacity):
+      size = sizes[index]
+      residual = residuals.pop((size, -1))
+      if residual is None:
+         binIndex = len(bins)
+         bins.append(([], 0))
+      else:
+         binIndex = residual[1]
+      (indexes, used) = bins[binIndex]
+      indexes.append(index)
+      bins[binIndex] = (indexes, used + size)
+      residuals.insert((capacity - (used + size), binIndex))
+   return bins
+
+
+#######################################################################
+# Private utility functions and classes
+#######################################################################
+
+#########################
+# _fillGreedy() function
+#########################
+
+def _fillGreedy(weights, start, remaining):
+   """
+   Greedily fills the remaining capacity with items, in order.
+   @param weights: Size of each item, largest first
+   @param start: Index of the first item to consider
+   @param remaining: Remaining capacity to fill
+   @return: Tuple C{(filled, chosen)}, the capacity filled and the list of chosen indexes.
+   """
+   filled = 0
+   chosen = []
+   for index in xrange(start, len(weights)):
+      if remaining == 0:
+         break
+      if weights[index] <= remaining:
+         chosen.append(index)
+         filled += weights[index]
+         remaining -= weights[index]
+   return (filled, chosen)
+
+
+#############################
+# _sortDecreasing() function
+#############################
+
+def _sortDecreasing(sizes, capacity):
+   """
+   Sorts the indexes of a sequence of sizes from largest to smallest size.
+   Items with the same size stay in their original order.
+   @param sizes: Size of each item
+   @param capacity: Capacity of each container
+   @return: List of indexes into C{sizes}.
+   @raise ValueError: If an item does not fit in the capacity.
+   """
+   order = sorted(xrange(len(sizes)), key=sizes.__getitem__, reverse=True)
+   if order and sizes[order[0]] > capacity:
+      raise ValueError("Item %d with size %s does not fit in capacity %s." % (order[0], sizes[order[0]], capacity))
+   return order
+
+
+#######################
+# _ResidualTree class
+#######################
+
+class _ResidualTree(object):
+
+   """
+   Tree of the remaining capacity of a set of containers.
+
+   This is a segment tree stored in a flat list, in the usual way: the node
+   at position C{i} has children at C{2i} and C{2i+1}, and each node holds
+   the largest remaining capacity among the containers below it.  The
+   leaves start at position C{leaves}, one per container.  Containers that
+   haven't been started yet have a remaining capacity of -1, so no item can
+   ever be placed in them.  The number of leaves is doubled whenever all of
+   them are in use.
+   """
+
+   def __init__(self, capacity):
+      """
+      Constructor.
+      @param capacity: Capacity of each container.
+      """
+      self.capacity = capacity
+      self.count = 0
+      self.leaves = 1
+      self.tree = [ -1, -1, ]
+
+   def find(self, size):
+      """
+      Finds the first container with enough remaining capacity for an item.
+      A new container is started if none of the existing ones have room.
+      @param size: Size of the item.
+      @return: Index of the container.
+      """
+      if self.tree[1] < size:
+         return self._start()
+      node = 1
+      while node < self.leaves:
+         node *= 2
+         if self.tree[node] < size:
+            node += 1
+      return node - self.leaves
+
+   def update(self, index, residual):
+      """
+      Sets the remaining capacity of a container.
+      @param index: Index of the container.
+      @param residual: Remaining capacity of the container.
+      """
+      tree = self.tree
+      node = index + self.leaves
+      tree[node] = residual
+      node //= 2
+      while node >= 1:
+         tree[node] = max(tree[2*node], tree[2*node + 1])
+         node //= 2
+
+   def _start(self):
+      """
+      Starts a new container with the full capacity available.
+      @return: Index of the new container.
+      """
+      if self.count == self.leaves:
+         leaves = self.tree[self.leaves:]
+         self.leaves *= 2
+         self.tree = [ -1, ] * self.leaves + leaves + [ -1, ] * (self.leaves - len(leaves))
+         for node in range(self.leaves - 1, 0, -1):
+            self.tree[node] = max(self.tree[2*node], self.tree[2*node + 1])
+      index = self.count
+      self.count += 1
+      self.update(index, self.capacity)
+      return index
+
+
+#######################
+# _ResidualList class
+#######################
+
+class _ResidualList(object):
+
+   """
+   Sorted list of the remaining capacity of a set of containers.
+
+   Each entry is a tuple C{(residual, index)}.  Rather than one long sorted
+   list, where every insert or removal shifts all of the later entries, the
+   entries are kept in a list of sorted blocks, along with a list of the
+   largest entry in each block.  Finding an entry is a binary search in each
+   list.  A block is split in two once it holds more than twice
+   L{RESIDUAL_LOAD} entries, and is dropped once it's empty, so an insert or
+   removal never shifts more than a block's worth of entries, and the list of
+   blocks only changes once every L{RESIDUAL_LOAD} or so operations.
+   """
+
+   def __init__(self):
+      """
+      Constructor.
+      """
+      self.blocks = []
+      self.maxes = []
+
+   def pop(self, key):
+      """
+      Removes the smallest entry that is no smaller than a key.
+      @param key: Key to search for.
+      @return: Entry that was removed, or C{None} if every entry is smaller than the key.
+      """
+      position = bisect.bisect_left(self.maxes, key)
+      if position == len(self.maxes):
+         return None
+      block = self.blocks[position]
+      entry = block.pop(bisect.bisect_left(block, key))
+      if block:
+         self.maxes[position] = block[-1]
+      else:
+         del self.blocks[position]
+         del self.maxes[position]
+      return entry
+
+   def insert(self, entry):
+      """
+      Adds an entry.
+      @param entry: Entry to add.
+      """
+      if not self.blocks:
+         self.blocks.append([ entry, ])
+         self.maxes.append(entry)
+         return
+      position = min(bisect.bisect_left(self.maxes, entry), len(self.maxes) - 1)
+      block = self.blocks[position]
+      bisect.insort(block, entry)
+      self.maxes[position] = block[-1]
+      if len(block) > 2 * RESIDUAL_LOAD:
+         self.blocks.insert(position + 1, block[RESIDUAL_LOAD:])
+         del block[RESIDUAL_LOAD:]
+         self.maxes.insert(position, block[-1])
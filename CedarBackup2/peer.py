@@ -60,6 +60,7 @@ import shutil
 from CedarBackup2.filesystem import FilesystemList
 from CedarBackup2.util import resolveCommand, executeCommand, isRunningAsRoot
 from CedarBackup2.util import splitCommandLine, encodePath
+from CedarBackup2.util import getIoMode, openBackupFile, closeBackupFile, IO_MODE_BACKUP
 from CedarBackup2.config import VALID_FAILURE_MODES
 
 
@@ -389,6 +390,10 @@ class LocalPeer(object):
       @param overwrite: Indicates whether it's OK to overwrite the target file.
       @type overwrite: Boolean true/false.
 
+      @note: In backup I/O mode (see L{util.setIoMode}), the source file is
+      read using L{util.openBackupFile}, so the copy doesn't disturb the page
+      cache or the source file's access time.
+
       @raise ValueError: If the passed-in source file is not a regular file.
       @raise ValueError: If a path cannot be encoded properly.
       @raise IOError: If the target file already exists.
@@ -406,7 +411,10 @@ class LocalPeer(object):
          open(targetFile, "w").write("")
       else:
          if os.path.isfile(sourceFile) and not os.path.islink(sourceFile):
-            shutil.copy(sourceFile, targetFile)
+            if getIoMode() == IO_MODE_BACKUP:
+               LocalPeer._copyBackupFile(sourceFile, targetFile)
+            else:
+               shutil.copy(sourceFile, targetFile)
          else:
             logger.debug("Source [%s] is not a regular file.", sourceFile)
             raise ValueError("Source is not a regular file.")
@@ -415,6 +423,32 @@ class LocalPeer(object):
       if permissions is not None:
          os.chmod(targetFile, permissions)
 
+   @staticmethod
+   def _copyBackupFile(sourceFile, targetFile):
+      """
+      Copies a source file to a target file, reading in backup I/O mode.
+
+      This is equivalent to C{shutil.copy}, except that the source file is
+      opened with L{util.openBackupFile} and closed with
+      L{util.closeBackupFile}.
+
+      @param sourceFile: Source file to copy
+      @param targetFile: Target file to create
+
+      @raise IOError: If there is an IO error copying the file
+      @raise OSError: If there is an OS error opening the source file
+      """
+      source = openBackupFile(sourceFile)
+      try:
+         target = open(targetFile, "wb")
+         try:
+            shutil.copyfileobj(source, target)
+         finally:
+            target.close()
+      finally:
+         closeBackupFile(source)
+      shutil.copymode(sourceFile, targetFile)
+
 
 ########################################################################
 # RemotePeer class definition
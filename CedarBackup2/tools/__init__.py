@@ -44,5 +44,5 @@ the util/ directory.
 # Using 'from CedarBackup2.tools import *' will just import the modules listed
 # in the __all__ variable.
 
-__all__ = [ 'span', 'amazons3', ]
+__all__ = [ 'span', 'amazons3', 'chunk', ]
 
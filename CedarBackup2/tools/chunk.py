@@ -0,0 +1,312 @@
+# -*- coding: iso-8859-1 -*-
+# vim: set ft=python ts=3 sw=3 expandtab:
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#
+#              C E D A R
+#          S O L U T I O N S       "Software done right."
+#           S O F T W A R E
+#
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#
+# Copyright (c) 2007-2008,2010 Kenneth J. Pronovici.
+# All rights reserved.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License,
+# Version 2, as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# Copies of the GNU General Public License are available from
+# the Free Software Foundation website, http://www.gnu.org/.
+#
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#
+# Author   : Kenneth J. Pronovici <pronovic@ieee.org>
+# Language : Python 2 (>= 2.7)
+# Project  : Cedar Backup, release 2
+# Purpose  : Rebuilds tarfiles from chunk archives
+#
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+########################################################################
+# Notes
+########################################################################
+
+"""
+Rebuilds tarfiles from chunk archives
+
+This is the Cedar Backup chunk tool.  It is intended for use when restoring
+data that was collected with the C{chunk} archive mode.  Given a manifest, it
+finds the packs holding the chunks listed in the manifest and rebuilds the
+tarfile that would have been collected in any of the other archive modes.
+The tarfile can then be extracted with C{tar} as usual.
+
+No configuration is needed, because all of the information comes from the
+command line.
+
+@author: Kenneth J. Pronovici <pronovic@ieee.org>
+"""
+
+########################################################################
+# Imported modules and constants
+########################################################################
+
+# System modules
+import sys
+import os
+import logging
+
+# Cedar Backup modules
+from CedarBackup2.release import AUTHOR, EMAIL, VERSION, DATE, COPYRIGHT
+from CedarBackup2.chunk import materializeTarfile
+from CedarBackup2.cli import Options, setupLogging
+from CedarBackup2.cli import DEFAULT_LOGFILE, DEFAULT_OWNERSHIP, DEFAULT_MODE
+from CedarBackup2.util import Diagnostics
+
+
+########################################################################
+# Module-wide constants and variables
+########################################################################
+
+logger = logging.getLogger("CedarBackup2.log.tools.chunk")
+
+
+#######################################################################
+# ChunkOptions class
+#######################################################################
+
+class ChunkOptions(Options):
+
+   """
+   Tool-specific command-line options.
+
+   Most of the cback command-line options are exactly what we need here --
+   logfile path, permissions, verbosity, etc.  The positional arguments that
+   would normally be actions are used for the manifest path, the tarfile path
+   and the list of directories to search for packs.
+
+   Also, a few extra command line options that we accept are really ignored
+   underneath.  I just don't care about that for a tool like this.
+   """
+
+   def validate(self):
+      """
+      Validates command-line options represented by the object.
+
+      Unless C{--help}, C{--version} or C{--diagnostics} are supplied, at
+      least a manifest path and a tarfile path must be specified.
+
+      @raise ValueError: If one of the validations fails.
+      """
+      if not self.help and not self.version and not self.diagnostics:
+         if self.actions is None or len(self.actions) < 2:
+            raise ValueError("A manifest path and a tarfile path must be specified.")
+
+
+#######################################################################
+# Public functions
+#######################################################################
+
+#################
+# cli() function
+#################
+
+def cli():
+   """
+   Implements the command-line interface for the C{cback-chunk} script.
+
+   Essentially, this is the "main routine" for the cback-chunk script.  It does
+   all of the argument processing for the script, and then also implements the
+   tool functionality.
+
+   A different error code is returned for each type of failure:
+
+      - C{1}: The Python interpreter version is < 2.7
+      - C{2}: Error processing command-line arguments
+      - C{3}: Error configuring logging
+      - C{5}: Rebuild was interrupted with a CTRL-C or similar
+      - C{6}: Error executing other parts of the script
+
+   Code C{4} is not used, because this tool does not read configuration.  It
+   is skipped so that the remaining codes match the other tools.
+
+   @return: Error code as described above.
+   """
+   try:
+      if map(int, [sys.version_info[0], sys.version_info[1]]) < [2, 7]:
+         sys.stderr.write("Python 2 version 2.7 or greater required.\n")
+         return 1
+   except:
+      # sys.version_info isn't available before 2.0
+      sys.stderr.write("Python 2 version 2.7 or greater required.\n")
+      return 1
+
+   try:
+      options = ChunkOptions(argumentList=sys.argv[1:])
+   except Exception, e:
+      _usage()
+      sys.stderr.write(" *** Error: %s\n" % e)
+      return 2
+
+   if options.help:
+      _usage()
+      return 0
+   if options.version:
+      _version()
+      return 0
+   if options.diagnostics:
+      _diagnostics()
+      return 0
+
+   if options.stacktrace:
+      logfile = setupLogging(options)
+   else:
+      try:
+         logfile = setupLogging(options)
+      except Exception as e:
+         sys.stderr.write("Error setting up logging: %s\n" % e)
+         return 3
+
+   logger.info("Cedar Backup 'chunk' utility run started.")
+   logger.info("Options were [%s]", options)
+   logger.info("Logfile is [%s]", logfile)
+
+   if options.stacktrace:
+      _executeAction(options)
+   else:
+      try:
+         _executeAction(options)
+      except KeyboardInterrupt:
+         logger.error("Rebuild interrupted.")
+         logger.info("Cedar Backup 'chunk' utility run completed with status 5.")
+         return 5
+      except Exception, e:
+         logger.error("Error rebuilding tarfile: %s", e)
+         logger.info("Cedar Backup 'chunk' utility run completed with status 6.")
+         return 6
+
+   logger.info("Cedar Backup 'chunk' utility run completed with status 0.")
+   return 0
+
+
+#######################################################################
+# Utility functions
+#######################################################################
+
+####################
+# _usage() function
+####################
+
+def _usage(fd=sys.stderr):
+   """
+   Prints usage information for the cback-chunk script.
+   @param fd: File descriptor used to print information.
+   @note: The C{fd} is used rather than C{print} to facilitate unit testing.
+   """
+   fd.write("\n")
+   fd.write(" Usage: cback-chunk [switches] manifest tarfile [directory ...]\n")
+   fd.write("\n")
+   fd.write(" Cedar Backup 'chunk' tool.\n")
+   fd.write("\n")
+   fd.write(" This Cedar Backup utility rebuilds a tarfile from a manifest collected\n")
+   fd.write(" using the chunk archive mode.  Packs are found by searching the listed\n")
+   fd.write(" directories, or the directory holding the manifest if none are listed.\n")
+   fd.write(" The tarfile is compressed if its name ends in .tar.gz or .tar.bz2.\n")
+   fd.write("\n")
+   fd.write(" The following switches are accepted, mostly to set up underlying\n")
+   fd.write(" Cedar Backup functionality:\n")
+   fd.write("\n")
+   fd.write("   -h, --help     Display this usage/help listing\n")
+   fd.write("   -V, --version  Display version information\n")
+   fd.write("   -b, --verbose  Print verbose output as well as logging to disk\n")
+   fd.write("   -l, --logfile  Path to logfile (default: %s)\n" % DEFAULT_LOGFILE)
+   fd.write("   -o, --owner    Logfile ownership, user:group (default: %s:%s)\n" % (DEFAULT_OWNERSHIP[0], DEFAULT_OWNERSHIP[1]))
+   fd.write("   -m, --mode     Octal logfile permissions mode (default: %o)\n" % DEFAULT_MODE)
+   fd.write("   -d, --debug    Write debugging information to the log\n")
+   fd.write("   -s, --stack    Dump a Python stack trace instead of swallowing exceptions\n")
+   fd.write("\n")
+
+
+######################
+# _version() function
+######################
+
+def _version(fd=sys.stdout):
+   """
+   Prints version information for the cback-chunk script.
+   @param fd: File descriptor used to print information.
+   @note: The C{fd} is used rather than C{print} to facilitate unit testing.
+   """
+   fd.write("\n")
+   fd.write(" Cedar Backup 'chunk' tool.\n")
+   fd.write(" Included with Cedar Backup version %s, released %s.\n" % (VERSION, DATE))
+   fd.write("\n")
+   fd.write(" Copyright (c) %s %s <%s>.\n" % (COPYRIGHT, AUTHOR, EMAIL))
+   fd.write(" See CREDITS for a list of included code and other contributors.\n")
+   fd.write(" This is free software; there is NO warranty.  See the\n")
+   fd.write(" GNU General Public License version 2 for copying conditions.\n")
+   fd.write("\n")
+   fd.write(" Use the --help option for usage information.\n")
+   fd.write("\n")
+
+
+##########################
+# _diagnostics() function
+##########################
+
+def _diagnostics(fd=sys.stdout):
+   """
+   Prints runtime diagnostics information.
+   @param fd: File descriptor used to print information.
+   @note: The C{fd} is used rather than C{print} to facilitate unit testing.
+   """
+   fd.write("\n")
+   fd.write("Diagnostics:\n")
+   fd.write("\n")
+   Diagnostics().printDiagnostics(fd=fd, prefix="   ")
+   fd.write("\n")
+
+
+############################
+# _executeAction() function
+############################
+
+def _executeAction(options):
+   """
+   Implements the guts of the cback-chunk tool.
+
+   @param options: Program command-line options.
+   @type options: ChunkOptions object.
+
+   @raise Exception: Under many generic error conditions
+   """
+   manifestPath = options.actions[0]
+   tarfilePath = options.actions[1]
+   searchDirs = options.actions[2:]
+   if not searchDirs:
+      searchDirs = [ os.path.dirname(os.path.abspath(manifestPath)), ]
+   mode = _getTarfileMode(tarfilePath)
+   logger.info("Rebuilding [%s] from manifest [%s].", tarfilePath, manifestPath)
+   logger.debug("Searching for packs in %s.", searchDirs)
+   materializeTarfile(manifestPath, searchDirs, tarfilePath, mode)
+   logger.info("Tarfile [%s] was rebuilt successfully.", tarfilePath)
+
+
+#############################
+# _getTarfileMode() function
+#############################
+
+def _getTarfileMode(tarfilePath):
+   """
+   Gets the tar creation mode to use, based on the name of a tarfile.
+   @param tarfilePath: Path of the tarfile to create.
+   @return: Tar creation mode, one of C{'tar'}, C{'targz'} or C{'tarbz2'}.
+   """
+   if tarfilePath.endswith(".tar.gz") or tarfilePath.endswith(".tgz"):
+      return "targz"
+   elif tarfilePath.endswith(".tar.bz2") or tarfilePath.endswith(".tbz2"):
+      return "tarbz2"
+   return "tar"
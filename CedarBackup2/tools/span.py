@@ -47,6 +47,10 @@ Most configuration is taken from the Cedar Backup configuration file,
 specifically the store section.  A few pieces of configuration are taken
 directly from the user.
 
+With the C{--auto} switch, the tool instead runs without asking any questions,
+so it can be run from cron.  Every fit algorithm is tried at once, and the
+best result is written (see L{_chooseSpan}).
+
 @author: Kenneth J. Pronovici <pronovic@ieee.org>
 """
 
@@ -57,6 +61,8 @@ directly from the user.
 # System modules
 import sys
 import os
+import time
+import fcntl
 import logging
 import tempfile
 
@@ -65,7 +71,9 @@ from CedarBackup2.release import AUTHOR, EMAIL, VERSION, DATE, COPYRIGHT
 from CedarBackup2.util import displayBytes, convertSize, mount, unmount
 from CedarBackup2.util import UNIT_SECTORS, UNIT_BYTES
 from CedarBackup2.config import Config
-from CedarBackup2.filesystem import BackupFileList, compareDigestMaps, normalizeDir
+from CedarBackup2.filesystem import BackupFileList, compareDigestMaps, normalizeDir, getSpanLocality
+from CedarBackup2.filesystem import DIRECTORY_LOCALITY
+from CedarBackup2.knapsack import OPTIMAL_BUDGET
 from CedarBackup2.cli import Options, setupLogging, setupPathResolver
 from CedarBackup2.cli import DEFAULT_CONFIG, DEFAULT_LOGFILE, DEFAULT_OWNERSHIP, DEFAULT_MODE
 from CedarBackup2.actions.constants import STORE_INDICATOR
@@ -81,6 +89,24 @@ from CedarBackup2.util import Diagnostics
 
 logger = logging.getLogger("CedarBackup2.log.tools.span")
 
+ALGORITHMS = { "first": "first_fit",
+               "best": "best_fit",
+               "worst": "worst_fit",
+               "alternate": "alternate_fit",
+               "optimal": "optimal_fit",
+               "ffd": "first_fit_decreasing",
+               "bfd": "best_fit_decreasing",
+               "dir": "directory_fit", }
+
+AUTO_CUSHION    = 0.5           # cushion percentage used by --auto, which always estimates ISO costs
+AUTO_MEDIA_POLL = 30            # seconds between checks for new media, when --auto needs another disc
+AUTO_MEDIA_WAIT = 4 * 60 * 60   # seconds to wait for new media before giving up
+LOCALITY_DEPTH  = 4             # depth of the per-peer directories (YYYY/MM/DD/peer) in the staging directory
+
+CDROM_DRIVE_STATUS = 0x5326      # Linux ioctl that asks a CD/DVD drive about its media
+CDSL_CURRENT       = 0x7fffffff  # slot argument for CDROM_DRIVE_STATUS, meaning the current slot
+CDS_DISC_OK        = 4           # CDROM_DRIVE_STATUS result when a disc is loaded and ready
+
 
 #######################################################################
 # SpanOptions class
@@ -97,8 +123,48 @@ class SpanOptions(Options):
 
    Also, a few extra command line options that we accept are really ignored
    underneath.  I just don't care about that for a tool like this.
+
+   There is one switch that the cback script doesn't have, C{--auto}, which
+   asks for a run without any questions.  It's picked out of the argument
+   list before the rest of the list is handed to the base class.
    """
 
+   def __init__(self, argumentList=None, argumentString=None, validate=True):
+      """
+      Initializes an options object, as for L{Options.__init__}.
+      """
+      self._auto = False
+      Options.__init__(self, argumentList, argumentString, validate)
+
+   def __cmp__(self, other):
+      """
+      Definition of equals operator for this class.
+      @param other: Other object to compare to.
+      @return: -1/0/1 depending on whether self is C{<}, C{=} or C{>} other.
+      """
+      result = Options.__cmp__(self, other)
+      if result != 0 or not isinstance(other, SpanOptions):
+         return result
+      return cmp(self.auto, other.auto)
+
+   def _setAuto(self, value):
+      """
+      Property target used to set the auto flag.
+      No validations, but we normalize the value to C{True} or C{False}.
+      """
+      if value:
+         self._auto = True
+      else:
+         self._auto = False
+
+   def _getAuto(self):
+      """
+      Property target used to get the auto flag.
+      """
+      return self._auto
+
+   auto = property(_getAuto, _setAuto, None, "Command-line auto (C{--auto}) flag.")
+
    def validate(self):
       """
       Validates command-line options represented by the object.
@@ -107,6 +173,39 @@ class SpanOptions(Options):
       """
       pass
 
+   def buildArgumentList(self, validate=True):
+      """
+      Extracts options into a list of command line arguments, as for L{Options.buildArgumentList}.
+      """
+      argumentList = Options.buildArgumentList(self, validate)
+      if self.auto:
+         argumentList.append("--auto")
+      return argumentList
+
+   def buildArgumentString(self, validate=True):
+      """
+      Extracts options into a string of command-line arguments, as for L{Options.buildArgumentString}.
+      """
+      argumentString = Options.buildArgumentString(self, validate)
+      if self.auto:
+         argumentString += "--auto "
+      return argumentString
+
+   def _parseArgumentList(self, argumentList):
+      """
+      Internal method to parse a list of command-line arguments.
+      The C{--auto} switch is handled here, and everything else is parsed by L{Options._parseArgumentList}.
+      @param argumentList: List of arguments to a command.
+      @raise ValueError: If the argument list cannot be successfully parsed.
+      """
+      remaining = []
+      for argument in argumentList:
+         if argument == "--auto":
+            self.auto = True
+         else:
+            remaining.append(argument)
+      Options._parseArgumentList(self, remaining)
+
 
 #######################################################################
 # Public functions
@@ -236,7 +335,8 @@ def _usage(fd=sys.stderr):
    fd.write(" Cedar Backup 'span' tool.\n")
    fd.write("\n")
    fd.write(" This Cedar Backup utility spans staged data between multiple discs.\n")
-   fd.write(" It is a utility, not an extension, and requires user interaction.\n")
+   fd.write(" It is a utility, not an extension, and requires user interaction\n")
+   fd.write(" unless --auto is given.\n")
    fd.write("\n")
    fd.write(" The following switches are accepted, mostly to set up underlying\n")
    fd.write(" Cedar Backup functionality:\n")
@@ -251,6 +351,7 @@ def _usage(fd=sys.stderr):
    fd.write("   -O, --output   Record some sub-command (i.e. tar) output to the log\n")
    fd.write("   -d, --debug    Write debugging information to the log (implies --output)\n")
    fd.write("   -s, --stack    Dump a Python stack trace instead of swallowing exceptions\n")
+   fd.write("   --auto         Pick the best span and write it without asking any questions\n")
    fd.write("\n")
 
 
@@ -311,6 +412,10 @@ def _executeAction(options, config):
 
    @raise Exception: Under many generic error conditions
    """
+   if options.auto:
+      _executeAutoAction(config)
+      return
+
    print ""
    print "================================================"
    print "           Cedar Backup 'span' tool"
@@ -367,13 +472,22 @@ def _executeAction(options, config):
    print ""
    print "Based on configuration, the capacity of your media is %s." % displayBytes(mediaCapacity)
 
+   print ""
+   print "Every file on a disc takes up a whole number of 2048-byte sectors,"
+   print "and the disc also needs room for directories.  Cedar Backup can"
+   print "estimate this overhead for each file, so that only a very small"
+   print "cushion is needed.  Otherwise, the cushion has to cover it."
+   print ""
+   isoCost = _getYesNoAnswer("Estimate disc overhead for each file?", default="Y")
+   print "==="
+
    print ""
    print "Since estimates are not perfect and there is some uncertainly in"
    print "media capacity calculations, it is good to have a \"cushion\","
    print "a percentage of capacity to set aside.  The cushion reduces the"
    print "capacity of your media, so a 1.5% cushion leaves 98.5% remaining."
    print ""
-   cushion = _getFloat("What cushion percentage?", default=4.5)
+   cushion = _getFloat("What cushion percentage?", default=isoCost and 0.5 or 4.5)
    print "==="
 
    realCapacity = ((100.0 - cushion)/100.0) * mediaCapacity
@@ -398,20 +512,56 @@ def _executeAction(options, config):
       print "   best.....: The \"best-fit\" algorithm"
       print "   worst....: The \"worst-fit\" algorithm"
       print "   alternate: The \"alternate-fit\" algorithm"
+      print "   optimal..: The \"optimal-fit\" algorithm"
+      print "   ffd......: The \"first-fit-decreasing\" algorithm"
+      print "   bfd......: The \"best-fit-decreasing\" algorithm"
+      print "   dir......: The \"directory-fit\" algorithm"
+      print ""
+      print "The first five fill one disc at a time.  The two \"decreasing\""
+      print "algorithms plan all of the discs at once, which is much faster"
+      print "when there are a lot of files.  The \"directory-fit\" algorithm"
+      print "also plans all of the discs at once, but tries to keep each"
+      print "directory on a single disc, so it's easier to restore."
       print ""
       print "If you don't like the results you will have a chance to try a"
       print "different one later."
       print ""
-      algorithm = _getChoiceAnswer("Which algorithm?", "worst", [ "first", "best", "worst", "alternate", ])
+      choices = [ "first", "best", "worst", "alternate", "optimal", "ffd", "bfd", "dir", ]
+      algorithm = _getChoiceAnswer("Which algorithm?", "worst", choices)
       print "==="
 
+      budget = None
+      if algorithm == "optimal":
+         print ""
+         print "The optimal-fit algorithm searches for the best way to fill each"
+         print "disc, for as long as you let it."
+         print ""
+         budget = _getFloat("How many seconds per disc?", default=OPTIMAL_BUDGET)
+         print "==="
+
+      locality = None
+      if algorithm == "dir":
+         print ""
+         print "The directory-fit algorithm keeps each directory together if it"
+         print "is no larger than some fraction of a disc.  A fraction of 1.0"
+         print "keeps together everything that fits on one disc.  Smaller"
+         print "fractions split up more directories, but usually fill the discs"
+         print "better."
+         print ""
+         locality = _getFloat("What fraction of a disc?", default=DIRECTORY_LOCALITY)
+         while locality < 0.0 or locality > 1.0:
+            print "Fraction must be between 0.0 and 1.0."
+            locality = _getFloat("What fraction of a disc?", default=DIRECTORY_LOCALITY)
+         print "==="
+
       print ""
       print "Please wait, generating file lists (this may take a while)..."
-      spanSet = fileList.generateSpan(capacity=realCapacity, algorithm="%s_fit" % algorithm)
+      spanSet = fileList.generateSpan(capacity=realCapacity, algorithm=ALGORITHMS[algorithm], budget=budget,
+                                      isoCost=isoCost, locality=locality)
       print "==="
 
       print ""
-      print "Using the \"%s-fit\" algorithm, Cedar Backup can split your data" % algorithm
+      print "Using the \"%s\" algorithm, Cedar Backup can split your data" % ALGORITHMS[algorithm].replace("_", "-")
       print "into %d discs." % len(spanSet)
       print ""
       counter = 0
@@ -420,6 +570,8 @@ def _executeAction(options, config):
          print "Disc %d: %d files, %s, %.2f%% utilization" % (counter, len(item.fileList),
                                                               displayBytes(item.size), item.utilization)
       print ""
+      _printLocality(config, spanSet)
+      print ""
       if _getYesNoAnswer("Accept this solution?", default="Y"):
          happy = True
       print "==="
@@ -443,6 +595,234 @@ def _executeAction(options, config):
    print "Completed writing all discs."
 
 
+################################
+# _executeAutoAction() function
+################################
+
+def _executeAutoAction(config):
+   """
+   Implements the cback-span tool for the C{--auto} switch.
+
+   Nothing is printed and no questions are asked.  The overhead of the ISO
+   filesystem is always estimated, so the cushion is just L{AUTO_CUSHION}.
+   Every fit algorithm is tried at once in worker processes, and the best
+   result (see L{_chooseSpan}) is written to disc.
+
+   The first disc is written to whatever media is in the device, just like
+   the store action.  If more discs are needed, the tray is opened after each
+   disc, and we wait (see L{_waitForMedia}) until the disc has been replaced
+   with usable media, which must not be any of the discs written so far.  Any
+   failure is fatal, since there's nobody to ask about a retry.
+
+   @param config: Program configuration.
+   @type config: Config object.
+
+   @raise Exception: Under many generic error conditions
+   """
+   logger.info("Running without interaction, per the --auto switch.")
+   (writer, mediaCapacity) = _getWriter(config)
+   (dailyDirs, fileList) = _findDailyDirs(config.store.sourceDir)
+   if not dailyDirs:
+      logger.info("There are no daily staging directories that need to be written.")
+      return
+   logger.info("Spanning %d daily staging directories, %s of data.", len(dailyDirs), displayBytes(fileList.totalSize()))
+   realCapacity = ((100.0 - AUTO_CUSHION)/100.0) * mediaCapacity
+   spanSets = fileList.generateSpans(realCapacity, sorted(ALGORITHMS.values()), isoCost=True)
+   (algorithm, spanSet) = _chooseSpan(spanSets)
+   logger.info("Using the [%s] algorithm, which needs %d discs.", algorithm, len(spanSet))
+   for (directory, count) in sorted(_getLocality(config, spanSet).items()):
+      if count > 1:
+         logger.info("Restoring [%s] will need %d discs.", directory, count)
+   written = []
+   for spanItem in spanSet:
+      logger.info("Writing disc %d: %d files, %s, %.2f%% utilization.", len(written) + 1, len(spanItem.fileList),
+                  displayBytes(spanItem.size), spanItem.utilization)
+      if written:
+         writer.openTray()
+         _waitForMedia(config, writer, written)
+      _buildImage(config, writer, spanItem)
+      writer.writeImage()
+      if config.store.checkData:
+         _consistencyCheck(config, spanItem.fileList)
+      written.append(spanItem)
+   _writeStoreIndicator(config, dailyDirs)
+   logger.info("Completed writing all discs.")
+
+
+#########################
+# _chooseSpan() function
+#########################
+
+def _chooseSpan(spanSets):
+   """
+   Chooses the best of several ways to span data across discs.
+
+   The best span is the one that needs the fewest discs.  Among spans with
+   the same number of discs, the total amount of data is the same, so the
+   average utilization is also the same.  Instead, the discs are compared from
+   fullest to emptiest, and the span that fills its discs fuller first is the
+   best, since it leaves the most room on the last disc.  Any remaining tie
+   goes to the algorithm whose name sorts first.
+
+   @param spanSets: Dictionary mapping algorithm to list of L{SpanItem} objects.
+   @return: Tuple C{(algorithm, spanSet)} for the best span.
+   """
+   def rank(algorithm):
+      """Returns a sort key for an algorithm's span, which is smallest for the best span."""
+      utilizations = sorted([ spanItem.utilization for spanItem in spanSets[algorithm] ], reverse=True)
+      return (len(spanSets[algorithm]), [ -utilization for utilization in utilizations ], algorithm)
+   algorithm = min(spanSets.keys(), key=rank)
+   return (algorithm, spanSets[algorithm])
+
+
+##########################
+# _getLocality() function
+##########################
+
+def _getLocality(config, spanSet):
+   """
+   Counts how many discs would be needed to restore each peer's daily directory.
+   @param config: Cedar Backup configuration
+   @param spanSet: List of L{SpanItem} objects
+   @return: Dictionary mapping directory to number of discs, as from L{getSpanLocality}.
+   """
+   return getSpanLocality(spanSet, config.store.sourceDir, LOCALITY_DEPTH)
+
+
+############################
+# _printLocality() function
+############################
+
+def _printLocality(config, spanSet):
+   """
+   Prints a summary of how many discs would be needed to restore each directory.
+   @param config: Cedar Backup configuration
+   @param spanSet: List of L{SpanItem} objects
+   """
+   locality = _getLocality(config, spanSet)
+   split = [ directory for directory in sorted(locality.keys()) if locality[directory] > 1 ]
+   if not split:
+      print "Each of the %d directories can be restored from a single disc." % len(locality)
+   else:
+      print "Of the %d directories, %d are split across discs:" % (len(locality), len(split))
+      for directory in split:
+         print "   %s: %d discs" % (directory, locality[directory])
+
+
+###########################
+# _waitForMedia() function
+###########################
+
+def _waitForMedia(config, writer, written):
+   """
+   Waits for the disc that was just written to be replaced with usable media.
+
+   Every disc is written from scratch, so any media of the configured type
+   has room for the next span item.  What matters is that the disc really was
+   replaced.  The media capacity can't tell us that: an empty tray, a disc
+   that can't be read, and (on a drive without multisession support) the disc
+   that was just written are all reported as having the whole disc free, and
+   an underfilled disc has some room left anyway.
+
+   Instead, the drive is asked about its media every L{AUTO_MEDIA_POLL}
+   seconds (see L{_getDriveStatus}).  Once the tray has been seen open or
+   empty and a disc has been loaded again, the disc is checked (see
+   L{_getDiscState}).  A blank disc can be used.  A disc that already holds
+   data can only be used if the media is rewritable, and never if it's one of
+   the discs written so far, not just the one that was written last.
+   Whenever there's any doubt, we give up rather than risk writing over one
+   of those discs, and the operator has to write the remaining discs by hand.
+
+   @param config: Cedar Backup configuration
+   @param writer: Writer to use
+   @param written: List of span items written so far, the last of which is on the disc that must be replaced
+
+   @raise IOError: If the disc is not replaced with usable media within L{AUTO_MEDIA_WAIT} seconds.
+   """
+   logger.info("Waiting for the disc in [%s] to be replaced.", config.store.devicePath)
+   deadline = time.time() + AUTO_MEDIA_WAIT
+   removed = False
+   while True:
+      status = _getDriveStatus(config.store.devicePath)
+      if status is None:
+         raise IOError("Unable to tell whether the disc in [%s] was replaced; write the remaining discs by hand." %
+                       config.store.devicePath)
+      elif status != CDS_DISC_OK:
+         removed = True
+      elif removed:
+         state = _getDiscState(config, written)
+         if state == "same":
+            raise IOError("A disc that was already written was loaded again; write the remaining discs by hand.")
+         elif state == "used" and not writer.isRewritable():
+            raise IOError("The disc that was loaded already holds data and is not rewritable; write the remaining discs by hand.")
+         logger.info("A %s disc was loaded; continuing.", state)
+         return
+      if time.time() > deadline:
+         raise IOError("The disc was not replaced within %d seconds; write the remaining discs by hand." % AUTO_MEDIA_WAIT)
+      time.sleep(AUTO_MEDIA_POLL)
+
+
+#############################
+# _getDriveStatus() function
+#############################
+
+def _getDriveStatus(devicePath):
+   """
+   Asks a CD/DVD drive about the state of its media.
+
+   @warning: The implementation of this function is Linux-specific.
+
+   @param devicePath: Path to the backup device
+
+   @return: One of the Linux C{CDS_*} drive status values, or C{None} if the drive can't be asked.
+   """
+   try:
+      fd = os.open(devicePath, os.O_RDONLY | os.O_NONBLOCK)
+      try:
+         return fcntl.ioctl(fd, CDROM_DRIVE_STATUS, CDSL_CURRENT)
+      finally:
+         os.close(fd)
+   except (IOError, OSError), e:
+      logger.debug("Unable to get drive status for [%s]: %s", devicePath, e)
+      return None
+
+
+###########################
+# _getDiscState() function
+###########################
+
+def _getDiscState(config, spanItems):
+   """
+   Checks whether the disc in the backup device is blank, or is a disc one of several span items was written to.
+
+   The device is mounted at a temporary mount point in the working directory,
+   just like for the consistency check.  If it can't be mounted, the disc is
+   taken to be blank.  Otherwise, it's a disc one of the span items was
+   written to if any of that span item's files is on it, with the same size.
+
+   @warning: The implementation of this function is very UNIX-specific.
+
+   @param config: Cedar Backup configuration
+   @param spanItems: List of span items that were written to disc
+
+   @return: C{"blank"}, C{"same"} for a disc one of the span items was written to, or C{"used"} for any other disc.
+   """
+   mountPoint = tempfile.mkdtemp(dir=config.options.workingDir)
+   try:
+      try:
+         mount(config.store.devicePath, mountPoint, "iso9660")
+      except IOError:
+         return "blank"
+      for spanItem in spanItems:
+         for path in spanItem.fileList:
+            discPath = os.path.join(mountPoint, path.replace(config.store.sourceDir, "", 1).lstrip(os.sep))
+            if os.path.isfile(discPath) and os.path.getsize(discPath) == os.path.getsize(path):
+               return "same"
+      return "used"
+   finally:
+      unmount(mountPoint, True, 5, 1)  # try 5 times, and remove mount point when done
+
+
 ############################
 # _findDailyDirs() function
 ############################
@@ -534,10 +914,7 @@ def _discInitializeImage(config, writer, spanItem):
    while not complete:
       try:
          print "Initializing image..."
-         writer.initializeImage(newDisc=True, tmpdir=config.options.workingDir)
-         for path in spanItem.fileList:
-            graftPoint = os.path.dirname(path.replace(config.store.sourceDir, "", 1))
-            writer.addImageEntry(path, graftPoint)
+         _buildImage(config, writer, spanItem)
          complete = True
       except KeyboardInterrupt, e:
          raise e
@@ -549,6 +926,18 @@ def _discInitializeImage(config, writer, spanItem):
          print "==="
    print "Completed initializing image."
 
+def _buildImage(config, writer, spanItem):
+   """
+   Initializes the writer's ISO image with the contents of a span item.
+   @param config: Cedar Backup configuration
+   @param writer: Writer to use
+   @param spanItem: Span item to write
+   """
+   writer.initializeImage(newDisc=True, tmpdir=config.options.workingDir)
+   for path in spanItem.fileList:
+      graftPoint = os.path.dirname(path.replace(config.store.sourceDir, "", 1))
+      writer.addImageEntry(path, graftPoint)
+
 # pylint: disable=W0613
 def _discWriteImage(config, writer):
    """
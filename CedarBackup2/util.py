@@ -45,11 +45,13 @@ Provides general-purpose utilities.
        RegexList, _Vertex, DirectedGraph, PathResolverSingleton,
        sortDict, convertSize, getUidGid, changeOwnership, splitCommandLine,
        resolveCommand, executeCommand, calculateFileAge, encodePath, nullDevice,
-       deriveDayOfWeek, isStartOfWeek, buildNormalizedPath,
+       deriveDayOfWeek, isStartOfWeek, buildNormalizedPath, adviseFileAccess,
+       setIoMode, getIoMode, openBackupFile, closeBackupFile,
        ISO_SECTOR_SIZE, BYTES_PER_SECTOR,
        BYTES_PER_KBYTE, BYTES_PER_MBYTE, BYTES_PER_GBYTE, KBYTES_PER_MBYTE, MBYTES_PER_GBYTE,
        SECONDS_PER_MINUTE, MINUTES_PER_HOUR, HOURS_PER_DAY, SECONDS_PER_DAY,
-       UNIT_BYTES, UNIT_KBYTES, UNIT_MBYTES, UNIT_GBYTES, UNIT_SECTORS
+       UNIT_BYTES, UNIT_KBYTES, UNIT_MBYTES, UNIT_GBYTES, UNIT_SECTORS,
+       IO_MODE_NORMAL, IO_MODE_BACKUP
 
 @var ISO_SECTOR_SIZE: Size of an ISO image sector, in bytes.
 @var BYTES_PER_SECTOR: Number of bytes (B) per ISO sector.
@@ -67,6 +69,12 @@ Provides general-purpose utilities.
 @var UNIT_MBYTES: Constant representing the megabyte (MB) unit for conversion.
 @var UNIT_GBYTES: Constant representing the gigabyte (GB) unit for conversion.
 @var UNIT_SECTORS: Constant representing the ISO sector unit for conversion.
+@var POSIX_FADV_NORMAL: Access advice indicating no special treatment.
+@var POSIX_FADV_SEQUENTIAL: Access advice indicating data will be read sequentially.
+@var POSIX_FADV_WILLNEED: Access advice indicating data will be needed soon.
+@var POSIX_FADV_DONTNEED: Access advice indicating data will not be needed again.
+@var IO_MODE_NORMAL: I/O mode in which backup reads are ordinary reads.
+@var IO_MODE_BACKUP: I/O mode in which backup reads try to leave the page cache and atimes alone.
 
 @author: Kenneth J. Pronovici <pronovic@ieee.org>
 """
@@ -80,6 +88,7 @@ import sys
 import math
 import os
 import re
+import errno
 import time
 import logging
 import string  # pylint: disable=W0402
@@ -92,6 +101,14 @@ try:
 except ImportError:
    _UID_GID_AVAILABLE = False
 
+try:
+   import ctypes
+   _POSIX_FADVISE = ctypes.CDLL(None, use_errno=True).posix_fadvise
+   _POSIX_FADVISE.argtypes = [ ctypes.c_int, ctypes.c_int64, ctypes.c_int64, ctypes.c_int, ]
+   _FADVISE_AVAILABLE = True
+except (ImportError, OSError, AttributeError):
+   _FADVISE_AVAILABLE = False
+
 from CedarBackup2.release import VERSION, DATE
 
 
@@ -122,6 +139,23 @@ UNIT_MBYTES        = 2
 UNIT_GBYTES        = 4
 UNIT_SECTORS       = 3
 
+POSIX_FADV_NORMAL     = 0
+POSIX_FADV_SEQUENTIAL = 2
+POSIX_FADV_WILLNEED   = 3
+POSIX_FADV_DONTNEED   = 4
+
+IO_MODE_NORMAL     = "normal"
+IO_MODE_BACKUP     = "backup"
+
+if hasattr(os, "O_NOATIME"):
+   O_NOATIME = os.O_NOATIME
+elif sys.platform.startswith("linux"):
+   O_NOATIME = 01000000   # not exposed by the Python 2 os module
+else:
+   O_NOATIME = 0
+
+_IO_MODE = IO_MODE_NORMAL  # set from configuration via setIoMode()
+
 MTAB_FILE          = "/etc/mtab"
 
 MOUNT_COMMAND      = [ "mount", ]
@@ -1545,6 +1579,132 @@ def calculateFileAge(path):
    return ageInDays
 
 
+##############################
+# adviseFileAccess() function
+##############################
+
+def adviseFileAccess(fd, advice, offset=0, length=0):
+   """
+   Advises the kernel about how an open file is going to be accessed.
+
+   This is a wrapper around the C{posix_fadvise(2)} system call, which isn't
+   exposed by the Python 2 C{os} module.  Advice is only a hint, so failures
+   are ignored.  On platforms where the call isn't available, this function
+   does nothing.
+
+   @param fd: Open file descriptor.
+   @param advice: One of the C{POSIX_FADV_*} constants.
+   @param offset: Offset of the region the advice applies to.
+   @param length: Length of the region, where zero means "to the end of the file".
+
+   @return: True if the advice was accepted, False otherwise.
+   """
+   if not _FADVISE_AVAILABLE:
+      return False
+   try:
+      return _POSIX_FADVISE(fd, offset, length, advice) == 0
+   except Exception:
+      return False
+
+
+#######################
+# setIoMode() function
+#######################
+
+def setIoMode(mode):
+   """
+   Sets the I/O mode used when reading files for backup.
+
+   In the C{IO_MODE_NORMAL} mode, files are just opened and read.  In the
+   C{IO_MODE_BACKUP} mode, L{openBackupFile} and L{closeBackupFile} try to
+   keep a backup from disturbing the rest of the system.  Files are opened
+   with C{O_NOATIME} where that's permitted, the kernel is told that the file
+   will be read sequentially, and the file's pages are dropped from the page
+   cache once it has been read, so a nightly backup doesn't evict the working
+   set of the machine being backed up.
+
+   The mode is global to the process, and is normally set once from the
+   options configuration when the program starts.
+
+   @param mode: I/O mode, either C{IO_MODE_NORMAL} or C{IO_MODE_BACKUP}.
+   @raise ValueError: If the mode is not valid.
+   """
+   global _IO_MODE # pylint: disable=W0603
+   if mode not in [ IO_MODE_NORMAL, IO_MODE_BACKUP, ]:
+      raise ValueError("I/O mode must be one of %s." % [ IO_MODE_NORMAL, IO_MODE_BACKUP, ])
+   logger.debug("Using I/O mode [%s].", mode)
+   _IO_MODE = mode
+
+
+#######################
+# getIoMode() function
+#######################
+
+def getIoMode():
+   """
+   Gets the I/O mode used when reading files for backup.
+   @return: I/O mode, either C{IO_MODE_NORMAL} or C{IO_MODE_BACKUP}.
+   """
+   return _IO_MODE
+
+
+############################
+# openBackupFile() function
+############################
+
+def openBackupFile(path):
+   """
+   Opens a file for reading as part of a backup.
+
+   The file is opened in binary mode, according to the current I/O mode (see
+   L{setIoMode}).  In backup mode, we first try to open the file with
+   C{O_NOATIME}, which is only permitted for the owner of the file (or root).
+   If that's refused, the file is opened normally.  Either way, the kernel is
+   then advised that the file will be read sequentially.
+
+   Files opened with this function should be closed with L{closeBackupFile}.
+
+   @param path: Path of the file to open.
+   @return: File object open for reading.
+   @raise OSError: If the file cannot be opened.
+   """
+   if _IO_MODE != IO_MODE_BACKUP:
+      return os.fdopen(os.open(path, os.O_RDONLY), "rb")
+   fd = None
+   if O_NOATIME:
+      try:
+         fd = os.open(path, os.O_RDONLY | O_NOATIME)
+      except OSError, e:
+         if e.errno not in (errno.EPERM, errno.EINVAL):
+            raise e
+   if fd is None:
+      fd = os.open(path, os.O_RDONLY)
+   adviseFileAccess(fd, POSIX_FADV_SEQUENTIAL)
+   return os.fdopen(fd, "rb")
+
+
+#############################
+# closeBackupFile() function
+#############################
+
+def closeBackupFile(fileobj):
+   """
+   Closes a file that was opened with L{openBackupFile}.
+
+   In backup mode, the kernel is advised that the file's pages won't be
+   needed again before the file is closed, so they can be dropped from the
+   page cache.  Objects which aren't real files (for instance, a C{StringIO}
+   holding data that was already read) are just closed.
+
+   @param fileobj: File object to close.
+   """
+   try:
+      if _IO_MODE == IO_MODE_BACKUP and isinstance(fileobj, file):
+         adviseFileAccess(fileobj.fileno(), POSIX_FADV_DONTNEED)
+   finally:
+      fileobj.close()
+
+
 ###################
 # mount() function
 ###################
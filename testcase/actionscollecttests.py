@@ -0,0 +1,877 @@
+#!/usr/bin/env python
+# -*- coding: iso-8859-1 -*-
+# vim: set ft=python ts=3 sw=3 expandtab:
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#
+#              C E D A R
+#          S O L U T I O N S       "Software done right."
+#           S O F T W A R E
+#
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#
+# Copyright (c) 2007,2010 Kenneth J. Pronovici.
+# All rights reserved.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License,
+# Version 2, as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# Copies of the GNU General Public License are available from
+# the Free Software Foundation website, http://www.gnu.org/.
+#
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#
+# Author   : Kenneth J. Pronovici <pronovic@ieee.org>
+# Language : Python 2 (>= 2.7)
+# Project  : Cedar Backup, release 2
+# Purpose  : Tests collect action functionality.
+#
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+########################################################################
+# Module documentation
+########################################################################
+
+"""
+Unit tests for CedarBackup2/actions/collect.py.
+
+Code Coverage
+=============
+
+   This module contains tests for the private functions in actions/collect.py
+   that decide how collect jobs are scheduled and executed.  The collect
+   action as a whole needs a lot of configuration and a real filesystem to
+   work against, so most of these tests call the private functions directly,
+   using small collect jobs defined in this module.
+
+Naming Conventions
+==================
+
+   I prefer to avoid large unit tests which validate more than one piece of
+   functionality, and I prefer to avoid using overly descriptive (read: long)
+   test names, as well.  Instead, I use lots of very small tests that each
+   validate one specific thing.  These small tests are then named with an index
+   number, yielding something like C{testAddDir_001} or C{testValidate_010}.
+   Each method has a docstring describing what it's supposed to accomplish.  I
+   feel that this makes it easier to judge how important a given failure is,
+   and also makes it somewhat easier to diagnose and fix individual problems.
+
+Full vs. Reduced Tests
+======================
+
+   All of the tests in this module are considered safe to be run in an average
+   build environment.  There is a no need to use a ACTIONSCOLLECTTESTS_FULL
+   environment variable to provide a "reduced feature set" test suite as for
+   some of the other test modules.
+
+@author Kenneth J. Pronovici <pronovic@ieee.org>
+"""
+
+
+########################################################################
+# Import modules and do runtime validations
+########################################################################
+
+import os
+import time
+import shutil
+import hashlib
+import logging
+import tarfile
+import unittest
+import tempfile
+import multiprocessing
+from CedarBackup2.testutil import removedir
+from CedarBackup2.util import buildNormalizedPath
+from CedarBackup2.filesystem import BackupFileList
+from CedarBackup2.chunk import materializeTarfile
+from CedarBackup2.cli import Options
+from CedarBackup2.config import Config, OptionsConfig, CollectConfig, CollectFile, CollectDir, StageConfig, LocalPeer
+from CedarBackup2.actions import collect
+from CedarBackup2.actions.constants import COLLECT_INDICATOR
+from CedarBackup2.actions.collect import executeCollect, DAYS_OF_WEEK
+from CedarBackup2.actions.collect import _executeJobs, _writeStatistics, _chooseCompression
+from CedarBackup2.actions.collect import _getFileGroupItems, _collectFileGroup, _getCollectItems
+from CedarBackup2.actions.collect import _getDigestPath, _getTarfilePath, _loadDeferred, _writeDeferred
+from CedarBackup2.actions.collect import _getFullDays, _loadSchedule, _writeSchedule, _updateSchedule
+from CedarBackup2.actions.collect import _getChunkPackPath, _getChunkIndexPath
+from CedarBackup2.actions.collect import _getSyntheticArchives, _loadFullDate, _writeFullDate, _getFullDatePath
+
+
+#######################################################################
+# Module-wide configuration and constants
+#######################################################################
+
+_SUBMITTED = []   # Jobs submitted to the fake pool, in order
+_DEADLINES = []   # Archive deadlines seen by collect jobs
+
+
+#######################################################################
+# Utility functions and classes
+#######################################################################
+
+def _quietJob(config, name): # pylint: disable=W0613
+   """Collect job which does nothing."""
+   return 0
+
+def _loggingJob(config, name): # pylint: disable=W0613
+   """Collect job which just writes a log message."""
+   logging.getLogger("CedarBackup2.log.actions.collect").info("Collected job [%s].", name)
+   return 0
+
+def _failingJob(config, name): # pylint: disable=W0613
+   """Collect job which always fails."""
+   raise ValueError("Job [%s] failed." % name)
+
+def _deadlineJob(config, name): # pylint: disable=W0613
+   """Collect job which records the archive deadline in effect."""
+   _DEADLINES.append(collect._ARCHIVE_DEADLINE) # pylint: disable=W0212
+   return 0
+
+class _FakeResult(object):
+   """Result of a job submitted to L{_FakePool}."""
+   def get(self):
+      return (0.0, [], None, False, 0, None)
+
+class _FakePool(object):
+   """Stands in for C{multiprocessing.Pool}, recording the order of submitted jobs."""
+   def __init__(self, processes=None, initializer=None, initargs=()):
+      pass
+   def apply_async(self, function, args): # pylint: disable=C0103,W0613
+      _SUBMITTED.append(args[1][0])
+      return _FakeResult()
+   def close(self):
+      pass
+   def terminate(self):
+      pass
+   def join(self):
+      pass
+
+class _CaptureHandler(logging.Handler):
+   """Log handler which keeps the messages it is given."""
+   def __init__(self):
+      logging.Handler.__init__(self)
+      self.messages = []
+   def emit(self, record):
+      self.messages.append(record.getMessage())
+
+
+#######################################################################
+# Test Case Classes
+#######################################################################
+
+######################
+# TestFunctions class
+######################
+
+class TestFunctions(unittest.TestCase):
+
+   """Tests for the various private functions."""
+
+   ################
+   # Setup methods
+   ################
+
+   def setUp(self):
+      try:
+         self.tmpdir = tempfile.mkdtemp()
+         self.handler = _CaptureHandler()
+         self.level = logging.getLogger("CedarBackup2.log").level
+         logging.getLogger("CedarBackup2.log").addHandler(self.handler)
+         logging.getLogger("CedarBackup2.log").setLevel(logging.INFO)
+         del _SUBMITTED[:]
+         del _DEADLINES[:]
+      except Exception, e:
+         self.fail(e)
+
+   def tearDown(self):
+      logging.getLogger("CedarBackup2.log").removeHandler(self.handler)
+      logging.getLogger("CedarBackup2.log").setLevel(self.level)
+      try:
+         removedir(self.tmpdir)
+      except: pass
+
+
+   ##################
+   # Utility methods
+   ##################
+
+   def buildConfig(self, workerCount=1, archiveBudget=None):
+      """Builds a config object which works against the temporary directory."""
+      config = Config()
+      config.options = OptionsConfig(startingDay="monday", workingDir=self.tmpdir)
+      config.collect = CollectConfig(targetDir=self.tmpdir, workerCount=workerCount, archiveBudget=archiveBudget)
+      return config
+
+   def buildGroupConfig(self, collectFiles):
+      """Builds a config object with grouped collect files, each a tuple C{(path, collectMode, archiveMode)}."""
+      config = self.buildConfig()
+      config.collect.groupFiles = True
+      config.collect.collectMode = "daily"
+      config.collect.archiveMode = "tar"
+      config.collect.collectFiles = [ CollectFile(absolutePath, collectMode, archiveMode)
+                                      for (absolutePath, collectMode, archiveMode) in collectFiles ]
+      return config
+
+   def buildDirConfig(self, names, collectMode="daily", fullSchedule=None, archiveMode="tar"):
+      """Builds a config object with a collect directory, under a separate target directory, for each name."""
+      config = self.buildConfig()
+      config.options.startingDay = DAYS_OF_WEEK[(time.localtime().tm_wday + 1) % len(DAYS_OF_WEEK)]  # never today
+      config.collect.targetDir = os.path.join(self.tmpdir, "target")
+      os.mkdir(config.collect.targetDir)
+      config.collect.collectMode = collectMode
+      config.collect.archiveMode = archiveMode
+      config.collect.fullSchedule = fullSchedule
+      config.collect.collectDirs = [ CollectDir(os.path.join(self.tmpdir, name)) for name in names ]
+      return config
+
+   def buildDir(self, name, size):
+      """Creates a directory in the temporary directory, holding one file of the indicated size."""
+      path = os.path.join(self.tmpdir, name)
+      if not os.path.isdir(path):
+         os.mkdir(path)
+      open(os.path.join(path, "file"), "w").write("x" * size)
+      return path
+
+   def executeWithDeadline(self, config, deadline):
+      """Executes the collect action with a collect deadline that is the indicated offset from now."""
+      original = collect._getCollectDeadline # pylint: disable=W0212
+      collect._getCollectDeadline = lambda config, start: start + deadline # pylint: disable=W0212
+      try:
+         executeCollect(None, Options(), config)
+      finally:
+         collect._getCollectDeadline = original # pylint: disable=W0212
+
+   def readIndicator(self, config):
+      """Reads the contents of the collect indicator."""
+      return open(os.path.join(config.collect.targetDir, COLLECT_INDICATOR)).read()
+
+   def buildFile(self, name, contents):
+      """Writes a file into the temporary directory, returning its path."""
+      path = os.path.join(self.tmpdir, name)
+      open(path, "w").write(contents)
+      return path
+
+   def executeWithFakePool(self, config, items, priority=None):
+      """Executes jobs with L{_FakePool} in place of the real pool, returning the submission order."""
+      original = multiprocessing.Pool
+      multiprocessing.Pool = _FakePool
+      try:
+         _executeJobs(config, items, priority=priority)
+      finally:
+         multiprocessing.Pool = original
+      return _SUBMITTED[:]
+
+
+   ######################
+   # Test _executeJobs()
+   ######################
+
+   def testExecuteJobs_001(self):
+      """
+      Test that jobs are submitted longest first, based on the previous run.
+      """
+      config = self.buildConfig(workerCount=2)
+      _writeStatistics(config, { "/a": { "duration": 5.0, "bytes": 10, },
+                                 "/b": { "duration": 50.0, "bytes": 10, },
+                                 "/c": { "duration": 20.0, "bytes": 10, }, })
+      items = [ ("%s", "/a", [ ("/a", _quietJob, ("a", )), ]),
+                ("%s", "/b", [ ("/b", _quietJob, ("b", )), ]),
+                ("%s", "/c", [ ("/c", _quietJob, ("c", )), ]), ]
+      self.failUnlessEqual([ "b", "c", "a", ], self.executeWithFakePool(config, items))
+
+   def testExecuteJobs_002(self):
+      """
+      Test that jobs with no previous duration are submitted before all others.
+      """
+      config = self.buildConfig(workerCount=2)
+      _writeStatistics(config, { "/a": { "duration": 5.0, "bytes": 10, },
+                                 "/b": { "duration": 50.0, "bytes": 10, }, })
+      items = [ ("%s", "/a", [ ("/a", _quietJob, ("a", )), ]),
+                ("%s", "/b", [ ("/b", _quietJob, ("b", )), ]),
+                ("%s", "/c", [ ("/c", _quietJob, ("c", )), ]), ]
+      self.failUnlessEqual([ "c", "b", "a", ], self.executeWithFakePool(config, items))
+
+   def testExecuteJobs_003(self):
+      """
+      Test that jobs for deferred items are submitted before all others.
+      """
+      config = self.buildConfig(workerCount=2)
+      _writeStatistics(config, { "/a": { "duration": 5.0, "bytes": 10, },
+                                 "/b": { "duration": 50.0, "bytes": 10, }, })
+      items = [ ("%s", "/a", [ ("/a", _quietJob, ("a", )), ]),
+                ("%s", "/b", [ ("/b", _quietJob, ("b", )), ]),
+                ("%s", "/c", [ ("/c", _quietJob, ("c", )), ]), ]
+      self.failUnlessEqual([ "a", "c", "b", ], self.executeWithFakePool(config, items, priority=[ "/a", ]))
+
+   def testExecuteJobs_004(self):
+      """
+      Test that log messages from worker processes are emitted in the parent, in configuration order.
+      """
+      config = self.buildConfig(workerCount=2)
+      items = [ ("Completed [%s]", "/a", [ ("/a", _loggingJob, ("a", )), ]),
+                ("Completed [%s]", "/b", [ ("/b", _loggingJob, ("b", )), ]), ]
+      deferred = _executeJobs(config, items)
+      self.failUnlessEqual([], deferred)
+      messages = [ message for message in self.handler.messages if message.startswith("Collected") ]
+      self.failUnlessEqual([ "Collected job [a].", "Collected job [b].", ], messages)
+      self.failUnless("Completed [/a]" in self.handler.messages)
+      self.failUnless("Completed [/b]" in self.handler.messages)
+
+   def testExecuteJobs_005(self):
+      """
+      Test that a failure in a worker process fails the action, and that its traceback is logged.
+      """
+      config = self.buildConfig(workerCount=2)
+      items = [ ("Completed [%s]", "/a", [ ("/a", _quietJob, ("a", )), ]),
+                ("Completed [%s]", "/b", [ ("/b", _failingJob, ("b", )), ]), ]
+      self.failUnlessRaises(ValueError, _executeJobs, config, items)
+      traces = [ message for message in self.handler.messages if message.startswith("Collect job for [/b] failed") ]
+      self.failUnlessEqual(1, len(traces))
+      self.failUnless("_failingJob" in traces[0])
+      self.failUnless("ValueError: Job [b] failed." in traces[0])
+
+   def testExecuteJobs_006(self):
+      """
+      Test that a failure fails the action when jobs are executed sequentially.
+      """
+      config = self.buildConfig(workerCount=1)
+      items = [ ("Completed [%s]", "/a", [ ("/a", _failingJob, ("a", )), ]), ]
+      self.failUnlessRaises(ValueError, _executeJobs, config, items)
+
+   def testExecuteJobs_007(self):
+      """
+      Test that the archive budget is turned into a deadline for the whole run, and cleared afterwards.
+      """
+      config = self.buildConfig(workerCount=1, archiveBudget=2)
+      items = [ ("%s", "/a", [ ("/a", _deadlineJob, ("a", )), ]),
+                ("%s", "/b", [ ("/b", _deadlineJob, ("b", )), ]), ]
+      start = time.time()
+      _executeJobs(config, items)
+      self.failUnlessEqual(2, len(_DEADLINES))
+      self.failUnlessEqual(_DEADLINES[0], _DEADLINES[1])
+      self.failUnless(start + 120 <= _DEADLINES[0] <= time.time() + 120)
+      self.failUnlessEqual(None, collect._ARCHIVE_DEADLINE) # pylint: disable=W0212
+
+
+   ########################
+   # Test executeCollect()
+   ########################
+
+   def testExecuteCollect_001(self):
+      """
+      Test that nothing is deferred when the deadline is not reached.
+      """
+      paths = [ self.buildDir("a", 10), self.buildDir("b", 10), ]
+      config = self.buildDirConfig([ "a", "b", ])
+      self.executeWithDeadline(config, 3600)
+      self.failUnlessEqual("", self.readIndicator(config))
+      self.failUnlessEqual({}, _loadDeferred(config))
+      for path in paths:
+         self.failUnless(os.path.isfile(_getTarfilePath(config, path, "tar")))
+
+   def testExecuteCollect_002(self):
+      """
+      Test that directories not started by the deadline are deferred and listed in a partial indicator.
+      """
+      paths = [ self.buildDir("a", 10), self.buildDir("b", 10), ]
+      config = self.buildDirConfig([ "a", "b", ], collectMode="incr")
+      self.executeWithDeadline(config, -1)
+      self.failUnlessEqual("partial\n%s\n%s\n" % (paths[0], paths[1]), self.readIndicator(config))
+      self.failUnlessEqual({ paths[0]: False, paths[1]: False, }, _loadDeferred(config))
+      for path in paths:
+         self.failIf(os.path.exists(_getTarfilePath(config, path, "tar")))
+
+   def testExecuteCollect_003(self):
+      """
+      Test that deferred directories are collected on the next run, even if their collect mode wouldn't call for it.
+      """
+      paths = [ self.buildDir("a", 10), self.buildDir("b", 10), ]
+      config = self.buildDirConfig([ "a", "b", ], collectMode="weekly")
+      _writeDeferred(config, { paths[1]: True, })
+      self.executeWithDeadline(config, 3600)
+      self.failUnlessEqual("", self.readIndicator(config))
+      self.failUnlessEqual({}, _loadDeferred(config))
+      self.failIf(os.path.exists(_getTarfilePath(config, paths[0], "tar")))
+      self.failUnless(os.path.isfile(_getTarfilePath(config, paths[1], "tar")))
+
+   def testExecuteCollect_004(self):
+      """
+      Test that deferred directories are collected first, with the reset digest flag saved when they were deferred.
+      """
+      paths = [ self.buildDir("a", 10), self.buildDir("b", 10), ]
+      config = self.buildDirConfig([ "a", "b", ], collectMode="incr")
+      self.executeWithDeadline(config, 3600)
+      for path in paths:
+         os.remove(_getTarfilePath(config, path, "tar"))
+      _writeDeferred(config, { paths[1]: True, })
+      del self.handler.messages[:]
+      self.executeWithDeadline(config, 3600)
+      completed = [ message for message in self.handler.messages if message.startswith("Completed collecting") ]
+      self.failUnlessEqual([ "Completed collecting directory [%s]" % paths[1],
+                             "Completed collecting directory [%s]" % paths[0], ], completed)
+      self.failIf(os.path.exists(_getTarfilePath(config, paths[0], "tar")))
+      self.failUnlessEqual([ "%s/file" % paths[1][1:], ], tarfile.open(_getTarfilePath(config, paths[1], "tar")).getnames())
+
+   def testExecuteCollect_005(self):
+      """
+      Test that the size of a directory in the full schedule is updated after its full backup.
+      """
+      path = self.buildDir("a", 10)
+      config = self.buildDirConfig([ "a", ], collectMode="incr", fullSchedule="size")
+      self.executeWithDeadline(config, 3600)
+      self.failUnlessEqual((config.options.startingDay, 10), _loadSchedule(config)[path])
+      self.buildDir("a", 25)
+      self.executeWithDeadline(config, 3600)
+      self.failUnlessEqual((config.options.startingDay, 10), _loadSchedule(config)[path])
+      options = Options()
+      options.full = True
+      executeCollect(None, options, config)
+      self.failUnlessEqual((config.options.startingDay, 25), _loadSchedule(config)[path])
+
+
+   def testExecuteCollect_006(self):
+      """
+      Test that every differential run is compared against the digest from the last full backup, which is left alone.
+      """
+      path = self.buildDir("a", 10)
+      self.buildFile("a/other", "unchanged")
+      config = self.buildDirConfig([ "a", ], collectMode="diff")
+      tarfilePath = _getTarfilePath(config, path, "tar")
+      digestPath = _getDigestPath(config, path)
+      options = Options()
+      options.full = True
+      executeCollect(None, options, config)
+      self.failUnlessEqual(2, len(tarfile.open(tarfilePath).getnames()))
+      digest = open(digestPath).read()
+      self.buildFile("a/file", "changed")
+      os.remove(tarfilePath)
+      self.executeWithDeadline(config, 3600)
+      self.failUnlessEqual([ "%s/file" % path[1:], ], tarfile.open(tarfilePath).getnames())
+      self.failUnlessEqual(digest, open(digestPath).read())
+      self.buildFile("a/new", "added")
+      os.remove(tarfilePath)
+      self.executeWithDeadline(config, 3600)
+      self.failUnlessEqual(sorted([ "%s/file" % path[1:], "%s/new" % path[1:], ]),
+                           sorted(tarfile.open(tarfilePath).getnames()))
+      self.failUnlessEqual(digest, open(digestPath).read())
+      os.remove(tarfilePath)
+      executeCollect(None, options, config)
+      self.failUnlessEqual(3, len(tarfile.open(tarfilePath).getnames()))
+      self.failIfEqual(digest, open(digestPath).read())
+
+   def testExecuteCollect_007(self):
+      """
+      Test that a differential run with no digest on disk backs up everything, and writes the digest.
+      """
+      path = self.buildDir("a", 10)
+      config = self.buildDirConfig([ "a", ], collectMode="diff")
+      tarfilePath = _getTarfilePath(config, path, "tar")
+      digestPath = _getDigestPath(config, path)
+      self.executeWithDeadline(config, 3600)
+      self.failUnlessEqual([ "%s/file" % path[1:], ], tarfile.open(tarfilePath).getnames())
+      self.failUnless(os.path.isfile(digestPath))
+      digest = open(digestPath).read()
+      os.remove(tarfilePath)
+      self.executeWithDeadline(config, 3600)
+      self.failIf(os.path.exists(tarfilePath))
+      self.failUnlessEqual(digest, open(digestPath).read())
+
+
+   def testExecuteCollect_008(self):
+      """
+      Test that differential chunk archives only depend on the packs from themselves and the full backup.
+      """
+      path = self.buildDir("a", 10)
+      self.buildFile("a/first", os.urandom(20000))
+      config = self.buildDirConfig([ "a", ], collectMode="diff", archiveMode="chunk")
+      manifestPath = _getTarfilePath(config, path, "chunk")
+      packPath = _getChunkPackPath(config, path)
+      indexPath = _getChunkIndexPath(config, path)
+      options = Options()
+      options.full = True
+      executeCollect(None, options, config)
+      index = open(indexPath).read()
+      staged = []
+      for day in range(3):
+         if day > 0:
+            self.buildFile("a/day%d" % day, os.urandom(20000))
+            self.executeWithDeadline(config, 3600)
+            self.failUnlessEqual(index, open(indexPath).read())
+         stageDir = os.path.join(self.tmpdir, "stage", str(day))
+         os.makedirs(stageDir)
+         shutil.move(manifestPath, stageDir)
+         shutil.move(packPath, stageDir)
+         staged.append(stageDir)
+      manifestPath = os.path.join(staged[2], os.path.basename(manifestPath))
+      tarfilePath = os.path.join(self.tmpdir, "restored.tar")
+      materializeTarfile(manifestPath, [ staged[0], staged[2], ], tarfilePath)
+      self.failUnlessEqual(sorted([ "%s/day1" % path[1:], "%s/day2" % path[1:], ]),
+                           sorted(tarfile.open(tarfilePath).getnames()))
+
+   def testExecuteCollect_009(self):
+      """
+      Test that incremental chunk archives save the record of stored chunks on every run.
+      """
+      path = self.buildDir("a", 10)
+      config = self.buildDirConfig([ "a", ], collectMode="incr", archiveMode="chunk")
+      indexPath = _getChunkIndexPath(config, path)
+      options = Options()
+      options.full = True
+      executeCollect(None, options, config)
+      index = open(indexPath).read()
+      self.buildFile("a/day1", os.urandom(20000))
+      self.executeWithDeadline(config, 3600)
+      self.failIfEqual(index, open(indexPath).read())
+
+
+   #######################################
+   # Test _loadDeferred()/_writeDeferred()
+   #######################################
+
+   def testDeferred_001(self):
+      """
+      Test that deferred directories survive a round trip to disk.
+      """
+      config = self.buildConfig()
+      self.failUnlessEqual({}, _loadDeferred(config))
+      _writeDeferred(config, { "/a": True, "/b": False, })
+      self.failUnlessEqual({ "/a": True, "/b": False, }, _loadDeferred(config))
+
+   def testDeferred_002(self):
+      """
+      Test that the file on disk is removed when nothing is deferred.
+      """
+      config = self.buildConfig()
+      _writeDeferred(config, { "/a": True, })
+      _writeDeferred(config, {})
+      self.failUnlessEqual([], os.listdir(self.tmpdir))
+      self.failUnlessEqual({}, _loadDeferred(config))
+
+
+   #######################
+   # Test _getFullDays()
+   #######################
+
+   def testGetFullDays_001(self):
+      """
+      Test that no days are assigned with the fixed schedule.
+      """
+      self.buildDir("a", 10)
+      config = self.buildDirConfig([ "a", ], fullSchedule="fixed")
+      self.failUnlessEqual({}, _getFullDays(config))
+      self.failUnlessEqual({}, _loadSchedule(config))
+
+   def testGetFullDays_002(self):
+      """
+      Test that the hash schedule assigns a day from the path, without measuring the directory.
+      """
+      config = self.buildDirConfig([ "missing1", "missing2", ], fullSchedule="hash")
+      fullDays = _getFullDays(config)
+      schedule = _loadSchedule(config)
+      for collectDir in config.collect.collectDirs:
+         path = collectDir.absolutePath
+         expected = DAYS_OF_WEEK[int(hashlib.md5(path).hexdigest(), 16) % len(DAYS_OF_WEEK)]
+         self.failUnlessEqual(expected, fullDays[path])
+         self.failUnlessEqual((expected, 0), schedule[path])
+
+   def testGetFullDays_003(self):
+      """
+      Test that the size schedule assigns the largest directories first, to the emptiest day.
+      """
+      paths = [ self.buildDir("a", 100), self.buildDir("b", 300), self.buildDir("c", 200), ]
+      config = self.buildDirConfig([ "a", "b", "c", ], fullSchedule="size")
+      config.options.startingDay = "wednesday"
+      fullDays = _getFullDays(config)
+      self.failUnlessEqual({ paths[0]: "friday", paths[1]: "wednesday", paths[2]: "thursday", }, fullDays)
+      self.failUnlessEqual({ paths[0]: ("friday", 100), paths[1]: ("wednesday", 300), paths[2]: ("thursday", 200), },
+                           _loadSchedule(config))
+
+   def testGetFullDays_004(self):
+      """
+      Test that saved assignments are kept, and only new directories are measured and assigned.
+      """
+      paths = [ self.buildDir("a", 100), self.buildDir("b", 300), ]
+      config = self.buildDirConfig([ "a", "b", "missing", ], fullSchedule="size")
+      config.options.startingDay = "monday"
+      _writeSchedule(config, { paths[0]: ("monday", 500), os.path.join(self.tmpdir, "missing"): ("monday", 50), })
+      fullDays = _getFullDays(config)
+      self.failUnlessEqual("monday", fullDays[paths[0]])
+      self.failUnlessEqual("tuesday", fullDays[paths[1]])
+      self.failUnlessEqual(("monday", 500), _loadSchedule(config)[paths[0]])
+      self.failUnlessEqual(("tuesday", 300), _loadSchedule(config)[paths[1]])
+
+   def testGetFullDays_005(self):
+      """
+      Test that new assignments are not saved when asked not to.
+      """
+      self.buildDir("a", 100)
+      config = self.buildDirConfig([ "a", ], fullSchedule="size")
+      self.failUnlessEqual(1, len(_getFullDays(config, save=False)))
+      self.failUnlessEqual({}, _loadSchedule(config))
+
+
+   ##########################
+   # Test _updateSchedule()
+   ##########################
+
+   def testUpdateSchedule_001(self):
+      """
+      Test that a full backup updates the size from the bytes backed up by all of the directory's jobs.
+      """
+      config = self.buildDirConfig([], fullSchedule="size")
+      _writeSchedule(config, { "/a": ("monday", 5), "/b": ("tuesday", 6), })
+      _writeStatistics(config, { "/a/x": { "duration": 1.0, "bytes": 10, },
+                                 "/a/y": { "duration": 1.0, "bytes": 7, },
+                                 "/b": { "duration": 1.0, "bytes": 3, }, })
+      items = [ ("%s", "/a", [ ("/a/x", _quietJob, ()), ("/a/y", _quietJob, ()), ]),
+                ("%s", "/b", [ ("/b", _quietJob, ()), ]), ]
+      _updateSchedule(config, items, { "/a": True, "/b": False, }, [])
+      self.failUnlessEqual({ "/a": ("monday", 17), "/b": ("tuesday", 6), }, _loadSchedule(config))
+
+   def testUpdateSchedule_002(self):
+      """
+      Test that the size of a deferred directory is left alone.
+      """
+      config = self.buildDirConfig([], fullSchedule="size")
+      _writeSchedule(config, { "/a": ("monday", 5), })
+      _writeStatistics(config, { "/a": { "duration": 1.0, "bytes": 10, }, })
+      items = [ ("%s", "/a", [ ("/a", _quietJob, ()), ]), ]
+      _updateSchedule(config, items, { "/a": True, }, [ "/a", ])
+      self.failUnlessEqual({ "/a": ("monday", 5), }, _loadSchedule(config))
+
+   def testUpdateSchedule_003(self):
+      """
+      Test that nothing is written with the fixed schedule.
+      """
+      config = self.buildDirConfig([], fullSchedule="fixed")
+      _writeStatistics(config, { "/a": { "duration": 1.0, "bytes": 10, }, })
+      _updateSchedule(config, [ ("%s", "/a", [ ("/a", _quietJob, ()), ]), ], { "/a": True, }, [])
+      self.failUnlessEqual({}, _loadSchedule(config))
+
+
+   ###############################
+   # Test _getSyntheticArchives()
+   ###############################
+
+   def buildStagedArchives(self, absolutePath, days):
+      """Builds a staging configuration with an empty archive for the path in each daily directory."""
+      config = self.buildDirConfig([])
+      stageDir = os.path.join(self.tmpdir, "stage")
+      config.stage = StageConfig(targetDir=stageDir, localPeers=[ LocalPeer("local", config.collect.targetDir), ])
+      for day in days:
+         peerDir = os.path.join(stageDir, day, "local")
+         os.makedirs(peerDir)
+         open(os.path.join(peerDir, "%s.tar" % buildNormalizedPath(absolutePath)), "w").close()
+      return config
+
+   def testGetSyntheticArchives_001(self):
+      """
+      Test that no archives are used when the date of the last full backup is not known.
+      """
+      config = self.buildStagedArchives("/a/b", [ "2026/10/11", "2026/10/12", ])
+      self.failUnlessEqual([], _getSyntheticArchives(config, "/a/b"))
+
+   def testGetSyntheticArchives_002(self):
+      """
+      Test that only the archives staged since the last full backup are used, newest first.
+      """
+      config = self.buildStagedArchives("/a/b", [ "2026/09/30", "2026/10/04", "2026/10/11", "2026/10/12", ])
+      open(_getFullDatePath(config, "/a/b"), "w").write("2026/10/04\n")
+      archives = _getSyntheticArchives(config, "/a/b")
+      days = [ "2026/10/12", "2026/10/11", "2026/10/04", ]
+      expected = [ os.path.join(self.tmpdir, "stage", day, "local", "a-b.tar") for day in days ]
+      self.failUnlessEqual(expected, archives)
+
+   def testGetSyntheticArchives_003(self):
+      """
+      Test that the date written for a full backup is today's date, and that a damaged date is ignored.
+      """
+      config = self.buildDirConfig([])
+      self.failUnlessEqual(None, _loadFullDate(config, "/a/b"))
+      _writeFullDate(config, "/a/b")
+      self.failUnlessEqual(time.strftime("%Y/%m/%d"), _loadFullDate(config, "/a/b"))
+      open(_getFullDatePath(config, "/a/b"), "w").write("bogus")
+      self.failUnlessEqual(None, _loadFullDate(config, "/a/b"))
+
+
+   ############################
+   # Test _getFileGroupItems()
+   ############################
+
+   def testGetFileGroupItems_001(self):
+      """
+      Test that files are grouped by collect mode and archive mode, in a stable order.
+      """
+      config = self.buildGroupConfig([ ("/etc/a", "incr", "tar"),
+                                       ("/etc/b", "daily", "targz"),
+                                       ("/etc/c", "daily", "tar"),
+                                       ("/etc/d", "incr", "tar"), ])
+      items = _getFileGroupItems(config, False, False, False)
+      self.failUnlessEqual([ "/collect-files-daily-tar", "/collect-files-daily-targz", "/collect-files-incr-tar", ],
+                           [ item[1] for item in items ])
+      self.failUnlessEqual([ [ "/etc/c", ], [ "/etc/b", ], [ "/etc/a", "/etc/d", ], ],
+                           [ item[2][0][2][1] for item in items ])
+
+   def testGetFileGroupItems_002(self):
+      """
+      Test that each group is a single job which collects into the group's own tarfile and digest.
+      """
+      config = self.buildGroupConfig([ ("/etc/a", "incr", "targz"), ("/etc/b", "incr", "targz"), ])
+      items = _getFileGroupItems(config, False, False, True)
+      self.failUnlessEqual(1, len(items))
+      (message, groupPath, jobs) = items[0]
+      self.failUnlessEqual("Completed collecting file group [%s]", message)
+      self.failUnlessEqual("/collect-files-incr-targz", groupPath)
+      self.failUnlessEqual(1, len(jobs))
+      self.failUnlessEqual((groupPath, _collectFileGroup,
+                            (groupPath, [ "/etc/a", "/etc/b", ],
+                             _getTarfilePath(config, groupPath, "targz"), "incr", "targz",
+                             True, _getDigestPath(config, groupPath))), jobs[0])
+
+   def testGetFileGroupItems_003(self):
+      """
+      Test that weekly files are left out of the groups on a day that isn't the start of the week.
+      """
+      config = self.buildGroupConfig([ ("/etc/a", "weekly", "tar"), ("/etc/b", "daily", "tar"), ])
+      items = _getFileGroupItems(config, False, False, False)
+      self.failUnlessEqual([ "/collect-files-daily-tar", ], [ item[1] for item in items ])
+      self.failUnlessEqual([ "/etc/b", ], items[0][2][0][2][1])
+
+   def testGetFileGroupItems_004(self):
+      """
+      Test that weekly files are grouped on the start of the week.
+      """
+      config = self.buildGroupConfig([ ("/etc/a", "weekly", "tar"), ("/etc/b", "daily", "tar"), ])
+      items = _getFileGroupItems(config, False, True, True)
+      self.failUnlessEqual([ "/collect-files-daily-tar", "/collect-files-weekly-tar", ], [ item[1] for item in items ])
+      self.failUnlessEqual([ "/etc/a", ], items[1][2][0][2][1])
+
+   def testGetFileGroupItems_005(self):
+      """
+      Test that weekly files are grouped for a full backup on any day.
+      """
+      config = self.buildGroupConfig([ ("/etc/a", "weekly", "tar"), ])
+      items = _getFileGroupItems(config, True, False, True)
+      self.failUnlessEqual([ "/collect-files-weekly-tar", ], [ item[1] for item in items ])
+
+   def testGetFileGroupItems_006(self):
+      """
+      Test that no groups are returned when no file is collected today.
+      """
+      config = self.buildGroupConfig([ ("/etc/a", "weekly", "tar"), ])
+      self.failUnlessEqual([], _getFileGroupItems(config, False, False, False))
+
+   def testGetFileGroupItems_007(self):
+      """
+      Test that grouped files are used for collect items when the group files flag is set.
+      """
+      config = self.buildGroupConfig([ ("/etc/a", "daily", "tar"), ("/etc/b", "daily", "tar"), ])
+      (items, resetFlags) = _getCollectItems(config, False, {}, {})
+      self.failUnlessEqual([ "/collect-files-daily-tar", ], [ item[1] for item in items ])
+      self.failUnlessEqual({}, resetFlags)
+      config.collect.groupFiles = False
+      (items, resetFlags) = _getCollectItems(config, False, {}, {})
+      self.failUnlessEqual([ "/etc/a", "/etc/b", ], [ item[1] for item in items ])
+
+
+   ###########################
+   # Test _collectFileGroup()
+   ###########################
+
+   def testCollectFileGroup_001(self):
+      """
+      Test that all of the files in a group are collected into a single tarfile.
+      """
+      config = self.buildConfig()
+      paths = [ self.buildFile("a", "first"), self.buildFile("b", "second"), ]
+      groupPath = "/collect-files-daily-tar"
+      tarfilePath = _getTarfilePath(config, groupPath, "tar")
+      digestPath = _getDigestPath(config, groupPath)
+      size = _collectFileGroup(config, groupPath, paths, tarfilePath, "daily", "tar", False, digestPath)
+      self.failUnlessEqual(11, size)
+      names = tarfile.open(tarfilePath).getnames()
+      self.failUnlessEqual(sorted([ path[1:] for path in paths ]), sorted(names))
+      self.failIf(os.path.exists(digestPath))
+
+   def testCollectFileGroup_002(self):
+      """
+      Test that an incremental group keeps one digest for all of its files.
+      """
+      config = self.buildConfig()
+      paths = [ self.buildFile("a", "first"), self.buildFile("b", "second"), ]
+      groupPath = "/collect-files-incr-tar"
+      tarfilePath = _getTarfilePath(config, groupPath, "tar")
+      digestPath = _getDigestPath(config, groupPath)
+      _collectFileGroup(config, groupPath, paths, tarfilePath, "incr", "tar", True, digestPath)
+      self.failUnless(os.path.isfile(digestPath))
+      self.buildFile("b", "changed")
+      os.remove(tarfilePath)
+      size = _collectFileGroup(config, groupPath, paths, tarfilePath, "incr", "tar", False, digestPath)
+      self.failUnlessEqual(7, size)
+      self.failUnlessEqual([ paths[1][1:], ], tarfile.open(tarfilePath).getnames())
+
+
+   ############################
+   # Test _chooseCompression()
+   ############################
+
+   def testChooseCompression_001(self):
+      """
+      Test that the strongest compression is chosen when there is plenty of budget.
+      """
+      config = self.buildConfig(archiveBudget=60)
+      backupList = BackupFileList()
+      backupList.addFile(self.buildFile("file", "compressible data " * 1000))
+      self.failUnlessEqual(("tarbz2", 9), _chooseCompression(config, backupList, self.tmpdir))
+
+   def testChooseCompression_002(self):
+      """
+      Test that no compression is chosen once the run's archive deadline has passed.
+      """
+      config = self.buildConfig(archiveBudget=60)
+      backupList = BackupFileList()
+      backupList.addFile(self.buildFile("file", "compressible data " * 1000))
+      collect._ARCHIVE_DEADLINE = time.time() - 1 # pylint: disable=W0212
+      try:
+         self.failUnlessEqual(("tar", None), _chooseCompression(config, backupList, self.tmpdir))
+      finally:
+         collect._ARCHIVE_DEADLINE = None # pylint: disable=W0212
+
+   def testChooseCompression_003(self):
+      """
+      Test that the budget left before the run's deadline is used, rather than the configured budget.
+      """
+      config = self.buildConfig(archiveBudget=60)
+      backupList = BackupFileList()
+      backupList.addFile(self.buildFile("file", "compressible data " * 1000))
+      collect._ARCHIVE_DEADLINE = time.time() + 3600 # pylint: disable=W0212
+      try:
+         self.failUnlessEqual(("tarbz2", 9), _chooseCompression(config, backupList, self.tmpdir))
+      finally:
+         collect._ARCHIVE_DEADLINE = None # pylint: disable=W0212
+
+
+#######################################################################
+# Suite definition
+#######################################################################
+
+# pylint: disable=C0330
+def suite():
+   """Returns a suite containing all the test cases in this module."""
+   return unittest.TestSuite((
+                              unittest.makeSuite(TestFunctions, 'test'),
+                            ))
+
+
+########################################################################
+# Module entry point
+########################################################################
+
+# When this module is executed from the command-line, run its tests
+if __name__ == '__main__':
+   unittest.main()
@@ -0,0 +1,352 @@
+#!/usr/bin/env python
+# -*- coding: iso-8859-1 -*-
+# vim: set ft=python ts=3 sw=3 expandtab:
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#
+#              C E D A R
+#          S O L U T I O N S       "Software done right."
+#           S O F T W A R E
+#
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#
+# Copyright (c) 2007,2010 Kenneth J. Pronovici.
+# All rights reserved.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License,
+# Version 2, as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# Copies of the GNU General Public License are available from
+# the Free Software Foundation website, http://www.gnu.org/.
+#
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#
+# Author   : Kenneth J. Pronovici <pronovic@ieee.org>
+# Language : Python 2 (>= 2.7)
+# Project  : Cedar Backup, release 2
+# Purpose  : Tests store action functionality.
+#
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+########################################################################
+# Module documentation
+########################################################################
+
+"""
+Unit tests for CedarBackup2/actions/store.py.
+
+Code Coverage
+=============
+
+   This module contains tests for the private functions in actions/store.py
+   that plan media use for the C{planned} blank mode.  Writing a disc needs
+   real hardware, so these tests use a fake writer that only reports the
+   capacity of its media and the size of its image.
+
+Naming Conventions
+==================
+
+   I prefer to avoid large unit tests which validate more than one piece of
+   functionality, and I prefer to avoid using overly descriptive (read: long)
+   test names, as well.  Instead, I use lots of very small tests that each
+   validate one specific thing.  These small tests are then named with an index
+   number, yielding something like C{testAddDir_001} or C{testValidate_010}.
+   Each method has a docstring describing what it's supposed to accomplish.  I
+   feel that this makes it easier to judge how important a given failure is,
+   and also makes it somewhat easier to diagnose and fix individual problems.
+
+Full vs. Reduced Tests
+======================
+
+   All of the tests in this module are considered safe to be run in an average
+   build environment.  There is a no need to use a ACTIONSSTORETESTS_FULL
+   environment variable to provide a "reduced feature set" test suite as for
+   some of the other test modules.
+
+@author Kenneth J. Pronovici <pronovic@ieee.org>
+"""
+
+
+########################################################################
+# Import modules and do runtime validations
+########################################################################
+
+import os
+import datetime
+import unittest
+import tempfile
+from CedarBackup2.testutil import removedir
+from CedarBackup2.config import Config, OptionsConfig, StageConfig, BlankBehavior
+from CedarBackup2.writers.cdwriter import MediaCapacity
+from CedarBackup2.actions.constants import DIR_TIME_FORMAT, STORE_INDICATOR
+from CedarBackup2.actions.store import _getNewDisc, _getPlannedNewDisc, _getVolumeForecast, _forecastDays
+
+
+#######################################################################
+# Module-wide configuration and constants
+#######################################################################
+
+DAYS_OF_WEEK = [ "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday", ]
+
+
+#######################################################################
+# Utility functions and classes
+#######################################################################
+
+class _FakeWriter(object):
+   """Stands in for an image writer, reporting a fixed media capacity and image size."""
+   def __init__(self, used, available, entireDisc, required):
+      self.used = used
+      self.available = available
+      self.entireDisc = entireDisc
+      self.required = required
+   def retrieveCapacity(self, entireDisc=False):
+      if entireDisc:
+         return MediaCapacity(0, self.entireDisc, None)
+      return MediaCapacity(self.used, self.available, None)
+   def getEstimatedImageSize(self):
+      return self.required
+
+
+#######################################################################
+# Test Case Classes
+#######################################################################
+
+######################
+# TestFunctions class
+######################
+
+class TestFunctions(unittest.TestCase):
+
+   """Tests for the various private functions."""
+
+   ################
+   # Setup methods
+   ################
+
+   def setUp(self):
+      try:
+         self.tmpdir = tempfile.mkdtemp()
+      except Exception, e:
+         self.fail(e)
+
+   def tearDown(self):
+      try:
+         removedir(self.tmpdir)
+      except: pass
+
+
+   ##################
+   # Utility methods
+   ##################
+
+   def buildConfig(self, offset):
+      """
+      Builds configuration whose week starts the indicated number of days before today.
+      The staging directory is a directory within the temporary directory.
+      """
+      today = datetime.date.today()
+      config = Config()
+      startingDay = DAYS_OF_WEEK[(today - datetime.timedelta(days=offset)).weekday()]
+      config.options = OptionsConfig(startingDay=startingDay, workingDir=self.tmpdir)
+      config.stage = StageConfig(targetDir=os.path.join(self.tmpdir, "staging"))
+      return config
+
+   def buildDailyDir(self, config, daysAgo, size, stored=True):
+      """Builds a daily staging directory from the indicated number of days ago, holding a file of the indicated size."""
+      date = datetime.date.today() - datetime.timedelta(days=daysAgo)
+      dailyDir = os.path.join(config.stage.targetDir, date.strftime(DIR_TIME_FORMAT))
+      os.makedirs(os.path.join(dailyDir, "peer"))
+      open(os.path.join(dailyDir, "peer", "file"), "w").write("x" * size)
+      if stored:
+         open(os.path.join(dailyDir, STORE_INDICATOR), "w").write("")
+
+
+   #############################
+   # Test _getPlannedNewDisc()
+   #############################
+
+   def testGetPlannedNewDisc_001(self):
+      """
+      Test that a new disc is started when today's data does not fit on the current disc.
+      """
+      writer = _FakeWriter(900, 100, 1000, 200)
+      self.failUnlessEqual(True, _getPlannedNewDisc(writer, 1.0, 0))
+
+   def testGetPlannedNewDisc_002(self):
+      """
+      Test that the current disc is kept when the rest of the week is predicted to fit on it.
+      """
+      writer = _FakeWriter(400, 600, 1000, 200)
+      self.failUnlessEqual(False, _getPlannedNewDisc(writer, 1.0, 400))
+
+   def testGetPlannedNewDisc_003(self):
+      """
+      Test that a new disc is started when the rest of the week is predicted to fit only on a new disc.
+      """
+      writer = _FakeWriter(400, 600, 1000, 200)
+      self.failUnlessEqual(True, _getPlannedNewDisc(writer, 1.0, 401))
+      self.failUnlessEqual(True, _getPlannedNewDisc(writer, 1.0, 800))
+
+   def testGetPlannedNewDisc_004(self):
+      """
+      Test that the current disc is filled first when the rest of the week is predicted to need more than one disc.
+      """
+      writer = _FakeWriter(400, 600, 1000, 200)
+      self.failUnlessEqual(False, _getPlannedNewDisc(writer, 1.0, 801))
+
+   def testGetPlannedNewDisc_005(self):
+      """
+      Test that the blanking factor is applied to the forecast.
+      """
+      writer = _FakeWriter(400, 600, 1000, 200)
+      self.failUnlessEqual(False, _getPlannedNewDisc(writer, 1.0, 300))
+      self.failUnlessEqual(True, _getPlannedNewDisc(writer, 1.5, 300))
+      self.failUnlessEqual(False, _getPlannedNewDisc(writer, 3.0, 300))
+
+
+   ######################
+   # Test _getNewDisc()
+   ######################
+
+   def testGetNewDisc_001(self):
+      """
+      Test that the planned blank mode uses the media plan.
+      """
+      writer = _FakeWriter(400, 600, 1000, 200)
+      blankBehavior = BlankBehavior(blankMode="planned", blankFactor="1.0")
+      self.failUnlessEqual(False, _getNewDisc(writer, False, False, blankBehavior, 400))
+      self.failUnlessEqual(True, _getNewDisc(writer, False, False, blankBehavior, 500))
+
+   def testGetNewDisc_002(self):
+      """
+      Test that the planned blank mode treats a missing forecast as an empty one.
+      """
+      writer = _FakeWriter(400, 600, 1000, 200)
+      blankBehavior = BlankBehavior(blankMode="planned", blankFactor="1.0")
+      self.failUnlessEqual(False, _getNewDisc(writer, False, False, blankBehavior, None))
+      self.failUnlessEqual(False, _getNewDisc(writer, False, True, blankBehavior))
+
+   def testGetNewDisc_003(self):
+      """
+      Test that rebuilding media always starts a new disc, in the planned blank mode.
+      """
+      writer = _FakeWriter(400, 600, 1000, 200)
+      blankBehavior = BlankBehavior(blankMode="planned", blankFactor="1.0")
+      self.failUnlessEqual(True, _getNewDisc(writer, True, False, blankBehavior, 0))
+
+
+   ########################
+   # Test _forecastDays()
+   ########################
+
+   def testForecastDays_001(self):
+      """
+      Test that there is no forecast without history.
+      """
+      self.failUnlessEqual(None, _forecastDays({}, datetime.date(2010, 3, 17), [ 0, 1, ]))
+
+   def testForecastDays_002(self):
+      """
+      Test that the largest size seen for each day of the week is used.
+      """
+      history = { datetime.date(2010, 3, 1): 10,     # monday
+                  datetime.date(2010, 3, 8): 30,     # monday
+                  datetime.date(2010, 3, 2): 20,     # tuesday
+                  datetime.date(2010, 3, 9): 5, }    # tuesday
+      self.failUnlessEqual(30, _forecastDays(history, datetime.date(2010, 3, 17), [ 0, ]))
+      self.failUnlessEqual(20, _forecastDays(history, datetime.date(2010, 3, 17), [ 1, ]))
+      self.failUnlessEqual(50, _forecastDays(history, datetime.date(2010, 3, 17), [ 0, 1, ]))
+
+   def testForecastDays_003(self):
+      """
+      Test that days of the week with no history use the largest size seen for any day.
+      """
+      history = { datetime.date(2010, 3, 1): 10,     # monday
+                  datetime.date(2010, 3, 2): 20, }   # tuesday
+      self.failUnlessEqual(50, _forecastDays(history, datetime.date(2010, 3, 17), [ 0, 3, 4, ]))
+
+   def testForecastDays_004(self):
+      """
+      Test that history from the indicated date onwards is ignored.
+      """
+      history = { datetime.date(2010, 3, 1): 10,     # monday
+                  datetime.date(2010, 3, 8): 30, }   # monday
+      self.failUnlessEqual(10, _forecastDays(history, datetime.date(2010, 3, 8), [ 0, ]))
+      self.failUnlessEqual(None, _forecastDays(history, datetime.date(2010, 3, 1), [ 0, ]))
+
+   def testForecastDays_005(self):
+      """
+      Test that nothing is forecast for no days.
+      """
+      self.failUnlessEqual(0, _forecastDays({ datetime.date(2010, 3, 1): 10, }, datetime.date(2010, 3, 17), []))
+
+
+   #############################
+   # Test _getVolumeForecast()
+   #############################
+
+   def testGetVolumeForecast_001(self):
+      """
+      Test that each remaining day is assumed to match today when there is no history.
+      """
+      config = self.buildConfig(0)
+      writer = _FakeWriter(0, 1000, 1000, 200)
+      self.failUnlessEqual(6 * 200, _getVolumeForecast(config, writer))
+
+   def testGetVolumeForecast_002(self):
+      """
+      Test that the forecast covers only the days after today until the start of the next week.
+      """
+      config = self.buildConfig(4)
+      writer = _FakeWriter(0, 1000, 1000, 200)
+      self.failUnlessEqual(2 * 200, _getVolumeForecast(config, writer))
+      config = self.buildConfig(6)
+      self.failUnlessEqual(0, _getVolumeForecast(config, writer))
+
+   def testGetVolumeForecast_003(self):
+      """
+      Test that the forecast uses the stored daily staging directories from recent weeks.
+      """
+      config = self.buildConfig(0)
+      self.buildDailyDir(config, 6, 3000)     # tomorrow's day of the week
+      self.buildDailyDir(config, 13, 5000)    # tomorrow's day of the week
+      self.buildDailyDir(config, 7, 8000)     # today's day of the week
+      self.buildDailyDir(config, 5, 9000, stored=False)
+      writer = _FakeWriter(0, 1000, 1000, 200)
+      self.failUnlessEqual(5000 + (5 * 8000), _getVolumeForecast(config, writer))
+
+   def testGetVolumeForecast_004(self):
+      """
+      Test that history older than the planning window is ignored.
+      """
+      config = self.buildConfig(0)
+      self.buildDailyDir(config, 6, 3000)
+      self.buildDailyDir(config, 7 * 9 - 1, 9000)
+      writer = _FakeWriter(0, 1000, 1000, 200)
+      self.failUnlessEqual(6 * 3000, _getVolumeForecast(config, writer))
+
+
+#######################################################################
+# Suite definition
+#######################################################################
+
+# pylint: disable=C0330
+def suite():
+   """Returns a suite containing all the test cases in this module."""
+   return unittest.TestSuite((
+                              unittest.makeSuite(TestFunctions, 'test'),
+                            ))
+
+
+########################################################################
+# Module entry point
+########################################################################
+
+# When this module is executed from the command-line, run its tests
+if __name__ == '__main__':
+   unittest.main()
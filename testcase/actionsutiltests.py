@@ -248,6 +248,17 @@ class TestFunctions(unittest.TestCase):
       stagingDir = self.buildPath(["tree8", "dir001", ])
       writeIndicatorFile(stagingDir, ENCRYPT_INDICATOR, None, None)
       self.failUnless(os.path.exists(self.buildPath(["tree8", "dir001", ENCRYPT_INDICATOR, ])))
+      self.failUnlessEqual("", open(self.buildPath(["tree8", "dir001", ENCRYPT_INDICATOR, ])).read())
+
+   def testWriteIndicatorFile_003(self):
+      """
+      Test with a valid staging directory and some contents.
+      """
+      self.extractTar("tree8")
+      stagingDir = self.buildPath(["tree8", "dir001", ])
+      writeIndicatorFile(stagingDir, ENCRYPT_INDICATOR, None, None, "partial\n/home\n")
+      self.failUnless(os.path.exists(self.buildPath(["tree8", "dir001", ENCRYPT_INDICATOR, ])))
+      self.failUnlessEqual("partial\n/home\n", open(self.buildPath(["tree8", "dir001", ENCRYPT_INDICATOR, ])).read())
 
 
 #######################################################################
@@ -0,0 +1,370 @@
+#!/usr/bin/env python
+# -*- coding: iso-8859-1 -*-
+# vim: set ft=python ts=3 sw=3 expandtab:
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#
+#              C E D A R
+#          S O L U T I O N S       "Software done right."
+#           S O F T W A R E
+#
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#
+# Copyright (c) 2004-2005,2010 Kenneth J. Pronovici.
+# All rights reserved.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License,
+# Version 2, as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# Copies of the GNU General Public License are available from
+# the Free Software Foundation website, http://www.gnu.org/.
+#
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#
+# Author   : Kenneth J. Pronovici <pronovic@ieee.org>
+# Language : Python 2 (>= 2.7)
+# Project  : Cedar Backup, release 2
+# Purpose  : Tests chunk archive functionality.
+#
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+########################################################################
+# Module documentation
+########################################################################
+
+"""
+Unit tests for CedarBackup2/chunk.py.
+
+Code Coverage
+=============
+
+   This module contains individual tests for each of the public functions
+   implemented in chunk.py: C{splitChunks()}, C{writeChunkArchive()} and
+   C{materializeTarfile()}.  The files involved are generated on the fly, from
+   a seeded random number generator so that the results are repeatable.
+
+Naming Conventions
+==================
+
+   I prefer to avoid large unit tests which validate more than one piece of
+   functionality, and I prefer to avoid using overly descriptive (read: long)
+   test names, as well.  Instead, I use lots of very small tests that each
+   validate one specific thing.  These small tests are then named with an index
+   number, yielding something like C{testAddDir_001} or C{testValidate_010}.
+   Each method has a docstring describing what it's supposed to accomplish.  I
+   feel that this makes it easier to judge how important a given failure is,
+   and also makes it somewhat easier to diagnose and fix individual problems.
+
+Full vs. Reduced Tests
+======================
+
+   All of the tests in this module are considered safe to be run in an average
+   build environment.  There is a no need to use a CHUNKTESTS_FULL environment
+   variable to provide a "reduced feature set" test suite as for some of the
+   other test modules.
+
+@author Kenneth J. Pronovici <pronovic@ieee.org>
+"""
+
+
+
+########################################################################
+# Import modules and do runtime validations
+########################################################################
+
+# Import standard modules
+import os
+import json
+import random
+import hashlib
+import tarfile
+import unittest
+import tempfile
+from cStringIO import StringIO
+from CedarBackup2.testutil import removedir
+from CedarBackup2.chunk import splitChunks, writeChunkArchive, materializeTarfile
+from CedarBackup2.chunk import CHUNK_MIN_SIZE, CHUNK_MAX_SIZE, PACK_MAGIC
+
+
+#######################################################################
+# Test Case Classes
+#######################################################################
+
+##################
+# TestChunk class
+##################
+
+class TestChunk(unittest.TestCase):
+
+   """Tests for the chunk archive functions."""
+
+   ################
+   # Setup methods
+   ################
+
+   def setUp(self):
+      try:
+         self.tmpdir = tempfile.mkdtemp()
+         os.mkdir(os.path.join(self.tmpdir, "out"))
+         self.random = random.Random(42)
+      except Exception, e:
+         self.fail(e)
+
+   def tearDown(self):
+      try:
+         removedir(self.tmpdir)
+      except: pass
+
+
+   ##################
+   # Utility methods
+   ##################
+
+   def randomData(self, length):
+      """Returns a string of random data of the indicated length."""
+      return ("%0*x" % (length * 2, self.random.getrandbits(length * 8))).decode("hex")
+
+   def writeFile(self, name, contents):
+      """Writes a file in the temporary directory, returning its path."""
+      path = os.path.join(self.tmpdir, name)
+      if not os.path.isdir(os.path.dirname(path)):
+         os.makedirs(os.path.dirname(path))
+      open(path, "wb").write(contents)
+      return path
+
+   def getPaths(self):
+      """Returns manifest, pack and tarfile paths in the temporary directory."""
+      return (os.path.join(self.tmpdir, "out", "archive.manifest"),
+              os.path.join(self.tmpdir, "out", "archive.chunks"),
+              os.path.join(self.tmpdir, "archive.tar"))
+
+   def extractTarfile(self, tarfilePath):
+      """Returns a dict mapping member name to contents for a tarfile."""
+      contents = {}
+      tar = tarfile.open(tarfilePath)
+      try:
+         for member in tar.getmembers():
+            if member.isreg():
+               contents[member.name] = tar.extractfile(member).read()
+            else:
+               contents[member.name] = None
+      finally:
+         tar.close()
+      return contents
+
+
+   #######################
+   # Test splitChunks()
+   #######################
+
+   def testSplitChunks_001(self):
+      """
+      Test with an empty file.
+      """
+      self.failUnlessEqual([], list(splitChunks(StringIO(""))))
+
+   def testSplitChunks_002(self):
+      """
+      Test with a file smaller than the minimum chunk size.
+      """
+      data = self.randomData(1000)
+      self.failUnlessEqual([ data, ], list(splitChunks(StringIO(data))))
+
+   def testSplitChunks_003(self):
+      """
+      Test with random data, which should be split on content boundaries.
+      """
+      data = self.randomData(CHUNK_MAX_SIZE * 4)
+      chunks = list(splitChunks(StringIO(data)))
+      self.failUnlessEqual(data, "".join(chunks))
+      self.failUnless(len(chunks) > 1)
+      for chunk in chunks[:-1]:
+         self.failUnless(CHUNK_MIN_SIZE <= len(chunk) <= CHUNK_MAX_SIZE)
+
+   def testSplitChunks_004(self):
+      """
+      Test with data that has no boundaries, which should be split at the maximum size.
+      """
+      data = "\x00" * (CHUNK_MAX_SIZE * 2 + 10)
+      chunks = list(splitChunks(StringIO(data)))
+      self.failUnlessEqual([ CHUNK_MAX_SIZE, CHUNK_MAX_SIZE, 10, ], [ len(chunk) for chunk in chunks ])
+
+   def testSplitChunks_005(self):
+      """
+      Test that inserting data only changes the chunks around the insertion.
+      """
+      data = self.randomData(CHUNK_MAX_SIZE * 4)
+      before = list(splitChunks(StringIO(data)))
+      after = list(splitChunks(StringIO(data[:1000] + "inserted" + data[1000:])))
+      self.failUnless(len(set(before).intersection(after)) >= len(before) - 2)
+
+
+   #############################
+   # Test writeChunkArchive()
+   #############################
+
+   def testWriteChunkArchive_001(self):
+      """
+      Test with an empty list.
+      """
+      (manifestPath, packPath, unused) = self.getPaths()
+      self.failUnlessRaises(ValueError, writeChunkArchive, [], manifestPath, packPath, set())
+
+   def testWriteChunkArchive_002(self):
+      """
+      Test with a list of files, checking the manifest, pack and known chunks.
+      """
+      (manifestPath, packPath, unused) = self.getPaths()
+      path1 = self.writeFile("src/file1", self.randomData(CHUNK_MAX_SIZE))
+      path2 = self.writeFile("src/file2", "small")
+      known = set()
+      result = writeChunkArchive([ path1, path2, ], manifestPath, packPath, known)
+      self.failUnlessEqual(None, result)
+      manifest = json.load(open(manifestPath), encoding="latin-1")
+      self.failUnlessEqual(2, len(manifest["entries"]))
+      chunks = manifest["entries"][0]["chunks"] + manifest["entries"][1]["chunks"]
+      self.failUnlessEqual(set([ digest.decode("hex") for digest in chunks ]), known)
+      self.failUnless(open(packPath, "rb").read().startswith(PACK_MAGIC))
+
+   def testWriteChunkArchive_003(self):
+      """
+      Test that duplicate contents are only stored once, within and across archives.
+      """
+      (manifestPath, packPath, unused) = self.getPaths()
+      data = self.randomData(CHUNK_MAX_SIZE)
+      path1 = self.writeFile("src/file1", data)
+      path2 = self.writeFile("src/file2", data)
+      known = set()
+      writeChunkArchive([ path1, ], manifestPath, packPath, set(known))
+      single = os.path.getsize(packPath)
+      writeChunkArchive([ path1, path2, ], manifestPath, packPath, known)
+      self.failUnlessEqual(single, os.path.getsize(packPath))
+      writeChunkArchive([ path2, ], manifestPath, packPath, known)
+      self.failIf(os.path.exists(packPath))
+      self.failUnless(os.path.exists(manifestPath))
+
+   def testWriteChunkArchive_004(self):
+      """
+      Test with captureDigest=True.
+      """
+      (manifestPath, packPath, unused) = self.getPaths()
+      data = self.randomData(1000)
+      path = self.writeFile("src/file", data)
+      result = writeChunkArchive([ path, ], manifestPath, packPath, set(), captureDigest=True)
+      self.failUnlessEqual({ path: hashlib.sha1(data).hexdigest(), }, result)
+
+   def testWriteChunkArchive_005(self):
+      """
+      Test with a missing file and ignore=False, which should fail and clean up.
+      """
+      (manifestPath, packPath, unused) = self.getPaths()
+      path = self.writeFile("src/file", "data")
+      missing = os.path.join(self.tmpdir, "src", "missing")
+      self.failUnlessRaises((IOError, OSError), writeChunkArchive, [ path, missing, ], manifestPath, packPath, set())
+      self.failIf(os.path.exists(manifestPath))
+      self.failIf(os.path.exists(packPath))
+
+   def testWriteChunkArchive_006(self):
+      """
+      Test with a missing file and ignore=True, which should leave it out.
+      """
+      (manifestPath, packPath, unused) = self.getPaths()
+      path = self.writeFile("src/file", "data")
+      missing = os.path.join(self.tmpdir, "src", "missing")
+      writeChunkArchive([ path, missing, ], manifestPath, packPath, set(), ignore=True)
+      manifest = json.load(open(manifestPath), encoding="latin-1")
+      self.failUnlessEqual([ path[1:], ], [ entry["name"] for entry in manifest["entries"] ])
+
+   def testWriteChunkArchive_007(self):
+      """
+      Test with append=True, which should keep the chunks already in the pack.
+      """
+      (manifestPath, packPath, tarfilePath) = self.getPaths()
+      path1 = self.writeFile("src/file1", self.randomData(1000))
+      path2 = self.writeFile("src/file2", self.randomData(1000))
+      known = set()
+      writeChunkArchive([ path1, ], manifestPath, packPath, known)
+      writeChunkArchive([ path1, path2, ], manifestPath, packPath, known, append=True)
+      materializeTarfile(manifestPath, [ os.path.dirname(packPath), ], tarfilePath)
+      self.failUnlessEqual(2, len(self.extractTarfile(tarfilePath)))
+
+
+   ##############################
+   # Test materializeTarfile()
+   ##############################
+
+   def testMaterializeTarfile_001(self):
+      """
+      Test a round trip with files, a directory and a soft link, using packs in several directories.
+      """
+      (manifestPath, packPath, tarfilePath) = self.getPaths()
+      data = self.randomData(CHUNK_MAX_SIZE * 2)
+      path1 = self.writeFile("src/file1", data)
+      path2 = self.writeFile("src/dir/file2", "small")
+      link = os.path.join(self.tmpdir, "src", "link")
+      os.symlink(path2, link)
+      dirPath = os.path.dirname(path2)
+      known = set()
+      writeChunkArchive([ path1, ], manifestPath, packPath, known)
+      os.rename(packPath, os.path.join(self.tmpdir, "first.chunks"))
+      self.writeFile("src/file1", data + "more")
+      writeChunkArchive([ path1, path2, dirPath, link, ], manifestPath, packPath, known)
+      materializeTarfile(manifestPath, [ os.path.dirname(packPath), self.tmpdir, ], tarfilePath, mode="targz")
+      contents = self.extractTarfile(tarfilePath)
+      self.failUnlessEqual(data + "more", contents[path1[1:]])
+      self.failUnlessEqual("small", contents[path2[1:]])
+      self.failUnlessEqual(None, contents[dirPath[1:]])
+      self.failUnlessEqual(None, contents[link[1:]])
+
+   def testMaterializeTarfile_002(self):
+      """
+      Test with a pack that can't be found.
+      """
+      (manifestPath, packPath, tarfilePath) = self.getPaths()
+      path = self.writeFile("src/file", "data")
+      writeChunkArchive([ path, ], manifestPath, packPath, set())
+      os.remove(packPath)
+      self.failUnlessRaises(ValueError, materializeTarfile, manifestPath, [ self.tmpdir, ], tarfilePath)
+      self.failIf(os.path.exists(tarfilePath))
+
+   def testMaterializeTarfile_003(self):
+      """
+      Test with a file that is not a manifest.
+      """
+      (unused, unused, tarfilePath) = self.getPaths()
+      manifestPath = self.writeFile("bogus.manifest", "not a manifest")
+      self.failUnlessRaises(ValueError, materializeTarfile, manifestPath, [ self.tmpdir, ], tarfilePath)
+
+   def testMaterializeTarfile_004(self):
+      """
+      Test with an invalid mode.
+      """
+      (manifestPath, packPath, tarfilePath) = self.getPaths()
+      path = self.writeFile("src/file", "data")
+      writeChunkArchive([ path, ], manifestPath, packPath, set())
+      self.failUnlessRaises(ValueError, materializeTarfile, manifestPath, [ self.tmpdir, ], tarfilePath, mode="zip")
+
+
+#######################################################################
+# Suite definition
+#######################################################################
+
+# pylint: disable=C0330
+def suite():
+   """Returns a suite containing all the test cases in this module."""
+   return unittest.TestSuite((
+                              unittest.makeSuite(TestChunk, 'test'),
+                            ))
+
+
+########################################################################
+# Module entry point
+########################################################################
+
+# When this module is executed from the command-line, run its tests
+if __name__ == '__main__':
+   unittest.main()
@@ -3515,6 +3515,141 @@ class TestOptions(unittest.TestCase):
       """
       self.failUnlessRaises(ValueError, Options, argumentString="-u", validate=True)
 
+   def testConstructor_221(self):
+      """
+      Test constructor with argumentList=["--plan", "collect", ], validate=True.
+      """
+      options = Options(argumentList=["--plan", "collect", ], validate=True)
+      self.failUnlessEqual(False, options.help)
+      self.failUnlessEqual(False, options.version)
+      self.failUnlessEqual(False, options.verbose)
+      self.failUnlessEqual(False, options.quiet)
+      self.failUnlessEqual(None, options.config)
+      self.failUnlessEqual(False, options.full)
+      self.failUnlessEqual(True, options.plan)
+      self.failUnlessEqual(False, options.managed)
+      self.failUnlessEqual(False, options.managedOnly)
+      self.failUnlessEqual(None, options.logfile)
+      self.failUnlessEqual(None, options.owner)
+      self.failUnlessEqual(None, options.mode)
+      self.failUnlessEqual(False, options.output)
+      self.failUnlessEqual(False, options.debug)
+      self.failUnlessEqual(False, options.stacktrace)
+      self.failUnlessEqual(False, options.diagnostics)
+      self.failUnlessEqual(False, options.unsupported)
+      self.failUnlessEqual(["collect", ], options.actions)
+
+   def testConstructor_222(self):
+      """
+      Test constructor with argumentString="--plan collect", validate=True.
+      """
+      options = Options(argumentString="--plan collect", validate=True)
+      self.failUnlessEqual(False, options.help)
+      self.failUnlessEqual(False, options.version)
+      self.failUnlessEqual(False, options.verbose)
+      self.failUnlessEqual(False, options.quiet)
+      self.failUnlessEqual(None, options.config)
+      self.failUnlessEqual(False, options.full)
+      self.failUnlessEqual(True, options.plan)
+      self.failUnlessEqual(False, options.managed)
+      self.failUnlessEqual(False, options.managedOnly)
+      self.failUnlessEqual(None, options.logfile)
+      self.failUnlessEqual(None, options.owner)
+      self.failUnlessEqual(None, options.mode)
+      self.failUnlessEqual(False, options.output)
+      self.failUnlessEqual(False, options.debug)
+      self.failUnlessEqual(False, options.stacktrace)
+      self.failUnlessEqual(False, options.diagnostics)
+      self.failUnlessEqual(False, options.unsupported)
+      self.failUnlessEqual(["collect", ], options.actions)
+
+   def testConstructor_223(self):
+      """
+      Test constructor with argumentList=["-P", "collect", ], validate=True.
+      """
+      options = Options(argumentList=["-P", "collect", ], validate=True)
+      self.failUnlessEqual(False, options.help)
+      self.failUnlessEqual(False, options.version)
+      self.failUnlessEqual(False, options.verbose)
+      self.failUnlessEqual(False, options.quiet)
+      self.failUnlessEqual(None, options.config)
+      self.failUnlessEqual(False, options.full)
+      self.failUnlessEqual(True, options.plan)
+      self.failUnlessEqual(False, options.managed)
+      self.failUnlessEqual(False, options.managedOnly)
+      self.failUnlessEqual(None, options.logfile)
+      self.failUnlessEqual(None, options.owner)
+      self.failUnlessEqual(None, options.mode)
+      self.failUnlessEqual(False, options.output)
+      self.failUnlessEqual(False, options.debug)
+      self.failUnlessEqual(False, options.stacktrace)
+      self.failUnlessEqual(False, options.diagnostics)
+      self.failUnlessEqual(False, options.unsupported)
+      self.failUnlessEqual(["collect", ], options.actions)
+
+   def testConstructor_224(self):
+      """
+      Test constructor with argumentString="-P collect", validate=True.
+      """
+      options = Options(argumentString="-P collect", validate=True)
+      self.failUnlessEqual(False, options.help)
+      self.failUnlessEqual(False, options.version)
+      self.failUnlessEqual(False, options.verbose)
+      self.failUnlessEqual(False, options.quiet)
+      self.failUnlessEqual(None, options.config)
+      self.failUnlessEqual(False, options.full)
+      self.failUnlessEqual(True, options.plan)
+      self.failUnlessEqual(False, options.managed)
+      self.failUnlessEqual(False, options.managedOnly)
+      self.failUnlessEqual(None, options.logfile)
+      self.failUnlessEqual(None, options.owner)
+      self.failUnlessEqual(None, options.mode)
+      self.failUnlessEqual(False, options.output)
+      self.failUnlessEqual(False, options.debug)
+      self.failUnlessEqual(False, options.stacktrace)
+      self.failUnlessEqual(False, options.diagnostics)
+      self.failUnlessEqual(False, options.unsupported)
+      self.failUnlessEqual(["collect", ], options.actions)
+
+   def testConstructor_225(self):
+      """
+      Test constructor with argumentList=["--plan", ], validate=True.
+      """
+      self.failUnlessRaises(ValueError, Options, argumentList=["--plan", ], validate=True)
+
+   def testConstructor_226(self):
+      """
+      Test constructor with argumentList=["--plan", "stage", ], validate=True.
+      """
+      self.failUnlessRaises(ValueError, Options, argumentList=["--plan", "stage", ], validate=True)
+
+   def testConstructor_227(self):
+      """
+      Test constructor with argumentString="-P collect stage", validate=True.
+      """
+      self.failUnlessRaises(ValueError, Options, argumentString="-P collect stage", validate=True)
+
+   def testConstructor_228(self):
+      """
+      Test constructor with argumentList=["--plan", "--managed", "collect", ], validate=True.
+      """
+      self.failUnlessRaises(ValueError, Options, argumentList=["--plan", "--managed", "collect", ], validate=True)
+
+   def testConstructor_229(self):
+      """
+      Test constructor with argumentString="-P -N collect", validate=True.
+      """
+      self.failUnlessRaises(ValueError, Options, argumentString="-P -N collect", validate=True)
+
+   def testConstructor_230(self):
+      """
+      Test constructor with argumentList=["--plan", "--help", ], validate=True.
+      """
+      options = Options(argumentList=["--plan", "--help", ], validate=True)
+      self.failUnlessEqual(True, options.help)
+      self.failUnlessEqual(True, options.plan)
+      self.failUnlessEqual([], options.actions)
+
 
    ############################
    # Test comparison operators
@@ -4350,6 +4485,27 @@ class TestOptions(unittest.TestCase):
       self.failUnless(not options1 >= options2)
       self.failUnless(options1 != options2)
 
+   def testComparison_018(self):
+      """
+      Test comparison of two identical objects, actions filled in, plan different.
+      """
+      options1 = Options()
+      options2 = Options()
+
+      options1.plan = False
+      options1.actions = ["collect", ]
+
+      options2.plan = True
+      options2.actions = ["collect", ]
+
+      self.failIfEqual(options1, options2)
+      self.failUnless(not options1 == options2)
+      self.failUnless(options1 < options2)
+      self.failUnless(options1 <= options2)
+      self.failUnless(not options1 > options2)
+      self.failUnless(not options1 >= options2)
+      self.failUnless(options1 != options2)
+
 
    ###########################
    # Test buildArgumentList()
@@ -4751,6 +4907,34 @@ class TestOptions(unittest.TestCase):
       options.unsupported = True
       self.failUnlessRaises(ValueError, options.buildArgumentList, validate=True)
 
+   def testBuildArgumentList_045(self):
+      """Test with plan set, validate=False."""
+      options = Options()
+      options.plan = True
+      argumentList = options.buildArgumentList(validate=False)
+      self.failUnlessEqual(["--plan", ], argumentList)
+
+   def testBuildArgumentList_046(self):
+      """Test with plan set, validate=True."""
+      options = Options()
+      options.plan = True
+      self.failUnlessRaises(ValueError, options.buildArgumentList, validate=True)
+
+   def testBuildArgumentList_047(self):
+      """Test with plan set and a collect action, validate=True."""
+      options = Options()
+      options.plan = True
+      options.actions = ["collect", ]
+      argumentList = options.buildArgumentList(validate=True)
+      self.failUnlessEqual(["--plan", "collect", ], argumentList)
+
+   def testBuildArgumentList_048(self):
+      """Test with plan set and a stage action, validate=True."""
+      options = Options()
+      options.plan = True
+      options.actions = ["stage", ]
+      self.failUnlessRaises(ValueError, options.buildArgumentList, validate=True)
+
 
    #############################
    # Test buildArgumentString()
@@ -5136,6 +5320,34 @@ class TestOptions(unittest.TestCase):
       options.unsupported = True
       self.failUnlessRaises(ValueError, options.buildArgumentString, validate=True)
 
+   def testBuildArgumentString_045(self):
+      """Test with plan set, validate=False."""
+      options = Options()
+      options.plan = True
+      argumentString = options.buildArgumentString(validate=False)
+      self.failUnlessEqual("--plan ", argumentString)
+
+   def testBuildArgumentString_046(self):
+      """Test with plan set, validate=True."""
+      options = Options()
+      options.plan = True
+      self.failUnlessRaises(ValueError, options.buildArgumentString, validate=True)
+
+   def testBuildArgumentString_047(self):
+      """Test with plan set and a collect action, validate=True."""
+      options = Options()
+      options.plan = True
+      options.actions = ["collect", ]
+      argumentString = options.buildArgumentString(validate=True)
+      self.failUnlessEqual('--plan "collect" ', argumentString)
+
+   def testBuildArgumentString_048(self):
+      """Test with plan set and a stage action, validate=True."""
+      options = Options()
+      options.plan = True
+      options.actions = ["stage", ]
+      self.failUnlessRaises(ValueError, options.buildArgumentString, validate=True)
+
 
 ######################
 # TestActionSet class
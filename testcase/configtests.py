@@ -120,7 +120,7 @@ RESOURCES = [ "cback.conf.1", "cback.conf.2", "cback.conf.3", "cback.conf.4",
               "cback.conf.9", "cback.conf.10", "cback.conf.11", "cback.conf.12",
               "cback.conf.13", "cback.conf.14", "cback.conf.15", "cback.conf.16",
               "cback.conf.17", "cback.conf.18", "cback.conf.19", "cback.conf.20",
-              "cback.conf.21", "cback.conf.22", "cback.conf.23", ]
+              "cback.conf.21", "cback.conf.22", "cback.conf.23", "cback.conf.24", ]
 
 
 #######################################################################
@@ -1685,6 +1685,8 @@ class TestBlankBehavior(unittest.TestCase):
       self.failUnlessEqual("daily", behavior.blankMode)
       behavior.blankMode = "weekly"
       self.failUnlessEqual("weekly", behavior.blankMode)
+      behavior.blankMode = "planned"
+      self.failUnlessEqual("planned", behavior.blankMode)
 
    def testConstructor_005(self):
       """
@@ -2573,6 +2575,8 @@ class TestCollectFile(unittest.TestCase):
       self.failUnlessEqual("weekly", collectFile.collectMode)
       collectFile.collectMode = "incr"
       self.failUnlessEqual("incr", collectFile.collectMode)
+      collectFile.collectMode = "diff"
+      self.failUnlessEqual("diff", collectFile.collectMode)
 
    def testConstructor_009(self):
       """
@@ -2613,6 +2617,10 @@ class TestCollectFile(unittest.TestCase):
       self.failUnlessEqual("targz", collectFile.archiveMode)
       collectFile.archiveMode = "tarbz2"
       self.failUnlessEqual("tarbz2", collectFile.archiveMode)
+      collectFile.archiveMode = "adaptive"
+      self.failUnlessEqual("adaptive", collectFile.archiveMode)
+      collectFile.archiveMode = "chunk"
+      self.failUnlessEqual("chunk", collectFile.archiveMode)
 
    def testConstructor_013(self):
       """
@@ -2798,6 +2806,7 @@ class TestCollectDir(unittest.TestCase):
       self.failUnlessEqual(None, collectDir.absoluteExcludePaths)
       self.failUnlessEqual(None, collectDir.relativeExcludePaths)
       self.failUnlessEqual(None, collectDir.excludePatterns)
+      self.failUnlessEqual(None, collectDir.volumeSize)
 
    def testConstructor_002(self):
       """
@@ -2872,6 +2881,8 @@ class TestCollectDir(unittest.TestCase):
       self.failUnlessEqual("weekly", collectDir.collectMode)
       collectDir.collectMode = "incr"
       self.failUnlessEqual("incr", collectDir.collectMode)
+      collectDir.collectMode = "diff"
+      self.failUnlessEqual("diff", collectDir.collectMode)
 
    def testConstructor_009(self):
       """
@@ -2912,6 +2923,10 @@ class TestCollectDir(unittest.TestCase):
       self.failUnlessEqual("targz", collectDir.archiveMode)
       collectDir.archiveMode = "tarbz2"
       self.failUnlessEqual("tarbz2", collectDir.archiveMode)
+      collectDir.archiveMode = "adaptive"
+      self.failUnlessEqual("adaptive", collectDir.archiveMode)
+      collectDir.archiveMode = "chunk"
+      self.failUnlessEqual("chunk", collectDir.archiveMode)
 
    def testConstructor_013(self):
       """
@@ -3229,6 +3244,256 @@ class TestCollectDir(unittest.TestCase):
       self.failUnlessAssignRaises(ValueError, collectDir, "recursionLevel", "ken")
       self.failUnlessEqual(None, collectDir.recursionLevel)
 
+   def testConstructor_045(self):
+      """
+      Test assignment of volumeSize attribute, None value.
+      """
+      collectDir = CollectDir(volumeSize=ByteQuantity("2", UNIT_GBYTES))
+      self.failUnlessEqual(ByteQuantity("2", UNIT_GBYTES), collectDir.volumeSize)
+      collectDir.volumeSize = None
+      self.failUnlessEqual(None, collectDir.volumeSize)
+
+   def testConstructor_046(self):
+      """
+      Test assignment of volumeSize attribute, valid value.
+      """
+      collectDir = CollectDir()
+      self.failUnlessEqual(None, collectDir.volumeSize)
+      collectDir.volumeSize = ByteQuantity("650", UNIT_MBYTES)
+      self.failUnlessEqual(ByteQuantity("650", UNIT_MBYTES), collectDir.volumeSize)
+
+   def testConstructor_047(self):
+      """
+      Test assignment of volumeSize attribute, invalid value (not a ByteQuantity).
+      """
+      collectDir = CollectDir()
+      self.failUnlessEqual(None, collectDir.volumeSize)
+      self.failUnlessAssignRaises(ValueError, collectDir, "volumeSize", "2 GB")
+      self.failUnlessEqual(None, collectDir.volumeSize)
+      self.failUnlessAssignRaises(ValueError, collectDir, "volumeSize", 12)
+      self.failUnlessEqual(None, collectDir.volumeSize)
+
+   def testConstructor_048(self):
+      """
+      Test assignment of skipCompressed attribute, None value.
+      """
+      collectDir = CollectDir(skipCompressed=True)
+      self.failUnlessEqual(True, collectDir.skipCompressed)
+      collectDir.skipCompressed = None
+      self.failUnlessEqual(False, collectDir.skipCompressed)
+
+   def testConstructor_049(self):
+      """
+      Test assignment of skipCompressed attribute, valid value (real boolean).
+      """
+      collectDir = CollectDir()
+      self.failUnlessEqual(False, collectDir.skipCompressed)
+      collectDir.skipCompressed = True
+      self.failUnlessEqual(True, collectDir.skipCompressed)
+      collectDir.skipCompressed = False
+      self.failUnlessEqual(False, collectDir.skipCompressed)
+
+   def testConstructor_050(self):
+      """
+      Test assignment of skipCompressed attribute, valid value (expression).
+      """
+      collectDir = CollectDir()
+      self.failUnlessEqual(False, collectDir.skipCompressed)
+      collectDir.skipCompressed = 0
+      self.failUnlessEqual(False, collectDir.skipCompressed)
+      collectDir.skipCompressed = []
+      self.failUnlessEqual(False, collectDir.skipCompressed)
+      collectDir.skipCompressed = ['a']
+      self.failUnlessEqual(True, collectDir.skipCompressed)
+      collectDir.skipCompressed = 3
+      self.failUnlessEqual(True, collectDir.skipCompressed)
+
+   def testConstructor_051(self):
+      """
+      Test assignment of maxFileSize attribute, None value.
+      """
+      collectDir = CollectDir(maxFileSize=ByteQuantity("10", UNIT_GBYTES))
+      self.failUnlessEqual(ByteQuantity("10", UNIT_GBYTES), collectDir.maxFileSize)
+      collectDir.maxFileSize = None
+      self.failUnlessEqual(None, collectDir.maxFileSize)
+
+   def testConstructor_052(self):
+      """
+      Test assignment of maxFileSize attribute, valid value.
+      """
+      collectDir = CollectDir()
+      self.failUnlessEqual(None, collectDir.maxFileSize)
+      collectDir.maxFileSize = ByteQuantity("500", UNIT_MBYTES)
+      self.failUnlessEqual(ByteQuantity("500", UNIT_MBYTES), collectDir.maxFileSize)
+
+   def testConstructor_053(self):
+      """
+      Test assignment of maxFileSize attribute, invalid value (not a ByteQuantity).
+      """
+      collectDir = CollectDir()
+      self.failUnlessEqual(None, collectDir.maxFileSize)
+      self.failUnlessAssignRaises(ValueError, collectDir, "maxFileSize", "10 GB")
+      self.failUnlessEqual(None, collectDir.maxFileSize)
+
+   def testConstructor_054(self):
+      """
+      Test assignment of minFileAge attribute, None value.
+      """
+      collectDir = CollectDir(minFileAge=30)
+      self.failUnlessEqual(30, collectDir.minFileAge)
+      collectDir.minFileAge = None
+      self.failUnlessEqual(None, collectDir.minFileAge)
+
+   def testConstructor_055(self):
+      """
+      Test assignment of minFileAge attribute, valid value.
+      """
+      collectDir = CollectDir()
+      self.failUnlessEqual(None, collectDir.minFileAge)
+      collectDir.minFileAge = 0
+      self.failUnlessEqual(0, collectDir.minFileAge)
+      collectDir.minFileAge = "15"
+      self.failUnlessEqual(15, collectDir.minFileAge)
+
+   def testConstructor_056(self):
+      """
+      Test assignment of minFileAge attribute, invalid value.
+      """
+      collectDir = CollectDir()
+      self.failUnlessEqual(None, collectDir.minFileAge)
+      self.failUnlessAssignRaises(ValueError, collectDir, "minFileAge", "ken")
+      self.failUnlessEqual(None, collectDir.minFileAge)
+      self.failUnlessAssignRaises(ValueError, collectDir, "minFileAge", -1)
+      self.failUnlessEqual(None, collectDir.minFileAge)
+
+   def testConstructor_057(self):
+      """
+      Test assignment of maxFileAge attribute, None value.
+      """
+      collectDir = CollectDir(maxFileAge=365)
+      self.failUnlessEqual(365, collectDir.maxFileAge)
+      collectDir.maxFileAge = None
+      self.failUnlessEqual(None, collectDir.maxFileAge)
+
+   def testConstructor_058(self):
+      """
+      Test assignment of maxFileAge attribute, valid value.
+      """
+      collectDir = CollectDir()
+      self.failUnlessEqual(None, collectDir.maxFileAge)
+      collectDir.maxFileAge = 0
+      self.failUnlessEqual(0, collectDir.maxFileAge)
+      collectDir.maxFileAge = "90"
+      self.failUnlessEqual(90, collectDir.maxFileAge)
+
+   def testConstructor_059(self):
+      """
+      Test assignment of maxFileAge attribute, invalid value.
+      """
+      collectDir = CollectDir()
+      self.failUnlessEqual(None, collectDir.maxFileAge)
+      self.failUnlessAssignRaises(ValueError, collectDir, "maxFileAge", "ken")
+      self.failUnlessEqual(None, collectDir.maxFileAge)
+      self.failUnlessAssignRaises(ValueError, collectDir, "maxFileAge", -1)
+      self.failUnlessEqual(None, collectDir.maxFileAge)
+
+   def testConstructor_060(self):
+      """
+      Test assignment of syntheticFull attribute, None value.
+      """
+      collectDir = CollectDir(syntheticFull=True)
+      self.failUnlessEqual(True, collectDir.syntheticFull)
+      collectDir.syntheticFull = None
+      self.failUnlessEqual(False, collectDir.syntheticFull)
+
+   def testConstructor_061(self):
+      """
+      Test assignment of syntheticFull attribute, valid value (real boolean).
+      """
+      collectDir = CollectDir()
+      self.failUnlessEqual(False, collectDir.syntheticFull)
+      collectDir.syntheticFull = True
+      self.failUnlessEqual(True, collectDir.syntheticFull)
+      collectDir.syntheticFull = False
+      self.failUnlessEqual(False, collectDir.syntheticFull)
+
+   def testConstructor_062(self):
+      """
+      Test assignment of syntheticFull attribute, valid value (expression).
+      """
+      collectDir = CollectDir()
+      self.failUnlessEqual(False, collectDir.syntheticFull)
+      collectDir.syntheticFull = 0
+      self.failUnlessEqual(False, collectDir.syntheticFull)
+      collectDir.syntheticFull = []
+      self.failUnlessEqual(False, collectDir.syntheticFull)
+      collectDir.syntheticFull = ['a']
+      self.failUnlessEqual(True, collectDir.syntheticFull)
+      collectDir.syntheticFull = 3
+      self.failUnlessEqual(True, collectDir.syntheticFull)
+
+   def testConstructor_063(self):
+      """
+      Test assignment of deltaThreshold attribute, None value.
+      """
+      collectDir = CollectDir(deltaThreshold=ByteQuantity("1", UNIT_GBYTES))
+      self.failUnlessEqual(ByteQuantity("1", UNIT_GBYTES), collectDir.deltaThreshold)
+      collectDir.deltaThreshold = None
+      self.failUnlessEqual(None, collectDir.deltaThreshold)
+
+   def testConstructor_064(self):
+      """
+      Test assignment of deltaThreshold attribute, valid value.
+      """
+      collectDir = CollectDir()
+      self.failUnlessEqual(None, collectDir.deltaThreshold)
+      collectDir.deltaThreshold = ByteQuantity("500", UNIT_MBYTES)
+      self.failUnlessEqual(ByteQuantity("500", UNIT_MBYTES), collectDir.deltaThreshold)
+
+   def testConstructor_065(self):
+      """
+      Test assignment of deltaThreshold attribute, invalid value (not a ByteQuantity).
+      """
+      collectDir = CollectDir()
+      self.failUnlessEqual(None, collectDir.deltaThreshold)
+      self.failUnlessAssignRaises(ValueError, collectDir, "deltaThreshold", "1 GB")
+      self.failUnlessEqual(None, collectDir.deltaThreshold)
+
+   def testConstructor_066(self):
+      """
+      Test assignment of dedupFiles attribute, None value.
+      """
+      collectDir = CollectDir(dedupFiles=True)
+      self.failUnlessEqual(True, collectDir.dedupFiles)
+      collectDir.dedupFiles = None
+      self.failUnlessEqual(False, collectDir.dedupFiles)
+
+   def testConstructor_067(self):
+      """
+      Test assignment of dedupFiles attribute, valid value (real boolean).
+      """
+      collectDir = CollectDir()
+      self.failUnlessEqual(False, collectDir.dedupFiles)
+      collectDir.dedupFiles = True
+      self.failUnlessEqual(True, collectDir.dedupFiles)
+      collectDir.dedupFiles = False
+      self.failUnlessEqual(False, collectDir.dedupFiles)
+
+   def testConstructor_068(self):
+      """
+      Test assignment of dedupFiles attribute, valid value (expression).
+      """
+      collectDir = CollectDir()
+      self.failUnlessEqual(False, collectDir.dedupFiles)
+      collectDir.dedupFiles = 0
+      self.failUnlessEqual(False, collectDir.dedupFiles)
+      collectDir.dedupFiles = []
+      self.failUnlessEqual(False, collectDir.dedupFiles)
+      collectDir.dedupFiles = ['a']
+      self.failUnlessEqual(True, collectDir.dedupFiles)
+      collectDir.dedupFiles = 3
+      self.failUnlessEqual(True, collectDir.dedupFiles)
+
 
    ############################
    # Test comparison operators
@@ -3652,6 +3917,188 @@ class TestCollectDir(unittest.TestCase):
       self.failUnless(collectDir1 >= collectDir2)
       self.failUnless(collectDir1 != collectDir2)
 
+   def testComparison_030(self):
+      """
+      Test comparison of two differing objects, volumeSize differs (one None).
+      """
+      collectDir1 = CollectDir()
+      collectDir2 = CollectDir(volumeSize=ByteQuantity("1", UNIT_GBYTES))
+      self.failIfEqual(collectDir1, collectDir2)
+      self.failUnless(not collectDir1 == collectDir2)
+      self.failUnless(collectDir1 < collectDir2)
+      self.failUnless(collectDir1 <= collectDir2)
+      self.failUnless(not collectDir1 > collectDir2)
+      self.failUnless(not collectDir1 >= collectDir2)
+      self.failUnless(collectDir1 != collectDir2)
+
+   def testComparison_031(self):
+      """
+      Test comparison of two differing objects, volumeSize differs.
+      """
+      collectDir1 = CollectDir("/etc/whatever", "incr", "tar", "ignore", [], [], [], 1, True, 6, ByteQuantity("1", UNIT_GBYTES))
+      collectDir2 = CollectDir("/etc/whatever", "incr", "tar", "ignore", [], [], [], 1, True, 6, ByteQuantity("1000", UNIT_MBYTES))
+      self.failIfEqual(collectDir1, collectDir2)
+      self.failUnless(not collectDir1 == collectDir2)
+      self.failUnless(not collectDir1 < collectDir2)
+      self.failUnless(not collectDir1 <= collectDir2)
+      self.failUnless(collectDir1 > collectDir2)
+      self.failUnless(collectDir1 >= collectDir2)
+      self.failUnless(collectDir1 != collectDir2)
+
+   def testComparison_032(self):
+      """
+      Test comparison of two differing objects, skipCompressed differs (one None).
+      """
+      collectDir1 = CollectDir()
+      collectDir2 = CollectDir(skipCompressed=True)
+      self.failIfEqual(collectDir1, collectDir2)
+      self.failUnless(not collectDir1 == collectDir2)
+      self.failUnless(collectDir1 < collectDir2)
+      self.failUnless(collectDir1 <= collectDir2)
+      self.failUnless(not collectDir1 > collectDir2)
+      self.failUnless(not collectDir1 >= collectDir2)
+      self.failUnless(collectDir1 != collectDir2)
+
+   def testComparison_033(self):
+      """
+      Test comparison of two differing objects, skipCompressed differs.
+      """
+      collectDir1 = CollectDir("/etc/whatever", "incr", "tar", "ignore", [], [], [], 1, True, 6, None, True)
+      collectDir2 = CollectDir("/etc/whatever", "incr", "tar", "ignore", [], [], [], 1, True, 6, None, False)
+      self.failIfEqual(collectDir1, collectDir2)
+      self.failUnless(not collectDir1 == collectDir2)
+      self.failUnless(not collectDir1 < collectDir2)
+      self.failUnless(not collectDir1 <= collectDir2)
+      self.failUnless(collectDir1 > collectDir2)
+      self.failUnless(collectDir1 >= collectDir2)
+      self.failUnless(collectDir1 != collectDir2)
+
+   def testComparison_034(self):
+      """
+      Test comparison of two differing objects, maxFileSize (one None) differs.
+      """
+      collectDir1 = CollectDir(maxFileSize=None)
+      collectDir2 = CollectDir(maxFileSize=ByteQuantity("1", UNIT_GBYTES))
+      self.failIfEqual(collectDir1, collectDir2)
+      self.failUnless(not collectDir1 == collectDir2)
+      self.failUnless(collectDir1 < collectDir2)
+      self.failUnless(collectDir1 <= collectDir2)
+      self.failUnless(not collectDir1 > collectDir2)
+      self.failUnless(not collectDir1 >= collectDir2)
+      self.failUnless(collectDir1 != collectDir2)
+
+   def testComparison_035(self):
+      """
+      Test comparison of two differing objects, maxFileSize differs.
+      """
+      collectDir1 = CollectDir(maxFileSize=ByteQuantity("1", UNIT_MBYTES))
+      collectDir2 = CollectDir(maxFileSize=ByteQuantity("1", UNIT_GBYTES))
+      self.failIfEqual(collectDir1, collectDir2)
+      self.failUnless(not collectDir1 == collectDir2)
+      self.failUnless(collectDir1 < collectDir2)
+      self.failUnless(collectDir1 <= collectDir2)
+      self.failUnless(not collectDir1 > collectDir2)
+      self.failUnless(not collectDir1 >= collectDir2)
+      self.failUnless(collectDir1 != collectDir2)
+
+   def testComparison_036(self):
+      """
+      Test comparison of two differing objects, minFileAge (one None) differs.
+      """
+      collectDir1 = CollectDir(minFileAge=None)
+      collectDir2 = CollectDir(minFileAge=5)
+      self.failIfEqual(collectDir1, collectDir2)
+      self.failUnless(not collectDir1 == collectDir2)
+      self.failUnless(collectDir1 < collectDir2)
+      self.failUnless(collectDir1 <= collectDir2)
+      self.failUnless(not collectDir1 > collectDir2)
+      self.failUnless(not collectDir1 >= collectDir2)
+      self.failUnless(collectDir1 != collectDir2)
+
+   def testComparison_037(self):
+      """
+      Test comparison of two differing objects, minFileAge differs.
+      """
+      collectDir1 = CollectDir(minFileAge=5)
+      collectDir2 = CollectDir(minFileAge=10)
+      self.failIfEqual(collectDir1, collectDir2)
+      self.failUnless(not collectDir1 == collectDir2)
+      self.failUnless(collectDir1 < collectDir2)
+      self.failUnless(collectDir1 <= collectDir2)
+      self.failUnless(not collectDir1 > collectDir2)
+      self.failUnless(not collectDir1 >= collectDir2)
+      self.failUnless(collectDir1 != collectDir2)
+
+   def testComparison_038(self):
+      """
+      Test comparison of two differing objects, maxFileAge (one None) differs.
+      """
+      collectDir1 = CollectDir(maxFileAge=None)
+      collectDir2 = CollectDir(maxFileAge=30)
+      self.failIfEqual(collectDir1, collectDir2)
+      self.failUnless(not collectDir1 == collectDir2)
+      self.failUnless(collectDir1 < collectDir2)
+      self.failUnless(collectDir1 <= collectDir2)
+      self.failUnless(not collectDir1 > collectDir2)
+      self.failUnless(not collectDir1 >= collectDir2)
+      self.failUnless(collectDir1 != collectDir2)
+
+   def testComparison_039(self):
+      """
+      Test comparison of two differing objects, maxFileAge differs.
+      """
+      collectDir1 = CollectDir(maxFileAge=30)
+      collectDir2 = CollectDir(maxFileAge=60)
+      self.failIfEqual(collectDir1, collectDir2)
+      self.failUnless(not collectDir1 == collectDir2)
+      self.failUnless(collectDir1 < collectDir2)
+      self.failUnless(collectDir1 <= collectDir2)
+      self.failUnless(not collectDir1 > collectDir2)
+      self.failUnless(not collectDir1 >= collectDir2)
+      self.failUnless(collectDir1 != collectDir2)
+
+   def testComparison_040(self):
+      """
+      Test comparison of two differing objects, syntheticFull differs.
+      """
+      collectDir1 = CollectDir(syntheticFull=False)
+      collectDir2 = CollectDir(syntheticFull=True)
+      self.failIfEqual(collectDir1, collectDir2)
+      self.failUnless(not collectDir1 == collectDir2)
+      self.failUnless(collectDir1 < collectDir2)
+      self.failUnless(collectDir1 <= collectDir2)
+      self.failUnless(not collectDir1 > collectDir2)
+      self.failUnless(not collectDir1 >= collectDir2)
+      self.failUnless(collectDir1 != collectDir2)
+
+   def testComparison_041(self):
+      """
+      Test comparison of two differing objects, deltaThreshold differs.
+      """
+      collectDir1 = CollectDir(deltaThreshold=ByteQuantity("1", UNIT_MBYTES))
+      collectDir2 = CollectDir(deltaThreshold=ByteQuantity("1", UNIT_GBYTES))
+      self.failIfEqual(collectDir1, collectDir2)
+      self.failUnless(not collectDir1 == collectDir2)
+      self.failUnless(collectDir1 < collectDir2)
+      self.failUnless(collectDir1 <= collectDir2)
+      self.failUnless(not collectDir1 > collectDir2)
+      self.failUnless(not collectDir1 >= collectDir2)
+      self.failUnless(collectDir1 != collectDir2)
+
+   def testComparison_042(self):
+      """
+      Test comparison of two differing objects, dedupFiles differs.
+      """
+      collectDir1 = CollectDir(dedupFiles=False)
+      collectDir2 = CollectDir(dedupFiles=True)
+      self.failIfEqual(collectDir1, collectDir2)
+      self.failUnless(not collectDir1 == collectDir2)
+      self.failUnless(collectDir1 < collectDir2)
+      self.failUnless(collectDir1 <= collectDir2)
+      self.failUnless(not collectDir1 > collectDir2)
+      self.failUnless(not collectDir1 >= collectDir2)
+      self.failUnless(collectDir1 != collectDir2)
+
 
 #####################
 # TestPurgeDir class
@@ -5519,6 +5966,7 @@ class TestOptionsConfig(unittest.TestCase):
       self.failUnlessEqual(None, options.overrides)
       self.failUnlessEqual(None, options.hooks)
       self.failUnlessEqual(None, options.managedActions)
+      self.failUnlessEqual(None, options.ioMode)
 
    def testConstructor_002(self):
       """
@@ -5960,6 +6408,112 @@ class TestOptionsConfig(unittest.TestCase):
       self.failUnlessEqual(None, options.managedActions)
       self.failUnlessAssignRaises(ValueError, options, "managedActions", ["ken", "dash-word", ])
 
+   def testConstructor_046(self):
+      """
+      Test assignment of ioMode attribute, None value.
+      """
+      options = OptionsConfig(ioMode="backup")
+      self.failUnlessEqual("backup", options.ioMode)
+      options.ioMode = None
+      self.failUnlessEqual(None, options.ioMode)
+
+   def testConstructor_047(self):
+      """
+      Test assignment of ioMode attribute, valid value.
+      """
+      options = OptionsConfig()
+      self.failUnlessEqual(None, options.ioMode)
+      options.ioMode = "normal"
+      self.failUnlessEqual("normal", options.ioMode)
+      options.ioMode = "backup"
+      self.failUnlessEqual("backup", options.ioMode)
+
+   def testConstructor_048(self):
+      """
+      Test assignment of ioMode attribute, invalid value (empty).
+      """
+      options = OptionsConfig()
+      self.failUnlessEqual(None, options.ioMode)
+      self.failUnlessAssignRaises(ValueError, options, "ioMode", "")
+      self.failUnlessEqual(None, options.ioMode)
+
+   def testConstructor_049(self):
+      """
+      Test assignment of ioMode attribute, invalid value (not in list).
+      """
+      options = OptionsConfig()
+      self.failUnlessEqual(None, options.ioMode)
+      self.failUnlessAssignRaises(ValueError, options, "ioMode", "bogus")
+      self.failUnlessEqual(None, options.ioMode)
+
+   def testConstructor_050(self):
+      """
+      Test assignment of collectEndTime attribute, None value.
+      """
+      options = OptionsConfig(collectEndTime="06:30")
+      self.failUnlessEqual("06:30", options.collectEndTime)
+      options.collectEndTime = None
+      self.failUnlessEqual(None, options.collectEndTime)
+
+   def testConstructor_051(self):
+      """
+      Test assignment of collectEndTime attribute, valid value.
+      """
+      options = OptionsConfig()
+      self.failUnlessEqual(None, options.collectEndTime)
+      options.collectEndTime = "00:00"
+      self.failUnlessEqual("00:00", options.collectEndTime)
+      options.collectEndTime = "23:59"
+      self.failUnlessEqual("23:59", options.collectEndTime)
+
+   def testConstructor_052(self):
+      """
+      Test assignment of collectEndTime attribute, invalid value.
+      """
+      options = OptionsConfig()
+      self.failUnlessEqual(None, options.collectEndTime)
+      self.failUnlessAssignRaises(ValueError, options, "collectEndTime", "")
+      self.failUnlessEqual(None, options.collectEndTime)
+      self.failUnlessAssignRaises(ValueError, options, "collectEndTime", "6:30")
+      self.failUnlessEqual(None, options.collectEndTime)
+      self.failUnlessAssignRaises(ValueError, options, "collectEndTime", "24:00")
+      self.failUnlessEqual(None, options.collectEndTime)
+      self.failUnlessAssignRaises(ValueError, options, "collectEndTime", "06:60")
+      self.failUnlessEqual(None, options.collectEndTime)
+
+   def testConstructor_053(self):
+      """
+      Test assignment of collectDuration attribute, None value.
+      """
+      options = OptionsConfig(collectDuration=90)
+      self.failUnlessEqual(90, options.collectDuration)
+      options.collectDuration = None
+      self.failUnlessEqual(None, options.collectDuration)
+
+   def testConstructor_054(self):
+      """
+      Test assignment of collectDuration attribute, valid value.
+      """
+      options = OptionsConfig()
+      self.failUnlessEqual(None, options.collectDuration)
+      options.collectDuration = 1
+      self.failUnlessEqual(1, options.collectDuration)
+      options.collectDuration = "240"
+      self.failUnlessEqual(240, options.collectDuration)
+
+   def testConstructor_055(self):
+      """
+      Test assignment of collectDuration attribute, invalid value.
+      """
+      options = OptionsConfig()
+      self.failUnlessEqual(None, options.collectDuration)
+      self.failUnlessAssignRaises(ValueError, options, "collectDuration", "ken")
+      self.failUnlessEqual(None, options.collectDuration)
+      self.failUnlessAssignRaises(ValueError, options, "collectDuration", 0)
+      self.failUnlessEqual(None, options.collectDuration)
+      self.failUnlessAssignRaises(ValueError, options, "collectDuration", -5)
+      self.failUnlessEqual(None, options.collectDuration)
+
 
    ############################
    # Test comparison operators
@@ -6384,55 +6938,111 @@ class TestOptionsConfig(unittest.TestCase):
       self.failUnless(not options1 >= options2)
       self.failUnless(options1 != options2)
 
-   def testComparison_026(self):
+   def testComparison_026(self):
+      """
+      Test comparison of two differing objects, managedActions differs (one
+      None, one not empty).
+      """
+      overrides = [ CommandOverride("one", "/one"), ]
+      hooks = [ PreActionHook("collect", "ls -l ") ]
+      managedActions1 = None
+      managedActions2 = [ "collect", ]
+      options1 = OptionsConfig("monday", "/tmp", "user", "group", "scp -1 -B", overrides, hooks, "ssh", "cback", managedActions1)
+      options2 = OptionsConfig("monday", "/tmp", "user", "group", "scp -1 -B", overrides, hooks, "ssh", "cback", managedActions2)
+      self.failIfEqual(options1, options2)
+      self.failUnless(not options1 == options2)
+      self.failUnless(not options1 > options2)
+      self.failUnless(not options1 >= options2)
+      self.failUnless(options1 < options2)
+      self.failUnless(options1 <= options2)
+      self.failUnless(options1 != options2)
+
+   def testComparison_027(self):
+      """
+      Test comparison of two differing objects, managedActions differs (one
+      empty, one not empty).
+      """
+      overrides = [ CommandOverride("one", "/one"), ]
+      hooks = [ PreActionHook("collect", "ls -l ") ]
+      managedActions1 = []
+      managedActions2 = [ "collect", ]
+      options1 = OptionsConfig("monday", "/tmp", "user", "group", "scp -1 -B", overrides, hooks, "ssh", "cback", managedActions1)
+      options2 = OptionsConfig("monday", "/tmp", "user", "group", "scp -1 -B", overrides, hooks, "ssh", "cback", managedActions2)
+      self.failIfEqual(options1, options2)
+      self.failUnless(not options1 == options2)
+      self.failUnless(not options1 > options2)
+      self.failUnless(not options1 >= options2)
+      self.failUnless(options1 < options2)
+      self.failUnless(options1 <= options2)
+      self.failUnless(options1 != options2)
+
+   def testComparison_028(self):
+      """
+      Test comparison of two differing objects, managedActions differs (both
+      not empty).
+      """
+      overrides = [ CommandOverride("one", "/one"), ]
+      hooks = [ PreActionHook("collect", "ls -l ") ]
+      managedActions1 = [ "collect", ]
+      managedActions2 = [ "purge", ]
+      options1 = OptionsConfig("monday", "/tmp", "user", "group", "scp -1 -B", overrides, hooks, "ssh", "cback", managedActions1)
+      options2 = OptionsConfig("monday", "/tmp", "user", "group", "scp -1 -B", overrides, hooks, "ssh", "cback", managedActions2)
+      self.failIfEqual(options1, options2)
+      self.failUnless(not options1 == options2)
+      self.failUnless(options1 < options2)
+      self.failUnless(options1 <= options2)
+      self.failUnless(not options1 > options2)
+      self.failUnless(not options1 >= options2)
+      self.failUnless(options1 != options2)
+
+   def testComparison_029(self):
+      """
+      Test comparison of two differing objects, ioMode differs (one None).
+      """
+      options1 = OptionsConfig("monday", "/tmp", "user", "group", "scp -1 -B", [], [], "ssh", "cback", [], None)
+      options2 = OptionsConfig("monday", "/tmp", "user", "group", "scp -1 -B", [], [], "ssh", "cback", [], "backup")
+      self.failIfEqual(options1, options2)
+      self.failUnless(not options1 == options2)
+      self.failUnless(options1 < options2)
+      self.failUnless(options1 <= options2)
+      self.failUnless(not options1 > options2)
+      self.failUnless(not options1 >= options2)
+      self.failUnless(options1 != options2)
+
+   def testComparison_030(self):
       """
-      Test comparison of two differing objects, managedActions differs (one
-      None, one not empty).
+      Test comparison of two differing objects, ioMode differs.
       """
-      overrides = [ CommandOverride("one", "/one"), ]
-      hooks = [ PreActionHook("collect", "ls -l ") ]
-      managedActions1 = None
-      managedActions2 = [ "collect", ]
-      options1 = OptionsConfig("monday", "/tmp", "user", "group", "scp -1 -B", overrides, hooks, "ssh", "cback", managedActions1)
-      options2 = OptionsConfig("monday", "/tmp", "user", "group", "scp -1 -B", overrides, hooks, "ssh", "cback", managedActions2)
+      options1 = OptionsConfig("monday", "/tmp", "user", "group", "scp -1 -B", [], [], "ssh", "cback", [], "backup")
+      options2 = OptionsConfig("monday", "/tmp", "user", "group", "scp -1 -B", [], [], "ssh", "cback", [], "normal")
       self.failIfEqual(options1, options2)
       self.failUnless(not options1 == options2)
-      self.failUnless(not options1 > options2)
-      self.failUnless(not options1 >= options2)
       self.failUnless(options1 < options2)
       self.failUnless(options1 <= options2)
+      self.failUnless(not options1 > options2)
+      self.failUnless(not options1 >= options2)
       self.failUnless(options1 != options2)
 
-   def testComparison_027(self):
+   def testComparison_031(self):
       """
-      Test comparison of two differing objects, managedActions differs (one
-      empty, one not empty).
+      Test comparison of two differing objects, collectEndTime differs.
       """
-      overrides = [ CommandOverride("one", "/one"), ]
-      hooks = [ PreActionHook("collect", "ls -l ") ]
-      managedActions1 = []
-      managedActions2 = [ "collect", ]
-      options1 = OptionsConfig("monday", "/tmp", "user", "group", "scp -1 -B", overrides, hooks, "ssh", "cback", managedActions1)
-      options2 = OptionsConfig("monday", "/tmp", "user", "group", "scp -1 -B", overrides, hooks, "ssh", "cback", managedActions2)
+      options1 = OptionsConfig("monday", "/tmp", "user", "group", "scp -1 -B", [], [], "ssh", "cback", [], None, "05:00")
+      options2 = OptionsConfig("monday", "/tmp", "user", "group", "scp -1 -B", [], [], "ssh", "cback", [], None, "06:30")
       self.failIfEqual(options1, options2)
       self.failUnless(not options1 == options2)
-      self.failUnless(not options1 > options2)
-      self.failUnless(not options1 >= options2)
       self.failUnless(options1 < options2)
       self.failUnless(options1 <= options2)
+      self.failUnless(not options1 > options2)
+      self.failUnless(not options1 >= options2)
       self.failUnless(options1 != options2)
 
-   def testComparison_028(self):
+   def testComparison_032(self):
       """
-      Test comparison of two differing objects, managedActions differs (both
-      not empty).
+      Test comparison of two differing objects, collectDuration differs.
       """
-      overrides = [ CommandOverride("one", "/one"), ]
-      hooks = [ PreActionHook("collect", "ls -l ") ]
-      managedActions1 = [ "collect", ]
-      managedActions2 = [ "purge", ]
-      options1 = OptionsConfig("monday", "/tmp", "user", "group", "scp -1 -B", overrides, hooks, "ssh", "cback", managedActions1)
-      options2 = OptionsConfig("monday", "/tmp", "user", "group", "scp -1 -B", overrides, hooks, "ssh", "cback", managedActions2)
+      options1 = OptionsConfig("monday", "/tmp", "user", "group", "scp -1 -B", [], [], "ssh", "cback", [], None, None, 60)
+      options2 = OptionsConfig("monday", "/tmp", "user", "group", "scp -1 -B", [], [], "ssh", "cback", [], None, None, 90)
       self.failIfEqual(options1, options2)
       self.failUnless(not options1 == options2)
       self.failUnless(options1 < options2)
@@ -6906,6 +7516,9 @@ class TestCollectConfig(unittest.TestCase):
       self.failUnlessEqual(None, collect.absoluteExcludePaths)
       self.failUnlessEqual(None, collect.excludePatterns)
       self.failUnlessEqual(None, collect.collectDirs)
+      self.failUnlessEqual(None, collect.workerCount)
+      self.failUnlessEqual(None, collect.prefetchDepth)
+      self.failUnlessEqual(False, collect.physicalOrder)
 
    def testConstructor_002(self):
       """
@@ -6991,6 +7604,8 @@ class TestCollectConfig(unittest.TestCase):
       self.failUnlessEqual("weekly", collect.collectMode)
       collect.collectMode = "incr"
       self.failUnlessEqual("incr", collect.collectMode)
+      collect.collectMode = "diff"
+      self.failUnlessEqual("diff", collect.collectMode)
 
    def testConstructor_010(self):
       """
@@ -7031,6 +7646,10 @@ class TestCollectConfig(unittest.TestCase):
       self.failUnlessEqual("targz", collect.archiveMode)
       collect.archiveMode = "tarbz2"
       self.failUnlessEqual("tarbz2", collect.archiveMode)
+      collect.archiveMode = "adaptive"
+      self.failUnlessEqual("adaptive", collect.archiveMode)
+      collect.archiveMode = "chunk"
+      self.failUnlessEqual("chunk", collect.archiveMode)
 
    def testConstructor_014(self):
       """
@@ -7342,6 +7961,229 @@ class TestCollectConfig(unittest.TestCase):
       self.failUnlessAssignRaises(ValueError, collect, "collectFiles", [ "hello", CollectFile(), ])
       self.failUnlessEqual(None, collect.collectFiles)
 
+   def testConstructor_044(self):
+      """
+      Test assignment of workerCount attribute, None value.
+      """
+      collect = CollectConfig(workerCount=4)
+      self.failUnlessEqual(4, collect.workerCount)
+      collect.workerCount = None
+      self.failUnlessEqual(None, collect.workerCount)
+
+   def testConstructor_045(self):
+      """
+      Test assignment of workerCount attribute, valid value.
+      """
+      collect = CollectConfig()
+      self.failUnlessEqual(None, collect.workerCount)
+      collect.workerCount = 1
+      self.failUnlessEqual(1, collect.workerCount)
+      collect.workerCount = "24"
+      self.failUnlessEqual(24, collect.workerCount)
+
+   def testConstructor_046(self):
+      """
+      Test assignment of workerCount attribute, invalid value (not an
+      integer).
+      """
+      collect = CollectConfig()
+      self.failUnlessEqual(None, collect.workerCount)
+      self.failUnlessAssignRaises(ValueError, collect, "workerCount", "ken")
+      self.failUnlessEqual(None, collect.workerCount)
+
+   def testConstructor_047(self):
+      """
+      Test assignment of workerCount attribute, invalid value (less than
+      one).
+      """
+      collect = CollectConfig()
+      self.failUnlessEqual(None, collect.workerCount)
+      self.failUnlessAssignRaises(ValueError, collect, "workerCount", 0)
+      self.failUnlessEqual(None, collect.workerCount)
+      self.failUnlessAssignRaises(ValueError, collect, "workerCount", -3)
+      self.failUnlessEqual(None, collect.workerCount)
+
+   def testConstructor_048(self):
+      """
+      Test assignment of prefetchDepth attribute, None value.
+      """
+      collect = CollectConfig(prefetchDepth=16)
+      self.failUnlessEqual(16, collect.prefetchDepth)
+      collect.prefetchDepth = None
+      self.failUnlessEqual(None, collect.prefetchDepth)
+
+   def testConstructor_049(self):
+      """
+      Test assignment of prefetchDepth attribute, valid value.
+      """
+      collect = CollectConfig()
+      self.failUnlessEqual(None, collect.prefetchDepth)
+      collect.prefetchDepth = 0
+      self.failUnlessEqual(0, collect.prefetchDepth)
+      collect.prefetchDepth = "32"
+      self.failUnlessEqual(32, collect.prefetchDepth)
+
+   def testConstructor_050(self):
+      """
+      Test assignment of prefetchDepth attribute, invalid value (not an
+      integer).
+      """
+      collect = CollectConfig()
+      self.failUnlessEqual(None, collect.prefetchDepth)
+      self.failUnlessAssignRaises(ValueError, collect, "prefetchDepth", "ken")
+      self.failUnlessEqual(None, collect.prefetchDepth)
+
+   def testConstructor_051(self):
+      """
+      Test assignment of prefetchDepth attribute, invalid value (negative).
+      """
+      collect = CollectConfig()
+      self.failUnlessEqual(None, collect.prefetchDepth)
+      self.failUnlessAssignRaises(ValueError, collect, "prefetchDepth", -1)
+      self.failUnlessEqual(None, collect.prefetchDepth)
+
+   def testConstructor_052(self):
+      """
+      Test assignment of physicalOrder attribute, None value.
+      """
+      collect = CollectConfig(physicalOrder=True)
+      self.failUnlessEqual(True, collect.physicalOrder)
+      collect.physicalOrder = None
+      self.failUnlessEqual(False, collect.physicalOrder)
+
+   def testConstructor_053(self):
+      """
+      Test assignment of physicalOrder attribute, valid value (real boolean).
+      """
+      collect = CollectConfig()
+      self.failUnlessEqual(False, collect.physicalOrder)
+      collect.physicalOrder = True
+      self.failUnlessEqual(True, collect.physicalOrder)
+      collect.physicalOrder = False
+      self.failUnlessEqual(False, collect.physicalOrder)
+
+   def testConstructor_054(self):
+      """
+      Test assignment of physicalOrder attribute, valid value (expression).
+      """
+      collect = CollectConfig()
+      self.failUnlessEqual(False, collect.physicalOrder)
+      collect.physicalOrder = 0
+      self.failUnlessEqual(False, collect.physicalOrder)
+      collect.physicalOrder = []
+      self.failUnlessEqual(False, collect.physicalOrder)
+      collect.physicalOrder = 3
+      self.failUnlessEqual(True, collect.physicalOrder)
+      collect.physicalOrder = ["a", ]
+      self.failUnlessEqual(True, collect.physicalOrder)
+
+   def testConstructor_055(self):
+      """
+      Test assignment of archiveBudget attribute, None value.
+      """
+      collect = CollectConfig(archiveBudget=90)
+      self.failUnlessEqual(90, collect.archiveBudget)
+      collect.archiveBudget = None
+      self.failUnlessEqual(None, collect.archiveBudget)
+
+   def testConstructor_056(self):
+      """
+      Test assignment of archiveBudget attribute, valid value.
+      """
+      collect = CollectConfig()
+      self.failUnlessEqual(None, collect.archiveBudget)
+      collect.archiveBudget = 1
+      self.failUnlessEqual(1, collect.archiveBudget)
+      collect.archiveBudget = "240"
+      self.failUnlessEqual(240, collect.archiveBudget)
+
+   def testConstructor_057(self):
+      """
+      Test assignment of archiveBudget attribute, invalid value (not an
+      integer).
+      """
+      collect = CollectConfig()
+      self.failUnlessEqual(None, collect.archiveBudget)
+      self.failUnlessAssignRaises(ValueError, collect, "archiveBudget", "ken")
+      self.failUnlessEqual(None, collect.archiveBudget)
+
+   def testConstructor_058(self):
+      """
+      Test assignment of archiveBudget attribute, invalid value (zero).
+      """
+      collect = CollectConfig()
+      self.failUnlessEqual(None, collect.archiveBudget)
+      self.failUnlessAssignRaises(ValueError, collect, "archiveBudget", 0)
+      self.failUnlessEqual(None, collect.archiveBudget)
+
+   def testConstructor_059(self):
+      """
+      Test assignment of groupFiles attribute, None value.
+      """
+      collect = CollectConfig(groupFiles=True)
+      self.failUnlessEqual(True, collect.groupFiles)
+      collect.groupFiles = None
+      self.failUnlessEqual(False, collect.groupFiles)
+
+   def testConstructor_060(self):
+      """
+      Test assignment of groupFiles attribute, valid value (real boolean).
+      """
+      collect = CollectConfig()
+      self.failUnlessEqual(False, collect.groupFiles)
+      collect.groupFiles = True
+      self.failUnlessEqual(True, collect.groupFiles)
+      collect.groupFiles = False
+      self.failUnlessEqual(False, collect.groupFiles)
+
+   def testConstructor_061(self):
+      """
+      Test assignment of groupFiles attribute, valid value (expression).
+      """
+      collect = CollectConfig()
+      self.failUnlessEqual(False, collect.groupFiles)
+      collect.groupFiles = 0
+      self.failUnlessEqual(False, collect.groupFiles)
+      collect.groupFiles = []
+      self.failUnlessEqual(False, collect.groupFiles)
+      collect.groupFiles = 3
+      self.failUnlessEqual(True, collect.groupFiles)
+      collect.groupFiles = ["a", ]
+      self.failUnlessEqual(True, collect.groupFiles)
+
+   def testConstructor_062(self):
+      """
+      Test assignment of fullSchedule attribute, None value.
+      """
+      collect = CollectConfig(fullSchedule="hash")
+      self.failUnlessEqual("hash", collect.fullSchedule)
+      collect.fullSchedule = None
+      self.failUnlessEqual(None, collect.fullSchedule)
+
+   def testConstructor_063(self):
+      """
+      Test assignment of fullSchedule attribute, valid value.
+      """
+      collect = CollectConfig()
+      self.failUnlessEqual(None, collect.fullSchedule)
+      collect.fullSchedule = "fixed"
+      self.failUnlessEqual("fixed", collect.fullSchedule)
+      collect.fullSchedule = "hash"
+      self.failUnlessEqual("hash", collect.fullSchedule)
+      collect.fullSchedule = "size"
+      self.failUnlessEqual("size", collect.fullSchedule)
+
+   def testConstructor_064(self):
+      """
+      Test assignment of fullSchedule attribute, invalid value.
+      """
+      collect = CollectConfig()
+      self.failUnlessEqual(None, collect.fullSchedule)
+      self.failUnlessAssignRaises(ValueError, collect, "fullSchedule", "")
+      self.failUnlessEqual(None, collect.fullSchedule)
+      self.failUnlessAssignRaises(ValueError, collect, "fullSchedule", "weekly")
+      self.failUnlessEqual(None, collect.fullSchedule)
+
 
    ############################
    # Test comparison operators
@@ -7727,6 +8569,162 @@ class TestCollectConfig(unittest.TestCase):
       self.failUnless(collect1 >= collect2)
       self.failUnless(collect1 != collect2)
 
+   def testComparison_027(self):
+      """
+      Test comparison of two differing objects, workerCount differs (one
+      None).
+      """
+      collect1 = CollectConfig("/target", "incr", "tar", "ignore", ["/path", ], ["pattern", ], [CollectFile(), ], [CollectDir(), ])
+      collect2 = CollectConfig("/target", "incr", "tar", "ignore", ["/path", ], ["pattern", ], [CollectFile(), ], [CollectDir(), ], 4)
+      self.failIfEqual(collect1, collect2)
+      self.failUnless(not collect1 == collect2)
+      self.failUnless(collect1 < collect2)
+      self.failUnless(collect1 <= collect2)
+      self.failUnless(not collect1 > collect2)
+      self.failUnless(not collect1 >= collect2)
+      self.failUnless(collect1 != collect2)
+
+   def testComparison_028(self):
+      """
+      Test comparison of two differing objects, workerCount differs.
+      """
+      collect1 = CollectConfig("/target", "incr", "tar", "ignore", ["/path", ], ["pattern", ], [CollectFile(), ], [CollectDir(), ], 8)
+      collect2 = CollectConfig("/target", "incr", "tar", "ignore", ["/path", ], ["pattern", ], [CollectFile(), ], [CollectDir(), ], 4)
+      self.failIfEqual(collect1, collect2)
+      self.failUnless(not collect1 == collect2)
+      self.failUnless(not collect1 < collect2)
+      self.failUnless(not collect1 <= collect2)
+      self.failUnless(collect1 > collect2)
+      self.failUnless(collect1 >= collect2)
+      self.failUnless(collect1 != collect2)
+
+   def testComparison_029(self):
+      """
+      Test comparison of two differing objects, prefetchDepth differs (one
+      None).
+      """
+      collect1 = CollectConfig("/target", "incr", "tar", "ignore", ["/path", ], ["pattern", ], [CollectFile(), ], [CollectDir(), ], 4, None)
+      collect2 = CollectConfig("/target", "incr", "tar", "ignore", ["/path", ], ["pattern", ], [CollectFile(), ], [CollectDir(), ], 4, 16)
+      self.failIfEqual(collect1, collect2)
+      self.failUnless(not collect1 == collect2)
+      self.failUnless(collect1 < collect2)
+      self.failUnless(collect1 <= collect2)
+      self.failUnless(not collect1 > collect2)
+      self.failUnless(not collect1 >= collect2)
+      self.failUnless(collect1 != collect2)
+
+   def testComparison_030(self):
+      """
+      Test comparison of two differing objects, prefetchDepth differs.
+      """
+      collect1 = CollectConfig("/target", "incr", "tar", "ignore", ["/path", ], ["pattern", ], [CollectFile(), ], [CollectDir(), ], 4, 16)
+      collect2 = CollectConfig("/target", "incr", "tar", "ignore", ["/path", ], ["pattern", ], [CollectFile(), ], [CollectDir(), ], 4, 8)
+      self.failIfEqual(collect1, collect2)
+      self.failUnless(not collect1 == collect2)
+      self.failUnless(not collect1 < collect2)
+      self.failUnless(not collect1 <= collect2)
+      self.failUnless(collect1 > collect2)
+      self.failUnless(collect1 >= collect2)
+      self.failUnless(collect1 != collect2)
+
+   def testComparison_031(self):
+      """
+      Test comparison of two differing objects, physicalOrder differs.
+      """
+      collect1 = CollectConfig("/target", "incr", "tar", "ignore", ["/path", ], ["pattern", ], [CollectFile(), ], [CollectDir(), ], 4, 16, False)
+      collect2 = CollectConfig("/target", "incr", "tar", "ignore", ["/path", ], ["pattern", ], [CollectFile(), ], [CollectDir(), ], 4, 16, True)
+      self.failIfEqual(collect1, collect2)
+      self.failUnless(not collect1 == collect2)
+      self.failUnless(collect1 < collect2)
+      self.failUnless(collect1 <= collect2)
+      self.failUnless(not collect1 > collect2)
+      self.failUnless(not collect1 >= collect2)
+      self.failUnless(collect1 != collect2)
+
+   def testComparison_032(self):
+      """
+      Test comparison of two differing objects, archiveBudget differs (one None).
+      """
+      collect1 = CollectConfig()
+      collect2 = CollectConfig(archiveBudget=60)
+      self.failIfEqual(collect1, collect2)
+      self.failUnless(not collect1 == collect2)
+      self.failUnless(collect1 < collect2)
+      self.failUnless(collect1 <= collect2)
+      self.failUnless(not collect1 > collect2)
+      self.failUnless(not collect1 >= collect2)
+      self.failUnless(collect1 != collect2)
+
+   def testComparison_033(self):
+      """
+      Test comparison of two differing objects, archiveBudget differs.
+      """
+      collect1 = CollectConfig("/target", "incr", "adaptive", "ignore", ["/path", ], ["pattern", ], [CollectFile(), ], [CollectDir(), ], 4, 16, True, 120)
+      collect2 = CollectConfig("/target", "incr", "adaptive", "ignore", ["/path", ], ["pattern", ], [CollectFile(), ], [CollectDir(), ], 4, 16, True, 30)
+      self.failIfEqual(collect1, collect2)
+      self.failUnless(not collect1 == collect2)
+      self.failUnless(not collect1 < collect2)
+      self.failUnless(not collect1 <= collect2)
+      self.failUnless(collect1 > collect2)
+      self.failUnless(collect1 >= collect2)
+      self.failUnless(collect1 != collect2)
+
+   def testComparison_034(self):
+      """
+      Test comparison of two differing objects, groupFiles differs (one None).
+      """
+      collect1 = CollectConfig()
+      collect2 = CollectConfig(groupFiles=True)
+      self.failIfEqual(collect1, collect2)
+      self.failUnless(not collect1 == collect2)
+      self.failUnless(collect1 < collect2)
+      self.failUnless(collect1 <= collect2)
+      self.failUnless(not collect1 > collect2)
+      self.failUnless(not collect1 >= collect2)
+      self.failUnless(collect1 != collect2)
+
+   def testComparison_035(self):
+      """
+      Test comparison of two differing objects, groupFiles differs.
+      """
+      collect1 = CollectConfig("/target", "incr", "tar", "ignore", ["/path", ], ["pattern", ], [CollectFile(), ], [CollectDir(), ], 4, 16, True, 60, True)
+      collect2 = CollectConfig("/target", "incr", "tar", "ignore", ["/path", ], ["pattern", ], [CollectFile(), ], [CollectDir(), ], 4, 16, True, 60, False)
+      self.failIfEqual(collect1, collect2)
+      self.failUnless(not collect1 == collect2)
+      self.failUnless(not collect1 < collect2)
+      self.failUnless(not collect1 <= collect2)
+      self.failUnless(collect1 > collect2)
+      self.failUnless(collect1 >= collect2)
+      self.failUnless(collect1 != collect2)
+
+   def testComparison_036(self):
+      """
+      Test comparison of two differing objects, fullSchedule differs (one None).
+      """
+      collect1 = CollectConfig("/target", "incr", "tar", "ignore", ["/path", ], ["pattern", ], [CollectFile(), ], [CollectDir(), ], 4, 16, True, 60, True, None)
+      collect2 = CollectConfig("/target", "incr", "tar", "ignore", ["/path", ], ["pattern", ], [CollectFile(), ], [CollectDir(), ], 4, 16, True, 60, True, "size")
+      self.failIfEqual(collect1, collect2)
+      self.failUnless(not collect1 == collect2)
+      self.failUnless(collect1 < collect2)
+      self.failUnless(collect1 <= collect2)
+      self.failUnless(not collect1 > collect2)
+      self.failUnless(not collect1 >= collect2)
+      self.failUnless(collect1 != collect2)
+
+   def testComparison_037(self):
+      """
+      Test comparison of two differing objects, fullSchedule differs.
+      """
+      collect1 = CollectConfig("/target", "incr", "tar", "ignore", ["/path", ], ["pattern", ], [CollectFile(), ], [CollectDir(), ], 4, 16, True, 60, True, "hash")
+      collect2 = CollectConfig("/target", "incr", "tar", "ignore", ["/path", ], ["pattern", ], [CollectFile(), ], [CollectDir(), ], 4, 16, True, 60, True, "size")
+      self.failIfEqual(collect1, collect2)
+      self.failUnless(not collect1 == collect2)
+      self.failUnless(collect1 < collect2)
+      self.failUnless(collect1 <= collect2)
+      self.failUnless(not collect1 > collect2)
+      self.failUnless(not collect1 >= collect2)
+      self.failUnless(collect1 != collect2)
+
 
 ########################
 # TestStageConfig class
@@ -12446,6 +13444,48 @@ class TestConfig(unittest.TestCase):
       path = self.resources["cback.conf.23"]
       self.failUnlessRaises(ValueError, Config, xmlPath=path, validate=True)
 
+   def testParse_041(self):
+      """
+      Parse config document containing options and collect sections, with
+      all of the collect tuning fields filled in, validate=False.
+      """
+      path = self.resources["cback.conf.24"]
+      config = Config(xmlPath=path, validate=False)
+      expected = Config()
+      expected.options = OptionsConfig("tuesday", "/opt/backup/tmp", "backup", "group", "/usr/bin/scp -1 -B", ioMode="backup",
+                                       collectEndTime="06:30", collectDuration=240)
+      expected.collect = CollectConfig("/opt/backup/collect", "incr", "targz", ".cbignore", workerCount=4, prefetchDepth=16,
+                                       physicalOrder=True, archiveBudget=90, groupFiles=True,
+                                       fullSchedule="size")
+      expected.collect.collectFiles = [ CollectFile(absolutePath="/etc/fstab"), ]
+      expected.collect.collectDirs = [ CollectDir(absolutePath="/home", recursionLevel=1,
+                                                  volumeSize=ByteQuantity("2", UNIT_GBYTES),
+                                                  skipCompressed=True, maxFileSize=ByteQuantity("10", UNIT_GBYTES),
+                                                  minFileAge=30, maxFileAge=365, syntheticFull=True,
+                                                  deltaThreshold=ByteQuantity("1", UNIT_GBYTES), dedupFiles=True), ]
+      self.failUnlessEqual(expected, config)
+
+   def testParse_042(self):
+      """
+      Parse config document containing options and collect sections, with
+      all of the collect tuning fields filled in, validate=True.
+      """
+      path = self.resources["cback.conf.24"]
+      config = Config(xmlPath=path, validate=True)
+      expected = Config()
+      expected.options = OptionsConfig("tuesday", "/opt/backup/tmp", "backup", "group", "/usr/bin/scp -1 -B", ioMode="backup",
+                                       collectEndTime="06:30", collectDuration=240)
+      expected.collect = CollectConfig("/opt/backup/collect", "incr", "targz", ".cbignore", workerCount=4, prefetchDepth=16,
+                                       physicalOrder=True, archiveBudget=90, groupFiles=True,
+                                       fullSchedule="size")
+      expected.collect.collectFiles = [ CollectFile(absolutePath="/etc/fstab"), ]
+      expected.collect.collectDirs = [ CollectDir(absolutePath="/home", recursionLevel=1,
+                                                  volumeSize=ByteQuantity("2", UNIT_GBYTES),
+                                                  skipCompressed=True, maxFileSize=ByteQuantity("10", UNIT_GBYTES),
+                                                  minFileAge=30, maxFileAge=365, syntheticFull=True,
+                                                  deltaThreshold=ByteQuantity("1", UNIT_GBYTES), dedupFiles=True), ]
+      self.failUnlessEqual(expected, config)
+
 
    #########################
    # Test the extract logic
@@ -13028,6 +14068,17 @@ class TestConfig(unittest.TestCase):
       after = Config(xmlData=beforeXml, validate=True)
       self.failUnlessEqual(before, after)
 
+   def testExtractXml_042(self):
+      """
+      Extract document containing options and collect sections, with all of
+      the collect tuning fields filled in, validate=True.
+      """
+      path = self.resources["cback.conf.24"]
+      before = Config(xmlPath=path, validate=True)
+      beforeXml = before.extractXml(validate=True)
+      after = Config(xmlData=beforeXml, validate=True)
+      self.failUnlessEqual(before, after)
+
 
 #######################################################################
 # Suite definition
@@ -0,0 +1,347 @@
+#!/usr/bin/env python
+# -*- coding: iso-8859-1 -*-
+# vim: set ft=python ts=3 sw=3 expandtab:
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#
+#              C E D A R
+#          S O L U T I O N S       "Software done right."
+#           S O F T W A R E
+#
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#
+# Copyright (c) 2004-2005,2010 Kenneth J. Pronovici.
+# All rights reserved.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License,
+# Version 2, as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# Copies of the GNU General Public License are available from
+# the Free Software Foundation website, http://www.gnu.org/.
+#
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#
+# Author   : Kenneth J. Pronovici <pronovic@ieee.org>
+# Language : Python 2 (>= 2.7)
+# Project  : Cedar Backup, release 2
+# Purpose  : Tests delta functionality.
+#
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+########################################################################
+# Module documentation
+########################################################################
+
+"""
+Unit tests for CedarBackup2/delta.py.
+
+Code Coverage
+=============
+
+   This module contains individual tests for each of the public functions
+   implemented in delta.py: C{generateSignature()}, C{generateDelta()} and
+   C{restoreFile()}.  The files involved are generated on the fly, using a
+   small block size so that the tests stay fast.
+
+Naming Conventions
+==================
+
+   I prefer to avoid large unit tests which validate more than one piece of
+   functionality, and I prefer to avoid using overly descriptive (read: long)
+   test names, as well.  Instead, I use lots of very small tests that each
+   validate one specific thing.  These small tests are then named with an index
+   number, yielding something like C{testAddDir_001} or C{testValidate_010}.
+   Each method has a docstring describing what it's supposed to accomplish.  I
+   feel that this makes it easier to judge how important a given failure is,
+   and also makes it somewhat easier to diagnose and fix individual problems.
+
+Full vs. Reduced Tests
+======================
+
+   All of the tests in this module are considered safe to be run in an average
+   build environment.  There is a no need to use a DELTATESTS_FULL environment
+   variable to provide a "reduced feature set" test suite as for some of the
+   other test modules.
+
+@author Kenneth J. Pronovici <pronovic@ieee.org>
+"""
+
+
+########################################################################
+# Import modules and do runtime validations
+########################################################################
+
+# Import standard modules
+import os
+import unittest
+import tempfile
+import hashlib
+from CedarBackup2.testutil import removedir
+from CedarBackup2.delta import generateSignature, generateDelta, restoreFile
+
+
+#######################################################################
+# Module-wide configuration and constants
+#######################################################################
+
+BLOCK_SIZE = 16
+
+
+#######################################################################
+# Test Case Classes
+#######################################################################
+
+##################
+# TestDelta class
+##################
+
+class TestDelta(unittest.TestCase):
+
+   """Tests for the delta functions."""
+
+   ################
+   # Setup methods
+   ################
+
+   def setUp(self):
+      try:
+         self.tmpdir = tempfile.mkdtemp()
+      except Exception, e:
+         self.fail(e)
+
+   def tearDown(self):
+      try:
+         removedir(self.tmpdir)
+      except: pass
+
+
+   ##################
+   # Utility methods
+   ##################
+
+   def writeFile(self, name, contents):
+      """Writes a file in the temporary directory, returning its path."""
+      path = os.path.join(self.tmpdir, name)
+      open(path, "wb").write(contents)
+      return path
+
+   def readFile(self, path):
+      """Returns the contents of a file."""
+      return open(path, "rb").read()
+
+
+   ################################
+   # Test generateSignature()
+   ################################
+
+   def testGenerateSignature_001(self):
+      """
+      Test for an empty file.
+      """
+      path = self.writeFile("file", "")
+      signature = generateSignature(path, BLOCK_SIZE)
+      self.failUnlessEqual((BLOCK_SIZE, 0, hashlib.sha1("").hexdigest(), []), signature)
+
+   def testGenerateSignature_002(self):
+      """
+      Test for a file that is an exact number of blocks.
+      """
+      contents = "a" * BLOCK_SIZE + "b" * BLOCK_SIZE
+      path = self.writeFile("file", contents)
+      signature = generateSignature(path, BLOCK_SIZE)
+      self.failUnlessEqual(BLOCK_SIZE, signature[0])
+      self.failUnlessEqual(len(contents), signature[1])
+      self.failUnlessEqual(hashlib.sha1(contents).hexdigest(), signature[2])
+      self.failUnlessEqual([ hashlib.md5("a" * BLOCK_SIZE).digest(), hashlib.md5("b" * BLOCK_SIZE).digest(), ], signature[3])
+
+   def testGenerateSignature_003(self):
+      """
+      Test for a file that ends with a partial block.
+      """
+      contents = "a" * BLOCK_SIZE + "bc"
+      path = self.writeFile("file", contents)
+      signature = generateSignature(path, BLOCK_SIZE)
+      self.failUnlessEqual(len(contents), signature[1])
+      self.failUnlessEqual([ hashlib.md5("a" * BLOCK_SIZE).digest(), hashlib.md5("bc").digest(), ], signature[3])
+
+   def testGenerateSignature_004(self):
+      """
+      Test for a file that does not exist.
+      """
+      path = os.path.join(self.tmpdir, "missing")
+      self.failUnlessRaises((OSError, IOError), generateSignature, path, BLOCK_SIZE)
+
+
+   ###########################
+   # Test generateDelta()
+   ###########################
+
+   def testGenerateDelta_001(self):
+      """
+      Test for a file that has not changed.
+      """
+      contents = "a" * BLOCK_SIZE * 4
+      path = self.writeFile("file", contents)
+      signature = generateSignature(path, BLOCK_SIZE)
+      deltaPath = os.path.join(self.tmpdir, "delta")
+      (result, changed) = generateDelta(path, signature, deltaPath)
+      self.failUnlessEqual(signature, result)
+      self.failUnlessEqual(0, changed)
+
+   def testGenerateDelta_002(self):
+      """
+      Test for a file with one block changed in the middle.
+      """
+      path = self.writeFile("file", "a" * BLOCK_SIZE * 4)
+      signature = generateSignature(path, BLOCK_SIZE)
+      contents = "a" * BLOCK_SIZE * 2 + "b" * BLOCK_SIZE + "a" * BLOCK_SIZE
+      self.writeFile("file", contents)
+      deltaPath = os.path.join(self.tmpdir, "delta")
+      (result, changed) = generateDelta(path, signature, deltaPath)
+      self.failUnlessEqual(1, changed)
+      self.failUnlessEqual(generateSignature(path, BLOCK_SIZE), result)
+      self.failUnless(os.path.getsize(deltaPath) < BLOCK_SIZE * 2 + 200)
+
+   def testGenerateDelta_003(self):
+      """
+      Test for a file that has grown.
+      """
+      path = self.writeFile("file", "a" * BLOCK_SIZE * 2)
+      signature = generateSignature(path, BLOCK_SIZE)
+      self.writeFile("file", "a" * BLOCK_SIZE * 3 + "b")
+      deltaPath = os.path.join(self.tmpdir, "delta")
+      (result, changed) = generateDelta(path, signature, deltaPath)
+      self.failUnlessEqual(2, changed)
+      self.failUnlessEqual(BLOCK_SIZE * 3 + 1, result[1])
+
+   def testGenerateDelta_004(self):
+      """
+      Test for a file that has shrunk.
+      """
+      path = self.writeFile("file", "a" * BLOCK_SIZE * 3)
+      signature = generateSignature(path, BLOCK_SIZE)
+      self.writeFile("file", "a" * BLOCK_SIZE)
+      deltaPath = os.path.join(self.tmpdir, "delta")
+      (result, changed) = generateDelta(path, signature, deltaPath)
+      self.failUnlessEqual(0, changed)
+      self.failUnlessEqual(BLOCK_SIZE, result[1])
+      self.failUnlessEqual(1, len(result[3]))
+
+
+   #########################
+   # Test restoreFile()
+   #########################
+
+   def testRestoreFile_001(self):
+      """
+      Test with no deltas, which just copies the base file.
+      """
+      basePath = self.writeFile("base", "abc" * BLOCK_SIZE)
+      targetPath = os.path.join(self.tmpdir, "target")
+      restoreFile(basePath, [], targetPath)
+      self.failUnlessEqual("abc" * BLOCK_SIZE, self.readFile(targetPath))
+
+   def testRestoreFile_002(self):
+      """
+      Test with a chain of deltas that change, grow and shrink the file.
+      """
+      versions = [ "a" * BLOCK_SIZE * 4,
+                   "a" * BLOCK_SIZE + "b" * BLOCK_SIZE + "a" * BLOCK_SIZE * 2,
+                   "a" * BLOCK_SIZE + "b" * BLOCK_SIZE + "a" * BLOCK_SIZE * 3 + "cd",
+                   "e" * BLOCK_SIZE + "b" * 5, ]
+      path = self.writeFile("file", versions[0])
+      basePath = self.writeFile("base", versions[0])
+      signature = generateSignature(path, BLOCK_SIZE)
+      deltaPaths = []
+      for i in range(1, len(versions)):
+         self.writeFile("file", versions[i])
+         deltaPaths.append(os.path.join(self.tmpdir, "delta%d" % i))
+         (signature, changed) = generateDelta(path, signature, deltaPaths[-1])
+      for i in range(1, len(versions)):
+         targetPath = os.path.join(self.tmpdir, "target%d" % i)
+         restoreFile(basePath, deltaPaths[:i], targetPath)
+         self.failUnlessEqual(versions[i], self.readFile(targetPath))
+
+   def testRestoreFile_003(self):
+      """
+      Test with a differential delta, always generated against the base signature.
+      """
+      path = self.writeFile("file", "a" * BLOCK_SIZE * 3)
+      basePath = self.writeFile("base", "a" * BLOCK_SIZE * 3)
+      signature = generateSignature(path, BLOCK_SIZE)
+      self.writeFile("file", "a" * BLOCK_SIZE * 2 + "b" * BLOCK_SIZE)
+      generateDelta(path, signature, os.path.join(self.tmpdir, "delta1"))
+      self.writeFile("file", "c" * BLOCK_SIZE + "a" * BLOCK_SIZE + "b" * BLOCK_SIZE)
+      generateDelta(path, signature, os.path.join(self.tmpdir, "delta2"))
+      targetPath = os.path.join(self.tmpdir, "target")
+      restoreFile(basePath, [ os.path.join(self.tmpdir, "delta2"), ], targetPath)
+      self.failUnlessEqual("c" * BLOCK_SIZE + "a" * BLOCK_SIZE + "b" * BLOCK_SIZE, self.readFile(targetPath))
+
+   def testRestoreFile_004(self):
+      """
+      Test with a delta that doesn't apply to the base file.
+      """
+      path = self.writeFile("file", "a" * BLOCK_SIZE * 2)
+      basePath = self.writeFile("base", "x" * BLOCK_SIZE * 2)
+      signature = generateSignature(path, BLOCK_SIZE)
+      self.writeFile("file", "b" * BLOCK_SIZE * 2)
+      deltaPath = os.path.join(self.tmpdir, "delta")
+      generateDelta(path, signature, deltaPath)
+      targetPath = os.path.join(self.tmpdir, "target")
+      self.failUnlessRaises(ValueError, restoreFile, basePath, [ deltaPath, ], targetPath)
+
+   def testRestoreFile_005(self):
+      """
+      Test with a chain of deltas in the wrong order.
+      """
+      path = self.writeFile("file", "a" * BLOCK_SIZE * 2)
+      basePath = self.writeFile("base", "a" * BLOCK_SIZE * 2)
+      signature = generateSignature(path, BLOCK_SIZE)
+      self.writeFile("file", "b" * BLOCK_SIZE * 2)
+      (signature, changed) = generateDelta(path, signature, os.path.join(self.tmpdir, "delta1"))
+      self.writeFile("file", "c" * BLOCK_SIZE * 2)
+      generateDelta(path, signature, os.path.join(self.tmpdir, "delta2"))
+      deltaPaths = [ os.path.join(self.tmpdir, "delta2"), os.path.join(self.tmpdir, "delta1"), ]
+      targetPath = os.path.join(self.tmpdir, "target")
+      self.failUnlessRaises(ValueError, restoreFile, basePath, deltaPaths, targetPath)
+
+   def testRestoreFile_006(self):
+      """
+      Test with a file that is not a delta.
+      """
+      basePath = self.writeFile("base", "a" * BLOCK_SIZE)
+      deltaPath = self.writeFile("delta", "not a delta")
+      targetPath = os.path.join(self.tmpdir, "target")
+      self.failUnlessRaises(ValueError, restoreFile, basePath, [ deltaPath, ], targetPath)
+
+   def testRestoreFile_007(self):
+      """
+      Test with the target path the same as the base path.
+      """
+      basePath = self.writeFile("base", "a" * BLOCK_SIZE)
+      self.failUnlessRaises(ValueError, restoreFile, basePath, [], basePath)
+
+
+#######################################################################
+# Suite definition
+#######################################################################
+
+# pylint: disable=C0330
+def suite():
+   """Returns a suite containing all the test cases in this module."""
+   return unittest.TestSuite((
+                              unittest.makeSuite(TestDelta, 'test'),
+                            ))
+
+
+########################################################################
+# Module entry point
+########################################################################
+
+# When this module is executed from the command-line, run its tests
+if __name__ == '__main__':
+   unittest.main()
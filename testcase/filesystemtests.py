@@ -113,12 +113,16 @@ import os
 import unittest
 import tempfile
 import tarfile
+from StringIO import StringIO
 
 from CedarBackup2.testutil import findResources, buildPath, removedir, extractTar, changeFileAge, randomFilename
 from CedarBackup2.testutil import platformMacOsX, platformWindows
 from CedarBackup2.testutil import platformSupportsLinks, platformRequiresBinaryRead
 from CedarBackup2.testutil import failUnlessAssignRaises
 from CedarBackup2.filesystem import FilesystemList, BackupFileList, PurgeItemList, normalizeDir, compareContents
+from CedarBackup2.filesystem import PREFETCH_SLURP, ISO_IMAGE_OVERHEAD, getVolumePath, getSpanLocality, SpanItem
+from CedarBackup2.util import setIoMode, IO_MODE_NORMAL, IO_MODE_BACKUP
+from CedarBackup2 import filesystem
 
 
 #######################################################################
@@ -15352,6 +15356,10 @@ class TestBackupFileList(unittest.TestCase):
       components.insert(0, self.tmpdir)
       return buildPath(components)
 
+   def failUnlessAssignRaises(self, exception, obj, prop, value):
+      """Equivalent of L{failUnlessRaises}, but used for property assignments instead."""
+      failUnlessAssignRaises(self, exception, obj, prop, value)
+
    def tarPath(self, components):
       """Builds a complete search path from a list of components, compatible with Python tar output."""
       if platformWindows():
@@ -15369,6 +15377,18 @@ class TestBackupFileList(unittest.TestCase):
       components = [ self.tmpdir, randomFilename(maxlength, suffix=extension), ]
       return buildPath(components)
 
+   def tarContents(self, tarPath):
+      """Returns a list of (name, type, linkname, data) for each member of a tar file."""
+      contents = []
+      tarFile = tarfile.open(tarPath)
+      for member in tarFile.getmembers():
+         data = None
+         if member.isreg():
+            data = tarFile.extractfile(member).read()
+         contents.append((member.name, member.type, member.linkname, data))
+      tarFile.close()
+      return contents
+
 
    ################
    # Test addDir()
@@ -16537,6 +16557,22 @@ class TestBackupFileList(unittest.TestCase):
          self.failUnlessEqual("3ef0b16a6237af9200b7a46c1987d6a555973847", digestMap[buildPath([ "/", "file001", ])])
          self.failUnlessEqual("fae89085ee97b57ccefa7e30346c573bb0a769db", digestMap[buildPath([ "/", "file002", ])])
 
+   def testGenerateDigestMap_011(self):
+      """
+      Test that backup I/O mode generates the same digest map as normal mode.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      backupList.addDirContents(path)
+      expected = backupList.generateDigestMap()
+      try:
+         setIoMode(IO_MODE_BACKUP)
+         digestMap = backupList.generateDigestMap()
+      finally:
+         setIoMode(IO_MODE_NORMAL)
+      self.failUnlessEqual(expected, digestMap)
+
 
    ########################
    # Test generateFitted()
@@ -16960,6 +16996,43 @@ class TestBackupFileList(unittest.TestCase):
          self.failUnless(self.buildPath([ "tree9", "link001", ]) in fittedList)
          self.failUnless(self.buildPath([ "tree9", "link002", ]) in fittedList)
 
+   def testGenerateFitted_008(self):
+      """
+      Test on a non-empty list, using optimal_fit with a time budget.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      count = backupList.addDirContents(path)
+      if platformSupportsLinks():
+         self.failUnlessEqual(15, count)
+         fittedList = backupList.generateFitted(500, "optimal_fit", budget=1.0)
+         self.failUnlessEqual(12, len(fittedList))
+         self.failUnless(self.buildPath([ "tree9", "dir001", "file002", ]) in fittedList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "file002", ]) in fittedList)
+         self.failUnless(self.buildPath([ "tree9", "file001", ]) in fittedList)
+         self.failIf(self.buildPath([ "tree9", "dir001", "file001", ]) in fittedList)
+         self.failIf(self.buildPath([ "tree9", "dir002", "file001", ]) in fittedList)
+         self.failIf(self.buildPath([ "tree9", "file002", ]) in fittedList)
+
+   def testGenerateFitted_009(self):
+      """
+      Test on a non-empty list, using ISO costs.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      count = backupList.addDirContents(path)
+      if platformSupportsLinks():
+         self.failUnlessEqual(15, count)
+         fittedList = backupList.generateFitted(2000, isoCost=True)
+         self.failUnlessEqual(0, len(fittedList))
+         fittedList = backupList.generateFitted(ISO_IMAGE_OVERHEAD + 4096, "best_fit", isoCost=True)
+         files = [ entry for entry in fittedList if not os.path.islink(entry) ]
+         self.failUnlessEqual(1, len(files))
+         fittedList = backupList.generateFitted(ISO_IMAGE_OVERHEAD + (1024 * 1024), isoCost=True)
+         self.failUnlessEqual(15, len(fittedList))
+
 
    ######################
    # Test generateSpan()
@@ -17163,192 +17236,548 @@ class TestBackupFileList(unittest.TestCase):
          self.failUnless(self.buildPath([ "tree9", "link002", ]) in backupList)
          self.failUnlessRaises(ValueError, backupList.generateSpan, 250, "best_fit")
 
-
-   #########################
-   # Test generateTarfile()
-   #########################
-
-   def testGenerateTarfile_001(self):
+   def testGenerateSpan_006(self):
       """
-      Test on an empty list.
+      Test a set of files that all fit in three span items, using first_fit_decreasing.
       """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
       backupList = BackupFileList()
-      tarPath = self.buildPath(["file.tar", ])
-      self.failUnlessRaises(ValueError, backupList.generateTarfile, tarPath)
-      self.failUnless(not os.path.exists(tarPath))
+      count = backupList.addDirContents(path)
+      if platformSupportsLinks():
+         self.failUnlessEqual(15, count)
+         self.failUnlessEqual(15, len(backupList))
+         spanSet = backupList.generateSpan(515, "first_fit_decreasing")
+         self.failUnlessEqual(3, len(spanSet))
+         spanItem = spanSet[0]
+         self.failUnlessEqual(11, len(spanItem.fileList))
+         self.failUnlessEqual(511, spanItem.size)
+         self.failUnlessEqual(515, spanItem.capacity)
+         self.failUnlessEqual((511.0/515.0)*100.0, spanItem.utilization)
+         self.failUnlessEqual(self.buildPath([ "tree9", "dir001", "file002", ]), spanItem.fileList[0])
+         self.failUnlessEqual(self.buildPath([ "tree9", "dir001", "file001", ]), spanItem.fileList[1])
+         self.failUnless(self.buildPath([ "tree9", "dir001", "link001", ]) in spanItem.fileList)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "link002", ]) in spanItem.fileList)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "link003", ]) in spanItem.fileList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "link001", ]) in spanItem.fileList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "link002", ]) in spanItem.fileList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "link003", ]) in spanItem.fileList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "link004", ]) in spanItem.fileList)
+         self.failUnless(self.buildPath([ "tree9", "link001", ]) in spanItem.fileList)
+         self.failUnless(self.buildPath([ "tree9", "link002", ]) in spanItem.fileList)
+         spanItem = spanSet[1]
+         self.failUnlessEqual(3, len(spanItem.fileList))
+         self.failUnlessEqual(471, spanItem.size)
+         self.failUnlessEqual(515, spanItem.capacity)
+         self.failUnlessEqual((471.0/515.0)*100.0, spanItem.utilization)
+         self.failUnlessEqual([ self.buildPath([ "tree9", "file002", ]),
+                                self.buildPath([ "tree9", "file001", ]),
+                                self.buildPath([ "tree9", "dir002", "file002", ]), ], spanItem.fileList)
+         spanItem = spanSet[2]
+         self.failUnlessEqual(1, len(spanItem.fileList))
+         self.failUnlessEqual(134, spanItem.size)
+         self.failUnlessEqual(515, spanItem.capacity)
+         self.failUnlessEqual((134.0/515.0)*100.0, spanItem.utilization)
+         self.failUnlessEqual([ self.buildPath([ "tree9", "dir002", "file001", ]), ], spanItem.fileList)
 
-   def testGenerateTarfile_002(self):
+   def testGenerateSpan_007(self):
       """
-      Test on a non-empty list containing a directory (which shouldn't be
-      possible).
+      Test a set of files that all fit in two span items, using best_fit_decreasing.
       """
       self.extractTar("tree9")
       path = self.buildPath(["tree9"])
       backupList = BackupFileList()
       count = backupList.addDirContents(path)
-      if not platformSupportsLinks():
-         self.failUnlessEqual(10, count)
-         self.failUnlessEqual(10, len(backupList))
-         backupList.append(self.buildPath([ "tree9", "dir001", ]))     # back-door around addDir()
-         self.failUnlessEqual(11, len(backupList))
-         self.failUnless(self.buildPath([ "tree9", "dir001", "file001", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir001", "file002", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir001", "link001", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir001", "link002", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir002", "file001", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir002", "file002", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir002", "link003", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir002", "link004", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "file001", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "file002", ]) in backupList)
-         tarPath = self.buildPath(["file.tar", ])
-         backupList.generateTarfile(tarPath)
-         self.failUnless(tarfile.is_tarfile(tarPath))
-         tarFile = tarfile.open(tarPath)
-         tarList = tarFile.getnames()
-         tarFile.close()
-         self.failUnlessEqual(11, len(tarList))
-         self.failUnless(self.tarPath([ "tree9", "dir001/" ]) in tarList
-                         or self.tarPath([ "tree9", "dir001//" ]) in tarList  # Grr... Python 2.5 behavior differs
-                         or self.tarPath([ "tree9", "dir001", ]) in tarList)  # Grr... Python 2.6 behavior differs
-         self.failUnless(self.tarPath([ "tree9", "dir001", "file001", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "dir001", "file002", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "dir001", "link001", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "dir001", "link002", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "dir002", "file001", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "dir002", "file002", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "dir002", "link003", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "dir002", "link004", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "file001", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "file002", ]) in tarList)
-      else:
+      if platformSupportsLinks():
          self.failUnlessEqual(15, count)
          self.failUnlessEqual(15, len(backupList))
-         backupList.append(self.buildPath([ "tree9", "dir001", ]))     # back-door around addDir()
-         self.failUnlessEqual(16, len(backupList))
-         self.failUnless(self.buildPath([ "tree9", "dir001" ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir001", "file001", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir001", "file002", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir001", "link001", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir001", "link002", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir001", "link003", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir002", "file001", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir002", "file002", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir002", "link001", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir002", "link002", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir002", "link003", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir002", "link004", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "file001", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "file002", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "link001", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "link002", ]) in backupList)
-         tarPath = self.buildPath(["file.tar", ])
-         backupList.generateTarfile(tarPath)
-         self.failUnless(tarfile.is_tarfile(tarPath))
-         tarFile = tarfile.open(tarPath)
-         tarList = tarFile.getnames()
-         tarFile.close()
-         self.failUnlessEqual(16, len(tarList))
-         self.failUnless(self.tarPath([ "tree9", "dir001/" ]) in tarList
-                         or self.tarPath([ "tree9", "dir001//" ]) in tarList  # Grr... Python 2.5 behavior differs
-                         or self.tarPath([ "tree9", "dir001", ]) in tarList)  # Grr... Python 2.6 behavior differs
-         self.failUnless(self.tarPath([ "tree9", "dir001", "file001", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "dir001", "file002", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "dir001", "link001", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "dir001", "link002", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "dir001", "link003", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "dir002", "file001", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "dir002", "file002", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "dir002", "link001", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "dir002", "link002", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "dir002", "link003", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "dir002", "link004", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "file001", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "file002", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "link001", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "link002", ]) in tarList)
+         spanSet = backupList.generateSpan(760, "best_fit_decreasing")
+         self.failUnlessEqual(2, len(spanSet))
+         spanItem = spanSet[0]
+         self.failUnlessEqual(12, len(spanItem.fileList))
+         self.failUnlessEqual(753, spanItem.size)
+         self.failUnlessEqual(760, spanItem.capacity)
+         self.failUnlessEqual((753.0/760.0)*100.0, spanItem.utilization)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "file001", ]) in spanItem.fileList)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "file002", ]) in spanItem.fileList)
+         self.failUnless(self.buildPath([ "tree9", "file002", ]) in spanItem.fileList)
+         spanItem = spanSet[1]
+         self.failUnlessEqual(3, len(spanItem.fileList))
+         self.failUnlessEqual(363, spanItem.size)
+         self.failUnlessEqual(760, spanItem.capacity)
+         self.failUnlessEqual((363.0/760.0)*100.0, spanItem.utilization)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "file001", ]) in spanItem.fileList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "file002", ]) in spanItem.fileList)
+         self.failUnless(self.buildPath([ "tree9", "file001", ]) in spanItem.fileList)
 
-   def testGenerateTarfile_003(self):
+   def testGenerateSpan_008(self):
       """
-      Test on a non-empty list containing a non-existent file, ignore=False.
+      Test a set of files where one of the files does not fit in the capacity, using first_fit_decreasing.
       """
       self.extractTar("tree9")
       path = self.buildPath(["tree9"])
       backupList = BackupFileList()
       count = backupList.addDirContents(path)
-      if not platformSupportsLinks():
-         self.failUnlessEqual(10, count)
-         self.failUnlessEqual(10, len(backupList))
-         backupList.append(self.buildPath([ "tree9", INVALID_FILE, ]))     # file won't exist on disk
-         self.failUnlessEqual(11, len(backupList))
-         self.failUnless(self.buildPath([ "tree9", INVALID_FILE ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir001", "file001", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir001", "file002", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir001", "link001", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir001", "link002", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir002", "file001", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir002", "file002", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir002", "link003", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir002", "link004", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "file001", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "file002", ]) in backupList)
-         tarPath = self.buildPath(["file.tar", ])
-         self.failUnlessRaises(tarfile.TarError, backupList.generateTarfile, tarPath, ignore=False)
-         self.failUnless(not os.path.exists(tarPath))
-      else:
+      if platformSupportsLinks():
          self.failUnlessEqual(15, count)
-         self.failUnlessEqual(15, len(backupList))
-         backupList.append(self.buildPath([ "tree9", INVALID_FILE, ]))     # file won't exist on disk
-         self.failUnlessEqual(16, len(backupList))
-         self.failUnless(self.buildPath([ "tree9", INVALID_FILE ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir001", "file001", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir001", "file002", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir001", "link001", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir001", "link002", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir001", "link003", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir002", "file001", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir002", "file002", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir002", "link001", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir002", "link002", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir002", "link003", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir002", "link004", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "file001", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "file002", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "link001", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "link002", ]) in backupList)
-         tarPath = self.buildPath(["file.tar", ])
-         self.failUnlessRaises(tarfile.TarError, backupList.generateTarfile, tarPath, ignore=False)
-         self.failUnless(not os.path.exists(tarPath))
+         self.failUnlessRaises(ValueError, backupList.generateSpan, 250, "first_fit_decreasing")
 
-   def testGenerateTarfile_004(self):
+   def testGenerateSpan_009(self):
       """
-      Test on a non-empty list containing a non-existent file, ignore=True.
+      Test on an empty list, using best_fit_decreasing.
+      """
+      backupList = BackupFileList()
+      spanSet = backupList.generateSpan(2000, "best_fit_decreasing")
+      self.failUnlessEqual(0, len(spanSet))
+
+   def testGenerateSpan_010(self):
+      """
+      Test with an invalid algorithm.
+      """
+      backupList = BackupFileList()
+      self.failUnlessRaises(ValueError, backupList.generateSpan, 2000, "bogus")
+
+   def testGenerateSpan_011(self):
+      """
+      Test a set of files that all fit in two span items, using optimal_fit.
       """
       self.extractTar("tree9")
       path = self.buildPath(["tree9"])
       backupList = BackupFileList()
       count = backupList.addDirContents(path)
-      if not platformSupportsLinks():
-         self.failUnlessEqual(10, count)
-         self.failUnlessEqual(10, len(backupList))
-         backupList.append(self.buildPath([ "tree9", INVALID_FILE, ]))     # file won't exist on disk
-         self.failUnlessEqual(11, len(backupList))
-         self.failUnless(self.buildPath([ "tree9", INVALID_FILE ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir001", "file001", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir001", "file002", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir001", "link001", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir001", "link002", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir002", "file001", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir002", "file002", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir002", "link003", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir002", "link004", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "file001", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "file002", ]) in backupList)
-         tarPath = self.buildPath(["file.tar", ])
-         backupList.generateTarfile(tarPath, ignore=True)
-         self.failUnless(tarfile.is_tarfile(tarPath))
-         tarFile = tarfile.open(tarPath)
-         tarList = tarFile.getnames()
+      if platformSupportsLinks():
+         self.failUnlessEqual(15, count)
+         spanSet = backupList.generateSpan(760, "optimal_fit")
+         self.failUnlessEqual(2, len(spanSet))
+         spanItem = spanSet[0]
+         self.failUnlessEqual(12, len(spanItem.fileList))
+         self.failUnlessEqual(753, spanItem.size)
+         self.failUnlessEqual(760, spanItem.capacity)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "file001", ]) in spanItem.fileList)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "file002", ]) in spanItem.fileList)
+         self.failUnless(self.buildPath([ "tree9", "file002", ]) in spanItem.fileList)
+         spanItem = spanSet[1]
+         self.failUnlessEqual(3, len(spanItem.fileList))
+         self.failUnlessEqual(363, spanItem.size)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "file001", ]) in spanItem.fileList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "file002", ]) in spanItem.fileList)
+         self.failUnless(self.buildPath([ "tree9", "file001", ]) in spanItem.fileList)
+
+   def testGenerateSpan_012(self):
+      """
+      Test a set of files that all fit in one span item, using ISO costs.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      count = backupList.addDirContents(path)
+      if platformSupportsLinks():
+         self.failUnlessEqual(15, count)
+         capacity = ISO_IMAGE_OVERHEAD + (1024 * 1024)
+         spanSet = backupList.generateSpan(capacity, isoCost=True)
+         self.failUnlessEqual(1, len(spanSet))
+         spanItem = spanSet[0]
+         self.failUnlessEqual(15, len(spanItem.fileList))
+         self.failUnlessEqual(capacity, spanItem.capacity)
+         self.failUnless(spanItem.size > ISO_IMAGE_OVERHEAD + (6 * 2048))
+         self.failUnless(spanItem.size < capacity)
+         self.failUnlessEqual((float(spanItem.size)/float(capacity))*100.0, spanItem.utilization)
+
+   def testGenerateSpan_013(self):
+      """
+      Test a set of files that need a span item for each file, using ISO costs and first_fit_decreasing.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      count = backupList.addDirContents(path)
+      if platformSupportsLinks():
+         self.failUnlessEqual(15, count)
+         capacity = ISO_IMAGE_OVERHEAD + 4096
+         spanSet = backupList.generateSpan(capacity, "first_fit_decreasing", isoCost=True)
+         self.failUnless(len(spanSet) >= 6)
+         self.failUnlessEqual(15, sum([ len(spanItem.fileList) for spanItem in spanSet ]))
+         for spanItem in spanSet:
+            self.failUnless(spanItem.size <= capacity)
+            self.failUnless(len([ entry for entry in spanItem.fileList if not os.path.islink(entry) ]) <= 1)
+
+   def testGenerateSpan_014(self):
+      """
+      Test a set of files that need a span item for each file, using ISO costs and worst_fit.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      count = backupList.addDirContents(path)
+      if platformSupportsLinks():
+         self.failUnlessEqual(15, count)
+         capacity = ISO_IMAGE_OVERHEAD + 4096
+         spanSet = backupList.generateSpan(capacity, "worst_fit", isoCost=True)
+         self.failUnless(len(spanSet) >= 6)
+         self.failUnlessEqual(15, sum([ len(spanItem.fileList) for spanItem in spanSet ]))
+         for spanItem in spanSet:
+            self.failUnless(spanItem.size <= capacity)
+            self.failUnless(len([ entry for entry in spanItem.fileList if not os.path.islink(entry) ]) <= 1)
+
+   def testGenerateSpan_015(self):
+      """
+      Test with ISO costs, where a file does not fit in the capacity or the capacity is used up by the image overhead.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      count = backupList.addDirContents(path)
+      if platformSupportsLinks():
+         self.failUnlessEqual(15, count)
+         self.failUnlessRaises(ValueError, backupList.generateSpan, ISO_IMAGE_OVERHEAD + 2048, "best_fit", isoCost=True)
+         self.failUnlessRaises(ValueError, backupList.generateSpan, ISO_IMAGE_OVERHEAD, "best_fit", isoCost=True)
+         self.failUnlessRaises(ValueError, BackupFileList().generateSpan, 2000, isoCost=True)
+
+   def testGenerateSpan_016(self):
+      """
+      Test a set of files that all fit in two span items, using directory_fit.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      count = backupList.addDirContents(path)
+      if platformSupportsLinks():
+         self.failUnlessEqual(15, count)
+         spanSet = backupList.generateSpan(760, "directory_fit")
+         self.failUnlessEqual(2, len(spanSet))
+         spanItem = spanSet[0]
+         self.failUnlessEqual(11, len(spanItem.fileList))
+         self.failUnlessEqual(719, spanItem.size)
+         self.failUnlessEqual(760, spanItem.capacity)
+         self.failUnlessEqual((719.0/760.0)*100.0, spanItem.utilization)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "file001", ]) in spanItem.fileList)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "file002", ]) in spanItem.fileList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "file001", ]) in spanItem.fileList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "file002", ]) in spanItem.fileList)
+         spanItem = spanSet[1]
+         self.failUnlessEqual(4, len(spanItem.fileList))
+         self.failUnlessEqual(397, spanItem.size)
+         self.failUnless(self.buildPath([ "tree9", "file001", ]) in spanItem.fileList)
+         self.failUnless(self.buildPath([ "tree9", "file002", ]) in spanItem.fileList)
+         self.failUnless(self.buildPath([ "tree9", "link001", ]) in spanItem.fileList)
+         self.failUnless(self.buildPath([ "tree9", "link002", ]) in spanItem.fileList)
+         self.failUnlessEqual({ self.buildPath([ "tree9", ]): 1,
+                                self.buildPath([ "tree9", "dir001", ]): 1,
+                                self.buildPath([ "tree9", "dir002", ]): 1, }, getSpanLocality(spanSet, path))
+
+   def testGenerateSpan_017(self):
+      """
+      Test a set of files that all fit in two span items, using directory_fit with a smaller locality.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      count = backupList.addDirContents(path)
+      if platformSupportsLinks():
+         self.failUnlessEqual(15, count)
+         spanSet = backupList.generateSpan(760, "directory_fit", locality=0.5)
+         self.failUnlessEqual(2, len(spanSet))
+         self.failUnlessEqual(753, spanSet[0].size)
+         self.failUnlessEqual(363, spanSet[1].size)
+         self.failUnlessEqual({ self.buildPath([ "tree9", ]): 2,
+                                self.buildPath([ "tree9", "dir001", ]): 1,
+                                self.buildPath([ "tree9", "dir002", ]): 1, }, getSpanLocality(spanSet, path))
+
+   def testGenerateSpan_018(self):
+      """
+      Test a set of files where one directory is larger than the capacity, using directory_fit.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      count = backupList.addDirContents(path)
+      if platformSupportsLinks():
+         self.failUnlessEqual(15, count)
+         spanSet = backupList.generateSpan(400, "directory_fit")
+         self.failUnlessEqual(4, len(spanSet))
+         self.failUnlessEqual(15, sum([ len(spanItem.fileList) for spanItem in spanSet ]))
+         for spanItem in spanSet:
+            self.failUnless(spanItem.size <= 400)
+         locality = getSpanLocality(spanSet, path)
+         self.failUnlessEqual(1, locality[self.buildPath([ "tree9", ])])
+         self.failUnlessEqual(1, locality[self.buildPath([ "tree9", "dir002", ])])
+         self.failUnless(locality[self.buildPath([ "tree9", "dir001", ])] > 1)
+
+   def testGenerateSpan_019(self):
+      """
+      Test directory_fit with an invalid locality, and with a file that does not fit in the capacity.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      count = backupList.addDirContents(path)
+      if platformSupportsLinks():
+         self.failUnlessEqual(15, count)
+         self.failUnlessRaises(ValueError, backupList.generateSpan, 760, "directory_fit", locality=-0.1)
+         self.failUnlessRaises(ValueError, backupList.generateSpan, 760, "directory_fit", locality=1.1)
+         self.failUnlessRaises(ValueError, backupList.generateSpan, 250, "directory_fit")
+
+
+   #######################
+   # Test generateSpans()
+   #######################
+
+   def testGenerateSpans_001(self):
+      """
+      Test on an empty list.
+      """
+      backupList = BackupFileList()
+      spanSets = backupList.generateSpans(2000, [ "best_fit", "first_fit_decreasing", ])
+      self.failUnlessEqual({ "best_fit": [], "first_fit_decreasing": [], }, spanSets)
+
+   def testGenerateSpans_002(self):
+      """
+      Test with no algorithms.
+      """
+      backupList = BackupFileList()
+      self.failUnlessEqual({}, backupList.generateSpans(2000, []))
+
+   def testGenerateSpans_003(self):
+      """
+      Test with an invalid algorithm.
+      """
+      backupList = BackupFileList()
+      self.failUnlessRaises(ValueError, backupList.generateSpans, 2000, [ "best_fit", "bogus", ])
+
+   def testGenerateSpans_004(self):
+      """
+      Test that each algorithm gives the same result as generateSpan.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      count = backupList.addDirContents(path)
+      if platformSupportsLinks():
+         self.failUnlessEqual(15, count)
+         algorithms = [ "best_fit", "worst_fit", "alternate_fit", "first_fit_decreasing", "best_fit_decreasing", "directory_fit", ]
+         spanSets = backupList.generateSpans(760, algorithms)
+         self.failUnlessEqual(algorithms, sorted(spanSets.keys(), key=algorithms.index))
+         for algorithm in algorithms:
+            expected = backupList.generateSpan(760, algorithm)
+            self.failUnlessEqual([ (sorted(item.fileList), item.size) for item in expected ],
+                                 [ (sorted(item.fileList), item.size) for item in spanSets[algorithm] ])
+
+   def testGenerateSpans_005(self):
+      """
+      Test that each algorithm gives the same result as generateSpan, using ISO costs.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      count = backupList.addDirContents(path)
+      if platformSupportsLinks():
+         self.failUnlessEqual(15, count)
+         capacity = ISO_IMAGE_OVERHEAD + 8192
+         algorithms = [ "best_fit", "first_fit_decreasing", ]
+         spanSets = backupList.generateSpans(capacity, algorithms, isoCost=True)
+         for algorithm in algorithms:
+            expected = backupList.generateSpan(capacity, algorithm, isoCost=True)
+            self.failUnlessEqual([ (sorted(item.fileList), item.size) for item in expected ],
+                                 [ (sorted(item.fileList), item.size) for item in spanSets[algorithm] ])
+
+   def testGenerateSpans_006(self):
+      """
+      Test a set of files where one of the files does not fit in the capacity.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      count = backupList.addDirContents(path)
+      if platformSupportsLinks():
+         self.failUnlessEqual(15, count)
+         self.failUnlessRaises(ValueError, backupList.generateSpans, 250, [ "best_fit", "first_fit_decreasing", ])
+
+
+   #########################
+   # Test generateTarfile()
+   #########################
+
+   def testGenerateTarfile_001(self):
+      """
+      Test on an empty list.
+      """
+      backupList = BackupFileList()
+      tarPath = self.buildPath(["file.tar", ])
+      self.failUnlessRaises(ValueError, backupList.generateTarfile, tarPath)
+      self.failUnless(not os.path.exists(tarPath))
+
+   def testGenerateTarfile_002(self):
+      """
+      Test on a non-empty list containing a directory (which shouldn't be
+      possible).
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      count = backupList.addDirContents(path)
+      if not platformSupportsLinks():
+         self.failUnlessEqual(10, count)
+         self.failUnlessEqual(10, len(backupList))
+         backupList.append(self.buildPath([ "tree9", "dir001", ]))     # back-door around addDir()
+         self.failUnlessEqual(11, len(backupList))
+         self.failUnless(self.buildPath([ "tree9", "dir001", "file001", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "file002", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "link001", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "link002", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "file001", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "file002", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "link003", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "link004", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "file001", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "file002", ]) in backupList)
+         tarPath = self.buildPath(["file.tar", ])
+         backupList.generateTarfile(tarPath)
+         self.failUnless(tarfile.is_tarfile(tarPath))
+         tarFile = tarfile.open(tarPath)
+         tarList = tarFile.getnames()
+         tarFile.close()
+         self.failUnlessEqual(11, len(tarList))
+         self.failUnless(self.tarPath([ "tree9", "dir001/" ]) in tarList
+                         or self.tarPath([ "tree9", "dir001//" ]) in tarList  # Grr... Python 2.5 behavior differs
+                         or self.tarPath([ "tree9", "dir001", ]) in tarList)  # Grr... Python 2.6 behavior differs
+         self.failUnless(self.tarPath([ "tree9", "dir001", "file001", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "dir001", "file002", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "dir001", "link001", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "dir001", "link002", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "dir002", "file001", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "dir002", "file002", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "dir002", "link003", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "dir002", "link004", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "file001", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "file002", ]) in tarList)
+      else:
+         self.failUnlessEqual(15, count)
+         self.failUnlessEqual(15, len(backupList))
+         backupList.append(self.buildPath([ "tree9", "dir001", ]))     # back-door around addDir()
+         self.failUnlessEqual(16, len(backupList))
+         self.failUnless(self.buildPath([ "tree9", "dir001" ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "file001", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "file002", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "link001", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "link002", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "link003", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "file001", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "file002", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "link001", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "link002", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "link003", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "link004", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "file001", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "file002", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "link001", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "link002", ]) in backupList)
+         tarPath = self.buildPath(["file.tar", ])
+         backupList.generateTarfile(tarPath)
+         self.failUnless(tarfile.is_tarfile(tarPath))
+         tarFile = tarfile.open(tarPath)
+         tarList = tarFile.getnames()
+         tarFile.close()
+         self.failUnlessEqual(16, len(tarList))
+         self.failUnless(self.tarPath([ "tree9", "dir001/" ]) in tarList
+                         or self.tarPath([ "tree9", "dir001//" ]) in tarList  # Grr... Python 2.5 behavior differs
+                         or self.tarPath([ "tree9", "dir001", ]) in tarList)  # Grr... Python 2.6 behavior differs
+         self.failUnless(self.tarPath([ "tree9", "dir001", "file001", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "dir001", "file002", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "dir001", "link001", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "dir001", "link002", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "dir001", "link003", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "dir002", "file001", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "dir002", "file002", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "dir002", "link001", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "dir002", "link002", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "dir002", "link003", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "dir002", "link004", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "file001", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "file002", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "link001", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "link002", ]) in tarList)
+
+   def testGenerateTarfile_003(self):
+      """
+      Test on a non-empty list containing a non-existent file, ignore=False.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      count = backupList.addDirContents(path)
+      if not platformSupportsLinks():
+         self.failUnlessEqual(10, count)
+         self.failUnlessEqual(10, len(backupList))
+         backupList.append(self.buildPath([ "tree9", INVALID_FILE, ]))     # file won't exist on disk
+         self.failUnlessEqual(11, len(backupList))
+         self.failUnless(self.buildPath([ "tree9", INVALID_FILE ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "file001", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "file002", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "link001", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "link002", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "file001", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "file002", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "link003", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "link004", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "file001", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "file002", ]) in backupList)
+         tarPath = self.buildPath(["file.tar", ])
+         self.failUnlessRaises(tarfile.TarError, backupList.generateTarfile, tarPath, ignore=False)
+         self.failUnless(not os.path.exists(tarPath))
+      else:
+         self.failUnlessEqual(15, count)
+         self.failUnlessEqual(15, len(backupList))
+         backupList.append(self.buildPath([ "tree9", INVALID_FILE, ]))     # file won't exist on disk
+         self.failUnlessEqual(16, len(backupList))
+         self.failUnless(self.buildPath([ "tree9", INVALID_FILE ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "file001", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "file002", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "link001", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "link002", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "link003", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "file001", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "file002", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "link001", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "link002", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "link003", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "link004", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "file001", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "file002", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "link001", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "link002", ]) in backupList)
+         tarPath = self.buildPath(["file.tar", ])
+         self.failUnlessRaises(tarfile.TarError, backupList.generateTarfile, tarPath, ignore=False)
+         self.failUnless(not os.path.exists(tarPath))
+
+   def testGenerateTarfile_004(self):
+      """
+      Test on a non-empty list containing a non-existent file, ignore=True.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      count = backupList.addDirContents(path)
+      if not platformSupportsLinks():
+         self.failUnlessEqual(10, count)
+         self.failUnlessEqual(10, len(backupList))
+         backupList.append(self.buildPath([ "tree9", INVALID_FILE, ]))     # file won't exist on disk
+         self.failUnlessEqual(11, len(backupList))
+         self.failUnless(self.buildPath([ "tree9", INVALID_FILE ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "file001", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "file002", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "link001", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "link002", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "file001", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "file002", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "link003", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "link004", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "file001", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "file002", ]) in backupList)
+         tarPath = self.buildPath(["file.tar", ])
+         backupList.generateTarfile(tarPath, ignore=True)
+         self.failUnless(tarfile.is_tarfile(tarPath))
+         tarFile = tarfile.open(tarPath)
+         tarList = tarFile.getnames()
          tarFile.close()
          self.failUnlessEqual(10, len(tarList))
          self.failUnless(self.tarPath([ "tree9", "dir001", "file001", ]) in tarList)
@@ -17607,9 +18036,88 @@ class TestBackupFileList(unittest.TestCase):
          self.failUnless(self.tarPath([ "tree11", "dir with spaces", "link002", ]) in tarList)
          self.failUnless(self.tarPath([ "tree11", "dir with spaces", "link with spaces", ]) in tarList)
 
-   def testGenerateTarfile_008(self):
+   def testGenerateTarfile_008(self):
+      """
+      Test on a non-empty list containing only valid entries, 'tar' mode.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      count = backupList.addDirContents(path)
+      if not platformSupportsLinks():
+         self.failUnlessEqual(10, count)
+         self.failUnlessEqual(10, len(backupList))
+         self.failUnless(self.buildPath([ "tree9", "dir001", "file001", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "file002", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "link001", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "link002", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "file001", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "file002", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "link003", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "link004", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "file001", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "file002", ]) in backupList)
+         tarPath = self.buildPath(["file.tar", ])
+         backupList.generateTarfile(tarPath)
+         self.failUnless(tarfile.is_tarfile(tarPath))
+         tarFile = tarfile.open(tarPath)
+         tarList = tarFile.getnames()
+         tarFile.close()
+         self.failUnlessEqual(10, len(tarList))
+         self.failUnless(self.tarPath([ "tree9", "dir001", "file001", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "dir001", "file002", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "dir001", "link001", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "dir001", "link002", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "dir002", "file001", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "dir002", "file002", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "dir002", "link003", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "dir002", "link004", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "file001", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "file002", ]) in tarList)
+      else:
+         self.failUnlessEqual(15, count)
+         self.failUnlessEqual(15, len(backupList))
+         self.failUnless(self.buildPath([ "tree9", "dir001", "file001", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "file002", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "link001", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "link002", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir001", "link003", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "file001", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "file002", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "link001", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "link002", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "link003", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "dir002", "link004", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "file001", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "file002", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "link001", ]) in backupList)
+         self.failUnless(self.buildPath([ "tree9", "link002", ]) in backupList)
+         tarPath = self.buildPath(["file.tar", ])
+         backupList.generateTarfile(tarPath)
+         self.failUnless(tarfile.is_tarfile(tarPath))
+         tarFile = tarfile.open(tarPath)
+         tarList = tarFile.getnames()
+         tarFile.close()
+         self.failUnlessEqual(15, len(tarList))
+         self.failUnless(self.tarPath([ "tree9", "dir001", "file001", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "dir001", "file002", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "dir001", "link001", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "dir001", "link002", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "dir001", "link003", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "dir002", "file001", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "dir002", "file002", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "dir002", "link001", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "dir002", "link002", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "dir002", "link003", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "dir002", "link004", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "file001", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "file002", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "link001", ]) in tarList)
+         self.failUnless(self.tarPath([ "tree9", "link002", ]) in tarList)
+
+   def testGenerateTarfile_009(self):
       """
-      Test on a non-empty list containing only valid entries, 'tar' mode.
+      Test on a non-empty list containing only valid entries, 'targz' mode.
       """
       self.extractTar("tree9")
       path = self.buildPath(["tree9"])
@@ -17628,8 +18136,8 @@ class TestBackupFileList(unittest.TestCase):
          self.failUnless(self.buildPath([ "tree9", "dir002", "link004", ]) in backupList)
          self.failUnless(self.buildPath([ "tree9", "file001", ]) in backupList)
          self.failUnless(self.buildPath([ "tree9", "file002", ]) in backupList)
-         tarPath = self.buildPath(["file.tar", ])
-         backupList.generateTarfile(tarPath)
+         tarPath = self.buildPath(["file.tar.gz", ])
+         backupList.generateTarfile(tarPath, mode="targz")
          self.failUnless(tarfile.is_tarfile(tarPath))
          tarFile = tarfile.open(tarPath)
          tarList = tarFile.getnames()
@@ -17663,8 +18171,8 @@ class TestBackupFileList(unittest.TestCase):
          self.failUnless(self.buildPath([ "tree9", "file002", ]) in backupList)
          self.failUnless(self.buildPath([ "tree9", "link001", ]) in backupList)
          self.failUnless(self.buildPath([ "tree9", "link002", ]) in backupList)
-         tarPath = self.buildPath(["file.tar", ])
-         backupList.generateTarfile(tarPath)
+         tarPath = self.buildPath(["file.tar.gz", ])
+         backupList.generateTarfile(tarPath, mode="targz")
          self.failUnless(tarfile.is_tarfile(tarPath))
          tarFile = tarfile.open(tarPath)
          tarList = tarFile.getnames()
@@ -17686,9 +18194,9 @@ class TestBackupFileList(unittest.TestCase):
          self.failUnless(self.tarPath([ "tree9", "link001", ]) in tarList)
          self.failUnless(self.tarPath([ "tree9", "link002", ]) in tarList)
 
-   def testGenerateTarfile_009(self):
+   def testGenerateTarfile_010(self):
       """
-      Test on a non-empty list containing only valid entries, 'targz' mode.
+      Test on a non-empty list containing only valid entries, 'tarbz2' mode.
       """
       self.extractTar("tree9")
       path = self.buildPath(["tree9"])
@@ -17707,8 +18215,8 @@ class TestBackupFileList(unittest.TestCase):
          self.failUnless(self.buildPath([ "tree9", "dir002", "link004", ]) in backupList)
          self.failUnless(self.buildPath([ "tree9", "file001", ]) in backupList)
          self.failUnless(self.buildPath([ "tree9", "file002", ]) in backupList)
-         tarPath = self.buildPath(["file.tar.gz", ])
-         backupList.generateTarfile(tarPath, mode="targz")
+         tarPath = self.buildPath(["file.tar.bz2", ])
+         backupList.generateTarfile(tarPath, mode="tarbz2")
          self.failUnless(tarfile.is_tarfile(tarPath))
          tarFile = tarfile.open(tarPath)
          tarList = tarFile.getnames()
@@ -17742,8 +18250,8 @@ class TestBackupFileList(unittest.TestCase):
          self.failUnless(self.buildPath([ "tree9", "file002", ]) in backupList)
          self.failUnless(self.buildPath([ "tree9", "link001", ]) in backupList)
          self.failUnless(self.buildPath([ "tree9", "link002", ]) in backupList)
-         tarPath = self.buildPath(["file.tar.gz", ])
-         backupList.generateTarfile(tarPath, mode="targz")
+         tarPath = self.buildPath(["file.tar.bz2", ])
+         backupList.generateTarfile(tarPath, mode="tarbz2")
          self.failUnless(tarfile.is_tarfile(tarPath))
          tarFile = tarfile.open(tarPath)
          tarList = tarFile.getnames()
@@ -17765,9 +18273,9 @@ class TestBackupFileList(unittest.TestCase):
          self.failUnless(self.tarPath([ "tree9", "link001", ]) in tarList)
          self.failUnless(self.tarPath([ "tree9", "link002", ]) in tarList)
 
-   def testGenerateTarfile_010(self):
+   def testGenerateTarfile_011(self):
       """
-      Test on a non-empty list containing only valid entries, 'tarbz2' mode.
+      Test on a non-empty list containing only valid entries, 'tar' mode, long target name.
       """
       self.extractTar("tree9")
       path = self.buildPath(["tree9"])
@@ -17786,8 +18294,8 @@ class TestBackupFileList(unittest.TestCase):
          self.failUnless(self.buildPath([ "tree9", "dir002", "link004", ]) in backupList)
          self.failUnless(self.buildPath([ "tree9", "file001", ]) in backupList)
          self.failUnless(self.buildPath([ "tree9", "file002", ]) in backupList)
-         tarPath = self.buildPath(["file.tar.bz2", ])
-         backupList.generateTarfile(tarPath, mode="tarbz2")
+         tarPath = self.buildRandomPath(255, ".tar")
+         backupList.generateTarfile(tarPath, mode="tar")
          self.failUnless(tarfile.is_tarfile(tarPath))
          tarFile = tarfile.open(tarPath)
          tarList = tarFile.getnames()
@@ -17821,8 +18329,8 @@ class TestBackupFileList(unittest.TestCase):
          self.failUnless(self.buildPath([ "tree9", "file002", ]) in backupList)
          self.failUnless(self.buildPath([ "tree9", "link001", ]) in backupList)
          self.failUnless(self.buildPath([ "tree9", "link002", ]) in backupList)
-         tarPath = self.buildPath(["file.tar.bz2", ])
-         backupList.generateTarfile(tarPath, mode="tarbz2")
+         tarPath = self.buildRandomPath(255, ".tar")
+         backupList.generateTarfile(tarPath, mode="tar")
          self.failUnless(tarfile.is_tarfile(tarPath))
          tarFile = tarfile.open(tarPath)
          tarList = tarFile.getnames()
@@ -17844,9 +18352,9 @@ class TestBackupFileList(unittest.TestCase):
          self.failUnless(self.tarPath([ "tree9", "link001", ]) in tarList)
          self.failUnless(self.tarPath([ "tree9", "link002", ]) in tarList)
 
-   def testGenerateTarfile_011(self):
+   def testGenerateTarfile_012(self):
       """
-      Test on a non-empty list containing only valid entries, 'tar' mode, long target name.
+      Test on a non-empty list containing only valid entries, 'targz' mode, long target name.
       """
       self.extractTar("tree9")
       path = self.buildPath(["tree9"])
@@ -17865,8 +18373,8 @@ class TestBackupFileList(unittest.TestCase):
          self.failUnless(self.buildPath([ "tree9", "dir002", "link004", ]) in backupList)
          self.failUnless(self.buildPath([ "tree9", "file001", ]) in backupList)
          self.failUnless(self.buildPath([ "tree9", "file002", ]) in backupList)
-         tarPath = self.buildRandomPath(255, ".tar")
-         backupList.generateTarfile(tarPath, mode="tar")
+         tarPath = self.buildRandomPath(255, ".tar.gz")
+         backupList.generateTarfile(tarPath, mode="targz")
          self.failUnless(tarfile.is_tarfile(tarPath))
          tarFile = tarfile.open(tarPath)
          tarList = tarFile.getnames()
@@ -17901,7 +18409,7 @@ class TestBackupFileList(unittest.TestCase):
          self.failUnless(self.buildPath([ "tree9", "link001", ]) in backupList)
          self.failUnless(self.buildPath([ "tree9", "link002", ]) in backupList)
          tarPath = self.buildRandomPath(255, ".tar")
-         backupList.generateTarfile(tarPath, mode="tar")
+         backupList.generateTarfile(tarPath, mode="targz")
          self.failUnless(tarfile.is_tarfile(tarPath))
          tarFile = tarfile.open(tarPath)
          tarList = tarFile.getnames()
@@ -17923,9 +18431,9 @@ class TestBackupFileList(unittest.TestCase):
          self.failUnless(self.tarPath([ "tree9", "link001", ]) in tarList)
          self.failUnless(self.tarPath([ "tree9", "link002", ]) in tarList)
 
-   def testGenerateTarfile_012(self):
+   def testGenerateTarfile_013(self):
       """
-      Test on a non-empty list containing only valid entries, 'targz' mode, long target name.
+      Test on a non-empty list containing only valid entries, 'tarbz2' mode, long target name.
       """
       self.extractTar("tree9")
       path = self.buildPath(["tree9"])
@@ -17944,8 +18452,8 @@ class TestBackupFileList(unittest.TestCase):
          self.failUnless(self.buildPath([ "tree9", "dir002", "link004", ]) in backupList)
          self.failUnless(self.buildPath([ "tree9", "file001", ]) in backupList)
          self.failUnless(self.buildPath([ "tree9", "file002", ]) in backupList)
-         tarPath = self.buildRandomPath(255, ".tar.gz")
-         backupList.generateTarfile(tarPath, mode="targz")
+         tarPath = self.buildRandomPath(255, ".tar.bz2")
+         backupList.generateTarfile(tarPath, mode="tarbz2")
          self.failUnless(tarfile.is_tarfile(tarPath))
          tarFile = tarfile.open(tarPath)
          tarList = tarFile.getnames()
@@ -17980,7 +18488,7 @@ class TestBackupFileList(unittest.TestCase):
          self.failUnless(self.buildPath([ "tree9", "link001", ]) in backupList)
          self.failUnless(self.buildPath([ "tree9", "link002", ]) in backupList)
          tarPath = self.buildRandomPath(255, ".tar")
-         backupList.generateTarfile(tarPath, mode="targz")
+         backupList.generateTarfile(tarPath, mode="tarbz2")
          self.failUnless(tarfile.is_tarfile(tarPath))
          tarFile = tarfile.open(tarPath)
          tarList = tarFile.getnames()
@@ -18002,115 +18510,567 @@ class TestBackupFileList(unittest.TestCase):
          self.failUnless(self.tarPath([ "tree9", "link001", ]) in tarList)
          self.failUnless(self.tarPath([ "tree9", "link002", ]) in tarList)
 
-   def testGenerateTarfile_013(self):
+   def testGenerateTarfile_014(self):
+      """
+      Test behavior of the flat flag.
+      """
+      self.extractTar("tree11")
+      backupList = BackupFileList()
+      path = self.buildPath([ "tree11", "dir with spaces", "file with spaces", ])
+      backupList.addFile(path)
+      path = self.buildPath([ "tree11", "dir with spaces", "file001", ])
+      backupList.addFile(path)
+      path = self.buildPath([ "tree11", "dir002", "file002", ])
+      backupList.addFile(path)
+      path = self.buildPath([ "tree11", "dir002", "file003", ])
+      backupList.addFile(path)
+      self.failUnlessEqual(4, len(backupList))
+      self.failUnless(self.buildPath([ "tree11", "dir with spaces", "file with spaces", ]) in backupList)
+      self.failUnless(self.buildPath([ "tree11", "dir with spaces", "file001", ]) in backupList)
+      self.failUnless(self.buildPath([ "tree11", "dir002", "file002", ]) in backupList)
+      self.failUnless(self.buildPath([ "tree11", "dir002", "file003", ]) in backupList)
+      tarPath = self.buildPath(["file.tar", ])
+      backupList.generateTarfile(tarPath, flat=True)
+      self.failUnless(tarfile.is_tarfile(tarPath))
+      tarFile = tarfile.open(tarPath)
+      tarList = tarFile.getnames()
+      tarFile.close()
+      self.failUnlessEqual(4, len(tarList))
+      self.failUnless("file with spaces" in tarList)
+      self.failUnless("file001" in tarList)
+      self.failUnless("file002" in tarList)
+      self.failUnless("file003" in tarList)
+
+   def testGenerateTarfile_015(self):
+      """
+      Test that prefetch generates the same archive as no prefetch, for a tree
+      containing files and links.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      backupList.addDirContents(path)
+      tarPath = self.buildPath(["file.tar.gz", ])
+      backupList.generateTarfile(tarPath, mode="targz")
+      expected = self.tarContents(tarPath)
+      for prefetch in [ 1, 2, 5, 100, ]:
+         tarPath = self.buildPath(["prefetch%d.tar.gz" % prefetch, ])
+         backupList.generateTarfile(tarPath, mode="targz", prefetch=prefetch)
+         self.failUnless(tarfile.is_tarfile(tarPath))
+         self.failUnlessEqual(expected, self.tarContents(tarPath))
+
+   def testGenerateTarfile_016(self):
+      """
+      Test that prefetch generates the same archive as no prefetch, for a tree
+      containing a file too large to be read whole, flat=True.
+      """
+      self.extractTar("tree1")
+      path = self.buildPath(["tree1"])
+      large = self.buildPath(["tree1", "large", ])
+      open(large, "wb").write("x" * (PREFETCH_SLURP + 1000))
+      backupList = BackupFileList()
+      backupList.addDirContents(path)
+      tarPath = self.buildPath(["file.tar", ])
+      backupList.generateTarfile(tarPath, flat=True)
+      expected = self.tarContents(tarPath)
+      tarPath = self.buildPath(["prefetch.tar", ])
+      backupList.generateTarfile(tarPath, flat=True, prefetch=3)
+      self.failUnlessEqual(expected, self.tarContents(tarPath))
+
+   def testGenerateTarfile_017(self):
+      """
+      Test prefetch on a non-empty list containing a non-existent file,
+      ignore=False.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      backupList.addDirContents(path)
+      backupList.insert(1, self.buildPath([ "tree9", INVALID_FILE, ]))     # file won't exist on disk
+      tarPath = self.buildPath(["file.tar", ])
+      self.failUnlessRaises(tarfile.TarError, backupList.generateTarfile, tarPath, ignore=False, prefetch=4)
+      self.failUnless(not os.path.exists(tarPath))
+
+   def testGenerateTarfile_018(self):
+      """
+      Test prefetch on a non-empty list containing a non-existent file,
+      ignore=True.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      backupList.addDirContents(path)
+      tarPath = self.buildPath(["file.tar", ])
+      backupList.generateTarfile(tarPath)
+      expected = self.tarContents(tarPath)
+      backupList.insert(1, self.buildPath([ "tree9", INVALID_FILE, ]))     # file won't exist on disk
+      tarPath = self.buildPath(["prefetch.tar", ])
+      backupList.generateTarfile(tarPath, ignore=True, prefetch=4)
+      self.failUnlessEqual(expected, self.tarContents(tarPath))
+
+   def testGenerateTarfile_019(self):
+      """
+      Test that backup I/O mode generates the same archive as normal mode, with
+      and without prefetch.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      backupList.addDirContents(path)
+      tarPath = self.buildPath(["file.tar", ])
+      backupList.generateTarfile(tarPath)
+      expected = self.tarContents(tarPath)
+      try:
+         setIoMode(IO_MODE_BACKUP)
+         for prefetch in [ 0, 4, ]:
+            tarPath = self.buildPath(["backup%d.tar" % prefetch, ])
+            backupList.generateTarfile(tarPath, prefetch=prefetch)
+            self.failUnlessEqual(expected, self.tarContents(tarPath))
+      finally:
+         setIoMode(IO_MODE_NORMAL)
+
+   def testGenerateTarfile_020(self):
+      """
+      Test backup I/O mode on a non-empty list containing a non-existent file,
+      ignore=False and ignore=True.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      backupList.addDirContents(path)
+      backupList.insert(1, self.buildPath([ "tree9", INVALID_FILE, ]))     # file won't exist on disk
+      tarPath = self.buildPath(["file.tar", ])
+      try:
+         setIoMode(IO_MODE_BACKUP)
+         self.failUnlessRaises(tarfile.TarError, backupList.generateTarfile, tarPath, ignore=False)
+         self.failUnless(not os.path.exists(tarPath))
+         backupList.generateTarfile(tarPath, ignore=True)
+         self.failUnless(tarfile.is_tarfile(tarPath))
+      finally:
+         setIoMode(IO_MODE_NORMAL)
+
+   def testGenerateTarfile_021(self):
+      """
+      Test that captureDigest=False returns None, and that captureDigest=True
+      returns the same digest map as generateDigestMap(), for a tree containing
+      files and links, with and without prefetch.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      backupList.addDirContents(path)
+      expected = backupList.generateDigestMap()
+      tarPath = self.buildPath(["file.tar", ])
+      self.failUnlessEqual(None, backupList.generateTarfile(tarPath))
+      contents = self.tarContents(tarPath)
+      for prefetch in [ 0, 1, 4, ]:
+         tarPath = self.buildPath(["digest%d.tar" % prefetch, ])
+         digestMap = backupList.generateTarfile(tarPath, prefetch=prefetch, captureDigest=True)
+         self.failUnlessEqual(expected, digestMap)
+         self.failUnlessEqual(contents, self.tarContents(tarPath))
+
+   def testGenerateTarfile_022(self):
+      """
+      Test captureDigest=True for a file too large to be read whole by the
+      prefetcher and for a hard link to an earlier member, flat=True.
+      """
+      self.extractTar("tree1")
+      path = self.buildPath(["tree1"])
+      large = self.buildPath(["tree1", "large", ])
+      open(large, "wb").write("x" * (PREFETCH_SLURP + 1000))
+      os.link(large, self.buildPath(["tree1", "hardlink", ]))
+      backupList = BackupFileList()
+      backupList.addDirContents(path)
+      expected = backupList.generateDigestMap()
+      for prefetch in [ 0, 3, ]:
+         tarPath = self.buildPath(["digest%d.tar" % prefetch, ])
+         digestMap = backupList.generateTarfile(tarPath, flat=True, prefetch=prefetch, captureDigest=True)
+         self.failUnlessEqual(expected, digestMap)
+
+   def testGenerateTarfile_023(self):
+      """
+      Test captureDigest=True on a non-empty list containing a non-existent
+      file, ignore=True.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      backupList.addDirContents(path)
+      expected = backupList.generateDigestMap()
+      backupList.insert(1, self.buildPath([ "tree9", INVALID_FILE, ]))     # file won't exist on disk
+      tarPath = self.buildPath(["file.tar", ])
+      digestMap = backupList.generateTarfile(tarPath, ignore=True, captureDigest=True)
+      self.failUnlessEqual(expected, digestMap)
+
+   def testGenerateTarfile_024(self):
+      """
+      Test volumeSize larger than the archive, which should produce a single
+      volume identical to the normal archive.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      backupList.addDirContents(path)
+      tarPath = self.buildPath(["file.tar", ])
+      backupList.generateTarfile(tarPath)
+      expected = self.tarContents(tarPath)
+      tarPath = self.buildPath(["volume.tar", ])
+      volumes = backupList.generateTarfile(tarPath, volumeSize=1024*1024*1024)
+      self.failUnlessEqual([ tarPath, ], volumes)
+      self.failUnlessEqual(expected, self.tarContents(tarPath))
+
+   def testGenerateTarfile_025(self):
+      """
+      Test a small volumeSize, for each mode, with and without prefetch.  Each
+      volume should be a valid archive, and together the volumes should contain
+      exactly the members of the normal archive, in order.  (The bzip2
+      compressor buffers too much data for such a small tree to be split.)
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      backupList.addDirContents(path)
+      for (mode, extension) in [ ("tar", "tar"), ("targz", "tar.gz"), ("tarbz2", "tar.bz2"), ]:
+         tarPath = self.buildPath(["file.%s" % extension, ])
+         backupList.generateTarfile(tarPath, mode=mode)
+         expected = self.tarContents(tarPath)
+         for prefetch in [ 0, 4, ]:
+            tarPath = self.buildPath(["volume%d.%s" % (prefetch, extension), ])
+            volumes = backupList.generateTarfile(tarPath, mode=mode, prefetch=prefetch, volumeSize=1)
+            if mode != "tarbz2":
+               self.failUnless(len(volumes) > 1)
+            self.failUnlessEqual([ getVolumePath(tarPath, i + 1) for i in range(0, len(volumes)) ], volumes)
+            contents = []
+            for volume in volumes:
+               self.failUnless(tarfile.is_tarfile(volume))
+               contents.extend(self.tarContents(volume))
+            self.failUnlessEqual(expected, contents)
+
+   def testGenerateTarfile_026(self):
+      """
+      Test volumeSize with captureDigest=True.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      backupList.addDirContents(path)
+      expected = backupList.generateDigestMap()
+      tarPath = self.buildPath(["volume.tar", ])
+      (volumes, digestMap) = backupList.generateTarfile(tarPath, volumeSize=1, captureDigest=True) # pylint: disable=W0633
+      self.failUnless(len(volumes) > 1)
+      self.failUnlessEqual(expected, digestMap)
+
+   def testGenerateTarfile_027(self):
+      """
+      Test volumeSize on a non-empty list containing a non-existent file,
+      ignore=False, which should remove all volumes.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      backupList.addDirContents(path)
+      backupList.append(self.buildPath([ "tree9", INVALID_FILE, ]))     # file won't exist on disk
+      tarPath = self.buildPath(["volume.tar", ])
+      self.failUnlessRaises(tarfile.TarError, backupList.generateTarfile, tarPath, ignore=False, volumeSize=1)
+      self.failUnless(not os.path.exists(tarPath))
+      self.failUnless(not os.path.exists(getVolumePath(tarPath, 2)))
+
+   def testGenerateTarfile_028(self):
+      """
+      Test compressLevel with modes targz and tarbz2, which should produce the
+      same valid archive contents at any level.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      backupList.addDirContents(path)
+      for (mode, extension) in [ ("targz", "tar.gz"), ("tarbz2", "tar.bz2"), ]:
+         for level in [ 1, 6, 9, ]:
+            tarPath = self.buildPath(["level%d.%s" % (level, extension), ])
+            backupList.generateTarfile(tarPath, mode, compressLevel=level)
+            tarFile = tarfile.open(tarPath)
+            self.failUnlessEqual(sorted([ entry[1:] for entry in backupList ]), sorted(tarFile.getnames()))
+            tarFile.close()
+
+   def testGenerateTarfile_029(self):
+      """
+      Test compressLevel with mode tar, where it should be ignored.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      backupList.addDirContents(path)
+      tarPath = self.buildPath(["level.tar", ])
+      backupList.generateTarfile(tarPath, "tar", compressLevel=42)
+      tarFile = tarfile.open(tarPath)
+      self.failUnlessEqual(len(backupList), len(tarFile.getnames()))
+      tarFile.close()
+
+   def testGenerateTarfile_030(self):
+      """
+      Test compressLevel out of range with mode targz, which should raise
+      ValueError without creating the archive.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      backupList.addDirContents(path)
+      tarPath = self.buildPath(["level.tar.gz", ])
+      self.failUnlessRaises(ValueError, backupList.generateTarfile, tarPath, "targz", compressLevel=0)
+      self.failUnlessRaises(ValueError, backupList.generateTarfile, tarPath, "targz", compressLevel=10)
+      self.failUnless(not os.path.exists(tarPath))
+
+   def testGenerateTarfile_031(self):
+      """
+      Test dedup=True with duplicate files, with and without prefetch.  The
+      duplicates should be stored as hard links to the first copy, the digest
+      map should be complete, and the archive should extract correctly.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      open(self.buildPath(["tree9", "dup1", ]), "w").write("duplicate" * 1000)
+      open(self.buildPath(["tree9", "dup2", ]), "w").write("duplicate" * 1000)
+      open(self.buildPath(["tree9", "dup3", ]), "w").write("duplicate" * 1000)
+      backupList = BackupFileList()
+      backupList.addDirContents(path)
+      backupList.sort()
+      expected = backupList.generateDigestMap()
+      for prefetch in [ 0, 4, ]:
+         tarPath = self.buildPath(["dedup%d.tar" % prefetch, ])
+         digestMap = backupList.generateTarfile(tarPath, prefetch=prefetch, captureDigest=True, dedup=True)
+         self.failUnlessEqual(expected, digestMap)
+         tarFile = tarfile.open(tarPath)
+         links = [ (member.name, member.linkname) for member in tarFile.getmembers() if member.islnk() ]
+         dup1 = self.buildPath(["tree9", "dup1", ])[1:]
+         self.failUnlessEqual([ (dup1.replace("dup1", "dup2"), dup1), (dup1.replace("dup1", "dup3"), dup1), ], links)
+         extractPath = self.buildPath(["extract%d" % prefetch, ])
+         tarFile.extractall(extractPath)
+         tarFile.close()
+         for name in [ "dup1", "dup2", "dup3", ]:
+            extracted = os.path.join(extractPath, self.buildPath(["tree9", name, ])[1:])
+            self.failUnlessEqual("duplicate" * 1000, open(extracted).read())
+
+   def testGenerateTarfile_032(self):
+      """
+      Test dedup=True with files that are the same size but have different
+      contents, which should not be linked.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      open(self.buildPath(["tree9", "same1", ]), "w").write("a" * 100000)
+      open(self.buildPath(["tree9", "same2", ]), "w").write("a" * 99999 + "b")
+      open(self.buildPath(["tree9", "same3", ]), "w").write("b" + "a" * 99999)
+      backupList = BackupFileList()
+      backupList.addDirContents(path)
+      tarPath = self.buildPath(["dedup.tar", ])
+      backupList.generateTarfile(tarPath, dedup=True)
+      tarFile = tarfile.open(tarPath)
+      self.failUnlessEqual([], [ member.name for member in tarFile.getmembers() if member.islnk() ])
+      self.failUnlessEqual(sorted([ entry[1:] for entry in backupList ]), sorted(tarFile.getnames()))
+      tarFile.close()
+
+   def testGenerateTarfile_033(self):
+      """
+      Test dedup=True with a small volumeSize, which should never link to a
+      member in an earlier volume.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      open(self.buildPath(["tree9", "dup1", ]), "w").write("duplicate")
+      open(self.buildPath(["tree9", "dup2", ]), "w").write("duplicate")
+      backupList = BackupFileList()
+      backupList.addDirContents(path)
+      tarPath = self.buildPath(["volume.tar", ])
+      volumes = backupList.generateTarfile(tarPath, volumeSize=1, dedup=True)
+      for volume in volumes:
+         tarFile = tarfile.open(volume)
+         self.failUnlessEqual([], [ member.name for member in tarFile.getmembers() if member.islnk() ])
+         tarFile.close()
+
+   def testGenerateTarfile_034(self):
+      """
+      Test dedup=True with flat=True, where links should use the flat names.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      open(self.buildPath(["tree9", "dup1", ]), "w").write("duplicate")
+      open(self.buildPath(["tree9", "dup2", ]), "w").write("duplicate")
+      backupList = BackupFileList()
+      backupList.addFile(self.buildPath(["tree9", "dup1", ]))
+      backupList.addFile(self.buildPath(["tree9", "dup2", ]))
+      tarPath = self.buildPath(["flat.tar", ])
+      backupList.generateTarfile(tarPath, flat=True, dedup=True)
+      tarFile = tarfile.open(tarPath)
+      self.failUnlessEqual([ ("dup1", ""), ("dup2", "dup1"), ], [ (member.name, member.linkname) for member in tarFile.getmembers() ])
+      tarFile.close()
+
+   def testGenerateTarfile_035(self):
+      """
+      Test that a member prefetched for the archive itself is closed rather than archived.
+      """
+      tarPath = self.buildPath(["self.tar", ])
+      tar = tarfile.open(tarPath, "w")
+      fileobj = StringIO("contents")
+      BackupFileList._addTarMember(tar, tarPath, "self.tar", (fileobj, len("contents")))
+      tar.close()
+      self.failUnless(fileobj.closed)
+      tarFile = tarfile.open(tarPath)
+      self.failUnlessEqual([], tarFile.getnames())
+      tarFile.close()
+
+   def testGenerateTarfile_036(self):
+      """
+      Test prefetch on a list containing the archive being written, which should be skipped.
+      """
+      self.extractTar("tree9")
+      tarPath = self.buildPath(["tree9", "backup.tar", ])
+      open(tarPath, "w").write("old archive")
+      backupList = BackupFileList()
+      backupList.addFile(self.buildPath(["tree9", "file001", ]))
+      backupList.addFile(tarPath)
+      backupList.generateTarfile(tarPath, prefetch=2)
+      tarFile = tarfile.open(tarPath)
+      self.failUnlessEqual([ self.buildPath(["tree9", "file001", ])[1:], ], tarFile.getnames())
+      tarFile.close()
+
+   def testGenerateTarfile_037(self):
       """
-      Test on a non-empty list containing only valid entries, 'tarbz2' mode, long target name.
+      Test prefetch when reading a file fails unexpectedly, which should raise
+      the same exception rather than waiting forever for the member.
       """
       self.extractTar("tree9")
       path = self.buildPath(["tree9"])
       backupList = BackupFileList()
-      count = backupList.addDirContents(path)
-      if not platformSupportsLinks():
-         self.failUnlessEqual(10, count)
-         self.failUnlessEqual(10, len(backupList))
-         self.failUnless(self.buildPath([ "tree9", "dir001", "file001", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir001", "file002", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir001", "link001", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir001", "link002", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir002", "file001", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir002", "file002", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir002", "link003", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir002", "link004", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "file001", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "file002", ]) in backupList)
-         tarPath = self.buildRandomPath(255, ".tar.bz2")
-         backupList.generateTarfile(tarPath, mode="tarbz2")
-         self.failUnless(tarfile.is_tarfile(tarPath))
-         tarFile = tarfile.open(tarPath)
-         tarList = tarFile.getnames()
-         tarFile.close()
-         self.failUnlessEqual(10, len(tarList))
-         self.failUnless(self.tarPath([ "tree9", "dir001", "file001", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "dir001", "file002", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "dir001", "link001", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "dir001", "link002", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "dir002", "file001", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "dir002", "file002", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "dir002", "link003", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "dir002", "link004", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "file001", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "file002", ]) in tarList)
-      else:
-         self.failUnlessEqual(15, count)
-         self.failUnlessEqual(15, len(backupList))
-         self.failUnless(self.buildPath([ "tree9", "dir001", "file001", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir001", "file002", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir001", "link001", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir001", "link002", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir001", "link003", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir002", "file001", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir002", "file002", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir002", "link001", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir002", "link002", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir002", "link003", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "dir002", "link004", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "file001", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "file002", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "link001", ]) in backupList)
-         self.failUnless(self.buildPath([ "tree9", "link002", ]) in backupList)
-         tarPath = self.buildRandomPath(255, ".tar")
-         backupList.generateTarfile(tarPath, mode="tarbz2")
-         self.failUnless(tarfile.is_tarfile(tarPath))
-         tarFile = tarfile.open(tarPath)
-         tarList = tarFile.getnames()
-         tarFile.close()
-         self.failUnlessEqual(15, len(tarList))
-         self.failUnless(self.tarPath([ "tree9", "dir001", "file001", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "dir001", "file002", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "dir001", "link001", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "dir001", "link002", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "dir001", "link003", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "dir002", "file001", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "dir002", "file002", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "dir002", "link001", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "dir002", "link002", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "dir002", "link003", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "dir002", "link004", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "file001", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "file002", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "link001", ]) in tarList)
-         self.failUnless(self.tarPath([ "tree9", "link002", ]) in tarList)
+      backupList.addDirContents(path)
+      tarPath = self.buildPath(["file.tar", ])
+      def failingOpen(path):
+         """Stands in for openBackupFile(), failing with an unexpected exception."""
+         raise ValueError("Unable to open [%s]." % path)
+      original = filesystem.openBackupFile
+      filesystem.openBackupFile = failingOpen
+      try:
+         self.failUnlessRaises(ValueError, backupList.generateTarfile, tarPath, prefetch=4)
+      finally:
+         filesystem.openBackupFile = original
 
-   def testGenerateTarfile_014(self):
+
+   ##################################
+   # Test generateSyntheticTarfile()
+   ##################################
+
+   def testGenerateSyntheticTarfile_001(self):
       """
-      Test behavior of the flat flag.
+      Test on an empty list.
       """
-      self.extractTar("tree11")
       backupList = BackupFileList()
-      path = self.buildPath([ "tree11", "dir with spaces", "file with spaces", ])
-      backupList.addFile(path)
-      path = self.buildPath([ "tree11", "dir with spaces", "file001", ])
-      backupList.addFile(path)
-      path = self.buildPath([ "tree11", "dir002", "file002", ])
-      backupList.addFile(path)
-      path = self.buildPath([ "tree11", "dir002", "file003", ])
-      backupList.addFile(path)
-      self.failUnlessEqual(4, len(backupList))
-      self.failUnless(self.buildPath([ "tree11", "dir with spaces", "file with spaces", ]) in backupList)
-      self.failUnless(self.buildPath([ "tree11", "dir with spaces", "file001", ]) in backupList)
-      self.failUnless(self.buildPath([ "tree11", "dir002", "file002", ]) in backupList)
-      self.failUnless(self.buildPath([ "tree11", "dir002", "file003", ]) in backupList)
-      tarPath = self.buildPath(["file.tar", ])
-      backupList.generateTarfile(tarPath, flat=True)
-      self.failUnless(tarfile.is_tarfile(tarPath))
+      tarPath = self.buildPath(["synthetic.tar", ])
+      self.failUnlessRaises(ValueError, backupList.generateSyntheticTarfile, tarPath, [], {})
+      self.failUnless(not os.path.exists(tarPath))
+
+   def testGenerateSyntheticTarfile_002(self):
+      """
+      Test with an invalid mode.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      backupList.addDirContents(path)
+      tarPath = self.buildPath(["synthetic.tar", ])
+      self.failUnlessRaises(ValueError, backupList.generateSyntheticTarfile, tarPath, [], {}, "bogus")
+      self.failUnless(not os.path.exists(tarPath))
+
+   def testGenerateSyntheticTarfile_003(self):
+      """
+      Test with every file unchanged, which should copy every file from the
+      archive rather than reading it from disk.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      backupList.addDirContents(path)
+      fullPath = self.buildPath(["full.tar.gz", ])
+      unchanged = backupList.generateTarfile(fullPath, "targz", captureDigest=True)
+      for entry in unchanged:
+         open(entry, "w").write("changed")
+      tarPath = self.buildPath(["synthetic.tar.gz", ])
+      digest = backupList.generateSyntheticTarfile(tarPath, [ fullPath, ], unchanged, "targz", captureDigest=True)
+      self.failUnlessEqual(unchanged, digest)
       tarFile = tarfile.open(tarPath)
-      tarList = tarFile.getnames()
+      self.failUnlessEqual(len(backupList), len(tarFile.getnames()))
+      for entry in unchanged:
+         self.failIfEqual("changed", tarFile.extractfile(entry[1:]).read())
+      tarFile.close()
+
+   def testGenerateSyntheticTarfile_004(self):
+      """
+      Test with several archives, where the newest copy of each file should be used.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      backupList.addDirContents(path)
+      fullPath = self.buildPath(["full.tar", ])
+      unchanged = backupList.generateTarfile(fullPath, "tar", captureDigest=True)
+      files = sorted(unchanged.keys())
+      open(files[0], "w").write("incremental")
+      incrList = BackupFileList()
+      incrList.addFile(files[0])
+      incrPath = self.buildPath(["incr.tar.bz2", ])
+      unchanged.update(incrList.generateTarfile(incrPath, "tarbz2", captureDigest=True))
+      open(files[0], "w").write("changed")
+      tarPath = self.buildPath(["synthetic.tar", ])
+      self.failUnlessEqual(None, backupList.generateSyntheticTarfile(tarPath, [ incrPath, fullPath, ], unchanged))
+      tarFile = tarfile.open(tarPath)
+      self.failUnlessEqual(len(backupList), len(tarFile.getnames()))
+      self.failUnlessEqual("incremental", tarFile.extractfile(files[0][1:]).read())
+      tarFile.close()
+
+   def testGenerateSyntheticTarfile_005(self):
+      """
+      Test with changed files and a missing archive, which should be read from disk.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      backupList.addDirContents(path)
+      fullPath = self.buildPath(["full.tar", ])
+      unchanged = backupList.generateTarfile(fullPath, "tar", captureDigest=True)
+      files = sorted(unchanged.keys())
+      open(files[0], "w").write("changed")
+      del unchanged[files[0]]
+      missingPath = self.buildPath(["missing.tar", ])
+      tarPath = self.buildPath(["synthetic.tar", ])
+      digest = backupList.generateSyntheticTarfile(tarPath, [ missingPath, fullPath, ], unchanged, captureDigest=True)
+      self.failUnlessEqual(BackupFileList._generateDigest(files[0]), digest[files[0]]) # pylint: disable=W0212
+      for entry in files[1:]:
+         self.failUnlessEqual(unchanged[entry], digest[entry])
+      tarFile = tarfile.open(tarPath)
+      self.failUnlessEqual(len(backupList), len(tarFile.getnames()))
+      self.failUnlessEqual("changed", tarFile.extractfile(files[0][1:]).read())
+      tarFile.close()
+
+   def testGenerateSyntheticTarfile_006(self):
+      """
+      Test with an archived copy that doesn't match its digest, which should be read from disk.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      backupList.addDirContents(path)
+      fullPath = self.buildPath(["full.tar", ])
+      unchanged = backupList.generateTarfile(fullPath, "tar", captureDigest=True)
+      files = sorted(unchanged.keys())
+      open(files[0], "w").write("changed")
+      unchanged[files[0]] = BackupFileList._generateDigest(files[0]) # pylint: disable=W0212
+      tarPath = self.buildPath(["synthetic.tar", ])
+      digest = backupList.generateSyntheticTarfile(tarPath, [ fullPath, ], unchanged, captureDigest=True)
+      self.failUnlessEqual(unchanged, digest)
+      tarFile = tarfile.open(tarPath)
+      self.failUnlessEqual(len(backupList), len(tarFile.getnames()))
+      self.failUnlessEqual("changed", tarFile.extractfile(files[0][1:]).read())
+      for entry in files[1:]:
+         self.failIfEqual("changed", tarFile.extractfile(entry[1:]).read())
       tarFile.close()
-      self.failUnlessEqual(4, len(tarList))
-      self.failUnless("file with spaces" in tarList)
-      self.failUnless("file001" in tarList)
-      self.failUnless("file002" in tarList)
-      self.failUnless("file003" in tarList)
 
 
    #########################
@@ -19365,6 +20325,231 @@ class TestBackupFileList(unittest.TestCase):
          self.failUnlessEqual("3ef0b16a6237af9200b7a46c1987d6a555973847", newDigest[self.buildPath([ "tree9", "file001", ])])
          self.failUnlessEqual("fae89085ee97b57ccefa7e30346c573bb0a769db", newDigest[self.buildPath([ "tree9", "file002", ])])
 
+   def testRemoveUnchanged_019(self):
+      """
+      Test that the order of the remaining entries is preserved, for both
+      values of captureDigest.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      digestMap = { self.buildPath([ "tree9", "dir001", "file002", ]):"9d473094a22ecf2ae299c25932c941795d1d6cba",
+                    self.buildPath([ "tree9", "file001", ])          :"3ef0b16a6237af9200b7a46c1987d6a555973847", }
+      for captureDigest in [ False, True, ]:
+         backupList = BackupFileList()
+         backupList.addDirContents(path)
+         backupList.reverse()
+         expected = [ entry for entry in backupList if entry not in digestMap ]
+         backupList.removeUnchanged(digestMap, captureDigest=captureDigest)
+         self.failUnlessEqual(expected, list(backupList))
+
+
+   ######################
+   # Test sortPhysical()
+   ######################
+
+   def testSortPhysical_001(self):
+      """
+      Test on an empty list.
+      """
+      backupList = BackupFileList()
+      backupList.sortPhysical()
+      self.failUnlessEqual(0, len(backupList))
+
+   def testSortPhysical_002(self):
+      """
+      Test with extents=False, which should sort files by inode.
+      """
+      self.extractTar("tree1")
+      path = self.buildPath(["tree1"])
+      backupList = BackupFileList()
+      backupList.addDirContents(path)
+      backupList.reverse()
+      expected = sorted(backupList, key=lambda entry: os.stat(entry).st_ino)
+      backupList.sortPhysical(extents=False)
+      self.failUnlessEqual(expected, list(backupList))
+
+   def testSortPhysical_003(self):
+      """
+      Test with extents=True, which should sort the list without gaining or
+      losing any entries.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      backupList.addDirContents(path)
+      expected = sorted(backupList)
+      backupList.sortPhysical()
+      self.failUnlessEqual(expected, sorted(backupList))
+
+   def testSortPhysical_004(self):
+      """
+      Test that links and non-existent files are moved to the end of the list,
+      in their original order.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      backupList.addDirContents(path)
+      backupList.insert(0, self.buildPath([ "tree9", INVALID_FILE, ]))     # file won't exist on disk
+      expected = [ entry for entry in backupList if os.path.islink(entry) or not os.path.exists(entry) ]
+      backupList.sortPhysical()
+      self.failUnlessEqual(expected, list(backupList)[len(backupList) - len(expected):])
+
+
+   ##################################
+   # Test splitIncompressible()
+   ##################################
+
+   def testSplitIncompressible_001(self):
+      """
+      Test on an empty list.
+      """
+      backupList = BackupFileList()
+      stored = backupList.splitIncompressible()
+      self.failUnless(isinstance(stored, BackupFileList))
+      self.failUnlessEqual(0, len(stored))
+      self.failUnlessEqual(0, len(backupList))
+
+   def testSplitIncompressible_002(self):
+      """
+      Test that files are split out by extension (regardless of case), and
+      that the remaining entries keep their original order.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      photo = self.buildPath(["tree9", "photo.JPG", ])
+      archive = self.buildPath(["tree9", "archive.tar.gz", ])
+      open(photo, "w").write("a" * 10000)
+      open(archive, "w").write("a" * 10000)
+      backupList = BackupFileList()
+      backupList.addDirContents(path)
+      expected = [ entry for entry in backupList if entry not in [ photo, archive, ] ]
+      stored = backupList.splitIncompressible(sample=False)
+      self.failUnlessEqual(sorted([ photo, archive, ]), sorted(stored))
+      self.failUnlessEqual(expected, list(backupList))
+
+   def testSplitIncompressible_003(self):
+      """
+      Test that sampling finds random data with an unknown extension, but
+      leaves compressible and small files alone.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      noise = self.buildPath(["tree9", "noise.dat", ])
+      text = self.buildPath(["tree9", "text.dat", ])
+      small = self.buildPath(["tree9", "small.dat", ])
+      open(noise, "wb").write(os.urandom(100000))
+      open(text, "w").write("hello, world\n" * 10000)
+      open(small, "wb").write(os.urandom(100))
+      backupList = BackupFileList()
+      backupList.addDirContents(path)
+      stored = backupList.splitIncompressible(extensions=[])
+      self.failUnlessEqual([ noise, ], list(stored))
+      self.failUnless(text in backupList)
+      self.failUnless(small in backupList)
+      self.failIf(noise in backupList)
+      stored = backupList.splitIncompressible(extensions=[], sample=False)
+      self.failUnlessEqual(0, len(stored))
+
+   def testSplitIncompressible_004(self):
+      """
+      Test that links and non-existent files are never split out.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      backupList = BackupFileList()
+      backupList.addDirContents(path)
+      backupList.append(self.buildPath([ "tree9", "%s.gz" % INVALID_FILE, ]))   # file won't exist on disk
+      expected = list(backupList)
+      stored = backupList.splitIncompressible(extensions=[ "", ])   # every name matches
+      for entry in stored:
+         self.failUnless(os.path.isfile(entry) and not os.path.islink(entry))
+      self.failUnlessEqual(len(expected), len(stored) + len(backupList))
+      self.failUnless(self.buildPath([ "tree9", "%s.gz" % INVALID_FILE, ]) in backupList)
+      for entry in backupList:
+         self.failIf(os.path.isfile(entry) and not os.path.islink(entry))
+
+
+   ###############################
+   # Test size and age filters
+   ###############################
+
+   def testFilters_001(self):
+      """
+      Test the default filter values, and that invalid values are rejected.
+      """
+      backupList = BackupFileList()
+      self.failUnlessEqual(None, backupList.maxFileSize)
+      self.failUnlessEqual(None, backupList.minFileAge)
+      self.failUnlessEqual(None, backupList.maxFileAge)
+      self.failUnlessEqual([], backupList.filteredFiles)
+      backupList.maxFileSize = 100
+      self.failUnlessEqual(100.0, backupList.maxFileSize)
+      backupList.minFileAge = "0.5"
+      self.failUnlessEqual(0.5, backupList.minFileAge)
+      self.failUnlessAssignRaises(ValueError, backupList, "maxFileSize", -1)
+      self.failUnlessAssignRaises(ValueError, backupList, "minFileAge", "ken")
+      self.failUnlessAssignRaises(ValueError, backupList, "maxFileAge", [])
+
+   def testFilters_002(self):
+      """
+      Test maxFileSize, which should filter only files larger than the size.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      large = self.buildPath(["tree9", "large", ])
+      exact = self.buildPath(["tree9", "exact", ])
+      open(large, "w").write("a" * 5001)
+      open(exact, "w").write("a" * 5000)
+      backupList = BackupFileList()
+      backupList.maxFileSize = 5000
+      backupList.addDirContents(path)
+      self.failIf(large in backupList)
+      self.failUnless(exact in backupList)
+      self.failUnlessEqual([ (large, 5001, "size"), ], backupList.filteredFiles)
+
+   def testFilters_003(self):
+      """
+      Test minFileAge and maxFileAge, which should filter files by
+      modification time.
+      """
+      self.extractTar("tree9")
+      path = self.buildPath(["tree9"])
+      new = self.buildPath(["tree9", "new", ])
+      old = self.buildPath(["tree9", "old", ])
+      open(new, "w").write("new")
+      open(old, "w").write("old")
+      changeFileAge(old, 10 * 24 * 60 * 60)  # 10 days
+      backupList = BackupFileList()
+      backupList.minFileAge = 1.0 / 24 / 60      # 1 minute
+      backupList.addDirContents(path)
+      self.failIf(new in backupList)
+      self.failUnless(old in backupList)
+      self.failUnless((new, 3, "new") in backupList.filteredFiles)
+      backupList = BackupFileList()
+      backupList.maxFileAge = 5
+      backupList.addDirContents(path)
+      self.failUnless(new in backupList)
+      self.failIf(old in backupList)
+      self.failUnless((old, 3, "old") in backupList.filteredFiles)
+
+   def testFilters_004(self):
+      """
+      Test that soft links are never filtered, even if their target would be.
+      """
+      if platformSupportsLinks():
+         self.extractTar("tree9")
+         path = self.buildPath(["tree9"])
+         target = self.buildPath(["tree9", "large", ])
+         link = self.buildPath(["tree9", "biglink", ])
+         open(target, "w").write("a" * 5001)
+         os.symlink(target, link)
+         backupList = BackupFileList()
+         backupList.maxFileSize = 5000
+         backupList.addDirContents(path)
+         self.failUnless(link in backupList)
+         self.failIf(target in backupList)
+
 
    #########################
    # Test _generateDigest()
@@ -24957,6 +26142,61 @@ class TestFunctions(unittest.TestCase):
       self.failUnlessRaises(ValueError, compareContents, path1, path2, verbose=True)
 
 
+   #######################
+   # Test getVolumePath()
+   #######################
+
+   def testGetVolumePath_001(self):
+      """
+      Test that the first volume is the path itself.
+      """
+      self.failUnlessEqual("/collect/home.tar", getVolumePath("/collect/home.tar", 1))
+      self.failUnlessEqual("/collect/home.tar.gz", getVolumePath("/collect/home.tar.gz", 1))
+      self.failUnlessEqual("/collect/home.tar.bz2", getVolumePath("/collect/home.tar.bz2", 1))
+
+   def testGetVolumePath_002(self):
+      """
+      Test later volumes, for each kind of tar extension.
+      """
+      self.failUnlessEqual("/collect/home.vol002.tar", getVolumePath("/collect/home.tar", 2))
+      self.failUnlessEqual("/collect/home.vol010.tar.gz", getVolumePath("/collect/home.tar.gz", 10))
+      self.failUnlessEqual("/collect/home.vol123.tar.bz2", getVolumePath("/collect/home.tar.bz2", 123))
+
+   def testGetVolumePath_003(self):
+      """
+      Test a later volume for a path without a tar extension.
+      """
+      self.failUnlessEqual("/collect/home.vol002", getVolumePath("/collect/home", 2))
+
+
+   #########################
+   # Test getSpanLocality()
+   #########################
+
+   def testGetSpanLocality_001(self):
+      """
+      Test with no span items.
+      """
+      self.failUnlessEqual({}, getSpanLocality([], "/staging"))
+
+   def testGetSpanLocality_002(self):
+      """
+      Test with top-level directories that are on one span item and split across two.
+      """
+      spanSet = [ SpanItem([ "/staging/one/a", "/staging/one/sub/b", "/staging/two/c", ], 3, 10, 30.0),
+                  SpanItem([ "/staging/two/d", "/staging/e", ], 2, 10, 20.0), ]
+      self.failUnlessEqual({ "/staging/one": 1, "/staging/two": 2, "/staging": 1, }, getSpanLocality(spanSet, "/staging"))
+      self.failUnlessEqual({ "/staging/one": 1, "/staging/two": 2, "/staging": 1, }, getSpanLocality(spanSet, "/staging/"))
+
+   def testGetSpanLocality_003(self):
+      """
+      Test with a depth of two, and with files outside the root.
+      """
+      spanSet = [ SpanItem([ "/staging/one/a", "/staging/one/sub/b", "/other/c", ], 3, 10, 30.0),
+                  SpanItem([ "/staging/one/sub/d", "/staging/one/x/e", ], 2, 10, 20.0), ]
+      self.failUnlessEqual({ "/staging/one": 1, "/staging/one/sub": 2, "/staging/one/x": 1, }, getSpanLocality(spanSet, "/staging", 2))
+
+
 #######################################################################
 # Suite definition
 #######################################################################
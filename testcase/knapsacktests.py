@@ -43,8 +43,9 @@ Code Coverage
 =============
 
    This module contains individual tests for each of the public functions
-   implemented in knapsack.py: C{firstFit()}, C{bestFit()}, C{worstFit()} and
-   C{alternateFit()}.
+   implemented in knapsack.py: C{firstFit()}, C{bestFit()}, C{worstFit()},
+   C{alternateFit()}, C{optimalFit()}, C{firstFitDecreasing()} and
+   C{bestFitDecreasing()}.
 
    Note that the tests for each function are pretty much identical and so
    there's pretty much code duplication.  In production code, I would argue
@@ -82,7 +83,9 @@ Full vs. Reduced Tests
 
 # Import standard modules
 import unittest
-from CedarBackup2.knapsack import firstFit, bestFit, worstFit, alternateFit
+import array
+from CedarBackup2.knapsack import firstFit, bestFit, worstFit, alternateFit, optimalFit
+from CedarBackup2.knapsack import firstFitDecreasing, bestFitDecreasing
 
 
 #######################################################################
@@ -2547,6 +2550,386 @@ class TestKnapsack(unittest.TestCase):
       self.failUnless('dir002/file002' in result[0])
       self.failUnless('dir002/file001' in result[0])
 
+   ##################################
+   # Tests for optimalFit() function
+   ##################################
+
+   def testOptimalFit_001(self):
+      """
+      Test optimalFit() behavior for an empty list of items.
+      """
+      items = buildItemDict(ITEMS_01)
+      capacity = 100
+      result = optimalFit(items, capacity, sectorSize=1)
+      self.failUnless(result[1] <= capacity, "%s <= %s" % (result[1], capacity))
+      self.failUnlessEqual(0, len(result[0]))
+      self.failUnlessEqual(0, result[1])
+
+   def testOptimalFit_002(self):
+      """
+      Test optimalFit() behavior for a list of zero-sized items.
+      """
+      items = buildItemDict(ITEMS_02)
+      capacity = 100
+      result = optimalFit(items, capacity, sectorSize=1)
+      self.failUnless(result[1] <= capacity, "%s <= %s" % (result[1], capacity))
+      self.failUnlessEqual(8, len(result[0]))
+      self.failUnlessEqual(0, result[1])
+      self.failUnless('z' in result[0])
+      self.failUnless('^' in result[0])
+      self.failUnless('3' in result[0])
+      self.failUnless('(' in result[0])
+      self.failUnless('[' in result[0])
+      self.failUnless('/' in result[0])
+      self.failUnless('a' in result[0])
+      self.failUnless('r' in result[0])
+
+   def testOptimalFit_003(self):
+      """
+      Test optimalFit() behavior for zero capacity.
+      """
+      items = buildItemDict(ITEMS_03)
+      capacity = 0
+      result = optimalFit(items, capacity, sectorSize=1)
+      self.failUnless(result[1] <= capacity, "%s <= %s" % (result[1], capacity))
+      self.failUnlessEqual(0, len(result[0]))
+      self.failUnlessEqual(0, result[1])
+
+   def testOptimalFit_004(self):
+      """
+      Test optimalFit() behavior for a capacity which only a few small items fit in.
+      """
+      items = buildItemDict(ITEMS_03)
+      capacity = 5
+      result = optimalFit(items, capacity, sectorSize=1)
+      self.failUnless(result[1] <= capacity, "%s <= %s" % (result[1], capacity))
+      self.failUnlessEqual(2, len(result[0]))
+      self.failUnlessEqual(1, result[1])
+      self.failUnless('k' in result[0])
+      self.failUnless('*' in result[0])
+
+   def testOptimalFit_005(self):
+      """
+      Test optimalFit() behavior for a capacity which can be met exactly.
+      """
+      items = buildItemDict(ITEMS_03)
+      capacity = 1111
+      result = optimalFit(items, capacity, sectorSize=1)
+      self.failUnless(result[1] <= capacity, "%s <= %s" % (result[1], capacity))
+      self.failUnlessEqual(5, len(result[0]))
+      self.failUnlessEqual(1111, result[1])
+      self.failUnless('k' in result[0])
+      self.failUnless('*' in result[0])
+      self.failUnless('u' in result[0])
+      self.failUnless('$' in result[0])
+      self.failUnless('h' in result[0])
+
+   def testOptimalFit_006(self):
+      """
+      Test optimalFit() behavior for a capacity which can be met exactly, items in reverse order.
+      """
+      items = buildItemDict(ITEMS_04)
+      capacity = 1111
+      result = optimalFit(items, capacity, sectorSize=1)
+      self.failUnless(result[1] <= capacity, "%s <= %s" % (result[1], capacity))
+      self.failUnlessEqual(5, len(result[0]))
+      self.failUnlessEqual(1111, result[1])
+      self.failUnless('t' in result[0])
+      self.failUnless('c' in result[0])
+      self.failUnless("'" in result[0])
+      self.failUnless('a' in result[0])
+      self.failUnless('#' in result[0])
+
+   def testOptimalFit_007(self):
+      """
+      Test optimalFit() behavior for a capacity larger than all of the items together.
+      """
+      items = buildItemDict(ITEMS_03)
+      capacity = 2000000
+      result = optimalFit(items, capacity, sectorSize=1)
+      self.failUnless(result[1] <= capacity, "%s <= %s" % (result[1], capacity))
+      self.failUnlessEqual(8, len(result[0]))
+      self.failUnlessEqual(1111111, result[1])
+      self.failUnless('k' in result[0])
+      self.failUnless('*' in result[0])
+      self.failUnless('u' in result[0])
+      self.failUnless('$' in result[0])
+      self.failUnless('h' in result[0])
+      self.failUnless('?' in result[0])
+      self.failUnless('b' in result[0])
+      self.failUnless('s' in result[0])
+
+   def testOptimalFit_008(self):
+      """
+      Test optimalFit() behavior for mixed large and small items.
+      """
+      items = buildItemDict(ITEMS_11)
+      capacity = 200003
+      result = optimalFit(items, capacity, sectorSize=1)
+      self.failUnless(result[1] <= capacity, "%s <= %s" % (result[1], capacity))
+      self.failUnlessEqual(5, len(result[0]))
+      self.failUnlessEqual(200003, result[1])
+      self.failUnlessEqual(3, len([ key for key in result[0] if key in [ 't', 'd', 'j', '1', ] ]))
+      self.failUnlessEqual(2, len([ key for key in result[0] if key in [ 'k', 'l', '7', 'G', ] ]))
+
+   def testOptimalFit_009(self):
+      """
+      Test optimalFit() behavior for mixed large and small items, where only some of the small items fit.
+      """
+      items = buildItemDict(ITEMS_14)
+      capacity = 303000
+      result = optimalFit(items, capacity, sectorSize=1)
+      self.failUnless(result[1] <= capacity, "%s <= %s" % (result[1], capacity))
+      self.failUnlessEqual(6, len(result[0]))
+      self.failUnlessEqual(303000, result[1])
+      self.failUnlessEqual(3, len([ key for key in result[0] if key in [ 'b', ':', 'm', '4', ] ]))
+      self.failUnlessEqual(3, len([ key for key in result[0] if key in [ 'e', 'O', 'o', '#', ] ]))
+
+   def testOptimalFit_010(self):
+      """
+      Test optimalFit() behavior for a more realistic set of items
+      """
+      items = buildItemDict(ITEMS_19)
+      capacity = 760
+      result = optimalFit(items, capacity, sectorSize=1)
+      self.failUnless(result[1] <= capacity, "%s <= %s" % (result[1], capacity))
+      self.failUnlessEqual(5, len(result[0]))
+      self.failUnlessEqual(753, result[1])
+      self.failUnless('dir001/file001' in result[0])
+      self.failUnless('dir001/file002' in result[0])
+      self.failUnless('file002' in result[0])
+      self.failUnless('link001' in result[0])
+      self.failUnless('link002' in result[0])
+
+   def testOptimalFit_011(self):
+      """
+      Test optimalFit() behavior where the greedy algorithms can't fill the capacity.
+      """
+      items = buildItemDict({ "a": 6, "b": 5, "c": 5, })
+      capacity = 10
+      self.failUnlessEqual(6, bestFit(buildItemDict({ "a": 6, "b": 5, "c": 5, }), capacity)[1])
+      result = optimalFit(items, capacity, sectorSize=1)
+      self.failUnlessEqual(2, len(result[0]))
+      self.failUnlessEqual(10, result[1])
+      self.failUnless("b" in result[0])
+      self.failUnless("c" in result[0])
+
+   def testOptimalFit_012(self):
+      """
+      Test optimalFit() behavior where sizes are rounded up to whole sectors.
+      """
+      items = buildItemDict({ "a": 4000, "b": 4000, "c": 100, })
+      capacity = 3 * 2048 * 4096
+      result = optimalFit(items, capacity)
+      self.failUnlessEqual(3, len(result[0]))
+      self.failUnlessEqual(8100, result[1])
+      capacity = 5 * 2048 * 4096
+      items = buildItemDict({ "a": 2048 * 4096 * 4, "b": 2048, "c": 1, })
+      result = optimalFit(items, capacity)
+      self.failUnlessEqual(3, len(result[0]))
+      items = buildItemDict({ "a": 2048 * 4096 * 5 - 2047, "b": 2048, "c": 1, })
+      result = optimalFit(items, capacity)
+      self.failUnlessEqual(1, len(result[0]))
+      self.failUnless("a" in result[0])
+
+   def testOptimalFit_013(self):
+      """
+      Test optimalFit() behavior with no time budget, which still returns a valid greedy solution.
+      """
+      items = buildItemDict(ITEMS_19)
+      capacity = 760
+      result = optimalFit(items, capacity, budget=0, sectorSize=1)
+      self.failUnless(result[1] <= capacity, "%s <= %s" % (result[1], capacity))
+      self.failUnless(result[1] >= bestFit(buildItemDict(ITEMS_19), capacity)[1])
+      self.failUnless('link001' in result[0])
+      self.failUnless('link002' in result[0])
+
+   def testOptimalFit_014(self):
+      """
+      Test optimalFit() behavior when some items are larger than the capacity.
+      """
+      items = buildItemDict(ITEMS_10)
+      capacity = 99999
+      result = optimalFit(items, capacity, sectorSize=1)
+      self.failUnlessEqual(([], 0), result)
+
+   def testOptimalFit_015(self):
+      """
+      Test that optimalFit() does not modify the items.
+      """
+      items = buildItemDict(ITEMS_19)
+      optimalFit(items, 515, sectorSize=1)
+      self.failUnlessEqual(buildItemDict(ITEMS_19), items)
+
+
+   ##########################################
+   # Tests for firstFitDecreasing() function
+   ##########################################
+
+   def testFirstFitDecreasing_001(self):
+      """
+      Test firstFitDecreasing() behavior for an empty list of sizes.
+      """
+      result = firstFitDecreasing([], 100)
+      self.failUnlessEqual([], result)
+
+   def testFirstFitDecreasing_002(self):
+      """
+      Test firstFitDecreasing() behavior for a list of zero-sized items.
+      """
+      result = firstFitDecreasing([ 0, 0, 0, ], 100)
+      self.failUnlessEqual([ ([ 0, 1, 2, ], 0), ], result)
+
+   def testFirstFitDecreasing_003(self):
+      """
+      Test firstFitDecreasing() behavior when an item is larger than the capacity.
+      """
+      self.failUnlessRaises(ValueError, firstFitDecreasing, [ 5, 101, 7, ], 100)
+
+   def testFirstFitDecreasing_004(self):
+      """
+      Test firstFitDecreasing() behavior for items of equal size, which keep their order.
+      """
+      result = firstFitDecreasing([ 5, 5, 5, 5, 5, ], 10)
+      self.failUnlessEqual([ ([ 0, 1, ], 10), ([ 2, 3, ], 10), ([ 4, ], 5), ], result)
+
+   def testFirstFitDecreasing_005(self):
+      """
+      Test firstFitDecreasing() behavior for items which pack exactly.
+      """
+      result = firstFitDecreasing([ 2, 5, 4, 7, 1, 3, 8, ], 10)
+      self.failUnlessEqual([ ([ 6, 0, ], 10), ([ 3, 5, ], 10), ([ 1, 2, 4, ], 10), ], result)
+
+   def testFirstFitDecreasing_006(self):
+      """
+      Test firstFitDecreasing() behavior for a mix of sizes.
+      """
+      result = firstFitDecreasing([ 1, 6, 7, 3, 3, 8, ], 10)
+      self.failUnlessEqual([ ([ 5, 0, ], 9), ([ 2, 3, ], 10), ([ 1, 4, ], 9), ], result)
+
+   def testFirstFitDecreasing_007(self):
+      """
+      Test firstFitDecreasing() behavior for sizes in an array.
+      """
+      result = firstFitDecreasing(array.array("d", [ 2.0, 5.0, 4.0, 7.0, 1.0, 3.0, 8.0, ]), 10)
+      self.failUnlessEqual([ ([ 6, 0, ], 10.0), ([ 3, 5, ], 10.0), ([ 1, 2, 4, ], 10.0), ], result)
+
+   def testFirstFitDecreasing_008(self):
+      """
+      Test firstFitDecreasing() behavior for a more realistic set of items, packing every item exactly once.
+      """
+      keys = sorted(ITEMS_19.keys())
+      sizes = [ ITEMS_19[key] for key in keys ]
+      result = firstFitDecreasing(sizes, 515)
+      self.failUnlessEqual(3, len(result))
+      indexes = []
+      for (binIndexes, used) in result:
+         self.failUnless(used <= 515, "%s <= 515" % used)
+         self.failUnlessEqual(sum([ sizes[index] for index in binIndexes ]), used)
+         indexes.extend(binIndexes)
+      self.failUnlessEqual(range(len(sizes)), sorted(indexes))
+
+   def testFirstFitDecreasing_009(self):
+      """
+      Test firstFitDecreasing() behavior when every item needs its own container.
+      """
+      result = firstFitDecreasing([ 60, 70, 80, 90, ], 100)
+      self.failUnlessEqual([ ([ 3, ], 90), ([ 2, ], 80), ([ 1, ], 70), ([ 0, ], 60), ], result)
+
+
+   #########################################
+   # Tests for bestFitDecreasing() function
+   #########################################
+
+   def testBestFitDecreasing_001(self):
+      """
+      Test bestFitDecreasing() behavior for an empty list of sizes.
+      """
+      result = bestFitDecreasing([], 100)
+      self.failUnlessEqual([], result)
+
+   def testBestFitDecreasing_002(self):
+      """
+      Test bestFitDecreasing() behavior for a list of zero-sized items.
+      """
+      result = bestFitDecreasing([ 0, 0, 0, ], 100)
+      self.failUnlessEqual([ ([ 0, 1, 2, ], 0), ], result)
+
+   def testBestFitDecreasing_003(self):
+      """
+      Test bestFitDecreasing() behavior when an item is larger than the capacity.
+      """
+      self.failUnlessRaises(ValueError, bestFitDecreasing, [ 5, 101, 7, ], 100)
+
+   def testBestFitDecreasing_004(self):
+      """
+      Test bestFitDecreasing() behavior for items of equal size, which keep their order.
+      """
+      result = bestFitDecreasing([ 5, 5, 5, 5, 5, ], 10)
+      self.failUnlessEqual([ ([ 0, 1, ], 10), ([ 2, 3, ], 10), ([ 4, ], 5), ], result)
+
+   def testBestFitDecreasing_005(self):
+      """
+      Test bestFitDecreasing() behavior for items which pack exactly.
+      """
+      result = bestFitDecreasing([ 2, 5, 4, 7, 1, 3, 8, ], 10)
+      self.failUnlessEqual([ ([ 6, 0, ], 10), ([ 3, 5, ], 10), ([ 1, 2, 4, ], 10), ], result)
+
+   def testBestFitDecreasing_006(self):
+      """
+      Test bestFitDecreasing() behavior for a mix of sizes.
+      """
+      result = bestFitDecreasing([ 1, 6, 7, 3, 3, 8, ], 10)
+      self.failUnlessEqual([ ([ 5, ], 8), ([ 2, 3, ], 10), ([ 1, 4, 0, ], 10), ], result)
+
+   def testBestFitDecreasing_007(self):
+      """
+      Test bestFitDecreasing() behavior for sizes in an array.
+      """
+      result = bestFitDecreasing(array.array("d", [ 2.0, 5.0, 4.0, 7.0, 1.0, 3.0, 8.0, ]), 10)
+      self.failUnlessEqual([ ([ 6, 0, ], 10.0), ([ 3, 5, ], 10.0), ([ 1, 2, 4, ], 10.0), ], result)
+
+   def testBestFitDecreasing_008(self):
+      """
+      Test bestFitDecreasing() behavior for a more realistic set of items, packing every item exactly once.
+      """
+      keys = sorted(ITEMS_19.keys())
+      sizes = [ ITEMS_19[key] for key in keys ]
+      result = bestFitDecreasing(sizes, 515)
+      self.failUnlessEqual(3, len(result))
+      indexes = []
+      for (binIndexes, used) in result:
+         self.failUnless(used <= 515, "%s <= 515" % used)
+         self.failUnlessEqual(sum([ sizes[index] for index in binIndexes ]), used)
+         indexes.extend(binIndexes)
+      self.failUnlessEqual(range(len(sizes)), sorted(indexes))
+
+   def testBestFitDecreasing_009(self):
+      """
+      Test bestFitDecreasing() behavior when every item needs its own container.
+      """
+      result = bestFitDecreasing([ 60, 70, 80, 90, ], 100)
+      self.failUnlessEqual([ ([ 3, ], 90), ([ 2, ], 80), ([ 1, ], 70), ([ 0, ], 60), ], result)
+
+   def testBestFitDecreasing_010(self):
+      """
+      Test bestFitDecreasing() behavior for enough containers to need several blocks of remaining capacity,
+      which should match a simple search of every container.
+      """
+      sizes = [ 30 + (index * 7919) % 41 for index in range(3000) ]
+      expected = []
+      for index in sorted(range(len(sizes)), key=sizes.__getitem__, reverse=True):
+         fits = [ (100 - used, binIndex) for (binIndex, (indexes, used)) in enumerate(expected) if used + sizes[index] <= 100 ]
+         if not fits:
+            expected.append(([], 0))
+            fits = [ (100, len(expected) - 1), ]
+         binIndex = min(fits)[1]
+         expected[binIndex][0].append(index)
+         expected[binIndex] = (expected[binIndex][0], expected[binIndex][1] + sizes[index])
+      result = bestFitDecreasing(sizes, 100)
+      self.failUnless(len(result) > 1000)
+      self.failUnlessEqual(expected, result)
+
 
 #######################################################################
 # Suite definition
@@ -92,12 +92,19 @@ Full vs. Reduced Tests
 ########################################################################
 
 # System modules
+import os
+import time
+import pickle
 import unittest
+import tempfile
 
 # Cedar Backup modules
-from CedarBackup2.testutil import findResources, failUnlessAssignRaises
+from CedarBackup2.testutil import findResources, failUnlessAssignRaises, removedir
 from CedarBackup2.xmlutil import createOutputDom, serializeDom
-from CedarBackup2.extend.mbox import LocalConfig, MboxConfig, MboxFile, MboxDir
+from CedarBackup2.cli import Options
+from CedarBackup2.config import Config, OptionsConfig, CollectConfig
+from CedarBackup2.extend import mbox
+from CedarBackup2.extend.mbox import LocalConfig, MboxConfig, MboxFile, MboxDir, executeAction
 
 
 #######################################################################
@@ -106,6 +113,7 @@ from CedarBackup2.extend.mbox import LocalConfig, MboxConfig, MboxFile, MboxDir
 
 DATA_DIRS = [ "./data", "./testcase/data", ]
 RESOURCES = [ "mbox.conf.1", "mbox.conf.2", "mbox.conf.3", "mbox.conf.4", ]
+DAYS_OF_WEEK = [ "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday", ]
 
 
 #######################################################################
@@ -221,6 +229,8 @@ class TestMboxFile(unittest.TestCase):
       self.failUnlessEqual("weekly", mboxFile.collectMode)
       mboxFile.collectMode = "incr"
       self.failUnlessEqual("incr", mboxFile.collectMode)
+      mboxFile.collectMode = "diff"
+      self.failUnlessEqual("diff", mboxFile.collectMode)
 
    def testConstructor_009(self):
       """
@@ -511,6 +521,8 @@ class TestMboxDir(unittest.TestCase):
       self.failUnlessEqual("weekly", mboxDir.collectMode)
       mboxDir.collectMode = "incr"
       self.failUnlessEqual("incr", mboxDir.collectMode)
+      mboxDir.collectMode = "diff"
+      self.failUnlessEqual("diff", mboxDir.collectMode)
 
    def testConstructor_009(self):
       """
@@ -2214,6 +2226,133 @@ class TestLocalConfig(unittest.TestCase):
       self.validateAddConfig(config)
 
 
+######################
+# TestFunctions class
+######################
+
+class TestFunctions(unittest.TestCase):
+
+   """Tests for the executeAction() function and the revision files it keeps."""
+
+   ################
+   # Setup methods
+   ################
+
+   def setUp(self):
+      try:
+         self.tmpdir = tempfile.mkdtemp()
+         self.backups = []
+         self.original = (mbox._backupMboxFile, mbox._backupMboxDir) # pylint: disable=W0212
+         mbox._backupMboxFile = self.recordBackup # pylint: disable=W0212
+         mbox._backupMboxDir = self.recordBackup # pylint: disable=W0212
+      except Exception, e:
+         self.fail(e)
+
+   def tearDown(self):
+      (mbox._backupMboxFile, mbox._backupMboxDir) = self.original # pylint: disable=W0212
+      try:
+         removedir(self.tmpdir)
+      except: pass
+
+
+   ##################
+   # Utility methods
+   ##################
+
+   def recordBackup(self, config, absolutePath, fullBackup, collectMode, compressMode, lastRevision, newRevision, *args):
+      """Stands in for the functions that run grepmail, recording the revision each backup starts from."""
+      self.backups.append((absolutePath, lastRevision))
+
+   def buildConfig(self, collectMode):
+      """
+      Builds configuration for one mbox file and one mbox directory, using the indicated collect mode.
+      The starting day is never today, so only a backup with the full flag is a full backup.
+      @return: Tuple C{(configPath, config)}.
+      """
+      mboxConfig = MboxConfig(collectMode=collectMode, compressMode="none",
+                              mboxFiles=[ MboxFile(absolutePath="/mail/file"), ],
+                              mboxDirs=[ MboxDir(absolutePath="/mail/dir"), ])
+      local = LocalConfig()
+      local.mbox = mboxConfig
+      (xmlDom, parentNode) = createOutputDom()
+      local.addConfig(xmlDom, parentNode)
+      configPath = os.path.join(self.tmpdir, "mbox.conf")
+      open(configPath, "w").write(serializeDom(xmlDom))
+      config = Config()
+      startingDay = DAYS_OF_WEEK[(time.localtime().tm_wday + 1) % len(DAYS_OF_WEEK)]
+      config.options = OptionsConfig(startingDay=startingDay, workingDir=self.tmpdir)
+      config.collect = CollectConfig(targetDir=self.tmpdir)
+      return (configPath, config)
+
+   def execute(self, configPath, config, full):
+      """Executes the action, returning the revision each backup started from and the saved revisions."""
+      del self.backups[:]
+      options = Options()
+      options.full = full
+      executeAction(configPath, options, config)
+      saved = {}
+      for name in os.listdir(self.tmpdir):
+         if name.endswith(".mboxlast"):
+            saved[name] = pickle.load(open(os.path.join(self.tmpdir, name)))
+      return (self.backups[:], saved)
+
+
+   #######################
+   # Test executeAction()
+   #######################
+
+   def testExecuteAction_001(self):
+      """
+      Test that an incremental backup saves a new revision every day.
+      """
+      (configPath, config) = self.buildConfig("incr")
+      (backups, first) = self.execute(configPath, config, True)
+      self.failUnlessEqual([ ("/mail/file", None), ("/mail/dir", None), ], backups)
+      self.failUnlessEqual(2, len(first))
+      (backups, second) = self.execute(configPath, config, False)
+      self.failUnlessEqual([ ("/mail/file", first["mail-file.mboxlast"]),
+                             ("/mail/dir", first["mail-dir.mboxlast"]), ], backups)
+      self.failUnless(second["mail-file.mboxlast"] > first["mail-file.mboxlast"])
+      self.failUnless(second["mail-dir.mboxlast"] > first["mail-dir.mboxlast"])
+
+   def testExecuteAction_002(self):
+      """
+      Test that a differential backup always starts from the revision of the last full backup, which is never replaced.
+      """
+      (configPath, config) = self.buildConfig("diff")
+      (backups, first) = self.execute(configPath, config, True)
+      self.failUnlessEqual([ ("/mail/file", None), ("/mail/dir", None), ], backups)
+      self.failUnlessEqual(2, len(first))
+      for unused in range(2):
+         (backups, saved) = self.execute(configPath, config, False)
+         self.failUnlessEqual([ ("/mail/file", first["mail-file.mboxlast"]),
+                                ("/mail/dir", first["mail-dir.mboxlast"]), ], backups)
+         self.failUnlessEqual(first, saved)
+
+   def testExecuteAction_003(self):
+      """
+      Test that a differential backup replaces its revision on the next full backup.
+      """
+      (configPath, config) = self.buildConfig("diff")
+      (backups, first) = self.execute(configPath, config, True)
+      self.execute(configPath, config, False)
+      (backups, second) = self.execute(configPath, config, True)
+      self.failUnlessEqual([ ("/mail/file", None), ("/mail/dir", None), ], backups)
+      self.failUnless(second["mail-file.mboxlast"] > first["mail-file.mboxlast"])
+      self.failUnless(second["mail-dir.mboxlast"] > first["mail-dir.mboxlast"])
+
+   def testExecuteAction_004(self):
+      """
+      Test that a differential backup with no saved revision backs up everything, and saves its revision.
+      """
+      (configPath, config) = self.buildConfig("diff")
+      (backups, first) = self.execute(configPath, config, False)
+      self.failUnlessEqual([ ("/mail/file", None), ("/mail/dir", None), ], backups)
+      self.failUnlessEqual(2, len(first))
+      (backups, saved) = self.execute(configPath, config, False)
+      self.failUnlessEqual(first, saved)
+
+
 #######################################################################
 # Suite definition
 #######################################################################
@@ -2226,6 +2365,7 @@ def suite():
                               unittest.makeSuite(TestMboxDir, 'test'),
                               unittest.makeSuite(TestMboxConfig, 'test'),
                               unittest.makeSuite(TestLocalConfig, 'test'),
+                              unittest.makeSuite(TestFunctions, 'test'),
                             ))
 
 
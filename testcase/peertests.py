@@ -100,6 +100,7 @@ from CedarBackup2.testutil import platformSupportsPermissions, platformWindows,
 from CedarBackup2.peer import LocalPeer, RemotePeer
 from CedarBackup2.peer import DEF_RCP_COMMAND, DEF_RSH_COMMAND
 from CedarBackup2.peer import DEF_COLLECT_INDICATOR, DEF_STAGE_INDICATOR
+from CedarBackup2.util import setIoMode, IO_MODE_NORMAL, IO_MODE_BACKUP
 
 
 #######################################################################
@@ -673,6 +674,29 @@ class TestLocalPeer(unittest.TestCase):
          self.failUnlessEqual(permissions, self.getFileMode(["target", "file006", ]))
          self.failUnlessEqual(permissions, self.getFileMode(["target", "file007", ]))
 
+   def testStagePeer_012(self):
+      """
+      Attempt to stage files with non-empty collect directory, in backup I/O
+      mode.
+      """
+      self.extractTar("tree1")
+      name = "peer1"
+      collectDir = self.buildPath(["tree1", ])
+      targetDir = self.buildPath(["target", ])
+      os.mkdir(targetDir)
+      peer = LocalPeer(name, collectDir)
+      try:
+         setIoMode(IO_MODE_BACKUP)
+         count = peer.stagePeer(targetDir=targetDir)
+      finally:
+         setIoMode(IO_MODE_NORMAL)
+      self.failUnlessEqual(7, count)
+      stagedFiles = os.listdir(targetDir)
+      self.failUnlessEqual(7, len(stagedFiles))
+      for stagedFile in stagedFiles:
+         expected = open(os.path.join(collectDir, stagedFile), "rb").read()
+         self.failUnlessEqual(expected, open(os.path.join(targetDir, stagedFile), "rb").read())
+
 
 ######################
 # TestRemotePeer class
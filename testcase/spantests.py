@@ -76,10 +76,63 @@ Full vs. Reduced Tests
 # Import modules and do runtime validations
 ########################################################################
 
+import os
 import unittest
-from CedarBackup2.testutil import captureOutput
-from CedarBackup2.tools.span import _usage, _version
-from CedarBackup2.tools.span import Options
+import tempfile
+from CedarBackup2.testutil import captureOutput, removedir
+from CedarBackup2.tools import span
+from CedarBackup2.tools.span import _usage, _version, _chooseSpan, _waitForMedia, _executeAutoAction, _getDriveStatus
+from CedarBackup2.tools.span import Options, SpanOptions, CDS_DISC_OK
+from CedarBackup2.filesystem import SpanItem
+from CedarBackup2.config import Config, OptionsConfig, StoreConfig
+from CedarBackup2.actions.constants import STORE_INDICATOR
+
+
+#######################################################################
+# Module-wide configuration and constants
+#######################################################################
+
+CDS_NO_DISC   = 1    # drive status for an empty tray
+CDS_TRAY_OPEN = 2    # drive status for an open tray
+
+
+#######################################################################
+# Utility functions and classes
+#######################################################################
+
+class _FakeWriter(object):
+   """Stands in for an image writer, recording what it is asked to do."""
+   def __init__(self, rewritable=False):
+      self.rewritable = rewritable
+      self.calls = []
+   def isRewritable(self):
+      return self.rewritable
+   def openTray(self):
+      self.calls.append("openTray")
+   def initializeImage(self, newDisc, tmpdir, mediaLabel=None): # pylint: disable=W0613
+      self.calls.append("initializeImage")
+   def addImageEntry(self, path, graftPoint):
+      pass
+   def writeImage(self, imagePath=None, newDisc=False, writeMulti=True): # pylint: disable=W0613
+      self.calls.append("writeImage")
+
+class _FakeDrive(object):
+   """
+   Stands in for the drive, reporting each status in turn and then repeating the last one.
+   The disc state is reported for any disc that is checked, and the number of span items
+   each check is against is recorded.
+   """
+   def __init__(self, statuses, state="blank"):
+      self.statuses = statuses
+      self.state = state
+      self.checks = []
+   def getDriveStatus(self, devicePath): # pylint: disable=W0613
+      if len(self.statuses) > 1:
+         return self.statuses.pop(0)
+      return self.statuses[0]
+   def getDiscState(self, config, spanItems): # pylint: disable=W0613
+      self.checks.append(len(spanItems))
+      return self.state
 
 
 #######################################################################
@@ -99,10 +152,50 @@ class TestFunctions(unittest.TestCase):
    ################
 
    def setUp(self):
-      pass
+      try:
+         self.tmpdir = tempfile.mkdtemp()
+         self.original = (span._getDriveStatus, span._getDiscState, span._getWriter, # pylint: disable=W0212
+                          span.AUTO_MEDIA_POLL, span.AUTO_MEDIA_WAIT)
+         span.AUTO_MEDIA_POLL = 0.01
+         span.AUTO_MEDIA_WAIT = 0.2
+      except Exception, e:
+         self.fail(e)
 
    def tearDown(self):
-      pass
+      (span._getDriveStatus, span._getDiscState, span._getWriter, # pylint: disable=W0212
+       span.AUTO_MEDIA_POLL, span.AUTO_MEDIA_WAIT) = self.original
+      try:
+         removedir(self.tmpdir)
+      except: pass
+
+
+   ##################
+   # Utility methods
+   ##################
+
+   def useDrive(self, drive):
+      """Makes the span tool talk to a fake drive."""
+      span._getDriveStatus = drive.getDriveStatus # pylint: disable=W0212
+      span._getDiscState = drive.getDiscState # pylint: disable=W0212
+
+   def useWriter(self, writer):
+      """Makes the span tool write to a fake writer, with room for one 100 kB file per disc, after the ISO overhead."""
+      span._getWriter = lambda config: (writer, (512 + 160) * 1024) # pylint: disable=W0212
+
+   def buildConfig(self, files=0):
+      """
+      Builds store configuration, with a daily staging directory holding the indicated number of 100 kB files.
+      @return: Tuple C{(config, dailyDir)}.
+      """
+      config = Config()
+      config.options = OptionsConfig(workingDir=self.tmpdir)
+      config.store = StoreConfig(sourceDir=os.path.join(self.tmpdir, "staging"), devicePath="/dev/cdrw")
+      dailyDir = os.path.join(config.store.sourceDir, "2010", "03", "17")
+      peerDir = os.path.join(dailyDir, "peer")
+      os.makedirs(peerDir)
+      for index in range(files):
+         open(os.path.join(peerDir, "file%d" % index), "w").write("x" * 100 * 1024)
+      return (config, dailyDir)
 
 
    ########################
@@ -124,6 +217,190 @@ class TestFunctions(unittest.TestCase):
       captureOutput(_version)
 
 
+   #######################
+   # Test _waitForMedia()
+   #######################
+
+   def testWaitForMedia_001(self):
+      """
+      Test that we give up right away if the drive can't report on its media.
+      """
+      (config, unused) = self.buildConfig()
+      drive = _FakeDrive([ None, ])
+      self.useDrive(drive)
+      self.failUnlessRaises(IOError, _waitForMedia, config, _FakeWriter(), [ SpanItem([], 0, 0, 0), ])
+      self.failUnlessEqual([], drive.checks)
+
+   def testWaitForMedia_002(self):
+      """
+      Test that an empty tray is never written to, and that we give up eventually.
+      """
+      (config, unused) = self.buildConfig()
+      drive = _FakeDrive([ CDS_TRAY_OPEN, CDS_NO_DISC, ])
+      self.useDrive(drive)
+      self.failUnlessRaises(IOError, _waitForMedia, config, _FakeWriter(), [ SpanItem([], 0, 0, 0), ])
+      self.failUnlessEqual([], drive.checks)
+
+   def testWaitForMedia_003(self):
+      """
+      Test that we give up if the disc that was just written is loaded again, even on rewritable media.
+      """
+      (config, unused) = self.buildConfig()
+      drive = _FakeDrive([ CDS_TRAY_OPEN, CDS_DISC_OK, ], "same")
+      self.useDrive(drive)
+      self.failUnlessRaises(IOError, _waitForMedia, config, _FakeWriter(True), [ SpanItem([], 0, 0, 0), ])
+      self.failUnlessEqual([ 1, ], drive.checks)
+
+   def testWaitForMedia_004(self):
+      """
+      Test that a disc which was never removed is never checked or used, and that we give up eventually.
+      """
+      (config, unused) = self.buildConfig()
+      drive = _FakeDrive([ CDS_DISC_OK, ], "blank")
+      self.useDrive(drive)
+      self.failUnlessRaises(IOError, _waitForMedia, config, _FakeWriter(True), [ SpanItem([], 0, 0, 0), ])
+      self.failUnlessEqual([], drive.checks)
+
+   def testWaitForMedia_005(self):
+      """
+      Test that a blank disc is used once it's loaded.
+      """
+      (config, unused) = self.buildConfig()
+      drive = _FakeDrive([ CDS_DISC_OK, CDS_TRAY_OPEN, CDS_NO_DISC, CDS_DISC_OK, ], "blank")
+      self.useDrive(drive)
+      _waitForMedia(config, _FakeWriter(), [ SpanItem([], 0, 0, 0), ])
+      self.failUnlessEqual([ 1, ], drive.checks)
+
+   def testWaitForMedia_006(self):
+      """
+      Test that a different disc holding data is used if the media is rewritable.
+      """
+      (config, unused) = self.buildConfig()
+      drive = _FakeDrive([ CDS_TRAY_OPEN, CDS_DISC_OK, ], "used")
+      self.useDrive(drive)
+      _waitForMedia(config, _FakeWriter(True), [ SpanItem([], 0, 0, 0), ])
+      self.failUnlessEqual([ 1, ], drive.checks)
+
+   def testWaitForMedia_007(self):
+      """
+      Test that we give up if a different disc holding data is loaded, and the media is not rewritable.
+      """
+      (config, unused) = self.buildConfig()
+      drive = _FakeDrive([ CDS_TRAY_OPEN, CDS_DISC_OK, ], "used")
+      self.useDrive(drive)
+      self.failUnlessRaises(IOError, _waitForMedia, config, _FakeWriter(False), [ SpanItem([], 0, 0, 0), ])
+
+
+   #########################
+   # Test _getDriveStatus()
+   #########################
+
+   def testGetDriveStatus_001(self):
+      """
+      Test that there is no status for a device that doesn't exist.
+      """
+      self.failUnlessEqual(None, _getDriveStatus(os.path.join(self.tmpdir, "missing")))
+
+   def testGetDriveStatus_002(self):
+      """
+      Test that there is no status for something that isn't a CD/DVD drive.
+      """
+      path = os.path.join(self.tmpdir, "file")
+      open(path, "w").write("data")
+      self.failUnlessEqual(None, _getDriveStatus(path))
+
+
+   ############################
+   # Test _executeAutoAction()
+   ############################
+
+   def testExecuteAutoAction_001(self):
+      """
+      Test that nothing more is written if the disc that was just written is loaded again.
+      """
+      (config, dailyDir) = self.buildConfig(files=2)
+      writer = _FakeWriter(True)
+      self.useWriter(writer)
+      self.useDrive(_FakeDrive([ CDS_TRAY_OPEN, CDS_DISC_OK, ], "same"))
+      self.failUnlessRaises(IOError, _executeAutoAction, config)
+      self.failUnlessEqual([ "initializeImage", "writeImage", "openTray", ], writer.calls)
+      self.failIf(os.path.exists(os.path.join(dailyDir, STORE_INDICATOR)))
+
+   def testExecuteAutoAction_002(self):
+      """
+      Test that nothing more is written if the tray is left empty.
+      """
+      (config, dailyDir) = self.buildConfig(files=2)
+      writer = _FakeWriter(True)
+      self.useWriter(writer)
+      self.useDrive(_FakeDrive([ CDS_TRAY_OPEN, CDS_NO_DISC, ]))
+      self.failUnlessRaises(IOError, _executeAutoAction, config)
+      self.failUnlessEqual([ "initializeImage", "writeImage", "openTray", ], writer.calls)
+      self.failIf(os.path.exists(os.path.join(dailyDir, STORE_INDICATOR)))
+
+   def testExecuteAutoAction_003(self):
+      """
+      Test that every disc is written when each one is replaced with a blank disc.
+      """
+      (config, dailyDir) = self.buildConfig(files=2)
+      writer = _FakeWriter(False)
+      self.useWriter(writer)
+      self.useDrive(_FakeDrive([ CDS_TRAY_OPEN, CDS_DISC_OK, ], "blank"))
+      _executeAutoAction(config)
+      self.failUnlessEqual([ "initializeImage", "writeImage", "openTray", "initializeImage", "writeImage", ], writer.calls)
+      self.failUnless(os.path.exists(os.path.join(dailyDir, STORE_INDICATOR)))
+
+   def testExecuteAutoAction_004(self):
+      """
+      Test that each replacement disc is checked against every disc written so far.
+      """
+      (config, dailyDir) = self.buildConfig(files=3)
+      writer = _FakeWriter(False)
+      self.useWriter(writer)
+      drive = _FakeDrive([ CDS_TRAY_OPEN, CDS_DISC_OK, CDS_TRAY_OPEN, CDS_DISC_OK, ], "blank")
+      self.useDrive(drive)
+      _executeAutoAction(config)
+      self.failUnlessEqual([ 1, 2, ], drive.checks)
+      self.failUnlessEqual(3, writer.calls.count("writeImage"))
+      self.failUnless(os.path.exists(os.path.join(dailyDir, STORE_INDICATOR)))
+
+
+   #####################
+   # Test _chooseSpan()
+   #####################
+
+   def testChooseSpan_001(self):
+      """
+      Test with a single span.
+      """
+      spanSet = [ SpanItem(["a", ], 50, 100, 50.0), ]
+      self.failUnlessEqual(("first_fit", spanSet), _chooseSpan({ "first_fit": spanSet, }))
+
+   def testChooseSpan_002(self):
+      """
+      Test that the span with the fewest discs is chosen.
+      """
+      spanSet1 = [ SpanItem(["a", ], 90, 100, 90.0), SpanItem(["b", ], 90, 100, 90.0), SpanItem(["c", ], 10, 100, 10.0), ]
+      spanSet2 = [ SpanItem(["a", "c", ], 100, 100, 100.0), SpanItem(["b", ], 90, 100, 90.0), ]
+      self.failUnlessEqual(("worst_fit", spanSet2), _chooseSpan({ "best_fit": spanSet1, "worst_fit": spanSet2, }))
+
+   def testChooseSpan_003(self):
+      """
+      Test that the span with the fullest discs is chosen when the number of discs is the same.
+      """
+      spanSet1 = [ SpanItem(["a", ], 80, 100, 80.0), SpanItem(["b", ], 70, 100, 70.0), ]
+      spanSet2 = [ SpanItem(["b", ], 60, 100, 60.0), SpanItem(["a", ], 90, 100, 90.0), ]
+      self.failUnlessEqual(("worst_fit", spanSet2), _chooseSpan({ "best_fit": spanSet1, "worst_fit": spanSet2, }))
+
+   def testChooseSpan_004(self):
+      """
+      Test that a tie goes to the algorithm whose name sorts first.
+      """
+      spanSet1 = [ SpanItem(["a", ], 80, 100, 80.0), ]
+      spanSet2 = [ SpanItem(["b", ], 80, 100, 80.0), ]
+      self.failUnlessEqual(("best_fit", spanSet1), _chooseSpan({ "worst_fit": spanSet2, "best_fit": spanSet1, }))
+
+
 ########################
 # TestSpanOptions class
 ########################
@@ -155,6 +432,66 @@ class TestSpanOptions(unittest.TestCase):
       obj.__repr__()
       obj.__str__()
 
+   def testStringFuncs_002(self):
+      """
+      Check that the auto flag is included in the string representation.
+      """
+      obj = SpanOptions(argumentList=[ "--auto", "--stack", ])
+      self.failUnlessEqual("--stack --auto ", obj.__repr__())
+      self.failUnlessEqual([ "--stack", "--auto", ], obj.buildArgumentList())
+
+
+   ###################
+   # Test constructor
+   ###################
+
+   def testConstructor_001(self):
+      """
+      Test constructor with an empty argument list.
+      """
+      obj = SpanOptions(argumentList=[])
+      self.failUnlessEqual(False, obj.auto)
+      self.failUnlessEqual(False, obj.stacktrace)
+      self.failUnlessEqual([], obj.actions)
+
+   def testConstructor_002(self):
+      """
+      Test constructor with the --auto switch alone.
+      """
+      obj = SpanOptions(argumentList=[ "--auto", ])
+      self.failUnlessEqual(True, obj.auto)
+      self.failUnlessEqual([], obj.actions)
+
+   def testConstructor_003(self):
+      """
+      Test constructor with the --auto switch and other switches.
+      """
+      obj = SpanOptions(argumentString="--verbose --auto --logfile /tmp/span.log")
+      self.failUnlessEqual(True, obj.auto)
+      self.failUnlessEqual(True, obj.verbose)
+      self.failUnlessEqual("/tmp/span.log", obj.logfile)
+
+   def testConstructor_004(self):
+      """
+      Test that the --auto switch is handled only as a long switch.
+      """
+      self.failUnlessRaises(Exception, SpanOptions, argumentList=[ "-a", ])
+
+
+   ############################
+   # Test comparison operators
+   ############################
+
+   def testComparison_001(self):
+      """
+      Test comparison of objects that differ only in the auto flag.
+      """
+      obj1 = SpanOptions(argumentList=[ "--stack", ])
+      obj2 = SpanOptions(argumentList=[ "--stack", "--auto", ])
+      self.failIfEqual(obj1, obj2)
+      self.failUnless(obj1 < obj2)
+      self.failUnlessEqual(obj2, SpanOptions(argumentList=[ "--auto", "--stack", ]))
+
 
 #######################################################################
 # Suite definition
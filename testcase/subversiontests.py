@@ -103,12 +103,17 @@ Full vs. Reduced Tests
 ########################################################################
 
 # System modules
+import os
+import pickle
 import unittest
+import tempfile
 
 # Cedar Backup modules
-from CedarBackup2.testutil import findResources, failUnlessAssignRaises
+from CedarBackup2.testutil import findResources, failUnlessAssignRaises, removedir
 from CedarBackup2.xmlutil import createOutputDom, serializeDom
-from CedarBackup2.extend.subversion import LocalConfig, SubversionConfig
+from CedarBackup2.config import Config, OptionsConfig, CollectConfig
+from CedarBackup2.extend import subversion
+from CedarBackup2.extend.subversion import LocalConfig, SubversionConfig, _backupRepository
 from CedarBackup2.extend.subversion import Repository, RepositoryDir, BDBRepository, FSFSRepository
 
 
@@ -243,6 +248,8 @@ class TestBDBRepository(unittest.TestCase):
       self.failUnlessEqual("weekly", repository.collectMode)
       repository.collectMode = "incr"
       self.failUnlessEqual("incr", repository.collectMode)
+      repository.collectMode = "diff"
+      self.failUnlessEqual("diff", repository.collectMode)
 
    def testConstructor_010(self):
       """
@@ -538,6 +545,8 @@ class TestFSFSRepository(unittest.TestCase):
       self.failUnlessEqual("weekly", repository.collectMode)
       repository.collectMode = "incr"
       self.failUnlessEqual("incr", repository.collectMode)
+      repository.collectMode = "diff"
+      self.failUnlessEqual("diff", repository.collectMode)
 
    def testConstructor_010(self):
       """
@@ -846,6 +855,8 @@ class TestRepository(unittest.TestCase):
       self.failUnlessEqual("weekly", repository.collectMode)
       repository.collectMode = "incr"
       self.failUnlessEqual("incr", repository.collectMode)
+      repository.collectMode = "diff"
+      self.failUnlessEqual("diff", repository.collectMode)
 
    def testConstructor_011(self):
       """
@@ -1186,6 +1197,8 @@ class TestRepositoryDir(unittest.TestCase):
       self.failUnlessEqual("weekly", repositoryDir.collectMode)
       repositoryDir.collectMode = "incr"
       self.failUnlessEqual("incr", repositoryDir.collectMode)
+      repositoryDir.collectMode = "diff"
+      self.failUnlessEqual("diff", repositoryDir.collectMode)
 
    def testConstructor_011(self):
       """
@@ -2600,6 +2613,118 @@ class TestLocalConfig(unittest.TestCase):
       self.validateAddConfig(config)
 
 
+######################
+# TestFunctions class
+######################
+
+class TestFunctions(unittest.TestCase):
+
+   """Tests for the _backupRepository() function and the revision files it keeps."""
+
+   ################
+   # Setup methods
+   ################
+
+   def setUp(self):
+      try:
+         self.tmpdir = tempfile.mkdtemp()
+         self.youngest = 0
+         self.original = (subversion.getYoungestRevision, subversion.backupRepository)
+         subversion.getYoungestRevision = lambda repositoryPath: self.youngest
+         subversion.backupRepository = self.dumpRepository
+      except Exception, e:
+         self.fail(e)
+
+   def tearDown(self):
+      (subversion.getYoungestRevision, subversion.backupRepository) = self.original
+      try:
+         removedir(self.tmpdir)
+      except: pass
+
+
+   ##################
+   # Utility methods
+   ##################
+
+   def dumpRepository(self, repositoryPath, backupFile, startRevision=None, endRevision=None):
+      """Stands in for the function that runs svnadmin, writing the revision range into the dump."""
+      backupFile.write("%d:%d\n" % (startRevision, endRevision))
+
+   def buildConfig(self):
+      """Builds configuration that collects into and keeps revisions in separate directories."""
+      config = Config()
+      config.options = OptionsConfig(workingDir=os.path.join(self.tmpdir, "working"))
+      config.collect = CollectConfig(targetDir=os.path.join(self.tmpdir, "target"))
+      os.mkdir(config.options.workingDir)
+      os.mkdir(config.collect.targetDir)
+      return config
+
+   def backup(self, config, collectMode, youngest, fullBackup):
+      """
+      Backs up a repository, with the indicated youngest revision.
+      @return: Tuple C{(dumps, saved)}, listing the new dump files and the saved revision, if any.
+      """
+      self.youngest = youngest
+      for name in os.listdir(config.collect.targetDir):
+         os.remove(os.path.join(config.collect.targetDir, name))
+      repository = FSFSRepository(repositoryPath="/svn/repo", collectMode=collectMode, compressMode="none")
+      _backupRepository(config, LocalConfig(), fullBackup, fullBackup, repository)
+      revisionPath = os.path.join(config.options.workingDir, "svn-repo.svnlast")
+      saved = None
+      if os.path.isfile(revisionPath):
+         saved = pickle.load(open(revisionPath))
+      return (sorted(os.listdir(config.collect.targetDir)), saved)
+
+
+   ###########################
+   # Test _backupRepository()
+   ###########################
+
+   def testBackupRepository_001(self):
+      """
+      Test that an incremental backup saves the youngest revision every day.
+      """
+      config = self.buildConfig()
+      self.failUnlessEqual(([ "svndump-0:5-svn-repo.txt", ], 5), self.backup(config, "incr", 5, True))
+      self.failUnlessEqual(([ "svndump-6:8-svn-repo.txt", ], 8), self.backup(config, "incr", 8, False))
+      self.failUnlessEqual(([ "svndump-9:10-svn-repo.txt", ], 10), self.backup(config, "incr", 10, False))
+
+   def testBackupRepository_002(self):
+      """
+      Test that a differential backup always starts after the revision of the last full backup, which is never replaced.
+      """
+      config = self.buildConfig()
+      self.failUnlessEqual(([ "svndump-0:5-svn-repo.txt", ], 5), self.backup(config, "diff", 5, True))
+      self.failUnlessEqual(([ "svndump-6:8-svn-repo.txt", ], 5), self.backup(config, "diff", 8, False))
+      self.failUnlessEqual(([ "svndump-6:10-svn-repo.txt", ], 5), self.backup(config, "diff", 10, False))
+
+   def testBackupRepository_003(self):
+      """
+      Test that a differential backup replaces its revision on the next full backup.
+      """
+      config = self.buildConfig()
+      self.backup(config, "diff", 5, True)
+      self.backup(config, "diff", 8, False)
+      self.failUnlessEqual(([ "svndump-0:12-svn-repo.txt", ], 12), self.backup(config, "diff", 12, True))
+      self.failUnlessEqual(([ "svndump-13:14-svn-repo.txt", ], 12), self.backup(config, "diff", 14, False))
+
+   def testBackupRepository_004(self):
+      """
+      Test that a differential backup with no saved revision dumps everything, and saves its revision.
+      """
+      config = self.buildConfig()
+      self.failUnlessEqual(([ "svndump-0:5-svn-repo.txt", ], 5), self.backup(config, "diff", 5, False))
+      self.failUnlessEqual(([ "svndump-6:8-svn-repo.txt", ], 5), self.backup(config, "diff", 8, False))
+
+   def testBackupRepository_005(self):
+      """
+      Test that a differential backup is skipped when there are no revisions since the last full backup.
+      """
+      config = self.buildConfig()
+      self.backup(config, "diff", 5, True)
+      self.failUnlessEqual(([], 5), self.backup(config, "diff", 5, False))
+
+
 #######################################################################
 # Suite definition
 #######################################################################
@@ -2614,6 +2739,7 @@ def suite():
                               unittest.makeSuite(TestRepositoryDir, 'test'),
                               unittest.makeSuite(TestSubversionConfig, 'test'),
                               unittest.makeSuite(TestLocalConfig, 'test'),
+                              unittest.makeSuite(TestFunctions, 'test'),
                             ))
 
 
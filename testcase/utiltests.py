@@ -91,6 +91,7 @@ from CedarBackup2.util import sortDict, resolveCommand, executeCommand, getFunct
 from CedarBackup2.util import convertSize, UNIT_BYTES, UNIT_SECTORS, UNIT_KBYTES, UNIT_MBYTES, UNIT_GBYTES
 from CedarBackup2.util import displayBytes, deriveDayOfWeek, isStartOfWeek, dereferenceLink
 from CedarBackup2.util import buildNormalizedPath, splitCommandLine, nullDevice
+from CedarBackup2.util import setIoMode, getIoMode, openBackupFile, closeBackupFile, IO_MODE_NORMAL, IO_MODE_BACKUP
 
 
 #######################################################################
@@ -4072,6 +4073,55 @@ class TestFunctions(unittest.TestCase):
       self.failUnlessEqual(["one", "two", "three", "four", "five", "six", "seven", "eight", ], actual)
 
 
+   ##########################################
+   # Test setIoMode() and openBackupFile()
+   ##########################################
+
+   def testIoMode_001(self):
+      """
+      Test setIoMode() and getIoMode() with valid and invalid values.
+      """
+      try:
+         self.failUnlessEqual(IO_MODE_NORMAL, getIoMode())
+         setIoMode(IO_MODE_BACKUP)
+         self.failUnlessEqual(IO_MODE_BACKUP, getIoMode())
+         self.failUnlessRaises(ValueError, setIoMode, "bogus")
+         self.failUnlessRaises(ValueError, setIoMode, None)
+         self.failUnlessEqual(IO_MODE_BACKUP, getIoMode())
+      finally:
+         setIoMode(IO_MODE_NORMAL)
+      self.failUnlessEqual(IO_MODE_NORMAL, getIoMode())
+
+   def testIoMode_002(self):
+      """
+      Test openBackupFile() and closeBackupFile() in both modes, for an existing
+      file.
+      """
+      path = self.getTempfile()
+      open(path, "wb").write("contents\n" * 1000)
+      try:
+         for mode in [ IO_MODE_NORMAL, IO_MODE_BACKUP, ]:
+            setIoMode(mode)
+            fileobj = openBackupFile(path)
+            self.failUnlessEqual("contents\n" * 1000, fileobj.read())
+            closeBackupFile(fileobj)
+            self.failUnless(fileobj.closed)
+      finally:
+         setIoMode(IO_MODE_NORMAL)
+
+   def testIoMode_003(self):
+      """
+      Test openBackupFile() in both modes, for a file that does not exist.
+      """
+      path = self.buildPath([ "bogus", ])
+      try:
+         for mode in [ IO_MODE_NORMAL, IO_MODE_BACKUP, ]:
+            setIoMode(mode)
+            self.failUnlessRaises(OSError, openBackupFile, path)
+      finally:
+         setIoMode(IO_MODE_NORMAL)
+
+
 #######################################################################
 # Suite definition
 #######################################################################
@@ -0,0 +1,509 @@
+#!/usr/bin/env python
+# -*- coding: iso-8859-1 -*-
+# vim: set ft=python ts=3 sw=3 expandtab:
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#
+#              C E D A R
+#          S O L U T I O N S       "Software done right."
+#           S O F T W A R E
+#
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#
+# Copyright (c) 2026 Kenneth J. Pronovici.
+# All rights reserved.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License,
+# Version 2, as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# Copies of the GNU General Public License are available from
+# the Free Software Foundation website, http://www.gnu.org/.
+#
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#
+# Author   : Kenneth J. Pronovici <pronovic@ieee.org>
+# Language : Python 2 (>= 2.7)
+# Project  : Cedar Backup, release 2
+# Purpose  : Benchmark the knapsack and span algorithms
+#
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+########################################################################
+# Notes
+########################################################################
+
+"""
+Benchmark the knapsack and span algorithms.
+
+Where C{knapsackdemo.py} just shows the algorithms working on a directory, this
+program measures C{BackupFileList.generateSpan} for each fit algorithm across a
+range of item distributions and list sizes.  Use 'python knapsackbench.py
+--help' for the usage.
+
+Each run reports the elapsed time, the peak memory used, the number of discs
+in the span, the lower bound on the number of discs (the total size divided by
+the capacity, rounded up) and the average utilization of the discs.  Results
+can be written to a JSON file with C{--output}, and a later run can be compared
+against that file with C{--compare}, which is the easiest way to see whether a
+change to C{knapsack.py} or C{filesystem.py} made things better or worse.
+
+The item sizes are generated up front, using a fixed seed so that every run
+sees the same items.  These distributions are available:
+
+   - C{uniform}: sizes spread evenly between 1 byte and 1/16 of the capacity
+   - C{lognormal}: a log-normal distribution around 32 KB, which is roughly what a home directory looks like
+   - C{mixed}: many tiny files (up to 64 KB) plus one huge file (1/8 to 3/4 of the capacity) in every thousand
+   - C{histogram}: sizes drawn from a histogram captured from a real directory with C{--capture}
+
+The histogram is built by walking a directory with a C{FilesystemList} and
+counting the files in power-of-two size buckets, so you can capture it once
+from a machine you care about and keep the (small) file around.
+
+The lists are never built from real files.  Instead, C{generateSpan} is run on
+a C{BackupFileList} that returns the generated sizes rather than calling
+C{stat()}, so the code being timed is exactly what C{cback-span} uses, minus
+the filesystem.
+
+Each run happens in a child process, so that the peak memory (the growth in
+the maximum resident set size) is measured for that run alone, and so that
+runs which take too long can be stopped.  With the default timeout, the
+repeated single-disc algorithms will not finish at the larger list sizes; that
+is reported as a timeout rather than a failure, and is part of the result.
+
+@author: Kenneth J. Pronovici <pronovic@ieee.org>
+"""
+
+########################################################################
+# Imported modules and constants
+########################################################################
+
+import sys
+import os
+import time
+import math
+import json
+import array
+import bisect
+import random
+import signal
+import getopt
+import resource
+import platform
+from CedarBackup2.release import VERSION
+from CedarBackup2.filesystem import BackupFileList, FilesystemList
+
+BYTES_PER_KBYTE = 1024.0
+KBYTES_PER_MBYTE = 1024.0
+BYTES_PER_MBYTE = BYTES_PER_KBYTE * KBYTES_PER_MBYTE
+
+ALGORITHMS = [ "first_fit", "best_fit", "worst_fit", "alternate_fit", "optimal_fit",
+               "first_fit_decreasing", "best_fit_decreasing", ]
+DISTRIBUTIONS = [ "uniform", "lognormal", "mixed", "histogram", ]
+
+DEFAULT_DISTRIBUTIONS = [ "uniform", "lognormal", "mixed", ]
+DEFAULT_ITEMS = [ 1000, 10000, 100000, ]
+DEFAULT_CAPACITY = 650.0   # MB, a CD
+DEFAULT_TIMEOUT = 300.0    # seconds
+DEFAULT_SEED = 1
+
+
+######################
+# SyntheticList class
+######################
+
+class SyntheticList(BackupFileList):
+
+   """
+   Backup file list whose entries have generated sizes rather than real files.
+
+   Only the conversion into the form needed by the knapsack and bin packing
+   algorithms is replaced.  The "paths" are just the item indexes, which keeps
+   the list small even with millions of items.
+   """
+
+   def __init__(self, sizes):
+      """
+      Create object.
+      @param sizes: C{array.array} of item sizes, in bytes.
+      """
+      BackupFileList.__init__(self)
+      self.sizes = sizes
+
+   def _getSpanSizes(self, capacity=None, isoCost=False):
+      """
+      Returns the generated sizes in the form needed by the bin packing algorithms.
+      The sizes are used as they are, even if C{isoCost} is C{True}, since there are no real paths to cost.
+      @return: Tuple C{(paths, sizes)}, where the paths are the item indexes.
+      """
+      return (xrange(len(self.sizes)), self.sizes)
+
+
+###########################
+# generateSizes() function
+###########################
+
+def generateSizes(distribution, items, capacity, seed, histogram=None):
+
+   """
+   Generates a list of item sizes from a distribution.
+   Every size is at least 1 byte and no larger than the capacity.
+   @param distribution: Name of the distribution, one of L{DISTRIBUTIONS}.
+   @param items: Number of items to generate.
+   @param capacity: Capacity of a disc, in bytes.
+   @param seed: Seed for the random number generator.
+   @param histogram: Histogram to use for the C{histogram} distribution, as from L{captureHistogram}.
+   @return: C{array.array} of item sizes, in bytes.
+   @raise ValueError: If the distribution is unknown.
+   """
+
+   rng = random.Random(seed)
+   if distribution == "uniform":
+      limit = max(1, int(capacity / 16))
+      sample = lambda: rng.randint(1, limit)
+   elif distribution == "lognormal":
+      mu = math.log(32 * BYTES_PER_KBYTE)
+      sample = lambda: rng.lognormvariate(mu, 2.0)
+   elif distribution == "mixed":
+      tiny = int(64 * BYTES_PER_KBYTE)
+      sample = lambda: rng.random() < 0.001 and rng.randint(int(capacity / 8), int(capacity * 3 / 4)) or rng.randint(1, tiny)
+   elif distribution == "histogram":
+      if histogram is None:
+         raise ValueError("The histogram distribution needs a histogram file.")
+      buckets = histogram["buckets"]
+      totals = []
+      total = 0
+      for (low, high, count) in buckets:
+         total += count
+         totals.append(total)
+      if total == 0:
+         raise ValueError("The histogram is empty.")
+      def sample():
+         """Picks a histogram bucket in proportion to its count, and a size within it."""
+         (low, high, count) = buckets[bisect.bisect_right(totals, rng.randrange(total))]
+         return rng.randint(low, high)
+   else:
+      raise ValueError("Distribution [%s] is invalid." % distribution)
+   sizes = array.array("d")
+   for i in xrange(items):
+      sizes.append(float(min(max(1, int(sample())), capacity)))
+   return sizes
+
+
+##############################
+# captureHistogram() function
+##############################
+
+def captureHistogram(path):
+
+   """
+   Captures a histogram of the sizes of the files in a directory.
+
+   The files are counted in power-of-two buckets, so the first bucket holds
+   files of 0 or 1 byte, the next holds files of 2-3 bytes, then 4-7 bytes, and
+   so on.  Links and anything that isn't a regular file are ignored.
+
+   @param path: Directory to walk.
+   @return: Dictionary with keys C{source}, C{files} and C{buckets}, where each bucket is a list C{[low, high, count]}.
+   """
+
+   fsList = FilesystemList()
+   fsList.excludeLinks = True
+   fsList.excludeDirs = True
+   fsList.addDirContents(path)
+   counts = { }
+   for entry in fsList:
+      try:
+         size = os.stat(entry).st_size
+      except OSError:
+         continue
+      bucket = int(math.log(size, 2)) if size > 1 else 0
+      while bucket > 0 and 2**bucket > size:
+         bucket -= 1   # guard against floating point error in log()
+      counts[bucket] = counts.get(bucket, 0) + 1
+   buckets = []
+   for bucket in sorted(counts.keys()):
+      low = 2**bucket if bucket > 0 else 0
+      buckets.append([ low, 2**(bucket + 1) - 1, counts[bucket], ])
+   return { "source": os.path.abspath(path), "files": sum(counts.values()), "buckets": buckets, }
+
+
+##########################
+# runAlgorithm() function
+##########################
+
+def runAlgorithm(sizes, capacity, algorithm, budget=None):
+
+   """
+   Runs C{generateSpan} for one algorithm on a list of sizes, and measures it.
+
+   This is meant to run in a child process (see L{measureAlgorithm}), because
+   the peak memory is taken from the resource usage of the whole process.
+
+   @param sizes: C{array.array} of item sizes, in bytes.
+   @param capacity: Capacity of a disc, in bytes.
+   @param algorithm: Name of the algorithm, one of L{ALGORITHMS}.
+   @param budget: Time budget per disc for the optimal fit algorithm, or C{None} for the default.
+   @return: Dictionary of measurements.
+   """
+
+   backupList = SyntheticList(sizes)
+   before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+   start = time.time()
+   spanItems = backupList.generateSpan(capacity, algorithm, budget)
+   elapsed = time.time() - start
+   after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+   packed = sum([ len(spanItem.fileList) for spanItem in spanItems ])
+   used = sum([ spanItem.size for spanItem in spanItems ])
+   if packed != len(sizes) or [ spanItem for spanItem in spanItems if spanItem.size > capacity ]:
+      status = "invalid"
+   else:
+      status = "ok"
+   return { "status": status,
+            "seconds": elapsed,
+            "peakKB": after - before,
+            "discs": len(spanItems),
+            "utilization": spanItems and (used / (len(spanItems) * capacity)) * 100.0 or 0.0, }
+
+
+##############################
+# measureAlgorithm() function
+##############################
+
+def measureAlgorithm(sizes, capacity, algorithm, budget=None, timeout=DEFAULT_TIMEOUT):
+
+   """
+   Runs L{runAlgorithm} in a child process, stopping it if it takes too long.
+   @param sizes: C{array.array} of item sizes, in bytes.
+   @param capacity: Capacity of a disc, in bytes.
+   @param algorithm: Name of the algorithm, one of L{ALGORITHMS}.
+   @param budget: Time budget per disc for the optimal fit algorithm, or C{None} for the default.
+   @param timeout: Maximum time to wait for the child, in seconds.
+   @return: Dictionary of measurements, with status C{"timeout"} or C{"error"} if the run didn't finish.
+   """
+
+   (readFd, writeFd) = os.pipe()
+   pid = os.fork()
+   if pid == 0:
+      os.close(readFd)
+      try:
+         result = runAlgorithm(sizes, capacity, algorithm, budget)
+      except Exception, e:
+         result = { "status": "error", "error": str(e), }
+      os.write(writeFd, json.dumps(result))
+      os._exit(0)   # pylint: disable=W0212
+   os.close(writeFd)
+   deadline = time.time() + timeout
+   while True:
+      (done, status) = os.waitpid(pid, os.WNOHANG)
+      if done != 0:
+         break
+      if time.time() > deadline:
+         os.kill(pid, signal.SIGKILL)
+         os.waitpid(pid, 0)
+         os.close(readFd)
+         return { "status": "timeout", "seconds": timeout, }
+      time.sleep(0.05)
+   data = ""
+   while True:
+      chunk = os.read(readFd, 4096)
+      if not chunk:
+         break
+      data += chunk
+   os.close(readFd)
+   if not data:
+      return { "status": "error", "error": "Child exited with status %d." % status, }
+   return json.loads(data)
+
+
+############################
+# compareResults() function
+############################
+
+def compareResults(current, previous, fd=sys.stdout):
+
+   """
+   Prints a comparison of two sets of results.
+   Only runs that appear in both sets of results are compared.
+   @param current: Results from this run.
+   @param previous: Results from an earlier run, as read from a C{--output} file.
+   @param fd: File descriptor used to print information.
+   """
+
+   key = lambda result: (result["distribution"], result["items"], result["algorithm"])
+   earlier = dict([ (key(result), result) for result in previous["results"] ])
+   fd.write("\nCompared with version %s (%s):\n\n" % (previous["version"], previous["date"]))
+   fd.write("%-10s %9s %-20s %12s %12s %8s\n" % ("DIST", "ITEMS", "ALGORITHM", "TIME", "MEMORY", "DISCS"))
+   for result in current["results"]:
+      old = earlier.get(key(result))
+      if old is None:
+         continue
+      if result["status"] != "ok" or old["status"] != "ok":
+         fd.write("%-10s %9d %-20s %12s\n" % (result["distribution"], result["items"], result["algorithm"],
+                                              "%s/%s" % (old["status"], result["status"])))
+         continue
+      fd.write("%-10s %9d %-20s %11.2fx %11.2fx %+8d\n" % (result["distribution"], result["items"], result["algorithm"],
+                                                           result["seconds"] / max(old["seconds"], 1e-6),
+                                                           float(result["peakKB"]) / max(old["peakKB"], 1),
+                                                           result["discs"] - old["discs"]))
+
+
+####################
+# _usage() function
+####################
+
+def _usage(fd=sys.stderr):
+
+   """
+   Prints usage information for the benchmark.
+   @param fd: File descriptor used to print information.
+   """
+
+   fd.write("Usage: %s [switches]\n" % sys.argv[0])
+   fd.write("Times generateSpan() for each fit algorithm across several item distributions.\n")
+   fd.write("\n")
+   fd.write("  -h, --help               Display this usage/help listing\n")
+   fd.write("  -d, --distributions=LIST Distributions to use (default: %s)\n" % ",".join(DEFAULT_DISTRIBUTIONS))
+   fd.write("                           Any of: %s\n" % ",".join(DISTRIBUTIONS))
+   fd.write("  -n, --items=LIST         Numbers of items, like 1e3,1e5 (default: %s)\n" % ",".join(map(str, DEFAULT_ITEMS)))
+   fd.write("  -a, --algorithms=LIST    Algorithms to run (default: all)\n")
+   fd.write("                           Any of: %s\n" % ",".join(ALGORITHMS))
+   fd.write("  -c, --capacity=MB        Capacity of each disc, in MB (default: %.0f)\n" % DEFAULT_CAPACITY)
+   fd.write("  -b, --budget=SECONDS     Time budget per disc for optimal_fit (default: library default)\n")
+   fd.write("  -t, --timeout=SECONDS    Maximum time for each run (default: %.0f)\n" % DEFAULT_TIMEOUT)
+   fd.write("  -s, --seed=SEED          Seed for generating sizes (default: %d)\n" % DEFAULT_SEED)
+   fd.write("  -H, --histogram=FILE     Histogram file for the histogram distribution\n")
+   fd.write("  -C, --capture=DIR        Capture a histogram from DIR into the --histogram file, and exit\n")
+   fd.write("  -o, --output=FILE        Write the results to FILE as JSON\n")
+   fd.write("  -r, --compare=FILE       Compare the results with an earlier --output file\n")
+
+
+##################
+# main() function
+##################
+
+def main():
+
+   """Main routine."""
+
+   # Parse arguments
+   try:
+      (switches, args) = getopt.getopt(sys.argv[1:], "hd:n:a:c:b:t:s:H:C:o:r:",
+                                       [ "help", "distributions=", "items=", "algorithms=", "capacity=", "budget=",
+                                         "timeout=", "seed=", "histogram=", "capture=", "output=", "compare=", ])
+      switches = dict(switches)
+      if args or "-h" in switches or "--help" in switches:
+         _usage()
+         sys.exit(1)
+      get = lambda short, long, default: switches.get(short, switches.get(long, default))
+      distributions = get("-d", "--distributions", ",".join(DEFAULT_DISTRIBUTIONS)).split(",")
+      items = [ int(float(count)) for count in get("-n", "--items", ",".join(map(str, DEFAULT_ITEMS))).split(",") ]
+      algorithms = get("-a", "--algorithms", ",".join(ALGORITHMS)).split(",")
+      capacity = float(get("-c", "--capacity", DEFAULT_CAPACITY)) * BYTES_PER_MBYTE
+      budget = get("-b", "--budget", None)
+      budget = float(budget) if budget is not None else None
+      timeout = float(get("-t", "--timeout", DEFAULT_TIMEOUT))
+      seed = int(get("-s", "--seed", DEFAULT_SEED))
+      histogramPath = get("-H", "--histogram", None)
+      capturePath = get("-C", "--capture", None)
+      outputPath = get("-o", "--output", None)
+      comparePath = get("-r", "--compare", None)
+      for distribution in distributions:
+         if distribution not in DISTRIBUTIONS:
+            raise ValueError("Distribution [%s] is invalid." % distribution)
+      for algorithm in algorithms:
+         if algorithm not in ALGORITHMS:
+            raise ValueError("Algorithm [%s] is invalid." % algorithm)
+      if capturePath is not None and histogramPath is None:
+         raise ValueError("The --capture switch needs a --histogram file to write.")
+      if "histogram" in distributions and histogramPath is None:
+         raise ValueError("The histogram distribution needs a --histogram file.")
+   except (getopt.GetoptError, ValueError), e:
+      _usage()
+      sys.stderr.write("\n *** Error: %s\n" % e)
+      sys.exit(1)
+
+   # Capture a histogram, if that's all we were asked to do
+   if capturePath is not None:
+      histogram = captureHistogram(capturePath)
+      fp = open(histogramPath, "w")
+      try:
+         json.dump(histogram, fp, indent=1)
+      finally:
+         fp.close()
+      print "Captured %d files in %d buckets from %s." % (histogram["files"], len(histogram["buckets"]), histogram["source"])
+      return
+
+   histogram = None
+   if histogramPath is not None:
+      fp = open(histogramPath)
+      try:
+         histogram = json.load(fp)
+      finally:
+         fp.close()
+
+   # Print a starting banner
+   print ""
+   print "=============================================================="
+   print "KNAPSACK BENCHMARK PROGRAM"
+   print "=============================================================="
+   print ""
+   print "Capacity is %.2f MB, seed is %d, timeout is %.0f seconds." % (capacity/BYTES_PER_MBYTE, seed, timeout)
+   print "Memory is the growth in maximum resident set size during each run."
+   print ""
+   print "%-10s %9s %-20s %-7s %10s %10s %6s %6s %7s" % ("DIST", "ITEMS", "ALGORITHM", "STATUS", "SECONDS",
+                                                         "MEMORY KB", "DISCS", "BOUND", "UTIL %")
+
+   # Run each test
+   results = { "version": VERSION,
+               "python": platform.python_version(),
+               "platform": platform.platform(),
+               "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+               "capacity": capacity,
+               "seed": seed,
+               "timeout": timeout,
+               "budget": budget,
+               "results": [], }
+   for distribution in distributions:
+      for count in items:
+         sizes = generateSizes(distribution, count, capacity, seed, histogram)
+         bound = int(math.ceil(sum(sizes) / capacity))
+         for algorithm in algorithms:
+            result = measureAlgorithm(sizes, capacity, algorithm, budget, timeout)
+            result.update({ "distribution": distribution, "items": count, "algorithm": algorithm, "bound": bound, })
+            results["results"].append(result)
+            if result["status"] in ("ok", "invalid"):
+               print "%-10s %9d %-20s %-7s %10.3f %10d %6d %6d %7.2f" % (distribution, count, algorithm, result["status"],
+                                                                         result["seconds"], result["peakKB"],
+                                                                         result["discs"], bound, result["utilization"])
+            else:
+               print "%-10s %9d %-20s %-7s %s" % (distribution, count, algorithm, result["status"], result.get("error", ""))
+            sys.stdout.flush()
+
+   # Write and compare the results
+   if outputPath is not None:
+      fp = open(outputPath, "w")
+      try:
+         json.dump(results, fp, indent=1, sort_keys=True)
+      finally:
+         fp.close()
+      print "\nResults were written to %s." % outputPath
+   if comparePath is not None:
+      fp = open(comparePath)
+      try:
+         previous = json.load(fp)
+      finally:
+         fp.close()
+      compareResults(results, previous)
+
+
+########################################################################
+# Module entry point
+########################################################################
+
+# Run the main routine if the module is executed rather than sourced
+if __name__ == '__main__':
+   main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+# -*- coding: iso-8859-1 -*-
+# vim: set ft=python ts=3 sw=3 expandtab:
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#
+#              C E D A R
+#          S O L U T I O N S       "Software done right."
+#           S O F T W A R E
+#
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#
+# Copyright (c) 2026 Kenneth J. Pronovici.
+# All rights reserved.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License,
+# Version 2, as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# Copies of the GNU General Public License are available from
+# the Free Software Foundation website, http://www.gnu.org/.
+#
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+#
+# Author   : Kenneth J. Pronovici <pronovic@ieee.org>
+# Language : Python 2 (>= 2.7)
+# Project  : Cedar Backup, release 2
+# Purpose  : Benchmark physical-order archiving in filesystem.py
+#
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+########################################################################
+# Notes
+########################################################################
+
+"""
+Benchmark physical-order archiving in filesystem.py.
+
+This is a little test program that shows how much C{BackupFileList.sortPhysical}
+helps when archiving a tree whose walk order has nothing to do with its on-disk
+layout.  Use 'python physicalorderbench.py' to run the program.  The usage is::
+
+    Usage: physicalorderbench.py dir [files] [size]
+    Generates a tree of files (default 2000) of up to size KB
+    (default 256) in dir, and then times archiving the tree in
+    walk order, inode order and extent order.
+
+The tree is generated by writing files in random order across a set of
+directories, so that walk order is essentially random with respect to where
+the data ends up on disk.  Before each run, the page cache is dropped for every
+file in the tree using C{posix_fadvise(POSIX_FADV_DONTNEED)}, so each run has
+to go to disk.  The archive itself is written into C{dir}, next to the tree.
+
+The directory must not already exist, and it should live on the kind of disk
+you care about.  The difference is dramatic on spinning disks and negligible on
+SSDs or tmpfs.  You can also use C{echo 3 > /proc/sys/vm/drop_caches} between
+runs if you are root and want to be really sure the cache is cold.
+
+@author: Kenneth J. Pronovici <pronovic@ieee.org>
+"""
+
+########################################################################
+# Imported modules and constants
+########################################################################
+
+import sys
+import os
+import time
+import random
+from CedarBackup2.filesystem import BackupFileList
+from CedarBackup2.util import adviseFileAccess, POSIX_FADV_DONTNEED
+
+BYTES_PER_KBYTE = 1024.0
+KBYTES_PER_MBYTE = 1024.0
+BYTES_PER_MBYTE = BYTES_PER_KBYTE * KBYTES_PER_MBYTE
+
+DIRECTORIES = 50
+
+
+#######################
+# buildTree() function
+#######################
+
+def buildTree(treeDir, files, size):
+
+   """
+   Builds a tree of files, writing them in random order.
+   @param treeDir: Directory to build the tree in.
+   @param files: Number of files to create.
+   @param size: Maximum size of each file, in KB.
+   @return: Total size of the tree, in bytes.
+   """
+
+   for i in range(0, DIRECTORIES):
+      os.makedirs(os.path.join(treeDir, "dir%03d" % i))
+   paths = [ os.path.join(treeDir, "dir%03d" % (i % DIRECTORIES), "file%05d" % i) for i in range(0, files) ]
+   random.shuffle(paths)
+   total = 0
+   for path in paths:
+      length = random.randint(1, int(size * BYTES_PER_KBYTE))
+      fp = open(path, "wb")
+      try:
+         fp.write(os.urandom(length))
+         fp.flush()
+         os.fsync(fp.fileno())
+      finally:
+         fp.close()
+      total += length
+   return total
+
+
+########################
+# dropCache() function
+########################
+
+def dropCache(files):
+
+   """
+   Asks the kernel to drop any cached pages for each file in a list.
+   @param files: List of files.
+   @return: Boolean indicating whether the advice was accepted for every file.
+   """
+
+   dropped = True
+   for entry in files:
+      fd = os.open(entry, os.O_RDONLY)
+      try:
+         dropped = adviseFileAccess(fd, POSIX_FADV_DONTNEED) and dropped
+      finally:
+         os.close(fd)
+   return dropped
+
+
+##################
+# main() function
+##################
+
+def main():
+
+   """Main routine."""
+
+   # Check arguments
+   if len(sys.argv) not in (2, 3, 4):
+      print "Usage: %s dir [files] [size]" % sys.argv[0]
+      print "Generates a tree of files (default 2000) of up to size KB"
+      print "(default 256) in dir, and then times archiving the tree in"
+      print "walk order, inode order and extent order."
+      sys.exit(1)
+
+   targetDir = sys.argv[1]
+   files = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+   size = int(sys.argv[3]) if len(sys.argv) > 3 else 256
+
+   if os.path.exists(targetDir):
+      print "Directory %s already exists." % targetDir
+      sys.exit(1)
+
+   # Print a starting banner
+   print ""
+   print "=============================================================="
+   print "PHYSICAL ORDER BENCHMARK PROGRAM"
+   print "=============================================================="
+   print ""
+   print "This program builds a tree of files written in random order,"
+   print "and then archives the tree with the files read in walk order,"
+   print "in inode order, and in the order of their first extent on disk."
+   print ""
+   print "The page cache is dropped for the tree before each run, so"
+   print "every run has to read the data from disk."
+   print ""
+   print "=============================================================="
+   print ""
+
+   # Build the tree
+   treeDir = os.path.join(targetDir, "tree")
+   tarPath = os.path.join(targetDir, "bench.tar")
+   start = time.time()
+   total = buildTree(treeDir, files, size)
+   end = time.time()
+   print "Built %d files, about %.2f MB, in %.3f seconds." % (files, total/BYTES_PER_MBYTE, end - start)
+   print ""
+
+   # Define the list of tests
+   # (These are functions that put the list in the order to test.)
+   tests = [ ('  WALK ORDER', lambda backupList: None),
+             (' INODE ORDER', lambda backupList: backupList.sortPhysical(extents=False)),
+             ('EXTENT ORDER', lambda backupList: backupList.sortPhysical(extents=True)), ]
+
+   # Run each test
+   for (key, order) in tests:
+
+      # Build and order the list
+      backupList = BackupFileList()
+      backupList.addDirContents(treeDir)
+      start = time.time()
+      order(backupList)
+      sorting = time.time() - start
+
+      # Drop the cache and time the archive
+      if not dropCache(backupList):
+         print "Warning: unable to drop the page cache; results will be meaningless."
+      if os.path.exists(tarPath):
+         os.remove(tarPath)
+      start = time.time()
+      backupList.generateTarfile(tarPath)
+      elapsed = time.time() - start
+
+      # Display the results
+      print "%s: sort %8.5f sec, archive %8.3f sec, %8.2f MB/sec" % (key, sorting, elapsed, (total/BYTES_PER_MBYTE)/elapsed)
+
+   print "\nThe tree and archive were left in %s." % targetDir
+
+
+########################################################################
+# Module entry point
+########################################################################
+
+# Run the main routine if the module is executed rather than sourced
+if __name__ == '__main__':
+   main()
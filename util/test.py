@@ -145,9 +145,13 @@ def main():
          print ""
       from testcase import utiltests
       from testcase import knapsacktests
+      from testcase import deltatests
+      from testcase import chunktests
       from testcase import filesystemtests
       from testcase import peertests
       from testcase import actionsutiltests
+      from testcase import actionscollecttests
+      from testcase import actionsstoretests
       from testcase import writersutiltests
       from testcase import cdwritertests
       from testcase import dvdwritertests
@@ -220,9 +224,13 @@ def main():
    unittests = { }
    if args == [] or "util" in args: unittests["util"] = utiltests.suite()
    if args == [] or "knapsack" in args: unittests["knapsack"] = knapsacktests.suite()
+   if args == [] or "delta" in args: unittests["delta"] = deltatests.suite()
+   if args == [] or "chunk" in args: unittests["chunk"] = chunktests.suite()
    if args == [] or "filesystem" in args: unittests["filesystem"] = filesystemtests.suite()
    if args == [] or "peer" in args: unittests["peer"] = peertests.suite()
    if args == [] or "actionsutil" in args: unittests["actionsutil"] = actionsutiltests.suite()
+   if args == [] or "actionscollect" in args: unittests["actionscollect"] = actionscollecttests.suite()
+   if args == [] or "actionsstore" in args: unittests["actionsstore"] = actionsstoretests.suite()
    if args == [] or "writersutil" in args: unittests["writersutil"] = writersutiltests.suite()
    if args == [] or "cdwriter" in args: unittests["cdwriter"] = cdwritertests.suite()
    if args == [] or "dvdwriter" in args: unittests["dvdwriter"] = dvdwritertests.suite()